@@ -63,6 +63,7 @@ else:
     from .aggregation import smoothed_aggregation_solver, rootnode_solver
     from .gallery import demo
     from .blackbox import solve, solver, solver_configuration
+    from .batch import batch_setup, batch_solve, component_solver
 
     __all__ = [s for s in dir() if not s.startswith('_')]
     __all__ += ['test', '__version__']
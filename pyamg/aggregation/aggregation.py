@@ -8,7 +8,7 @@ import numpy as np
 from scipy.sparse import csr_matrix, isspmatrix_csr, isspmatrix_bsr,\
     SparseEfficiencyWarning
 
-from pyamg.multilevel import multilevel_solver
+from pyamg.multilevel import multilevel_solver, galerkin_product
 from pyamg.relaxation.smoothing import change_smoothers
 from pyamg.util.utils import relaxation_as_linear_operator,\
     eliminate_diag_dom_nodes, blocksize,\
@@ -110,8 +110,9 @@ def smoothed_aggregation_solver(A, B=None, BH=None,
         dominance threshold.
     keep : {bool} : default False
         Flag to indicate keeping extra operators in the hierarchy for
-        diagnostics.  For example, if True, then strength of connection (C),
-        tentative prolongation (T), and aggregation (AggOp) are kept.
+        diagnostics.  For example, if True, then strength of connection (C)
+        and tentative prolongation (T) are kept.  The aggregation (AggOp)
+        is always kept, e.g., for the aggregate_schwarz smoother.
 
     Other Parameters
     ----------------
@@ -126,6 +127,10 @@ def smoothed_aggregation_solver(A, B=None, BH=None,
         For a detailed, more accurate setup complexity, pass in 
         'setup_complexity' = True. This will slow down performance, but
         increase accuracy of complexity count. 
+    mixed_precision : {None, 'coarse', 'all'}
+        Store the coarse levels ('coarse') or all levels ('all') in single
+        precision, see multilevel_solver.set_precision.  solve() wraps the
+        single precision cycle in a double precision iterative refinement.
 
     Returns
     -------
@@ -433,17 +438,30 @@ def extend_hierarchy(levels, strength, aggregate, smooth, improve_candidates,
 
     if keep:
         levels[-1].C = C            # strength of connection matrix
-        levels[-1].AggOp = AggOp    # aggregation operator
         levels[-1].T = T            # tentative prolongator
 
+    levels[-1].AggOp = AggOp  # aggregation operator
+
     levels[-1].P = P  # smoothed prolongator
     levels[-1].R = R  # restriction operator
 
+    # Prolongation smoother and its inputs other than A, with which
+    # multilevel_solver.update recomputes P and R for a new A
+    fn, kwargs = unpack_arg(smooth[len(levels)-1], cost=False)
+    if fn in ['jacobi', 'richardson'] and symmetry != 'nonsymmetric':
+        kwargs = dict((k, v) for k, v in kwargs.items() if k != 'cost')
+        kwargs['T'] = T
+        if fn == 'jacobi':
+            # C and B are only used by the filtered smoother
+            filtered = kwargs.get('filter', False)
+            kwargs.update(C=C if filtered else None, B=B if filtered else None)
+        levels[-1].interpolation = (fn, kwargs)
+
     # Form coarse grid operator, get complexity
-    levels[-1].complexity['RAP'] = mat_mat_complexity(R,A) / float(A.nnz)
-    RA = R * A
-    levels[-1].complexity['RAP'] += mat_mat_complexity(RA,P) / float(A.nnz)
-    A = RA * P      # Galerkin operator, Ac = RAP
+    temp_cost = [0.0]
+    nnz = float(A.nnz)
+    A = galerkin_product(levels[-1], cost=temp_cost)    # Ac = RAP
+    levels[-1].complexity['RAP'] = temp_cost[0] / nnz
     A.symmetry = symmetry
 
     levels.append(multilevel_solver.level())
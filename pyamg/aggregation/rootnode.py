@@ -8,7 +8,7 @@ from warnings import warn
 from scipy.sparse import csr_matrix, isspmatrix_csr, isspmatrix_bsr,\
     SparseEfficiencyWarning
 
-from pyamg.multilevel import multilevel_solver
+from pyamg.multilevel import multilevel_solver, galerkin_product
 from pyamg.relaxation.smoothing import change_smoothers
 from pyamg.util.utils import relaxation_as_linear_operator,\
     scale_T, get_Cpt_params, \
@@ -117,9 +117,9 @@ def rootnode_solver(A, B=None, BH=None,
     keep : {bool} : default False
         Flag to indicate keeping extra operators in the hierarchy for
         diagnostics.  For example, if True, then strength of connection (C),
-        tentative prolongation (T), aggregation (AggOp), and arrays
-        storing the C-points (Cpts) and F-points (Fpts) are kept at
-        each level.
+        tentative prolongation (T), and arrays storing the C-points (Cpts)
+        and F-points (Fpts) are kept at each level.  The aggregation
+        (AggOp) is always kept, e.g., for the aggregate_schwarz smoother.
 
     Other Parameters
     ----------------
@@ -134,6 +134,10 @@ def rootnode_solver(A, B=None, BH=None,
         For a detailed, more accurate setup complexity, pass in 
         'setup_complexity' = True. This will slow down performance, but
         increase accuracy of complexity count. 
+    mixed_precision : {None, 'coarse', 'all'}
+        Store the coarse levels ('coarse') or all levels ('all') in single
+        precision, see multilevel_solver.set_precision.  solve() wraps the
+        single precision cycle in a double precision iterative refinement.
 
     Returns
     -------
@@ -464,9 +468,10 @@ def extend_hierarchy(levels, strength, aggregate, smooth, improve_candidates,
             raise ValueError('unrecognized prolongation smoother \
                               method %s' % str(fn))
 
+    levels[-1].AggOp = AggOp                    # aggregation operator
+
     if keep:
         levels[-1].C = C                        # strength of connection matrix
-        levels[-1].AggOp = AggOp                # aggregation operator
         levels[-1].T = T                        # tentative prolongator
         levels[-1].Fpts = Cpt_params[1]['Fpts'] # Fpts
         levels[-1].P_I = Cpt_params[1]['P_I']   # Injection operator
@@ -478,10 +483,10 @@ def extend_hierarchy(levels, strength, aggregate, smooth, improve_candidates,
     levels[-1].Cpts = Cpt_params[1]['Cpts']     # Cpts (i.e., rootnodes)
 
     # Form coarse grid operator, get complexity
-    levels[-1].complexity['RAP'] = mat_mat_complexity(R,A) / float(A.nnz)
-    RA = R * A
-    levels[-1].complexity['RAP'] += mat_mat_complexity(RA,P) / float(A.nnz)
-    A = RA * P      # Galerkin operator, Ac = RAP
+    temp_cost = [0.0]
+    nnz = float(A.nnz)
+    A = galerkin_product(levels[-1], cost=temp_cost)    # Ac = RAP
+    levels[-1].complexity['RAP'] = temp_cost[0] / nnz
     A.symmetry = symmetry
 
     levels.append(multilevel_solver.level())
@@ -1,5 +1,11 @@
 /* -*- C -*-  (not really, but good for syntax highlighting) */
-%module amg_core
+
+/*
+ * The wrappers release the GIL while a kernel runs, so that threads can
+ * call the kernels concurrently.  The numpy arrays are unpacked before the
+ * GIL is released, and no kernel calls back into Python.
+ */
+%module(threads="1") amg_core
 %ignorewarn("509:") operator=;
 
 %{
@@ -13,6 +19,8 @@
 #include "ruge_stuben.h"
 #include "pairwise.h"
 #include "evolution_strength.h"
+#include "multilevel.h"
+#include "parallel.h"
 %}
 
 %feature("autodoc", "1");
@@ -50,15 +58,21 @@
     (const ctype Sj [], const int Sj_size),
     (      ctype Sj [], const int Sj_size),
     (const ctype Tj [], const int Tj_size),
+    (const ctype T_edges [], const int T_edges_size),
     (      ctype order [], const int order_size),
     (      ctype level [], const int level_size),
     (      ctype components [], const int components_size),
     (const ctype Id [], const int Id_size),
     (const ctype Cpts [], const int Cpts_size),
+    (const ctype Fpts [], const int Fpts_size),
     (const ctype splitting [], const int splitting_size),
     (      ctype splitting [], const int splitting_size),
     (      ctype indices [], const int indices_size),
     (const ctype indices [], const int indices_size),
+    (const ctype color_ptr [], const int color_ptr_size),
+    (const ctype block_ptr [], const int block_ptr_size),
+    (const ctype piv [], const int piv_size),
+    (      ctype piv [], const int piv_size),
     (const ctype rowptr [], const int rowptr_size),
     (      ctype rowptr [], const int rowptr_size),
     (const ctype colinds [], const int colinds_size),
@@ -67,7 +81,20 @@
     (const ctype A_colinds [], const int A_colinds_size),
     (const ctype C_rowptr [], const int C_rowptr_size),
     (const ctype C_colinds [], const int C_colinds_size),
-    (const ctype influence [], const int influence_size)
+    (const ctype influence [], const int influence_size),
+    (const ctype Pp [], const int Pp_size),
+    (const ctype Pj [], const int Pj_size),
+    (const ctype Rp [], const int Rp_size),
+    (const ctype Ri [], const int Ri_size),
+    (const ctype Rj [], const int Rj_size),
+    (const ctype Cp [], const int Cp_size),
+    (      ctype Cp [], const int Cp_size),
+    (const ctype Cj [], const int Cj_size),
+    (      ctype pairs [], const int pairs_size),
+    (      ctype Cj [], const int Cj_size),
+    (const ctype plan [], const int plan_size),
+    (const ctype levels [], const int levels_size),
+    (const ctype points [], const int points_size)
 
 };
 %enddef
@@ -98,16 +125,23 @@
     (      ctype Tx [], const int Tx_size),
     (      ctype AA [], const int AA_size),
     (      ctype  R [], const int  R_size),
+    (      ctype  r [], const int  r_size),
     (      ctype temp [], const int temp_size),
     (      ctype gamma [], const int gamma_size),
     (const ctype omega [], const int omega_size),
+    (const ctype coefficients [], const int coefficients_size),
     (const ctype X [], const int X_size),
     (      ctype data [], const int data_size),
     (const ctype A_data [], const int A_data_size),
     (const ctype C_data [], const int C_data_size),
     (      ctype C_data [], const int C_data_size),
     (      ctype weights [], const int weights_size),
-    (      ctype cost [], const int cost_size)
+    (      ctype cost [], const int cost_size),
+    (const ctype Px [], const int Px_size),
+    (const ctype Rx [], const int Rx_size),
+    (      ctype Cx [], const int Cx_size),
+    (const ctype coarse [], const int coarse_size),
+    (      ctype work [], const int work_size)
 };
 %enddef
 
@@ -179,6 +213,7 @@ INSTANTIATE_INDEXDATA_COMPLEX(filter_matrix_rows)
 %template(maximal_independent_set_serial)     maximal_independent_set_serial<int,int>;
 %template(maximal_independent_set_parallel)   maximal_independent_set_parallel<int,int,double>;
 %template(maximal_independent_set_k_parallel) maximal_independent_set_k_parallel<int,int,double>;
+%template(maximal_independent_set_threaded)   maximal_independent_set_threaded<int,int,double>;
 
 %template(vertex_coloring_mis)                vertex_coloring_mis<int,int>;
 %template(vertex_coloring_jones_plassmann)    vertex_coloring_jones_plassmann<int,int,double>;
@@ -207,7 +242,17 @@ INSTANTIATE_INDEXDATA(dense_GMRES)
 INSTANTIATE_INDEXDATA_COMPLEX(gauss_seidel)
 INSTANTIATE_INDEXDATA_COMPLEX(f_relaxation)
 INSTANTIATE_INDEXDATA_COMPLEX(bsr_gauss_seidel)
+INSTANTIATE_INDEXDATA_COMPLEX(hybrid_gauss_seidel)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_hybrid_gauss_seidel)
+INSTANTIATE_INDEXDATA_COMPLEX(l1_jacobi)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_l1_jacobi)
 INSTANTIATE_INDEXDATA_COMPLEX(jacobi)
+INSTANTIATE_INDEXDATA_COMPLEX(gauss_seidel_multivector)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_gauss_seidel_multivector)
+INSTANTIATE_INDEXDATA_COMPLEX(jacobi_multivector)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_jacobi_multivector)
+INSTANTIATE_INDEXDATA_COMPLEX(block_jacobi_multivector)
+INSTANTIATE_INDEXDATA_COMPLEX(block_gauss_seidel_multivector)
 INSTANTIATE_INDEXDATA_COMPLEX(jacobi_indexed)
 INSTANTIATE_INDEXDATA_COMPLEX(boundary_relaxation)
 INSTANTIATE_INDEXDATA_COMPLEX(bsr_jacobi)
@@ -221,6 +266,11 @@ INSTANTIATE_INDEXDATA_COMPLEX(block_jacobi_indexed)
 INSTANTIATE_INDEXDATA_COMPLEX(block_gauss_seidel)
 INSTANTIATE_INDEXDATA_COMPLEX(extract_subblocks)
 INSTANTIATE_INDEXDATA_COMPLEX(overlapping_schwarz_csr)
+INSTANTIATE_INDEXDATA_COMPLEX(lu_factor_blocks)
+INSTANTIATE_INDEXDATA_COMPLEX(lu_schwarz_csr)
+INSTANTIATE_INDEXDATA_COMPLEX(additive_lu_schwarz_csr)
+INSTANTIATE_INDEXDATA_COMPLEX(polynomial_smoother)
+INSTANTIATE_INDEXDATA_COMPLEX(cf_jacobi)
 
 /*----------------------------------------------------------------------------
   smoothed_aggregation.h
@@ -252,6 +302,7 @@ INSTANTIATE_INDEXDATA_COMPLEX(maximum_row_value)
 INSTANTIATE_INDEX_ONLY(rs_cf_splitting)
 INSTANTIATE_INDEX_ONLY(rs_cf_splitting_pass2)
 INSTANTIATE_INDEX_ONLY(cljp_naive_splitting)
+%template(cljp_splitting_threaded) cljp_splitting_threaded<int,double>;
 INSTANTIATE_INDEX_ONLY(rs_direct_interpolation_pass1)
 INSTANTIATE_INDEX_ONLY(rs_standard_interpolation_pass1)
 INSTANTIATE_INDEX_ONLY(distance_two_amg_interpolation_pass1)
@@ -290,3 +341,29 @@ INSTANTIATE_INDEXDATA(min_blocks)
 
 INSTANTIATE_INDEXDATA_COMPLEX(evolution_strength_helper)
 INSTANTIATE_INDEXDATA_COMPLEX(incomplete_mat_mult_csr)
+
+
+/*----------------------------------------------------------------------------
+  multilevel.h
+  ---------------------------------------------------------------------------*/
+%include "multilevel.h"
+
+INSTANTIATE_INDEXDATA_COMPLEX(csr_residual_restrict)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_residual_restrict)
+INSTANTIATE_INDEXDATA_COMPLEX(csr_interpolate_add)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_interpolate_add)
+INSTANTIATE_INDEX_ONLY(rap_symbolic)
+INSTANTIATE_INDEXDATA_COMPLEX(csr_rap_numeric)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_rap_numeric)
+INSTANTIATE_INDEXDATA_COMPLEX(multilevel_cycle)
+
+/*----------------------------------------------------------------------------
+  parallel.h
+  ---------------------------------------------------------------------------*/
+%include "parallel.h"
+
+INSTANTIATE_INDEXDATA_COMPLEX(csr_matvec_threaded)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_matvec_threaded)
+INSTANTIATE_INDEXDATA_COMPLEX(csr_residual_threaded)
+INSTANTIATE_INDEXDATA_COMPLEX(bsr_residual_threaded)
+INSTANTIATE_INDEXDATA_COMPLEX(gauss_seidel_multicolor)
@@ -197,6 +197,10 @@ def maximal_independent_set_k_parallel(num_rows, Ap, Aj, k, x, y, max_iters):
     """maximal_independent_set_k_parallel(int const num_rows, int const [] Ap, int const [] Aj, int const k, int [] x, double const [] y, int const max_iters)"""
     return _amg_core.maximal_independent_set_k_parallel(num_rows, Ap, Aj, k, x, y, max_iters)
 
+def maximal_independent_set_threaded(num_rows, Ap, Aj, active, C, F, x, y, max_iters, n_threads):
+    """maximal_independent_set_threaded(int const num_rows, int const [] Ap, int const [] Aj, int const active, int const C, int const F, int [] x, double const [] y, int const max_iters, int const n_threads) -> int"""
+    return _amg_core.maximal_independent_set_threaded(num_rows, Ap, Aj, active, C, F, x, y, max_iters, n_threads)
+
 def vertex_coloring_mis(num_rows, Ap, Aj, x):
     """vertex_coloring_mis(int const num_rows, int const [] Ap, int const [] Aj, int [] x) -> int"""
     return _amg_core.vertex_coloring_mis(num_rows, Ap, Aj, x)
@@ -298,6 +302,42 @@ def bsr_gauss_seidel(*args):
     """
     return _amg_core.bsr_gauss_seidel(*args)
 
+def hybrid_gauss_seidel(*args):
+    """
+    hybrid_gauss_seidel(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, float [] temp, int const [] block_ptr, int const row_step, float const [] omega, int const n_threads)
+    hybrid_gauss_seidel(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, double [] temp, int const [] block_ptr, int const row_step, double const [] omega, int const n_threads)
+    hybrid_gauss_seidel(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, std::complex< float > [] temp, int const [] block_ptr, int const row_step, std::complex< float > const [] omega, int const n_threads)
+    hybrid_gauss_seidel(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, std::complex< double > [] temp, int const [] block_ptr, int const row_step, std::complex< double > const [] omega, int const n_threads)
+    """
+    return _amg_core.hybrid_gauss_seidel(*args)
+
+def bsr_hybrid_gauss_seidel(*args):
+    """
+    bsr_hybrid_gauss_seidel(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, float [] temp, int const [] block_ptr, int const row_step, float const [] omega, int const blocksize, int const n_threads)
+    bsr_hybrid_gauss_seidel(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, double [] temp, int const [] block_ptr, int const row_step, double const [] omega, int const blocksize, int const n_threads)
+    bsr_hybrid_gauss_seidel(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, std::complex< float > [] temp, int const [] block_ptr, int const row_step, std::complex< float > const [] omega, int const blocksize, int const n_threads)
+    bsr_hybrid_gauss_seidel(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, std::complex< double > [] temp, int const [] block_ptr, int const row_step, std::complex< double > const [] omega, int const blocksize, int const n_threads)
+    """
+    return _amg_core.bsr_hybrid_gauss_seidel(*args)
+
+def l1_jacobi(*args):
+    """
+    l1_jacobi(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, float [] temp, float const [] omega, int const n_threads)
+    l1_jacobi(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, double [] temp, double const [] omega, int const n_threads)
+    l1_jacobi(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, std::complex< float > [] temp, std::complex< float > const [] omega, int const n_threads)
+    l1_jacobi(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, std::complex< double > [] temp, std::complex< double > const [] omega, int const n_threads)
+    """
+    return _amg_core.l1_jacobi(*args)
+
+def bsr_l1_jacobi(*args):
+    """
+    bsr_l1_jacobi(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, float [] temp, float const [] omega, int const blocksize, int const n_threads)
+    bsr_l1_jacobi(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, double [] temp, double const [] omega, int const blocksize, int const n_threads)
+    bsr_l1_jacobi(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, std::complex< float > [] temp, std::complex< float > const [] omega, int const blocksize, int const n_threads)
+    bsr_l1_jacobi(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, std::complex< double > [] temp, std::complex< double > const [] omega, int const blocksize, int const n_threads)
+    """
+    return _amg_core.bsr_l1_jacobi(*args)
+
 def jacobi(*args):
     """
     jacobi(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float [] temp, int const row_start, int const row_stop, int const row_step, float const [] omega)
@@ -307,6 +347,60 @@ def jacobi(*args):
     """
     return _amg_core.jacobi(*args)
 
+def gauss_seidel_multivector(*args):
+    """
+    gauss_seidel_multivector(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, int const row_start, int const row_stop, int const row_step, int const num_vectors)
+    gauss_seidel_multivector(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, int const row_start, int const row_stop, int const row_step, int const num_vectors)
+    gauss_seidel_multivector(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, int const row_start, int const row_stop, int const row_step, int const num_vectors)
+    gauss_seidel_multivector(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, int const row_start, int const row_stop, int const row_step, int const num_vectors)
+    """
+    return _amg_core.gauss_seidel_multivector(*args)
+
+def bsr_gauss_seidel_multivector(*args):
+    """
+    bsr_gauss_seidel_multivector(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    bsr_gauss_seidel_multivector(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    bsr_gauss_seidel_multivector(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    bsr_gauss_seidel_multivector(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    """
+    return _amg_core.bsr_gauss_seidel_multivector(*args)
+
+def jacobi_multivector(*args):
+    """
+    jacobi_multivector(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float [] temp, int const row_start, int const row_stop, int const row_step, float const [] omega, int const num_vectors)
+    jacobi_multivector(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double [] temp, int const row_start, int const row_stop, int const row_step, double const [] omega, int const num_vectors)
+    jacobi_multivector(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > [] temp, int const row_start, int const row_stop, int const row_step, std::complex< float > const [] omega, int const num_vectors)
+    jacobi_multivector(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > [] temp, int const row_start, int const row_stop, int const row_step, std::complex< double > const [] omega, int const num_vectors)
+    """
+    return _amg_core.jacobi_multivector(*args)
+
+def bsr_jacobi_multivector(*args):
+    """
+    bsr_jacobi_multivector(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float [] temp, int const row_start, int const row_stop, int const row_step, int const blocksize, float const [] omega, int const num_vectors)
+    bsr_jacobi_multivector(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double [] temp, int const row_start, int const row_stop, int const row_step, int const blocksize, double const [] omega, int const num_vectors)
+    bsr_jacobi_multivector(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > [] temp, int const row_start, int const row_stop, int const row_step, int const blocksize, std::complex< float > const [] omega, int const num_vectors)
+    bsr_jacobi_multivector(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > [] temp, int const row_start, int const row_stop, int const row_step, int const blocksize, std::complex< double > const [] omega, int const num_vectors)
+    """
+    return _amg_core.bsr_jacobi_multivector(*args)
+
+def block_jacobi_multivector(*args):
+    """
+    block_jacobi_multivector(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, float [] temp, int const row_start, int const row_stop, int const row_step, float const [] omega, int const blocksize, int const num_vectors)
+    block_jacobi_multivector(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, double [] temp, int const row_start, int const row_stop, int const row_step, double const [] omega, int const blocksize, int const num_vectors)
+    block_jacobi_multivector(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, std::complex< float > [] temp, int const row_start, int const row_stop, int const row_step, std::complex< float > const [] omega, int const blocksize, int const num_vectors)
+    block_jacobi_multivector(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, std::complex< double > [] temp, int const row_start, int const row_stop, int const row_step, std::complex< double > const [] omega, int const blocksize, int const num_vectors)
+    """
+    return _amg_core.block_jacobi_multivector(*args)
+
+def block_gauss_seidel_multivector(*args):
+    """
+    block_gauss_seidel_multivector(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    block_gauss_seidel_multivector(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    block_gauss_seidel_multivector(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    block_gauss_seidel_multivector(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, int const row_start, int const row_stop, int const row_step, int const blocksize, int const num_vectors)
+    """
+    return _amg_core.block_gauss_seidel_multivector(*args)
+
 def jacobi_indexed(*args):
     """
     jacobi_indexed(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, int const [] indices, float const [] omega)
@@ -424,6 +518,51 @@ def overlapping_schwarz_csr(*args):
     """
     return _amg_core.overlapping_schwarz_csr(*args)
 
+def lu_factor_blocks(*args):
+    """
+    lu_factor_blocks(float [] Tx, int const [] Tp, int [] piv, int const [] Sp, int const nsdomains, int const n_threads)
+    lu_factor_blocks(double [] Tx, int const [] Tp, int [] piv, int const [] Sp, int const nsdomains, int const n_threads)
+    lu_factor_blocks(std::complex< float > [] Tx, int const [] Tp, int [] piv, int const [] Sp, int const nsdomains, int const n_threads)
+    lu_factor_blocks(std::complex< double > [] Tx, int const [] Tp, int [] piv, int const [] Sp, int const nsdomains, int const n_threads)
+    """
+    return _amg_core.lu_factor_blocks(*args)
+
+def lu_schwarz_csr(*args):
+    """
+    lu_schwarz_csr(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, int nsdomains, int nrows, int row_start, int row_stop, int row_step)
+    lu_schwarz_csr(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, int nsdomains, int nrows, int row_start, int row_stop, int row_step)
+    lu_schwarz_csr(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, int nsdomains, int nrows, int row_start, int row_stop, int row_step)
+    lu_schwarz_csr(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, int nsdomains, int nrows, int row_start, int row_stop, int row_step)
+    """
+    return _amg_core.lu_schwarz_csr(*args)
+
+def additive_lu_schwarz_csr(*args):
+    """
+    additive_lu_schwarz_csr(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, float [] temp, float [] z, float const [] omega, int const nsdomains, int const n_threads)
+    additive_lu_schwarz_csr(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, double [] temp, double [] z, double const [] omega, int const nsdomains, int const n_threads)
+    additive_lu_schwarz_csr(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, std::complex< float > [] temp, std::complex< float > [] z, std::complex< float > const [] omega, int const nsdomains, int const n_threads)
+    additive_lu_schwarz_csr(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, int const [] Tp, int const [] piv, int const [] Sj, int const [] Sp, std::complex< double > [] temp, std::complex< double > [] z, std::complex< double > const [] omega, int const nsdomains, int const n_threads)
+    """
+    return _amg_core.additive_lu_schwarz_csr(*args)
+
+def polynomial_smoother(*args):
+    """
+    polynomial_smoother(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, float const [] coefficients, float [] r, float [] y, int const blocksize, int const num_vectors, int const iterations, int const zero_guess, int const n_threads)
+    polynomial_smoother(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, double const [] coefficients, double [] r, double [] y, int const blocksize, int const num_vectors, int const iterations, int const zero_guess, int const n_threads)
+    polynomial_smoother(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, std::complex< float > const [] coefficients, std::complex< float > [] r, std::complex< float > [] y, int const blocksize, int const num_vectors, int const iterations, int const zero_guess, int const n_threads)
+    polynomial_smoother(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, std::complex< double > const [] coefficients, std::complex< double > [] r, std::complex< double > [] y, int const blocksize, int const num_vectors, int const iterations, int const zero_guess, int const n_threads)
+    """
+    return _amg_core.polynomial_smoother(*args)
+
+def cf_jacobi(*args):
+    """
+    cf_jacobi(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, float const [] Tx, int const [] Cpts, int const [] Fpts, float [] temp, int const blocksize, int const iterations, int const C_iterations, int const F_iterations, int const F_first, float const [] omega, int const n_threads)
+    cf_jacobi(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, double const [] Tx, int const [] Cpts, int const [] Fpts, double [] temp, int const blocksize, int const iterations, int const C_iterations, int const F_iterations, int const F_first, double const [] omega, int const n_threads)
+    cf_jacobi(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > const [] Tx, int const [] Cpts, int const [] Fpts, std::complex< float > [] temp, int const blocksize, int const iterations, int const C_iterations, int const F_iterations, int const F_first, std::complex< float > const [] omega, int const n_threads)
+    cf_jacobi(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > const [] Tx, int const [] Cpts, int const [] Fpts, std::complex< double > [] temp, int const blocksize, int const iterations, int const C_iterations, int const F_iterations, int const F_first, std::complex< double > const [] omega, int const n_threads)
+    """
+    return _amg_core.cf_jacobi(*args)
+
 def symmetric_strength_of_connection(*args):
     """
     symmetric_strength_of_connection(int const n_row, float const theta, int const [] Ap, int const [] Aj, float const [] Ax, int [] Sp, int [] Sj, float [] Sx)
@@ -524,6 +663,10 @@ def cljp_naive_splitting(n, C_rowptr, C_colinds, Tp, Tj, splitting, colorflag):
     """cljp_naive_splitting(int const n, int const [] C_rowptr, int const [] C_colinds, int const [] Tp, int const [] Tj, int [] splitting, int const colorflag)"""
     return _amg_core.cljp_naive_splitting(n, C_rowptr, C_colinds, Tp, Tj, splitting, colorflag)
 
+def cljp_splitting_threaded(n, C_rowptr, C_colinds, Tp, Tj, T_edges, weights, splitting, n_threads):
+    """cljp_splitting_threaded(int const n, int const [] C_rowptr, int const [] C_colinds, int const [] Tp, int const [] Tj, int const [] T_edges, double [] weights, int [] splitting, int const n_threads)"""
+    return _amg_core.cljp_splitting_threaded(n, C_rowptr, C_colinds, Tp, Tj, T_edges, weights, splitting, n_threads)
+
 def rs_direct_interpolation_pass1(n_nodes, C_rowptr, C_colinds, splitting, P_rowptr):
     """rs_direct_interpolation_pass1(int const n_nodes, int const [] C_rowptr, int const [] C_colinds, int const [] splitting, int [] P_rowptr)"""
     return _amg_core.rs_direct_interpolation_pass1(n_nodes, C_rowptr, C_colinds, splitting, P_rowptr)
@@ -690,6 +833,143 @@ def incomplete_mat_mult_csr(*args):
     incomplete_mat_mult_csr(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, int const [] Bp, int const [] Bj, std::complex< double > const [] Bx, int const [] Sp, int const [] Sj, std::complex< double > [] Sx, int const num_rows)
     """
     return _amg_core.incomplete_mat_mult_csr(*args)
+CYCLE_NROWS = _amg_core.CYCLE_NROWS
+CYCLE_BLOCKSIZE = _amg_core.CYCLE_BLOCKSIZE
+CYCLE_A_PTR = _amg_core.CYCLE_A_PTR
+CYCLE_A_IDX = _amg_core.CYCLE_A_IDX
+CYCLE_A_DATA = _amg_core.CYCLE_A_DATA
+CYCLE_P_ROWBLOCK = _amg_core.CYCLE_P_ROWBLOCK
+CYCLE_P_COLBLOCK = _amg_core.CYCLE_P_COLBLOCK
+CYCLE_P_PTR = _amg_core.CYCLE_P_PTR
+CYCLE_P_IDX = _amg_core.CYCLE_P_IDX
+CYCLE_P_DATA = _amg_core.CYCLE_P_DATA
+CYCLE_R_COLBLOCK = _amg_core.CYCLE_R_COLBLOCK
+CYCLE_R_PTR = _amg_core.CYCLE_R_PTR
+CYCLE_R_IDX = _amg_core.CYCLE_R_IDX
+CYCLE_R_DATA = _amg_core.CYCLE_R_DATA
+CYCLE_WORK = _amg_core.CYCLE_WORK
+CYCLE_PRE = _amg_core.CYCLE_PRE
+CYCLE_POST = _amg_core.CYCLE_POST
+CYCLE_FIELDS = _amg_core.CYCLE_FIELDS
+CYCLE_PRESMOOTH = _amg_core.CYCLE_PRESMOOTH
+CYCLE_RESTRICT = _amg_core.CYCLE_RESTRICT
+CYCLE_COARSE_SOLVE = _amg_core.CYCLE_COARSE_SOLVE
+CYCLE_INTERPOLATE = _amg_core.CYCLE_INTERPOLATE
+CYCLE_POSTSMOOTH = _amg_core.CYCLE_POSTSMOOTH
+
+def csr_residual_restrict(*args):
+    """
+    csr_residual_restrict(int const [] Ap, int const [] Aj, float const [] Ax, float const [] x, float const [] b, int const [] Rp, int const [] Ri, float const [] Rx, float [] y)
+    csr_residual_restrict(int const [] Ap, int const [] Aj, double const [] Ax, double const [] x, double const [] b, int const [] Rp, int const [] Ri, double const [] Rx, double [] y)
+    csr_residual_restrict(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > const [] x, std::complex< float > const [] b, int const [] Rp, int const [] Ri, std::complex< float > const [] Rx, std::complex< float > [] y)
+    csr_residual_restrict(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > const [] x, std::complex< double > const [] b, int const [] Rp, int const [] Ri, std::complex< double > const [] Rx, std::complex< double > [] y)
+    """
+    return _amg_core.csr_residual_restrict(*args)
+
+def bsr_residual_restrict(*args):
+    """
+    bsr_residual_restrict(int const [] Ap, int const [] Aj, float const [] Ax, float const [] x, float const [] b, int const [] Rp, int const [] Ri, float const [] Rx, float [] y, int const blocksize, int const coarse_blocksize)
+    bsr_residual_restrict(int const [] Ap, int const [] Aj, double const [] Ax, double const [] x, double const [] b, int const [] Rp, int const [] Ri, double const [] Rx, double [] y, int const blocksize, int const coarse_blocksize)
+    bsr_residual_restrict(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > const [] x, std::complex< float > const [] b, int const [] Rp, int const [] Ri, std::complex< float > const [] Rx, std::complex< float > [] y, int const blocksize, int const coarse_blocksize)
+    bsr_residual_restrict(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > const [] x, std::complex< double > const [] b, int const [] Rp, int const [] Ri, std::complex< double > const [] Rx, std::complex< double > [] y, int const blocksize, int const coarse_blocksize)
+    """
+    return _amg_core.bsr_residual_restrict(*args)
+
+def csr_interpolate_add(*args):
+    """
+    csr_interpolate_add(int const [] Pp, int const [] Pj, float const [] Px, float const [] y, float [] x)
+    csr_interpolate_add(int const [] Pp, int const [] Pj, double const [] Px, double const [] y, double [] x)
+    csr_interpolate_add(int const [] Pp, int const [] Pj, std::complex< float > const [] Px, std::complex< float > const [] y, std::complex< float > [] x)
+    csr_interpolate_add(int const [] Pp, int const [] Pj, std::complex< double > const [] Px, std::complex< double > const [] y, std::complex< double > [] x)
+    """
+    return _amg_core.csr_interpolate_add(*args)
+
+def bsr_interpolate_add(*args):
+    """
+    bsr_interpolate_add(int const [] Pp, int const [] Pj, float const [] Px, float const [] y, float [] x, int const blocksize, int const coarse_blocksize)
+    bsr_interpolate_add(int const [] Pp, int const [] Pj, double const [] Px, double const [] y, double [] x, int const blocksize, int const coarse_blocksize)
+    bsr_interpolate_add(int const [] Pp, int const [] Pj, std::complex< float > const [] Px, std::complex< float > const [] y, std::complex< float > [] x, int const blocksize, int const coarse_blocksize)
+    bsr_interpolate_add(int const [] Pp, int const [] Pj, std::complex< double > const [] Px, std::complex< double > const [] y, std::complex< double > [] x, int const blocksize, int const coarse_blocksize)
+    """
+    return _amg_core.bsr_interpolate_add(*args)
+
+def rap_symbolic(Rp, Rj, Ap, Aj, Pp, Pj, Cp, pairs, n_col):
+    """rap_symbolic(int const [] Rp, int const [] Rj, int const [] Ap, int const [] Aj, int const [] Pp, int const [] Pj, int [] Cp, int [] pairs, int const n_col)"""
+    return _amg_core.rap_symbolic(Rp, Rj, Ap, Aj, Pp, Pj, Cp, pairs, n_col)
+
+def csr_rap_numeric(*args):
+    """
+    csr_rap_numeric(int const [] Rp, int const [] Rj, float const [] Rx, int const [] Ap, int const [] Aj, float const [] Ax, int const [] Pp, int const [] Pj, float const [] Px, int [] Cp, int [] Cj, float [] Cx, int const n_col, int const reverse)
+    csr_rap_numeric(int const [] Rp, int const [] Rj, double const [] Rx, int const [] Ap, int const [] Aj, double const [] Ax, int const [] Pp, int const [] Pj, double const [] Px, int [] Cp, int [] Cj, double [] Cx, int const n_col, int const reverse)
+    csr_rap_numeric(int const [] Rp, int const [] Rj, std::complex< float > const [] Rx, int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, int const [] Pp, int const [] Pj, std::complex< float > const [] Px, int [] Cp, int [] Cj, std::complex< float > [] Cx, int const n_col, int const reverse)
+    csr_rap_numeric(int const [] Rp, int const [] Rj, std::complex< double > const [] Rx, int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, int const [] Pp, int const [] Pj, std::complex< double > const [] Px, int [] Cp, int [] Cj, std::complex< double > [] Cx, int const n_col, int const reverse)
+    """
+    return _amg_core.csr_rap_numeric(*args)
+
+def bsr_rap_numeric(*args):
+    """
+    bsr_rap_numeric(int const [] Rp, int const [] Rj, float const [] Rx, int const [] Ap, int const [] Aj, float const [] Ax, int const [] Pp, int const [] Pj, float const [] Px, int [] Cp, int [] Cj, float [] Cx, int const n_col, int const R_blocksize, int const A_blocksize, int const P_blocksize, int const reverse)
+    bsr_rap_numeric(int const [] Rp, int const [] Rj, double const [] Rx, int const [] Ap, int const [] Aj, double const [] Ax, int const [] Pp, int const [] Pj, double const [] Px, int [] Cp, int [] Cj, double [] Cx, int const n_col, int const R_blocksize, int const A_blocksize, int const P_blocksize, int const reverse)
+    bsr_rap_numeric(int const [] Rp, int const [] Rj, std::complex< float > const [] Rx, int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, int const [] Pp, int const [] Pj, std::complex< float > const [] Px, int [] Cp, int [] Cj, std::complex< float > [] Cx, int const n_col, int const R_blocksize, int const A_blocksize, int const P_blocksize, int const reverse)
+    bsr_rap_numeric(int const [] Rp, int const [] Rj, std::complex< double > const [] Rx, int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, int const [] Pp, int const [] Pj, std::complex< double > const [] Px, int [] Cp, int [] Cj, std::complex< double > [] Cx, int const n_col, int const R_blocksize, int const A_blocksize, int const P_blocksize, int const reverse)
+    """
+    return _amg_core.bsr_rap_numeric(*args)
+
+def multilevel_cycle(*args):
+    """
+    multilevel_cycle(int const [] plan, int const [] levels, float const [] omega, int const [] Ap, int const [] Aj, float const [] Ax, int const [] Pp, int const [] Pj, float const [] Px, int const [] Rp, int const [] Ri, float const [] Rx, int const [] points, float const [] coarse, float [] x, float const [] b, float [] work)
+    multilevel_cycle(int const [] plan, int const [] levels, double const [] omega, int const [] Ap, int const [] Aj, double const [] Ax, int const [] Pp, int const [] Pj, double const [] Px, int const [] Rp, int const [] Ri, double const [] Rx, int const [] points, double const [] coarse, double [] x, double const [] b, double [] work)
+    multilevel_cycle(int const [] plan, int const [] levels, std::complex< float > const [] omega, int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, int const [] Pp, int const [] Pj, std::complex< float > const [] Px, int const [] Rp, int const [] Ri, std::complex< float > const [] Rx, int const [] points, std::complex< float > const [] coarse, std::complex< float > [] x, std::complex< float > const [] b, std::complex< float > [] work)
+    multilevel_cycle(int const [] plan, int const [] levels, std::complex< double > const [] omega, int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, int const [] Pp, int const [] Pj, std::complex< double > const [] Px, int const [] Rp, int const [] Ri, std::complex< double > const [] Rx, int const [] points, std::complex< double > const [] coarse, std::complex< double > [] x, std::complex< double > const [] b, std::complex< double > [] work)
+    """
+    return _amg_core.multilevel_cycle(*args)
+
+def csr_matvec_threaded(*args):
+    """
+    csr_matvec_threaded(int const [] Ap, int const [] Aj, float const [] Ax, float const [] x, float [] y, int const n_threads)
+    csr_matvec_threaded(int const [] Ap, int const [] Aj, double const [] Ax, double const [] x, double [] y, int const n_threads)
+    csr_matvec_threaded(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > const [] x, std::complex< float > [] y, int const n_threads)
+    csr_matvec_threaded(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > const [] x, std::complex< double > [] y, int const n_threads)
+    """
+    return _amg_core.csr_matvec_threaded(*args)
+
+def bsr_matvec_threaded(*args):
+    """
+    bsr_matvec_threaded(int const [] Ap, int const [] Aj, float const [] Ax, float const [] x, float [] y, int const R, int const C, int const n_threads)
+    bsr_matvec_threaded(int const [] Ap, int const [] Aj, double const [] Ax, double const [] x, double [] y, int const R, int const C, int const n_threads)
+    bsr_matvec_threaded(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > const [] x, std::complex< float > [] y, int const R, int const C, int const n_threads)
+    bsr_matvec_threaded(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > const [] x, std::complex< double > [] y, int const R, int const C, int const n_threads)
+    """
+    return _amg_core.bsr_matvec_threaded(*args)
+
+def csr_residual_threaded(*args):
+    """
+    csr_residual_threaded(int const [] Ap, int const [] Aj, float const [] Ax, float const [] x, float const [] b, float [] r, int const n_threads)
+    csr_residual_threaded(int const [] Ap, int const [] Aj, double const [] Ax, double const [] x, double const [] b, double [] r, int const n_threads)
+    csr_residual_threaded(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > const [] x, std::complex< float > const [] b, std::complex< float > [] r, int const n_threads)
+    csr_residual_threaded(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > const [] x, std::complex< double > const [] b, std::complex< double > [] r, int const n_threads)
+    """
+    return _amg_core.csr_residual_threaded(*args)
+
+def bsr_residual_threaded(*args):
+    """
+    bsr_residual_threaded(int const [] Ap, int const [] Aj, float const [] Ax, float const [] x, float const [] b, float [] r, int const R, int const C, int const n_threads)
+    bsr_residual_threaded(int const [] Ap, int const [] Aj, double const [] Ax, double const [] x, double const [] b, double [] r, int const R, int const C, int const n_threads)
+    bsr_residual_threaded(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > const [] x, std::complex< float > const [] b, std::complex< float > [] r, int const R, int const C, int const n_threads)
+    bsr_residual_threaded(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > const [] x, std::complex< double > const [] b, std::complex< double > [] r, int const R, int const C, int const n_threads)
+    """
+    return _amg_core.bsr_residual_threaded(*args)
+
+def gauss_seidel_multicolor(*args):
+    """
+    gauss_seidel_multicolor(int const [] Ap, int const [] Aj, float const [] Ax, float [] x, float const [] b, int const [] indices, int const [] color_ptr, int const color_start, int const color_stop, int const color_step, int const n_threads)
+    gauss_seidel_multicolor(int const [] Ap, int const [] Aj, double const [] Ax, double [] x, double const [] b, int const [] indices, int const [] color_ptr, int const color_start, int const color_stop, int const color_step, int const n_threads)
+    gauss_seidel_multicolor(int const [] Ap, int const [] Aj, std::complex< float > const [] Ax, std::complex< float > [] x, std::complex< float > const [] b, int const [] indices, int const [] color_ptr, int const color_start, int const color_stop, int const color_step, int const n_threads)
+    gauss_seidel_multicolor(int const [] Ap, int const [] Aj, std::complex< double > const [] Ax, std::complex< double > [] x, std::complex< double > const [] b, int const [] indices, int const [] color_ptr, int const color_start, int const color_stop, int const color_step, int const n_threads)
+    """
+    return _amg_core.gauss_seidel_multicolor(*args)
 # This file is compatible with both classic and new-style classes.
 
+cvar = _amg_core.cvar
+PARALLEL_MIN_WORK = cvar.PARALLEL_MIN_WORK
 
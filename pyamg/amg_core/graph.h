@@ -7,6 +7,8 @@
 #include <limits>
 #include <vector>
 
+#include "parallel.h"
+
 /*
  *  Compute a maximal independent set for a graph stored in CSR format
  *  using a greedy serial algorithm
@@ -155,6 +157,118 @@ I maximal_independent_set_parallel(const I num_rows,
     return N;
 }
 
+/*
+ *  Compute a maximal independent set for a graph stored in CSR format
+ *  using Luby's parallel MIS algorithm with threads
+ *
+ *  Each iteration selects, in parallel, the active vertices whose value
+ *  in y is larger than that of every active neighbor (ties go to the
+ *  larger index), adds them to the MIS, and removes their active
+ *  neighbors.  Every pass reads only the state left by the previous pass,
+ *  so the MIS depends on y alone, and not on the number of threads.
+ *
+ *  Parameters
+ *      num_rows   - number of rows in A (number of vertices)
+ *      Ap[]       - CSR row pointer
+ *      Aj[]       - CSR index array
+ *      active     - value used for active vertices        (input)
+ *       C         - value used to mark non-MIS vertices   (output)
+ *       F         - value used to mark MIS vertices       (output)
+ *      x[]        - state of each vertex
+ *      y[]        - random values for each vertex
+ *      max_iters  - maximum number of iterations
+ *                   by default max_iters=-1 and no limit
+ *                   is imposed
+ *      n_threads  - maximum number of threads, see parallel_rows
+ *
+ *  Returns:
+ *      The number of nodes in the MIS.
+ *
+ *  Notes:
+ *      As in maximal_independent_set_parallel, only the vertices with
+ *      x[i] == active are considered.  Unlike that function, all
+ *      vertices of an iteration are selected from the same state, so the
+ *      MIS may differ from it for the same y.
+ *
+ */
+template<class I, class T, class R>
+I maximal_independent_set_threaded(const I num_rows,
+                                   const I Ap[], const int Ap_size,
+                                   const I Aj[], const int Aj_size,
+                                   const T active,
+                                   const T  C,
+                                   const T  F,
+                                         T  x[], const int  x_size,
+                                   const R  y[], const int  y_size,
+                                   const I  max_iters,
+                                   const I  n_threads)
+{
+    std::vector<char> mark(num_rows, 0);
+    I num_iters = 0;
+
+    const I N_initial = (I) std::count(x, x + num_rows, C);
+
+    while(std::find(x, x + num_rows, active) != x + num_rows &&
+          (max_iters == -1 || num_iters < max_iters)){
+        num_iters++;
+
+        // select the active local maxima
+        parallel_rows(Ap, num_rows, n_threads, (I) 1,
+            [&](const I row_start, const I row_end){
+                for(I i = row_start; i < row_end; i++){
+                    mark[i] = 0;
+                    if(x[i] != active) continue;
+
+                    const R yi = y[i];
+                    bool maximum = true;
+                    for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                        const I j = Aj[jj];
+                        if(j == i) continue;
+                        const T xj = x[j];
+                        if(xj == C ||
+                           (xj == active &&
+                            (y[j] > yi || (y[j] == yi && j > i)))){
+                            maximum = false;
+                            break;
+                        }
+                    }
+                    mark[i] = maximum;
+                }
+            });
+
+        parallel_rows(Ap, num_rows, n_threads, (I) 1,
+            [&](const I row_start, const I row_end){
+                for(I i = row_start; i < row_end; i++){
+                    if(mark[i]) x[i] = C;
+                }
+            });
+
+        // remove the active neighbors of the MIS
+        parallel_rows(Ap, num_rows, n_threads, (I) 1,
+            [&](const I row_start, const I row_end){
+                for(I i = row_start; i < row_end; i++){
+                    mark[i] = 0;
+                    if(x[i] != active) continue;
+                    for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                        if(x[Aj[jj]] == C){
+                            mark[i] = 1;
+                            break;
+                        }
+                    }
+                }
+            });
+
+        parallel_rows(Ap, num_rows, n_threads, (I) 1,
+            [&](const I row_start, const I row_end){
+                for(I i = row_start; i < row_end; i++){
+                    if(mark[i]) x[i] = F;
+                }
+            });
+    }
+
+    return (I) std::count(x, x + num_rows, C) - N_initial;
+}
+
 /*
  *  Compute a vertex coloring for a graph stored in CSR format.
  *
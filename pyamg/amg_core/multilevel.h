@@ -0,0 +1,870 @@
+#ifndef MULTILEVEL_H
+#define MULTILEVEL_H
+
+#include <vector>
+#include <algorithm>
+
+#include "linalg.h"
+#include "relaxation.h"
+
+/*
+ *  Compute the restricted residual
+ *
+ *      y = R*(b - A*x)
+ *
+ *  in a single pass over A and R, without forming the residual vector.
+ *  A is stored in CSR format.  R is accessed column-wise, i.e., Rp, Ri and
+ *  Rx are the CSR arrays of R^T (equivalently, the CSC arrays of R).  Each
+ *  entry of the residual is computed once and immediately scattered into
+ *  the coarse right-hand side y.
+ *
+ *  The sums are formed in the same order as by csr_residual_threaded
+ *  followed by csr_matvec_threaded with R, if the indices of R are sorted,
+ *  so that the result does not depend on the number of threads.
+ *
+ *  Parameters
+ *      Ap[]       - CSR row pointer of A
+ *      Aj[]       - CSR index array of A
+ *      Ax[]       - CSR data array of A
+ *      x[]        - approximate solution
+ *      b[]        - right hand side
+ *      Rp[]       - CSR row pointer of R^T
+ *      Ri[]       - CSR index array of R^T
+ *      Rx[]       - CSR data array of R^T
+ *      y[]        - restricted residual, of length R.shape[0]
+ *
+ *  Returns:
+ *      Nothing, y will be overwritten
+ *
+ *  Notes:
+ *      R^T is not conjugated, i.e., for R = P^H, Rx holds conj(P)
+ *
+ */
+template<class I, class T, class F>
+void csr_residual_restrict(const I Ap[], const int Ap_size,
+                           const I Aj[], const int Aj_size,
+                           const T Ax[], const int Ax_size,
+                           const T  x[], const int  x_size,
+                           const T  b[], const int  b_size,
+                           const I Rp[], const int Rp_size,
+                           const I Ri[], const int Ri_size,
+                           const T Rx[], const int Rx_size,
+                                 T  y[], const int  y_size)
+{
+    const I n = Ap_size - 1;
+
+    for(I k = 0; k < y_size; k++){
+        y[k] = 0.0;
+    }
+
+    for(I i = 0; i < n; i++){
+        T sum = 0.0;
+        for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+            sum += Ax[jj]*x[Aj[jj]];
+        }
+        const T r = b[i] - sum;
+
+        for(I kk = Rp[i]; kk < Rp[i+1]; kk++){
+            y[Ri[kk]] += Rx[kk]*r;
+        }
+    }
+}
+
+/*
+ *  Compute the restricted residual
+ *
+ *      y = R*(b - A*x)
+ *
+ *  in a single pass over A and R, where A is stored in BSR format.  R is
+ *  accessed column-wise through the BSR arrays of R^T, with blocks of
+ *  size blocksize x coarse_blocksize.  See csr_residual_restrict, the
+ *  threaded kernels are bsr_residual_threaded and bsr_matvec_threaded.
+ *
+ *  Parameters
+ *      Ap[]             - BSR row pointer of A
+ *      Aj[]             - BSR index array of A
+ *      Ax[]             - BSR data array of A
+ *      x[]              - approximate solution
+ *      b[]              - right hand side
+ *      Rp[]             - BSR row pointer of R^T
+ *      Ri[]             - BSR index array of R^T
+ *      Rx[]             - BSR data array of R^T
+ *      y[]              - restricted residual, of length R.shape[0]
+ *      blocksize        - BSR blocksize of A (blocks must be square)
+ *      coarse_blocksize - column blocksize of R^T
+ *
+ *  Returns:
+ *      Nothing, y will be overwritten
+ *
+ */
+template<class I, class T, class F>
+void bsr_residual_restrict(const I Ap[], const int Ap_size,
+                           const I Aj[], const int Aj_size,
+                           const T Ax[], const int Ax_size,
+                           const T  x[], const int  x_size,
+                           const T  b[], const int  b_size,
+                           const I Rp[], const int Rp_size,
+                           const I Ri[], const int Ri_size,
+                           const T Rx[], const int Rx_size,
+                                 T  y[], const int  y_size,
+                           const I blocksize,
+                           const I coarse_blocksize)
+{
+    const I n = Ap_size - 1;
+    const I B2 = blocksize*blocksize;
+    const I RB = blocksize*coarse_blocksize;
+    T *r = new T[blocksize];
+
+    for(I k = 0; k < y_size; k++){
+        y[k] = 0.0;
+    }
+
+    for(I i = 0; i < n; i++){
+        for(I m = 0; m < blocksize; m++){
+            r[m] = 0.0;
+        }
+
+        // r = b_i - sum_j A_ij x_j, blocks are stored row-major
+        for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+            const T *block = &(Ax[jj*B2]);
+            const T *xj = &(x[Aj[jj]*blocksize]);
+            for(I m = 0; m < blocksize; m++){
+                T sum = r[m];
+                for(I k = 0; k < blocksize; k++){
+                    sum += block[m*blocksize + k]*xj[k];
+                }
+                r[m] = sum;
+            }
+        }
+        for(I m = 0; m < blocksize; m++){
+            r[m] = b[i*blocksize + m] - r[m];
+        }
+
+        // y_J += (R^T)_iJ^T r
+        for(I kk = Rp[i]; kk < Rp[i+1]; kk++){
+            const T *block = &(Rx[kk*RB]);
+            T *yJ = &(y[Ri[kk]*coarse_blocksize]);
+            for(I m = 0; m < blocksize; m++){
+                for(I c = 0; c < coarse_blocksize; c++){
+                    yJ[c] += block[m*coarse_blocksize + c]*r[m];
+                }
+            }
+        }
+    }
+
+    delete[] r;
+}
+
+/*
+ *  Add the interpolated coarse-grid correction
+ *
+ *      x += P*y
+ *
+ *  in place, where P is stored in CSR format.
+ *
+ *  Parameters
+ *      Pp[]       - CSR row pointer of P
+ *      Pj[]       - CSR index array of P
+ *      Px[]       - CSR data array of P
+ *      y[]        - coarse-grid correction
+ *      x[]        - approximate solution
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void csr_interpolate_add(const I Pp[], const int Pp_size,
+                         const I Pj[], const int Pj_size,
+                         const T Px[], const int Px_size,
+                         const T  y[], const int  y_size,
+                               T  x[], const int  x_size)
+{
+    const I n = Pp_size - 1;
+
+    for(I i = 0; i < n; i++){
+        T sum = x[i];
+        for(I jj = Pp[i]; jj < Pp[i+1]; jj++){
+            sum += Px[jj]*y[Pj[jj]];
+        }
+        x[i] = sum;
+    }
+}
+
+/*
+ *  Add the interpolated coarse-grid correction
+ *
+ *      x += P*y
+ *
+ *  in place, where P is stored in BSR format with blocks of size
+ *  blocksize x coarse_blocksize.
+ *
+ *  Parameters
+ *      Pp[]             - BSR row pointer of P
+ *      Pj[]             - BSR index array of P
+ *      Px[]             - BSR data array of P
+ *      y[]              - coarse-grid correction
+ *      x[]              - approximate solution
+ *      blocksize        - row blocksize of P
+ *      coarse_blocksize - column blocksize of P
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void bsr_interpolate_add(const I Pp[], const int Pp_size,
+                         const I Pj[], const int Pj_size,
+                         const T Px[], const int Px_size,
+                         const T  y[], const int  y_size,
+                               T  x[], const int  x_size,
+                         const I blocksize,
+                         const I coarse_blocksize)
+{
+    const I n = Pp_size - 1;
+    const I PB = blocksize*coarse_blocksize;
+
+    for(I i = 0; i < n; i++){
+        T *xi = &(x[i*blocksize]);
+        for(I jj = Pp[i]; jj < Pp[i+1]; jj++){
+            const T *block = &(Px[jj*PB]);
+            const T *yJ = &(y[Pj[jj]*coarse_blocksize]);
+            for(I m = 0; m < blocksize; m++){
+                T sum = xi[m];
+                for(I c = 0; c < coarse_blocksize; c++){
+                    sum += block[m*coarse_blocksize + c]*yJ[c];
+                }
+                xi[m] = sum;
+            }
+        }
+    }
+}
+
+/*
+ *  Return whether all entries of a dense block of the given size are zero
+ */
+template<class I, class T>
+inline bool is_zero_block(const T block[], const I size)
+{
+    for(I m = 0; m < size; m++){
+        if(block[m] != static_cast<T>(0.0)){
+            return false;
+        }
+    }
+    return true;
+}
+
+/*
+ *  Symbolic phase of the Galerkin product C = R*A*P
+ *
+ *  Count the number of (block) nonzeros in each row of C, assuming no
+ *  numerical cancellation, and the work of the numeric phase.  The product
+ *  is formed row by row: the pattern of row i of R*A is gathered once, and
+ *  then multiplied with P, so that neither R*A nor A*P is formed.  Only the
+ *  (block) sparsity patterns of R, A and P are used, so that the same
+ *  routine serves CSR and BSR matrices.
+ *
+ *  Parameters
+ *      Rp[]       - row pointer of R
+ *      Rj[]       - index array of R
+ *      Ap[]       - row pointer of A
+ *      Aj[]       - index array of A
+ *      Pp[]       - row pointer of P
+ *      Pj[]       - index array of P
+ *      Cp[]       - row pointer of C, of length R.shape[0] + 1
+ *      pairs[]    - number of products of an entry of row i of R*A with
+ *                   an entry of P, of length R.shape[0]
+ *      n_col      - number of (block) columns of P
+ *
+ *  Returns:
+ *      Nothing, Cp and pairs will be overwritten, with Cp[-1] an upper
+ *      bound on the number of nonzeros of C for any values of R, A and P
+ *      with the given patterns
+ *
+ */
+template<class I>
+void rap_symbolic(const I Rp[], const int Rp_size,
+                  const I Rj[], const int Rj_size,
+                  const I Ap[], const int Ap_size,
+                  const I Aj[], const int Aj_size,
+                  const I Pp[], const int Pp_size,
+                  const I Pj[], const int Pj_size,
+                        I Cp[], const int Cp_size,
+                        I pairs[], const int pairs_size,
+                  const I n_col)
+{
+    const I n_row = Rp_size - 1;
+    std::vector<I> ra_mask(Pp_size - 1, -1);
+    std::vector<I> ra_cols;
+    std::vector<I> mask(n_col, -1);
+
+    Cp[0] = 0;
+    I nnz = 0;
+    for(I i = 0; i < n_row; i++){
+        // pattern of row i of R*A
+        ra_cols.clear();
+        for(I ii = Rp[i]; ii < Rp[i+1]; ii++){
+            const I k = Rj[ii];
+            for(I kk = Ap[k]; kk < Ap[k+1]; kk++){
+                const I l = Aj[kk];
+                if(ra_mask[l] != i){
+                    ra_mask[l] = i;
+                    ra_cols.push_back(l);
+                }
+            }
+        }
+
+        // pattern of row i of (R*A)*P
+        I work = 0;
+        for(std::size_t n = 0; n < ra_cols.size(); n++){
+            const I l = ra_cols[n];
+            work += Pp[l+1] - Pp[l];
+            for(I ll = Pp[l]; ll < Pp[l+1]; ll++){
+                const I j = Pj[ll];
+                if(mask[j] != i){
+                    mask[j] = i;
+                    nnz++;
+                }
+            }
+        }
+        pairs[i] = work;
+        Cp[i+1] = nnz;
+    }
+}
+
+/*
+ *  Numeric phase of the Galerkin product C = R*A*P for CSR matrices
+ *
+ *  Compute C row by row: row i of R*A is accumulated once in a sparse
+ *  accumulator, and then multiplied with P.  The result is the same as the
+ *  product (R*A)*P of scipy.sparse, including the order of the entries
+ *  within each row: with reverse set, as for CSR matrices, the entries of
+ *  a row of R*A and of C are ordered last reached first, and exact zeros
+ *  are dropped; otherwise, as for BSR matrices, the entries are ordered
+ *  first reached first, and all are kept.
+ *
+ *  Parameters
+ *      Rp[]       - CSR row pointer of R
+ *      Rj[]       - CSR index array of R
+ *      Rx[]       - CSR data array of R
+ *      Ap[]       - CSR row pointer of A
+ *      Aj[]       - CSR index array of A
+ *      Ax[]       - CSR data array of A
+ *      Pp[]       - CSR row pointer of P
+ *      Pj[]       - CSR index array of P
+ *      Px[]       - CSR data array of P
+ *      Cp[]       - CSR row pointer of C, of length R.shape[0] + 1
+ *      Cj[]       - CSR index array of C, of at least the length given by
+ *                   rap_symbolic
+ *      Cx[]       - CSR data array of C, of the same length as Cj
+ *      n_col      - number of columns of P
+ *      reverse    - order and filter the entries as for CSR matrices
+ *
+ *  Returns:
+ *      Nothing, Cp, Cj and Cx will be overwritten, with Cp[-1] the number
+ *      of nonzeros
+ *
+ */
+template<class I, class T, class F>
+void csr_rap_numeric(const I Rp[], const int Rp_size,
+                     const I Rj[], const int Rj_size,
+                     const T Rx[], const int Rx_size,
+                     const I Ap[], const int Ap_size,
+                     const I Aj[], const int Aj_size,
+                     const T Ax[], const int Ax_size,
+                     const I Pp[], const int Pp_size,
+                     const I Pj[], const int Pj_size,
+                     const T Px[], const int Px_size,
+                           I Cp[], const int Cp_size,
+                           I Cj[], const int Cj_size,
+                           T Cx[], const int Cx_size,
+                     const I n_col,
+                     const I reverse)
+{
+    const I n_row = Rp_size - 1;
+    // sparse accumulators for the rows of R*A and of C, each entry is the
+    // row it was last used for and its value
+    std::vector<std::pair<I, T> > ra(Pp_size - 1, std::make_pair(-1, 0.0));
+    std::vector<I> ra_cols;
+    std::vector<std::pair<I, T> > sums(n_col, std::make_pair(-1, 0.0));
+    std::vector<I> cols;
+
+    Cp[0] = 0;
+    I nnz = 0;
+    for(I i = 0; i < n_row; i++){
+        // row i of R*A
+        ra_cols.clear();
+        for(I ii = Rp[i]; ii < Rp[i+1]; ii++){
+            const T r = Rx[ii];
+            const I k = Rj[ii];
+            for(I kk = Ap[k]; kk < Ap[k+1]; kk++){
+                const I l = Aj[kk];
+                if(ra[l].first != i){
+                    ra[l].first = i;
+                    ra[l].second = r*Ax[kk];
+                    ra_cols.push_back(l);
+                }
+                else{
+                    ra[l].second += r*Ax[kk];
+                }
+            }
+        }
+
+        // row i of (R*A)*P
+        cols.clear();
+        const std::size_t ra_nnz = ra_cols.size();
+        for(std::size_t n = 0; n < ra_nnz; n++){
+            const I l = ra_cols[reverse ? ra_nnz - 1 - n : n];
+            const T v = ra[l].second;
+            if(reverse && v == static_cast<T>(0.0)){
+                continue;
+            }
+            for(I ll = Pp[l]; ll < Pp[l+1]; ll++){
+                const I j = Pj[ll];
+                if(sums[j].first != i){
+                    sums[j].first = i;
+                    sums[j].second = v*Px[ll];
+                    cols.push_back(j);
+                }
+                else{
+                    sums[j].second += v*Px[ll];
+                }
+            }
+        }
+        const std::size_t c_nnz = cols.size();
+        for(std::size_t n = 0; n < c_nnz; n++){
+            const I j = cols[reverse ? c_nnz - 1 - n : n];
+            if(reverse && sums[j].second == static_cast<T>(0.0)){
+                continue;
+            }
+            Cj[nnz] = j;
+            Cx[nnz] = sums[j].second;
+            nnz++;
+        }
+        Cp[i+1] = nnz;
+    }
+}
+
+/*
+ *  Numeric phase of the Galerkin product C = R*A*P for BSR matrices
+ *
+ *  See csr_rap_numeric.  The blocks of R, A, P and C have sizes
+ *  R_blocksize x A_blocksize, A_blocksize x A_blocksize,
+ *  A_blocksize x P_blocksize and R_blocksize x P_blocksize, and are
+ *  stored row-major.  With reverse set, zero blocks are dropped.
+ *
+ *  Parameters
+ *      Rp[]        - BSR row pointer of R
+ *      Rj[]        - BSR index array of R
+ *      Rx[]        - BSR data array of R
+ *      Ap[]        - BSR row pointer of A
+ *      Aj[]        - BSR index array of A
+ *      Ax[]        - BSR data array of A
+ *      Pp[]        - BSR row pointer of P
+ *      Pj[]        - BSR index array of P
+ *      Px[]        - BSR data array of P
+ *      Cp[]        - BSR row pointer of C, of length R.shape[0]/R_blocksize + 1
+ *      Cj[]        - BSR index array of C, of at least the length given by
+ *                    rap_symbolic
+ *      Cx[]        - BSR data array of C, of length R_blocksize*P_blocksize
+ *                    times the length of Cj
+ *      n_col       - number of block columns of P
+ *      R_blocksize - row blocksize of R
+ *      A_blocksize - blocksize of A
+ *      P_blocksize - column blocksize of P
+ *      reverse     - order and filter the blocks as for CSR matrices
+ *
+ *  Returns:
+ *      Nothing, Cp, Cj and Cx will be overwritten, with Cp[-1] the number
+ *      of nonzero blocks
+ *
+ */
+template<class I, class T, class F>
+void bsr_rap_numeric(const I Rp[], const int Rp_size,
+                     const I Rj[], const int Rj_size,
+                     const T Rx[], const int Rx_size,
+                     const I Ap[], const int Ap_size,
+                     const I Aj[], const int Aj_size,
+                     const T Ax[], const int Ax_size,
+                     const I Pp[], const int Pp_size,
+                     const I Pj[], const int Pj_size,
+                     const T Px[], const int Px_size,
+                           I Cp[], const int Cp_size,
+                           I Cj[], const int Cj_size,
+                           T Cx[], const int Cx_size,
+                     const I n_col,
+                     const I R_blocksize,
+                     const I A_blocksize,
+                     const I P_blocksize,
+                     const I reverse)
+{
+    const I n_row = Rp_size - 1;
+    const I rb = R_blocksize;
+    const I ab = A_blocksize;
+    const I pb = P_blocksize;
+    const I RB = rb*ab;
+    const I CB = rb*pb;
+    std::vector<I> ra_mask(Pp_size - 1, -1);
+    std::vector<I> ra_cols;
+    std::vector<T> ra((Pp_size - 1)*RB);
+    std::vector<I> mask(n_col, -1);
+    std::vector<I> cols;
+    std::vector<T> sums(n_col*CB);
+
+    Cp[0] = 0;
+    I nnz = 0;
+    for(I i = 0; i < n_row; i++){
+        // row i of R*A, RA_il += R_ik A_kl
+        ra_cols.clear();
+        for(I ii = Rp[i]; ii < Rp[i+1]; ii++){
+            const T *Rblock = &(Rx[ii*RB]);
+            const I k = Rj[ii];
+            for(I kk = Ap[k]; kk < Ap[k+1]; kk++){
+                const T *Ablock = &(Ax[kk*ab*ab]);
+                const I l = Aj[kk];
+                T *RAblock = &(ra[l*RB]);
+                if(ra_mask[l] != i){
+                    ra_mask[l] = i;
+                    ra_cols.push_back(l);
+                    std::fill(RAblock, RAblock + RB, static_cast<T>(0.0));
+                }
+                for(I m = 0; m < rb; m++){
+                    for(I c = 0; c < ab; c++){
+                        T sum = RAblock[m*ab + c];
+                        for(I q = 0; q < ab; q++){
+                            sum += Rblock[m*ab + q]*Ablock[q*ab + c];
+                        }
+                        RAblock[m*ab + c] = sum;
+                    }
+                }
+            }
+        }
+        if(reverse){
+            std::reverse(ra_cols.begin(), ra_cols.end());
+        }
+
+        // row i of (R*A)*P, C_ij += RA_il P_lj
+        cols.clear();
+        for(std::size_t n = 0; n < ra_cols.size(); n++){
+            const I l = ra_cols[n];
+            const T *RAblock = &(ra[l*RB]);
+            if(reverse && is_zero_block(RAblock, RB)){
+                continue;
+            }
+            for(I ll = Pp[l]; ll < Pp[l+1]; ll++){
+                const T *Pblock = &(Px[ll*ab*pb]);
+                const I j = Pj[ll];
+                T *Cblock = &(sums[j*CB]);
+                if(mask[j] != i){
+                    mask[j] = i;
+                    cols.push_back(j);
+                    std::fill(Cblock, Cblock + CB, static_cast<T>(0.0));
+                }
+                for(I m = 0; m < rb; m++){
+                    for(I c = 0; c < pb; c++){
+                        T sum = Cblock[m*pb + c];
+                        for(I q = 0; q < ab; q++){
+                            sum += RAblock[m*ab + q]*Pblock[q*pb + c];
+                        }
+                        Cblock[m*pb + c] = sum;
+                    }
+                }
+            }
+        }
+        if(reverse){
+            std::reverse(cols.begin(), cols.end());
+        }
+        for(std::size_t n = 0; n < cols.size(); n++){
+            const I j = cols[n];
+            const T *Cblock = &(sums[j*CB]);
+            if(reverse && is_zero_block(Cblock, CB)){
+                continue;
+            }
+            Cj[nnz] = j;
+            std::copy(Cblock, Cblock + CB, Cx + nnz*CB);
+            nnz++;
+        }
+        Cp[i+1] = nnz;
+    }
+}
+
+/*
+ *  Layout of the level descriptors passed to multilevel_cycle.  Each level
+ *  is described by CYCLE_FIELDS integers, where the offsets index the
+ *  concatenated arrays of all levels.  The smoother fields are repeated for
+ *  the presmoother (CYCLE_PRE) and the postsmoother (CYCLE_POST), see
+ *  multilevel_relax.  Unused fields, e.g., P and R on the coarsest level,
+ *  are zero.
+ */
+enum cycle_fields {
+    CYCLE_NROWS,        // number of rows of A
+    CYCLE_BLOCKSIZE,    // BSR blocksize of A, 1 for CSR
+    CYCLE_A_PTR,        // offset of the row pointer of A in Ap
+    CYCLE_A_IDX,        // offset of the index array of A in Aj
+    CYCLE_A_DATA,       // offset of the data array of A in Ax
+    CYCLE_P_ROWBLOCK,   // row blocksize of P
+    CYCLE_P_COLBLOCK,   // column blocksize of P
+    CYCLE_P_PTR,        // offset of the row pointer of P in Pp
+    CYCLE_P_IDX,        // offset of the index array of P in Pj
+    CYCLE_P_DATA,       // offset of the data array of P in Px
+    CYCLE_R_COLBLOCK,   // column blocksize of R^T
+    CYCLE_R_PTR,        // offset of the row pointer of R^T in Rp
+    CYCLE_R_IDX,        // offset of the index array of R^T in Ri
+    CYCLE_R_DATA,       // offset of the data array of R^T in Rx
+    CYCLE_WORK,         // offset of the temp, x and b vectors in work
+    CYCLE_PRE,          // presmoother fields
+    CYCLE_POST = CYCLE_PRE + 9,
+    CYCLE_FIELDS = CYCLE_POST + 9
+};
+
+/*
+ *  Operations of a compiled multigrid cycle, see
+ *  multilevel_solver.compile_cycle
+ */
+enum cycle_ops {
+    CYCLE_PRESMOOTH,
+    CYCLE_RESTRICT,
+    CYCLE_COARSE_SOLVE,
+    CYCLE_INTERPOLATE,
+    CYCLE_POSTSMOOTH
+};
+
+/*
+ *  Apply a frozen smoother to Ax = b, where A is stored in CSR format
+ *  (blocksize = 1) or BSR format.
+ *
+ *  Parameters
+ *      smoother[]  - smoother fields: type (0 = none, 1 = gauss_seidel,
+ *                    2 = jacobi, 3 = CF_jacobi, 4 = FC_jacobi), iterations,
+ *                    sweep (0 = forward, 1 = backward, 2 = symmetric),
+ *                    F_iterations, C_iterations, offset and number of the
+ *                    C-points in points[], offset and number of the
+ *                    F-points in points[]
+ *      omega       - damping parameter
+ *      Ap[]        - row pointer of A
+ *      Aj[]        - index array of A
+ *      Ax[]        - data array of A
+ *      x[]         - approximate solution
+ *      b[]         - right hand side
+ *      temp[]      - temporary vector the same size as x
+ *      points[]    - concatenated C- and F-point index arrays
+ *      n           - number of rows of A
+ *      blocksize   - BSR blocksize of A
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void multilevel_relax(const I smoother[],
+                      const T omega,
+                      const I Ap[],
+                      const I Aj[],
+                      const T Ax[],
+                            T  x[],
+                      const T  b[],
+                            T temp[],
+                      const I points[],
+                      const I n,
+                      const I blocksize)
+{
+    const I nb = n/blocksize;
+    const I nnz = Ap[nb];
+    const I Ax_size = nnz*blocksize*blocksize;
+    const T w[1] = {omega};
+
+    const I iterations = smoother[1];
+    const I sweep = smoother[2];
+    const I *Cpts = &(points[smoother[5]]);
+    const I *Fpts = &(points[smoother[7]]);
+
+    for(I iter = 0; iter < iterations; iter++){
+        switch(smoother[0]){
+        case 1:
+            if(sweep == 0 || sweep == 2){
+                if(blocksize == 1)
+                    gauss_seidel<I,T,F>(Ap, nb+1, Aj, nnz, Ax, Ax_size,
+                                        x, n, b, n, 0, nb, 1);
+                else
+                    bsr_gauss_seidel<I,T,F>(Ap, nb+1, Aj, nnz, Ax, Ax_size,
+                                            x, n, b, n, 0, nb, 1, blocksize);
+            }
+            if(sweep == 1 || sweep == 2){
+                if(blocksize == 1)
+                    gauss_seidel<I,T,F>(Ap, nb+1, Aj, nnz, Ax, Ax_size,
+                                        x, n, b, n, nb-1, -1, -1);
+                else
+                    bsr_gauss_seidel<I,T,F>(Ap, nb+1, Aj, nnz, Ax, Ax_size,
+                                            x, n, b, n, nb-1, -1, -1,
+                                            blocksize);
+            }
+            break;
+        case 2:
+            if(blocksize == 1)
+                jacobi<I,T,F>(Ap, nb+1, Aj, nnz, Ax, Ax_size, x, n, b, n,
+                              temp, n, 0, nb, 1, w, 1);
+            else
+                bsr_jacobi<I,T,F>(Ap, nb+1, Aj, nnz, Ax, Ax_size, x, n, b, n,
+                                  temp, n, 0, nb, 1, blocksize, w, 1);
+            break;
+        case 3:
+        case 4:
+            // CF_jacobi relaxes the C-points first, FC_jacobi the F-points
+            cf_jacobi<I,T,F>(Ap, nb+1, Aj, nnz, Ax, Ax_size, x, n, b, n,
+                             NULL, 0, Cpts, smoother[6], Fpts, smoother[8],
+                             temp, n, blocksize, 1, smoother[4], smoother[3],
+                             smoother[0] == 4, w, 1, 1);
+            break;
+        }
+    }
+}
+
+/*
+ *  Execute a compiled multigrid cycle on a frozen hierarchy of CSR/BSR
+ *  operators, with a dense coarse-grid solve.
+ *
+ *  The cycle is given as a list of (operation, level) pairs, see
+ *  cycle_ops.  The operators and smoother parameters of all levels are
+ *  concatenated into flat arrays and indexed through the level
+ *  descriptors, see cycle_fields.  The iterate and right-hand side of
+ *  level 0 are x and b.  Each level owns a temporary vector in work,
+ *  followed by its iterate and right-hand side on all coarser levels.
+ *
+ *  Parameters
+ *      plan[]      - operation codes and levels, stored pairwise
+ *      levels[]    - level descriptors, CYCLE_FIELDS entries per level
+ *      omega[]     - pre- and postsmoother damping parameters per level
+ *      Ap[]        - concatenated row pointers of A
+ *      Aj[]        - concatenated index arrays of A
+ *      Ax[]        - concatenated data arrays of A
+ *      Pp[]        - concatenated row pointers of P
+ *      Pj[]        - concatenated index arrays of P
+ *      Px[]        - concatenated data arrays of P
+ *      Rp[]        - concatenated row pointers of R^T
+ *      Ri[]        - concatenated index arrays of R^T
+ *      Rx[]        - concatenated data arrays of R^T
+ *      points[]    - concatenated C- and F-point index arrays
+ *      coarse[]    - dense (pseudo-)inverse of the coarsest A, row major
+ *      x[]         - approximate solution on the finest level
+ *      b[]         - right hand side on the finest level
+ *      work[]      - temp, x and b vectors of every level
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void multilevel_cycle(const I   plan[], const int   plan_size,
+                      const I levels[], const int levels_size,
+                      const T  omega[], const int  omega_size,
+                      const I     Ap[], const int     Ap_size,
+                      const I     Aj[], const int     Aj_size,
+                      const T     Ax[], const int     Ax_size,
+                      const I     Pp[], const int     Pp_size,
+                      const I     Pj[], const int     Pj_size,
+                      const T     Px[], const int     Px_size,
+                      const I     Rp[], const int     Rp_size,
+                      const I     Ri[], const int     Ri_size,
+                      const T     Rx[], const int     Rx_size,
+                      const I points[], const int points_size,
+                      const T coarse[], const int coarse_size,
+                            T      x[], const int      x_size,
+                      const T      b[], const int      b_size,
+                            T   work[], const int   work_size)
+{
+    for(I k = 0; k < plan_size; k += 2){
+        const I op = plan[k];
+        const I lvl = plan[k+1];
+        const I *d = &(levels[lvl*CYCLE_FIELDS]);
+        const I n = d[CYCLE_NROWS];
+        const I bs = d[CYCLE_BLOCKSIZE];
+
+        T *temp = &(work[d[CYCLE_WORK]]);
+        T *xl = (lvl == 0) ? x : &(work[d[CYCLE_WORK] + n]);
+        const T *bl = (lvl == 0) ? b : &(work[d[CYCLE_WORK] + 2*n]);
+
+        const I *Apl = &(Ap[d[CYCLE_A_PTR]]);
+        const I *Ajl = &(Aj[d[CYCLE_A_IDX]]);
+        const T *Axl = &(Ax[d[CYCLE_A_DATA]]);
+
+        switch(op){
+        case CYCLE_PRESMOOTH:
+        case CYCLE_POSTSMOOTH:
+        {
+            const I field = (op == CYCLE_PRESMOOTH) ? CYCLE_PRE : CYCLE_POST;
+            const T w = omega[2*lvl + (op == CYCLE_PRESMOOTH ? 0 : 1)];
+            multilevel_relax<I,T,F>(&(d[field]), w, Apl, Ajl, Axl, xl, bl,
+                                    temp, points, n, bs);
+            break;
+        }
+        case CYCLE_RESTRICT:
+        {
+            const I *dc = &(levels[(lvl+1)*CYCLE_FIELDS]);
+            const I nc = dc[CYCLE_NROWS];
+            T *xc = &(work[dc[CYCLE_WORK] + nc]);
+            T *bc = &(work[dc[CYCLE_WORK] + 2*nc]);
+            const I nb = n/bs;
+            const I *Rpl = &(Rp[d[CYCLE_R_PTR]]);
+            const I rbs = d[CYCLE_R_COLBLOCK];
+
+            if(bs == 1 && rbs == 1)
+                csr_residual_restrict<I,T,F>(Apl, nb+1, Ajl, Apl[nb], Axl,
+                                             Apl[nb], xl, n, bl, n,
+                                             Rpl, nb+1,
+                                             &(Ri[d[CYCLE_R_IDX]]), Rpl[nb],
+                                             &(Rx[d[CYCLE_R_DATA]]), Rpl[nb],
+                                             bc, nc);
+            else
+                bsr_residual_restrict<I,T,F>(Apl, nb+1, Ajl, Apl[nb], Axl,
+                                             Apl[nb]*bs*bs, xl, n, bl, n,
+                                             Rpl, nb+1,
+                                             &(Ri[d[CYCLE_R_IDX]]), Rpl[nb],
+                                             &(Rx[d[CYCLE_R_DATA]]),
+                                             Rpl[nb]*bs*rbs, bc, nc, bs, rbs);
+
+            for(I i = 0; i < nc; i++){
+                xc[i] = 0.0;
+            }
+            break;
+        }
+        case CYCLE_COARSE_SOLVE:
+        {
+            // x = coarse*b, with coarse the dense inverse of A
+            for(I i = 0; i < n; i++){
+                T sum = 0.0;
+                const T *row = &(coarse[i*n]);
+                for(I j = 0; j < n; j++){
+                    sum += row[j]*bl[j];
+                }
+                xl[i] = sum;
+            }
+            break;
+        }
+        case CYCLE_INTERPOLATE:
+        {
+            const I *dc = &(levels[(lvl+1)*CYCLE_FIELDS]);
+            const I nc = dc[CYCLE_NROWS];
+            const T *xc = &(work[dc[CYCLE_WORK] + nc]);
+            const I prb = d[CYCLE_P_ROWBLOCK];
+            const I pcb = d[CYCLE_P_COLBLOCK];
+            const I np = n/prb;
+            const I *Ppl = &(Pp[d[CYCLE_P_PTR]]);
+
+            if(prb == 1 && pcb == 1)
+                csr_interpolate_add<I,T,F>(Ppl, np+1,
+                                           &(Pj[d[CYCLE_P_IDX]]), Ppl[np],
+                                           &(Px[d[CYCLE_P_DATA]]), Ppl[np],
+                                           xc, nc, xl, n);
+            else
+                bsr_interpolate_add<I,T,F>(Ppl, np+1,
+                                           &(Pj[d[CYCLE_P_IDX]]), Ppl[np],
+                                           &(Px[d[CYCLE_P_DATA]]),
+                                           Ppl[np]*prb*pcb, xc, nc, xl, n,
+                                           prb, pcb);
+            break;
+        }
+        }
+    }
+}
+
+#endif
@@ -0,0 +1,374 @@
+#ifndef PARALLEL_H
+#define PARALLEL_H
+
+#include <algorithm>
+#include <thread>
+#include <vector>
+
+/*
+ *  Minimum number of scalar multiply-adds handled by each thread.  Smaller
+ *  products run on fewer threads, or serially, since starting a thread
+ *  costs about as much as this many multiply-adds.
+ */
+const long PARALLEL_MIN_WORK = 32768;
+
+/*
+ *  Apply body(bounds[t], bounds[t+1]) for each chunk t, with one thread per
+ *  chunk.  The calling thread processes the first chunk and waits for the
+ *  others.
+ */
+template<class I, class Body>
+void parallel_chunks(const std::vector<I>& bounds, Body body)
+{
+    std::vector<std::thread> threads;
+    for(size_t t = 1; t + 1 < bounds.size(); t++){
+        threads.push_back(std::thread(body, bounds[t], bounds[t+1]));
+    }
+    body(bounds[0], bounds[1]);
+    for(size_t t = 0; t < threads.size(); t++){
+        threads[t].join();
+    }
+}
+
+/*
+ *  Apply body(row_start, row_end) to a partition of the rows [0, n) of a
+ *  CSR or BSR matrix into contiguous chunks, each processed by one thread.
+ *
+ *  The chunks are balanced by the number of (block) nonzeros given by the
+ *  row pointer Ap, and hold at least PARALLEL_MIN_WORK multiply-adds,
+ *  where each (block) nonzero costs block_work multiply-adds.  The calling
+ *  thread processes the first chunk.
+ *
+ *  Since each row is processed by a single thread, in the same order as a
+ *  serial loop, kernels whose rows are independent give bitwise identical
+ *  results for any number of threads.
+ *
+ *  Parameters
+ *      Ap[]       - row pointer, of length n + 1
+ *      n          - number of rows
+ *      n_threads  - maximum number of threads
+ *      block_work - multiply-adds per (block) nonzero
+ *      body       - callable, applied to (row_start, row_end)
+ *
+ */
+template<class I, class Body>
+void parallel_rows(const I Ap[], const I n, const I n_threads,
+                   const I block_work, Body body)
+{
+    const long nnz = (long) (Ap[n] - Ap[0]);
+    const long work = nnz * std::max<long>(block_work, 1);
+    const long n_chunks = std::min<long>(std::min<long>(n_threads, n),
+                                         work / PARALLEL_MIN_WORK);
+
+    if(n_chunks <= 1){
+        body((I) 0, n);
+        return;
+    }
+
+    std::vector<I> bounds(n_chunks + 1);
+    bounds[0] = 0;
+    bounds[n_chunks] = n;
+    for(long t = 1; t < n_chunks; t++){
+        const I target = (I) (Ap[0] + (nnz*t)/n_chunks);
+        I row = (I) (std::lower_bound(Ap, Ap + n + 1, target) - Ap);
+        bounds[t] = std::min(std::max(row, bounds[t-1]), n);
+    }
+
+    parallel_chunks(bounds, body);
+}
+
+/*
+ *  Apply body(start, end) to a partition of [0, n) into contiguous chunks
+ *  of equal length, each processed by one thread.
+ *
+ *  As in parallel_rows, each chunk holds at least PARALLEL_MIN_WORK
+ *  multiply-adds, where the whole range costs work multiply-adds, and the
+ *  calling thread processes the first chunk.
+ *
+ *  Parameters
+ *      n          - length of the range
+ *      n_threads  - maximum number of threads
+ *      work       - multiply-adds for the whole range
+ *      body       - callable, applied to (start, end)
+ *
+ */
+template<class I, class Body>
+void parallel_range(const I n, const I n_threads, const long work,
+                    Body body)
+{
+    const long n_chunks = std::min<long>(std::min<long>(n_threads, n),
+                                         work / PARALLEL_MIN_WORK);
+
+    if(n_chunks <= 1){
+        body((I) 0, n);
+        return;
+    }
+
+    std::vector<I> bounds(n_chunks + 1);
+    for(long t = 0; t <= n_chunks; t++){
+        bounds[t] = (I) ((n*t)/n_chunks);
+    }
+
+    parallel_chunks(bounds, body);
+}
+
+/*
+ *  Accumulate the CSR matrix-vector product
+ *
+ *      y += A*x
+ *
+ *  with the rows of A partitioned among threads, see parallel_rows.
+ *
+ *  Parameters
+ *      Ap[]       - CSR row pointer of A
+ *      Aj[]       - CSR index array of A
+ *      Ax[]       - CSR data array of A
+ *      x[]        - input vector
+ *      y[]        - output vector, of length A.shape[0]
+ *      n_threads  - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, y will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void csr_matvec_threaded(const I Ap[], const int Ap_size,
+                         const I Aj[], const int Aj_size,
+                         const T Ax[], const int Ax_size,
+                         const T  x[], const int  x_size,
+                               T  y[], const int  y_size,
+                         const I n_threads)
+{
+    parallel_rows(Ap, (I) (Ap_size - 1), n_threads, (I) 1,
+        [=](const I start, const I end){
+            for(I i = start; i < end; i++){
+                T sum = y[i];
+                for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                    sum += Ax[jj]*x[Aj[jj]];
+                }
+                y[i] = sum;
+            }
+        });
+}
+
+/*
+ *  Accumulate the BSR matrix-vector product
+ *
+ *      y += A*x
+ *
+ *  with the block rows of A partitioned among threads, see parallel_rows.
+ *
+ *  Parameters
+ *      Ap[]       - BSR row pointer of A
+ *      Aj[]       - BSR index array of A
+ *      Ax[]       - BSR data array of A, blocks stored row-major
+ *      x[]        - input vector
+ *      y[]        - output vector, of length A.shape[0]
+ *      R          - row blocksize of A
+ *      C          - column blocksize of A
+ *      n_threads  - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, y will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void bsr_matvec_threaded(const I Ap[], const int Ap_size,
+                         const I Aj[], const int Aj_size,
+                         const T Ax[], const int Ax_size,
+                         const T  x[], const int  x_size,
+                               T  y[], const int  y_size,
+                         const I R,
+                         const I C,
+                         const I n_threads)
+{
+    parallel_rows(Ap, (I) (Ap_size - 1), n_threads, R*C,
+        [=](const I start, const I end){
+            for(I i = start; i < end; i++){
+                T *yi = &(y[i*R]);
+                for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                    const T *block = &(Ax[jj*R*C]);
+                    const T *xj = &(x[Aj[jj]*C]);
+                    for(I m = 0; m < R; m++){
+                        T sum = yi[m];
+                        for(I k = 0; k < C; k++){
+                            sum += block[m*C + k]*xj[k];
+                        }
+                        yi[m] = sum;
+                    }
+                }
+            }
+        });
+}
+
+/*
+ *  Compute the CSR residual
+ *
+ *      r = b - A*x
+ *
+ *  with the rows of A partitioned among threads, see parallel_rows.
+ *
+ *  Parameters
+ *      Ap[]       - CSR row pointer of A
+ *      Aj[]       - CSR index array of A
+ *      Ax[]       - CSR data array of A
+ *      x[]        - approximate solution
+ *      b[]        - right hand side
+ *      r[]        - residual
+ *      n_threads  - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, r will be overwritten
+ *
+ */
+template<class I, class T, class F>
+void csr_residual_threaded(const I Ap[], const int Ap_size,
+                           const I Aj[], const int Aj_size,
+                           const T Ax[], const int Ax_size,
+                           const T  x[], const int  x_size,
+                           const T  b[], const int  b_size,
+                                 T  r[], const int  r_size,
+                           const I n_threads)
+{
+    parallel_rows(Ap, (I) (Ap_size - 1), n_threads, (I) 1,
+        [=](const I start, const I end){
+            for(I i = start; i < end; i++){
+                T sum = 0.0;
+                for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                    sum += Ax[jj]*x[Aj[jj]];
+                }
+                r[i] = b[i] - sum;
+            }
+        });
+}
+
+/*
+ *  Compute the BSR residual
+ *
+ *      r = b - A*x
+ *
+ *  with the block rows of A partitioned among threads, see parallel_rows.
+ *
+ *  Parameters
+ *      Ap[]       - BSR row pointer of A
+ *      Aj[]       - BSR index array of A
+ *      Ax[]       - BSR data array of A, blocks stored row-major
+ *      x[]        - approximate solution
+ *      b[]        - right hand side
+ *      r[]        - residual
+ *      R          - row blocksize of A
+ *      C          - column blocksize of A
+ *      n_threads  - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, r will be overwritten
+ *
+ */
+template<class I, class T, class F>
+void bsr_residual_threaded(const I Ap[], const int Ap_size,
+                           const I Aj[], const int Aj_size,
+                           const T Ax[], const int Ax_size,
+                           const T  x[], const int  x_size,
+                           const T  b[], const int  b_size,
+                                 T  r[], const int  r_size,
+                           const I R,
+                           const I C,
+                           const I n_threads)
+{
+    parallel_rows(Ap, (I) (Ap_size - 1), n_threads, R*C,
+        [=](const I start, const I end){
+            for(I k = start*R; k < end*R; k++){
+                r[k] = 0.0;
+            }
+            for(I i = start; i < end; i++){
+                T *ri = &(r[i*R]);
+                for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                    const T *block = &(Ax[jj*R*C]);
+                    const T *xj = &(x[Aj[jj]*C]);
+                    for(I m = 0; m < R; m++){
+                        T sum = ri[m];
+                        for(I k = 0; k < C; k++){
+                            sum += block[m*C + k]*xj[k];
+                        }
+                        ri[m] = sum;
+                    }
+                }
+                for(I m = 0; m < R; m++){
+                    ri[m] = b[i*R + m] - ri[m];
+                }
+            }
+        });
+}
+
+/*
+ *  Perform one multicolor Gauss-Seidel sweep on the linear system A*x = b
+ *
+ *  The rows are grouped into color classes, such that no two rows of the
+ *  same class are coupled in A.  The classes are relaxed one after another
+ *  in the order color_start, color_start + color_step, ..., and the rows of
+ *  each class are relaxed concurrently, with the class partitioned among
+ *  threads, see parallel_range.  Since the rows of a class are independent,
+ *  the result equals that of gauss_seidel_indexed with the rows in class
+ *  order, for any number of threads.
+ *
+ *  Parameters
+ *      Ap[]        - CSR row pointer of A
+ *      Aj[]        - CSR index array of A
+ *      Ax[]        - CSR data array of A
+ *      x[]         - approximate solution
+ *      b[]         - right hand side
+ *      indices[]   - rows of A, grouped by color
+ *      color_ptr[] - class c is indices[color_ptr[c]:color_ptr[c+1]]
+ *      color_start - first color to relax
+ *      color_stop  - stop before this color
+ *      color_step  - color increment, 1 or -1
+ *      n_threads   - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void gauss_seidel_multicolor(const I Ap[], const int Ap_size,
+                             const I Aj[], const int Aj_size,
+                             const T Ax[], const int Ax_size,
+                                   T  x[], const int  x_size,
+                             const T  b[], const int  b_size,
+                             const I indices[], const int indices_size,
+                             const I color_ptr[], const int color_ptr_size,
+                             const I color_start,
+                             const I color_stop,
+                             const I color_step,
+                             const I n_threads)
+{
+    const long avg_row = (long) (Ap[Ap_size - 1] - Ap[0]) /
+                         std::max(Ap_size - 1, 1);
+
+    for(I c = color_start; c != color_stop; c += color_step){
+        const I *rows = indices + color_ptr[c];
+        const I n = color_ptr[c+1] - color_ptr[c];
+
+        parallel_range(n, n_threads, (long) n * std::max<long>(avg_row, 1),
+            [=](const I start, const I end){
+                for(I k = start; k < end; k++){
+                    const I i = rows[k];
+                    T rsum = 0.0;
+                    T diag = 0.0;
+                    for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                        const I j = Aj[jj];
+                        if(i == j){
+                            diag = Ax[jj];
+                        }
+                        else{
+                            rsum += Ax[jj]*x[j];
+                        }
+                    }
+                    if(diag != (F) 0.0){
+                        x[i] = (b[i] - rsum)/diag;
+                    }
+                }
+            });
+    }
+}
+
+#endif
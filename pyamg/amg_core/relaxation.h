@@ -2,6 +2,7 @@
 #define RELAXATION_H
 
 #include "linalg.h"
+#include "parallel.h"
 
 /*
  *  Perform one iteration of Gauss-Seidel relaxation on the linear
@@ -233,69 +234,913 @@ void bsr_gauss_seidel(const I Ap[], const int Ap_size,
 }// end function
 
 
+/*
+ *  Perform one iteration of hybrid Gauss-Seidel relaxation on the linear
+ *  system Ax = b, where A is stored in CSR format and x and b are column
+ *  vectors.
+ *
+ *  The rows are partitioned into contiguous blocks.  Gauss-Seidel is used
+ *  inside each block and Jacobi between blocks, i.e., the unknowns of
+ *  other blocks keep their values from the beginning of the sweep.  The
+ *  blocks are relaxed concurrently, see parallel_range, and the result is
+ *  independent of the number of threads.  With the l1 diagonal
+ *
+ *      d_i = a_ii + sum_{j not in the block of i} |a_ij|
+ *
+ *  the iteration converges for symmetric positive definite A.
+ *
+ *  Parameters
+ *      Ap[]        - CSR row pointer
+ *      Aj[]        - CSR index array
+ *      Ax[]        - CSR data array
+ *      x[]         - approximate solution
+ *      b[]         - right hand side
+ *      Tx[]        - inverse of the l1 diagonal, 1/d_i
+ *      temp[]      - temporary vector the same size as x
+ *      block_ptr[] - block k holds the rows block_ptr[k]:block_ptr[k+1]
+ *      row_step    - 1 for a forward sweep in each block, -1 for backward
+ *      omega       - damping parameter
+ *      n_threads   - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void hybrid_gauss_seidel(const I Ap[], const int Ap_size,
+                         const I Aj[], const int Aj_size,
+                         const T Ax[], const int Ax_size,
+                               T  x[], const int  x_size,
+                         const T  b[], const int  b_size,
+                         const T Tx[], const int Tx_size,
+                               T temp[], const int temp_size,
+                         const I block_ptr[], const int block_ptr_size,
+                         const I row_step,
+                         const T omega[], const int omega_size,
+                         const I n_threads)
+{
+    const T omega2 = omega[0];
+    const I n_blocks = block_ptr_size - 1;
+    const long work = (long) (Ap[Ap_size - 1] - Ap[0]);
+
+    std::copy(x, x + x_size, temp);
+
+    parallel_range(n_blocks, n_threads, work,
+        [=](const I block_start, const I block_end){
+            for(I k = block_start; k < block_end; k++){
+                const I row_begin = block_ptr[k];
+                const I row_end = block_ptr[k+1];
+                const I first = (row_step > 0) ? row_begin : row_end - 1;
+                const I last = (row_step > 0) ? row_end : row_begin - 1;
+
+                for(I i = first; i != last; i += row_step){
+                    T rsum = b[i];
+                    for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                        const I j = Aj[jj];
+                        if(j >= row_begin && j < row_end)
+                            rsum -= Ax[jj]*x[j];
+                        else
+                            rsum -= Ax[jj]*temp[j];
+                    }
+                    x[i] += omega2*Tx[i]*rsum;
+                }
+            }
+        });
+}
+
+
+/*
+ *  Perform one iteration of hybrid Gauss-Seidel relaxation on the linear
+ *  system Ax = b, where A is stored in BSR format and x and b are column
+ *  vectors.
+ *
+ *  Refer to hybrid_gauss_seidel for additional information.  Here, the
+ *  block rows are partitioned, and each block row is relaxed at once with
+ *  the inverse of its l1 diagonal block, i.e., the diagonal block of A
+ *  plus the diagonal matrix of the l1 norms of the rows restricted to the
+ *  columns outside of the partition block.
+ *
+ *  Parameters
+ *      Ap[]        - BSR row pointer
+ *      Aj[]        - BSR index array
+ *      Ax[]        - BSR data array, blocks assumed square
+ *      x[]         - approximate solution
+ *      b[]         - right hand side
+ *      Tx[]        - inverse of each l1 diagonal block, stored as a
+ *                    (n/blocksize, blocksize, blocksize) array
+ *      temp[]      - temporary vector the same size as x
+ *      block_ptr[] - block k holds the block rows block_ptr[k]:block_ptr[k+1]
+ *      row_step    - 1 for a forward sweep in each block, -1 for backward
+ *      omega       - damping parameter
+ *      blocksize   - dimension of square blocks in BSR matrix A
+ *      n_threads   - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void bsr_hybrid_gauss_seidel(const I Ap[], const int Ap_size,
+                             const I Aj[], const int Aj_size,
+                             const T Ax[], const int Ax_size,
+                                   T  x[], const int  x_size,
+                             const T  b[], const int  b_size,
+                             const T Tx[], const int Tx_size,
+                                   T temp[], const int temp_size,
+                             const I block_ptr[], const int block_ptr_size,
+                             const I row_step,
+                             const T omega[], const int omega_size,
+                             const I blocksize,
+                             const I n_threads)
+{
+    const T omega2 = omega[0];
+    const I B2 = blocksize*blocksize;
+    const I n_blocks = block_ptr_size - 1;
+    const long work = (long) (Ap[Ap_size - 1] - Ap[0]) * B2;
+
+    std::copy(x, x + x_size, temp);
+
+    parallel_range(n_blocks, n_threads, work,
+        [=](const I block_start, const I block_end){
+            std::vector<T> rsum(blocksize);
+
+            for(I k = block_start; k < block_end; k++){
+                const I row_begin = block_ptr[k];
+                const I row_end = block_ptr[k+1];
+                const I first = (row_step > 0) ? row_begin : row_end - 1;
+                const I last = (row_step > 0) ? row_end : row_begin - 1;
+
+                for(I i = first; i != last; i += row_step){
+                    for(I m = 0; m < blocksize; m++){
+                        rsum[m] = b[i*blocksize + m];
+                    }
+                    for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                        const I j = Aj[jj];
+                        const T *block = &(Ax[jj*B2]);
+                        const T *xj = (j >= row_begin && j < row_end) ?
+                                      &(x[j*blocksize]) : &(temp[j*blocksize]);
+                        for(I m = 0; m < blocksize; m++){
+                            for(I n = 0; n < blocksize; n++){
+                                rsum[m] -= block[m*blocksize + n]*xj[n];
+                            }
+                        }
+                    }
+                    const T *Dinv = &(Tx[i*B2]);
+                    for(I m = 0; m < blocksize; m++){
+                        T update = 0.0;
+                        for(I n = 0; n < blocksize; n++){
+                            update += Dinv[m*blocksize + n]*rsum[n];
+                        }
+                        x[i*blocksize + m] += omega2*update;
+                    }
+                }
+            }
+        });
+}
+
+
+/*
+ *  Perform one iteration of l1-Jacobi relaxation on the linear system
+ *  Ax = b, where A is stored in CSR format and x and b are column vectors,
+ *
+ *      x <- x + omega * D_l1^{-1} (b - A x),
+ *
+ *  where D_l1 is the diagonal of the l1 row norms of A,
+ *
+ *      d_i = a_ii + sum_{j != i} |a_ij|.
+ *
+ *  The iteration converges for symmetric positive definite A, without a
+ *  spectral radius estimate.  The rows are partitioned among threads, see
+ *  parallel_rows.
+ *
+ *  Parameters
+ *      Ap[]       - CSR row pointer
+ *      Aj[]       - CSR index array
+ *      Ax[]       - CSR data array
+ *      x[]        - approximate solution
+ *      b[]        - right hand side
+ *      Tx[]       - inverse of the l1 diagonal, 1/d_i
+ *      temp[]     - temporary vector the same size as x
+ *      omega      - damping parameter
+ *      n_threads  - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void l1_jacobi(const I Ap[], const int Ap_size,
+               const I Aj[], const int Aj_size,
+               const T Ax[], const int Ax_size,
+                     T  x[], const int  x_size,
+               const T  b[], const int  b_size,
+               const T Tx[], const int Tx_size,
+                     T temp[], const int temp_size,
+               const T omega[], const int omega_size,
+               const I n_threads)
+{
+    const T omega2 = omega[0];
+
+    std::copy(x, x + x_size, temp);
+
+    parallel_rows(Ap, (I) (Ap_size - 1), n_threads, (I) 1,
+        [=](const I start, const I end){
+            for(I i = start; i < end; i++){
+                T rsum = b[i];
+                for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                    rsum -= Ax[jj]*temp[Aj[jj]];
+                }
+                x[i] = temp[i] + omega2*Tx[i]*rsum;
+            }
+        });
+}
+
+
+/*
+ *  Perform one iteration of l1-Jacobi relaxation on the linear system
+ *  Ax = b, where A is stored in BSR format and x and b are column vectors.
+ *
+ *  Refer to l1_jacobi for additional information.  Here, each block row is
+ *  relaxed with the inverse of its l1 diagonal block, i.e., the diagonal
+ *  block of A plus the diagonal matrix of the l1 norms of the rows outside
+ *  of the diagonal block.
+ *
+ *  Parameters
+ *      Ap[]       - BSR row pointer
+ *      Aj[]       - BSR index array
+ *      Ax[]       - BSR data array, blocks assumed square
+ *      x[]        - approximate solution
+ *      b[]        - right hand side
+ *      Tx[]       - inverse of each l1 diagonal block, stored as a
+ *                   (n/blocksize, blocksize, blocksize) array
+ *      temp[]     - temporary vector the same size as x
+ *      omega      - damping parameter
+ *      blocksize  - dimension of square blocks in BSR matrix A
+ *      n_threads  - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void bsr_l1_jacobi(const I Ap[], const int Ap_size,
+                   const I Aj[], const int Aj_size,
+                   const T Ax[], const int Ax_size,
+                         T  x[], const int  x_size,
+                   const T  b[], const int  b_size,
+                   const T Tx[], const int Tx_size,
+                         T temp[], const int temp_size,
+                   const T omega[], const int omega_size,
+                   const I blocksize,
+                   const I n_threads)
+{
+    const T omega2 = omega[0];
+    const I B2 = blocksize*blocksize;
+
+    std::copy(x, x + x_size, temp);
+
+    parallel_rows(Ap, (I) (Ap_size - 1), n_threads, B2,
+        [=](const I start, const I end){
+            std::vector<T> rsum(blocksize);
+
+            for(I i = start; i < end; i++){
+                for(I m = 0; m < blocksize; m++){
+                    rsum[m] = b[i*blocksize + m];
+                }
+                for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                    const T *block = &(Ax[jj*B2]);
+                    const T *xj = &(temp[Aj[jj]*blocksize]);
+                    for(I m = 0; m < blocksize; m++){
+                        for(I n = 0; n < blocksize; n++){
+                            rsum[m] -= block[m*blocksize + n]*xj[n];
+                        }
+                    }
+                }
+                const T *Dinv = &(Tx[i*B2]);
+                for(I m = 0; m < blocksize; m++){
+                    T update = 0.0;
+                    for(I n = 0; n < blocksize; n++){
+                        update += Dinv[m*blocksize + n]*rsum[n];
+                    }
+                    x[i*blocksize + m] = temp[i*blocksize + m] + omega2*update;
+                }
+            }
+        });
+}
+
+
 /*
  *  Perform one iteration of Jacobi relaxation on the linear
  *  system Ax = b, where A is stored in CSR format and x and b
  *  are column vectors.  Damping is controlled by the omega
  *  parameter.
  *
- *  Refer to gauss_seidel for additional information regarding
- *  row_start, row_stop, and row_step.
+ *  Refer to gauss_seidel for additional information regarding
+ *  row_start, row_stop, and row_step.
+ *
+ *  Parameters
+ *      Ap[]       - CSR row pointer
+ *      Aj[]       - CSR index array
+ *      Ax[]       - CSR data array
+ *      x[]        - approximate solution
+ *      b[]        - right hand side
+ *      temp[]     - temporary vector the same size as x
+ *      row_start  - beginning of the sweep
+ *      row_stop   - end of the sweep (i.e. one past the last unknown)
+ *      row_step   - stride used during the sweep (may be negative)
+ *      omega      - damping parameter
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void jacobi(const I Ap[], const int Ap_size,
+            const I Aj[], const int Aj_size,
+            const T Ax[], const int Ax_size,
+                  T  x[], const int  x_size,
+            const T  b[], const int  b_size,
+                  T temp[], const int temp_size,
+            const I row_start,
+            const I row_stop,
+            const I row_step,
+            const T omega[], const int omega_size)
+{
+    T one = 1.0;
+    T omega2 = omega[0];
+
+    for(I i = row_start; i != row_stop; i += row_step) {
+        temp[i] = x[i];
+    }
+
+    for(I i = row_start; i != row_stop; i += row_step) {
+        I start = Ap[i];
+        I end   = Ap[i+1];
+        T rsum = 0;
+        T diag = 0;
+
+        for(I jj = start; jj < end; jj++){
+            I j = Aj[jj];
+            if (i == j)
+                diag  = Ax[jj];
+            else
+                rsum += Ax[jj]*temp[j];
+        }
+
+        //TODO raise error? inform user?
+        if (diag != (F) 0.0){
+            x[i] = (one - omega2) * temp[i] + omega2 * ((b[i] - rsum)/diag);
+        }
+    }
+}
+
+
+/*
+ *  Perform one iteration of Gauss-Seidel relaxation on the linear
+ *  systems AX = B, where A is stored in CSR format and X and B are
+ *  n x k multivectors stored in row-major (C) order.  All k columns
+ *  are relaxed during a single pass over A.
+ *
+ *  Refer to gauss_seidel for additional information regarding
+ *  row_start, row_stop, and row_step.
+ *
+ *  Parameters
+ *      Ap[]        - CSR row pointer
+ *      Aj[]        - CSR index array
+ *      Ax[]        - CSR data array
+ *      x[]         - approximate solutions, x[i*num_vectors + c]
+ *      b[]         - right hand sides, b[i*num_vectors + c]
+ *      row_start   - beginning of the sweep
+ *      row_stop    - end of the sweep (i.e. one past the last unknown)
+ *      row_step    - stride used during the sweep (may be negative)
+ *      num_vectors - number of columns k in x and b
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void gauss_seidel_multivector(const I Ap[], const int Ap_size,
+                              const I Aj[], const int Aj_size,
+                              const T Ax[], const int Ax_size,
+                                    T  x[], const int  x_size,
+                              const T  b[], const int  b_size,
+                              const I row_start,
+                              const I row_stop,
+                              const I row_step,
+                              const I num_vectors)
+{
+    T *rsum = new T[num_vectors];
+
+    for(I i = row_start; i != row_stop; i += row_step) {
+        I start = Ap[i];
+        I end   = Ap[i+1];
+        T diag = 0;
+
+        for(I c = 0; c < num_vectors; c++){
+            rsum[c] = 0; }
+
+        for(I jj = start; jj < end; jj++){
+            I j = Aj[jj];
+            if (i == j)
+                diag  = Ax[jj];
+            else {
+                const T a = Ax[jj];
+                const T *xj = &(x[j*num_vectors]);
+                for(I c = 0; c < num_vectors; c++){
+                    rsum[c] += a*xj[c]; }
+            }
+        }
+
+        if (diag != (F) 0.0){
+            for(I c = 0; c < num_vectors; c++){
+                x[i*num_vectors + c] = (b[i*num_vectors + c] - rsum[c])/diag; }
+        }
+    }
+
+    delete[] rsum;
+}
+
+
+/*
+ *  Perform one iteration of point-wise Gauss-Seidel relaxation on the
+ *  linear systems AX = B, where A is stored in Block CSR format and X
+ *  and B are n x k multivectors stored in row-major (C) order.  All k
+ *  columns are relaxed during a single pass over A.
+ *
+ *  Refer to bsr_gauss_seidel for additional information regarding
+ *  row_start, row_stop, and row_step.
+ *
+ *  Parameters
+ *      Ap[]        - BSR row pointer
+ *      Aj[]        - BSR index array
+ *      Ax[]        - BSR data array
+ *      x[]         - approximate solutions, x[i*num_vectors + c]
+ *      b[]         - right hand sides, b[i*num_vectors + c]
+ *      row_start   - beginning of the sweep (block row index)
+ *      row_stop    - end of the sweep (i.e. one past the last unknown)
+ *      row_step    - stride used during the sweep (may be negative)
+ *      blocksize   - BSR blocksize (blocks must be square)
+ *      num_vectors - number of columns k in x and b
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void bsr_gauss_seidel_multivector(const I Ap[], const int Ap_size,
+                                  const I Aj[], const int Aj_size,
+                                  const T Ax[], const int Ax_size,
+                                        T  x[], const int  x_size,
+                                  const T  b[], const int  b_size,
+                                  const I row_start,
+                                  const I row_stop,
+                                  const I row_step,
+                                  const I blocksize,
+                                  const I num_vectors)
+{
+    const I B2 = blocksize*blocksize;
+    const I K = num_vectors;
+    T *rsum = new T[blocksize*K];
+
+    // Determine if this is a forward, or backward sweep
+    I step, step_start, step_end;
+    if (row_step < 0){
+        step = -1;
+        step_start = blocksize-1;
+        step_end = -1;
+    }
+    else{
+        step = 1;
+        step_start = 0;
+        step_end = blocksize;
+    }
+
+    for(I i = row_start; i != row_stop; i += row_step) {
+        I start = Ap[i];
+        I end   = Ap[i+1];
+        I diag_ptr = -1;
+
+        // initialize rsum to b, then later subtract A*x
+        for(I m = 0; m < blocksize*K; m++) {
+            rsum[m] = b[i*blocksize*K + m]; }
+
+        // loop over row i, accumulating the off-diagonal blocks
+        for(I jj = start; jj < end; jj++){
+            I j = Aj[jj];
+
+            if (i == j){
+                diag_ptr = jj*B2; }
+            else {
+                const T *block = &(Ax[jj*B2]);
+                const T *xj = &(x[j*blocksize*K]);
+                for(I m = 0; m < blocksize; m++){
+                    for(I kk = 0; kk < blocksize; kk++){
+                        const T a = block[m*blocksize + kk];
+                        for(I c = 0; c < K; c++){
+                            rsum[m*K + c] -= a*xj[kk*K + c]; }
+                    }
+                }
+            }
+        }
+
+        // Carry out point-wise GS over the diagonal block
+        if (diag_ptr != -1) {
+            for(I m = step_start; m != step_end; m+=step){
+                T diag = 1.0;
+                for(I kk = step_start; kk != step_end; kk+=step){
+                    const T a = Ax[m*blocksize + kk + diag_ptr];
+                    if(m == kk){
+                        diag = a; }
+                    else{
+                        for(I c = 0; c < K; c++){
+                            rsum[m*K + c] -= a*x[(i*blocksize + kk)*K + c]; }
+                    }
+                }
+                if (diag != (F) 0.0){
+                    for(I c = 0; c < K; c++){
+                        x[(i*blocksize + m)*K + c] = rsum[m*K + c]/diag; }
+                }
+            }
+        }
+    }
+
+    delete[] rsum;
+}
+
+
+/*
+ *  Perform one iteration of Jacobi relaxation on the linear systems
+ *  AX = B, where A is stored in CSR format and X and B are n x k
+ *  multivectors stored in row-major (C) order.  All k columns are
+ *  relaxed during a single pass over A.  Damping is controlled by the
+ *  omega parameter.
+ *
+ *  Refer to gauss_seidel for additional information regarding
+ *  row_start, row_stop, and row_step.
+ *
+ *  Parameters
+ *      Ap[]        - CSR row pointer
+ *      Aj[]        - CSR index array
+ *      Ax[]        - CSR data array
+ *      x[]         - approximate solutions, x[i*num_vectors + c]
+ *      b[]         - right hand sides, b[i*num_vectors + c]
+ *      temp[]      - temporary vector the same size as x
+ *      row_start   - beginning of the sweep
+ *      row_stop    - end of the sweep (i.e. one past the last unknown)
+ *      row_step    - stride used during the sweep (may be negative)
+ *      omega       - damping parameter
+ *      num_vectors - number of columns k in x and b
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void jacobi_multivector(const I Ap[], const int Ap_size,
+                        const I Aj[], const int Aj_size,
+                        const T Ax[], const int Ax_size,
+                              T  x[], const int  x_size,
+                        const T  b[], const int  b_size,
+                              T temp[], const int temp_size,
+                        const I row_start,
+                        const I row_stop,
+                        const I row_step,
+                        const T omega[], const int omega_size,
+                        const I num_vectors)
+{
+    T one = 1.0;
+    T omega2 = omega[0];
+    T *rsum = new T[num_vectors];
+
+    for(I i = 0; i < x_size; i++) {
+        temp[i] = x[i];
+    }
+
+    for(I i = row_start; i != row_stop; i += row_step) {
+        I start = Ap[i];
+        I end   = Ap[i+1];
+        T diag = 0;
+
+        for(I c = 0; c < num_vectors; c++){
+            rsum[c] = 0; }
+
+        for(I jj = start; jj < end; jj++){
+            I j = Aj[jj];
+            if (i == j)
+                diag  = Ax[jj];
+            else {
+                const T a = Ax[jj];
+                const T *tj = &(temp[j*num_vectors]);
+                for(I c = 0; c < num_vectors; c++){
+                    rsum[c] += a*tj[c]; }
+            }
+        }
+
+        if (diag != (F) 0.0){
+            for(I c = 0; c < num_vectors; c++){
+                I ic = i*num_vectors + c;
+                x[ic] = (one - omega2) * temp[ic] + omega2 * ((b[ic] - rsum[c])/diag);
+            }
+        }
+    }
+
+    delete[] rsum;
+}
+
+
+/*
+ *  Perform one iteration of point-wise Jacobi relaxation on the linear
+ *  systems AX = B, where A is stored in Block CSR format and X and B
+ *  are n x k multivectors stored in row-major (C) order.  All k columns
+ *  are relaxed during a single pass over A.
+ *
+ *  Refer to bsr_jacobi for additional information.
+ *
+ *  Parameters
+ *      Ap[]        - BSR row pointer
+ *      Aj[]        - BSR index array
+ *      Ax[]        - BSR data array
+ *      x[]         - approximate solutions, x[i*num_vectors + c]
+ *      b[]         - right hand sides, b[i*num_vectors + c]
+ *      temp[]      - temporary vector the same size as x
+ *      row_start   - beginning of the sweep (block row index)
+ *      row_stop    - end of the sweep (i.e. one past the last unknown)
+ *      row_step    - stride used during the sweep (may be negative)
+ *      blocksize   - BSR blocksize (blocks must be square)
+ *      omega       - damping parameter
+ *      num_vectors - number of columns k in x and b
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void bsr_jacobi_multivector(const I Ap[], const int Ap_size,
+                            const I Aj[], const int Aj_size,
+                            const T Ax[], const int Ax_size,
+                                  T  x[], const int  x_size,
+                            const T  b[], const int  b_size,
+                                  T temp[], const int temp_size,
+                            const I row_start,
+                            const I row_stop,
+                            const I row_step,
+                            const I blocksize,
+                            const T omega[], const int omega_size,
+                            const I num_vectors)
+{
+    const I B2 = blocksize*blocksize;
+    const I K = num_vectors;
+    T *rsum = new T[blocksize*K];
+    T one = 1.0;
+    T omega2 = omega[0];
+
+    for(I i = 0; i < x_size; i++) {
+        temp[i] = x[i];
+    }
+
+    for(I i = row_start; i != row_stop; i += row_step) {
+        I start = Ap[i];
+        I end   = Ap[i+1];
+        I diag_ptr = -1;
+
+        // initialize rsum to b, then later subtract A*x
+        for(I m = 0; m < blocksize*K; m++) {
+            rsum[m] = b[i*blocksize*K + m]; }
+
+        // loop over row i, accumulating the off-diagonal blocks
+        for(I jj = start; jj < end; jj++){
+            I j = Aj[jj];
+
+            if (i == j){
+                diag_ptr = jj*B2; }
+            else {
+                const T *block = &(Ax[jj*B2]);
+                const T *tj = &(temp[j*blocksize*K]);
+                for(I m = 0; m < blocksize; m++){
+                    for(I kk = 0; kk < blocksize; kk++){
+                        const T a = block[m*blocksize + kk];
+                        for(I c = 0; c < K; c++){
+                            rsum[m*K + c] -= a*tj[kk*K + c]; }
+                    }
+                }
+            }
+        }
+
+        // Carry out point-wise jacobi over the diagonal block
+        if (diag_ptr != -1) {
+            const T *ti = &(temp[i*blocksize*K]);
+            for(I m = 0; m < blocksize; m++){
+                T diag = 1.0;
+                for(I kk = 0; kk < blocksize; kk++){
+                    const T a = Ax[m*blocksize + kk + diag_ptr];
+                    if(m == kk){
+                        diag = a; }
+                    else{
+                        for(I c = 0; c < K; c++){
+                            rsum[m*K + c] -= a*ti[kk*K + c]; }
+                    }
+                }
+                if (diag != (F) 0.0){
+                    for(I c = 0; c < K; c++){
+                        I ic = (i*blocksize + m)*K + c;
+                        x[ic] = (one - omega2) * temp[ic] + omega2 * rsum[m*K + c]/diag;
+                    }
+                }
+            }
+        }
+    }
+
+    delete[] rsum;
+}
+
+
+/*
+ *  Perform one iteration of block Jacobi relaxation on the linear
+ *  systems AX = B, where A is stored in BSR format and X and B are
+ *  n x k multivectors stored in row-major (C) order.  All k columns
+ *  are relaxed during a single pass over A.
+ *
+ *  Refer to block_jacobi for additional information.
+ *
+ *  Parameters
+ *      Ap[]        - BSR row pointer
+ *      Aj[]        - BSR index array
+ *      Ax[]        - BSR data array, blocks assumed square
+ *      x[]         - approximate solutions, x[i*num_vectors + c]
+ *      b[]         - right hand sides, b[i*num_vectors + c]
+ *      Tx[]        - Inverse of each diagonal block of A stored
+ *                    as a (n/blocksize, blocksize, blocksize) array
+ *      temp[]      - temporary vector the same size as x
+ *      row_start   - beginning of the sweep (block row index)
+ *      row_stop    - end of the sweep (i.e. one past the last unknown)
+ *      row_step    - stride used during the sweep (may be negative)
+ *      omega       - damping parameter
+ *      blocksize   - dimension of square blocks in BSR matrix A
+ *      num_vectors - number of columns k in x and b
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void block_jacobi_multivector(const I Ap[], const int Ap_size,
+                              const I Aj[], const int Aj_size,
+                              const T Ax[], const int Ax_size,
+                                    T  x[], const int  x_size,
+                              const T  b[], const int  b_size,
+                              const T Tx[], const int Tx_size,
+                                    T temp[], const int temp_size,
+                              const I row_start,
+                              const I row_stop,
+                              const I row_step,
+                              const T omega[], const int omega_size,
+                              const I blocksize,
+                              const I num_vectors)
+{
+    // Rename
+    const T * Dinv = Tx;
+
+    const I B2 = blocksize*blocksize;
+    const I K = num_vectors;
+    T one = 1.0;
+    T omega2 = omega[0];
+    T *rsum = new T[blocksize*K];
+
+    for(I i = 0; i < x_size; i++) {
+        temp[i] = x[i];
+    }
+
+    for(I i = row_start; i != row_stop; i += row_step) {
+        I start = Ap[i];
+        I end   = Ap[i+1];
+
+        // initialize rsum to b, then later subtract A*x
+        for(I m = 0; m < blocksize*K; m++) {
+            rsum[m] = b[i*blocksize*K + m]; }
+
+        // loop over row i, accumulating the off-diagonal blocks
+        for(I jj = start; jj < end; jj++){
+            I j = Aj[jj];
+            if (i == j)
+                continue;
+
+            const T *block = &(Ax[jj*B2]);
+            const T *tj = &(temp[j*blocksize*K]);
+            for(I m = 0; m < blocksize; m++){
+                for(I kk = 0; kk < blocksize; kk++){
+                    const T a = block[m*blocksize + kk];
+                    for(I c = 0; c < K; c++){
+                        rsum[m*K + c] -= a*tj[kk*K + c]; }
+                }
+            }
+        }
+
+        // x_i = (1 - omega) temp_i + omega Dinv_i (b_i - sum_{j != i} A_ij temp_j)
+        const T *Di = &(Dinv[i*B2]);
+        for(I m = 0; m < blocksize; m++){
+            T *xm = &(x[(i*blocksize + m)*K]);
+            const T *tm = &(temp[(i*blocksize + m)*K]);
+            for(I c = 0; c < K; c++){
+                xm[c] = (one - omega2)*tm[c]; }
+            for(I kk = 0; kk < blocksize; kk++){
+                const T d = omega2*Di[m*blocksize + kk];
+                for(I c = 0; c < K; c++){
+                    xm[c] += d*rsum[kk*K + c]; }
+            }
+        }
+    }
+
+    delete[] rsum;
+}
+
+
+/*
+ *  Perform one iteration of block Gauss-Seidel relaxation on the
+ *  linear systems AX = B, where A is stored in BSR format and X and B
+ *  are n x k multivectors stored in row-major (C) order.  All k
+ *  columns are relaxed during a single pass over A.
+ *
+ *  Refer to block_gauss_seidel for additional information.
  *
  *  Parameters
- *      Ap[]       - CSR row pointer
- *      Aj[]       - CSR index array
- *      Ax[]       - CSR data array
- *      x[]        - approximate solution
- *      b[]        - right hand side
- *      temp[]     - temporary vector the same size as x
- *      row_start  - beginning of the sweep
- *      row_stop   - end of the sweep (i.e. one past the last unknown)
- *      row_step   - stride used during the sweep (may be negative)
- *      omega      - damping parameter
+ *      Ap[]        - BSR row pointer
+ *      Aj[]        - BSR index array
+ *      Ax[]        - BSR data array, blocks assumed square
+ *      x[]         - approximate solutions, x[i*num_vectors + c]
+ *      b[]         - right hand sides, b[i*num_vectors + c]
+ *      Tx[]        - Inverse of each diagonal block of A stored
+ *                    as a (n/blocksize, blocksize, blocksize) array
+ *      row_start   - beginning of the sweep (block row index)
+ *      row_stop    - end of the sweep (i.e. one past the last unknown)
+ *      row_step    - stride used during the sweep (may be negative)
+ *      blocksize   - dimension of square blocks in BSR matrix A
+ *      num_vectors - number of columns k in x and b
  *
  *  Returns:
  *      Nothing, x will be modified in place
  *
  */
 template<class I, class T, class F>
-void jacobi(const I Ap[], const int Ap_size,
-            const I Aj[], const int Aj_size,
-            const T Ax[], const int Ax_size,
-                  T  x[], const int  x_size,
-            const T  b[], const int  b_size,
-                  T temp[], const int temp_size,
-            const I row_start,
-            const I row_stop,
-            const I row_step,
-            const T omega[], const int omega_size)
+void block_gauss_seidel_multivector(const I Ap[], const int Ap_size,
+                                    const I Aj[], const int Aj_size,
+                                    const T Ax[], const int Ax_size,
+                                          T  x[], const int  x_size,
+                                    const T  b[], const int  b_size,
+                                    const T Tx[], const int Tx_size,
+                                    const I row_start,
+                                    const I row_stop,
+                                    const I row_step,
+                                    const I blocksize,
+                                    const I num_vectors)
 {
-    T one = 1.0;
-    T omega2 = omega[0];
+    // Rename
+    const T * Dinv = Tx;
 
-    for(I i = row_start; i != row_stop; i += row_step) {
-        temp[i] = x[i];
-    }
+    const I B2 = blocksize*blocksize;
+    const I K = num_vectors;
+    T zero = 0.0;
+    T *rsum = new T[blocksize*K];
 
     for(I i = row_start; i != row_stop; i += row_step) {
         I start = Ap[i];
         I end   = Ap[i+1];
-        T rsum = 0;
-        T diag = 0;
 
+        // initialize rsum to b, then later subtract A*x
+        for(I m = 0; m < blocksize*K; m++) {
+            rsum[m] = b[i*blocksize*K + m]; }
+
+        // loop over row i, accumulating the off-diagonal blocks
         for(I jj = start; jj < end; jj++){
             I j = Aj[jj];
             if (i == j)
-                diag  = Ax[jj];
-            else
-                rsum += Ax[jj]*temp[j];
+                continue;
+
+            const T *block = &(Ax[jj*B2]);
+            const T *xj = &(x[j*blocksize*K]);
+            for(I m = 0; m < blocksize; m++){
+                for(I kk = 0; kk < blocksize; kk++){
+                    const T a = block[m*blocksize + kk];
+                    for(I c = 0; c < K; c++){
+                        rsum[m*K + c] -= a*xj[kk*K + c]; }
+                }
+            }
         }
 
-        //TODO raise error? inform user?
-        if (diag != (F) 0.0){
-            x[i] = (one - omega2) * temp[i] + omega2 * ((b[i] - rsum)/diag);
+        // x_i = Dinv_i (b_i - sum_{j != i} A_ij x_j)
+        const T *Di = &(Dinv[i*B2]);
+        for(I m = 0; m < blocksize; m++){
+            T *xm = &(x[(i*blocksize + m)*K]);
+            std::fill(xm, xm + K, zero);
+            for(I kk = 0; kk < blocksize; kk++){
+                const T d = Di[m*blocksize + kk];
+                for(I c = 0; c < K; c++){
+                    xm[c] += d*rsum[kk*K + c]; }
+            }
         }
     }
+
+    delete[] rsum;
 }
 
 
@@ -1411,4 +2256,625 @@ void overlapping_schwarz_csr(const I Ap[], const int Ap_size,
 }
 
 
+/*
+ *  Compute the LU factorizations with partial pivoting of a set of dense
+ *  square blocks, in place.
+ *
+ *  Block i is stored in row major order in Tx[Tp[i]:Tp[i+1]], and has
+ *  dimension m_i = Sp[i+1] - Sp[i].  It is overwritten by the unit lower
+ *  triangular factor L, below the diagonal, and the upper triangular
+ *  factor U, such that P A_i = L U, where the row permutation P swaps row k
+ *  with row piv[Sp[i] + k], for k = 0, ..., m_i - 1 in turn.
+ *
+ *  Pivot columns that are zero are skipped, leaving a zero on the diagonal
+ *  of U, see lu_solve.  The blocks are partitioned among threads.
+ *
+ *  Parameters
+ *      Tx[]           - dense blocks, stored in row major
+ *      Tp[]           - pointer array into Tx
+ *      piv[]          - pivot indices, the same length as Sj
+ *      Sp[]           - pointer array of the subdomains, block i has
+ *                       dimension Sp[i+1] - Sp[i]
+ *      nsdomains      - number of blocks
+ *      n_threads      - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, Tx and piv will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void lu_factor_blocks(      T Tx[], const int Tx_size,
+                      const I Tp[], const int Tp_size,
+                            I piv[], const int piv_size,
+                      const I Sp[], const int Sp_size,
+                      const I nsdomains,
+                      const I n_threads)
+{
+    long work = 0;
+    for(I i = 0; i < nsdomains; i++){
+        const long m = (long) (Sp[i+1] - Sp[i]);
+        work += m*m*m/3 + 1;
+    }
+
+    parallel_range(nsdomains, n_threads, work,
+        [=](const I start, const I end){
+            for(I i = start; i < end; i++){
+                const I m = Sp[i+1] - Sp[i];
+                T *LU = Tx + Tp[i];
+                I *p = piv + Sp[i];
+
+                for(I k = 0; k < m; k++){
+                    // row of the largest entry in column k
+                    I imax = k;
+                    F vmax = mynorm(LU[k*m + k]);
+                    for(I r = k + 1; r < m; r++){
+                        const F v = mynorm(LU[r*m + k]);
+                        if(v > vmax){
+                            imax = r;
+                            vmax = v;
+                        }
+                    }
+                    p[k] = imax;
+                    if(vmax == 0.0){
+                        continue;
+                    }
+                    if(imax != k){
+                        std::swap_ranges(LU + k*m, LU + (k+1)*m,
+                                         LU + imax*m);
+                    }
+
+                    const T pivot = LU[k*m + k];
+                    for(I r = k + 1; r < m; r++){
+                        const T l = LU[r*m + k] / pivot;
+                        LU[r*m + k] = l;
+                        for(I c = k + 1; c < m; c++){
+                            LU[r*m + c] -= l*LU[k*m + c];
+                        }
+                    }
+                }
+            }
+        });
+}
+
+
+/*
+ *  Solve A_i z = r in place with the LU factorization of A_i computed by
+ *  lu_factor_blocks.  The components of z belonging to a zero diagonal
+ *  entry of U are set to zero.
+ *
+ *  Parameters
+ *      LU[]  - factorization of the m x m block, row major
+ *      p[]   - pivot indices of the block
+ *      r[]   - right hand side, overwritten by the solution
+ *      m     - dimension of the block
+ *
+ */
+template<class I, class T>
+inline void lu_solve(const T LU[], const I p[], T r[], const I m)
+{
+    const T zero = 0.0;
+
+    for(I k = 0; k < m; k++){
+        if(p[k] != k){
+            std::swap(r[k], r[p[k]]);
+        }
+    }
+    for(I k = 0; k < m; k++){
+        T sum = r[k];
+        for(I c = 0; c < k; c++){
+            sum -= LU[k*m + c]*r[c];
+        }
+        r[k] = sum;
+    }
+    for(I k = m - 1; k >= 0; k--){
+        if(LU[k*m + k] == zero){
+            r[k] = zero;
+            continue;
+        }
+        T sum = r[k];
+        for(I c = k + 1; c < m; c++){
+            sum -= LU[k*m + c]*r[c];
+        }
+        r[k] = sum / LU[k*m + k];
+    }
+}
+
+
+/*
+ *  Perform one iteration of multiplicative Schwarz relaxation on the
+ *  linear system Ax = b, where A is stored in CSR format, with the LU
+ *  factorizations of the subdomain blocks computed by lu_factor_blocks.
+ *
+ *  For each subdomain in turn, the residual is computed on the subdomain,
+ *  the subdomain block is solved with it, and the correction is added to
+ *  x.  Refer to overlapping_schwarz_csr for the meaning of the
+ *  parameters, where Tx[] holds the LU factors and piv[] the pivots of
+ *  each block.
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void lu_schwarz_csr(const I Ap[], const int Ap_size,
+                    const I Aj[], const int Aj_size,
+                    const T Ax[], const int Ax_size,
+                          T  x[], const int  x_size,
+                    const T  b[], const int  b_size,
+                    const T Tx[], const int Tx_size,
+                    const I Tp[], const int Tp_size,
+                    const I piv[], const int piv_size,
+                    const I Sj[], const int Sj_size,
+                    const I Sp[], const int Sp_size,
+                          I nsdomains,
+                          I nrows,
+                          I row_start,
+                          I row_stop,
+                          I row_step)
+{
+    I max_size = 0;
+    for(I i = 0; i < nsdomains; i++){
+        max_size = std::max(max_size, Sp[i+1] - Sp[i]);
+    }
+    std::vector<T> rsum(max_size);
+
+    for(I domptr = row_start; domptr != row_stop; domptr += row_step){
+        const I offset = Sp[domptr];
+        const I m = Sp[domptr+1] - offset;
+
+        // residual on the subdomain
+        for(I k = 0; k < m; k++){
+            const I row = Sj[offset + k];
+            T sum = b[row];
+            for(I jj = Ap[row]; jj < Ap[row+1]; jj++){
+                sum -= Ax[jj]*x[Aj[jj]];
+            }
+            rsum[k] = sum;
+        }
+
+        lu_solve(Tx + Tp[domptr], piv + offset, &(rsum[0]), m);
+
+        for(I k = 0; k < m; k++){
+            x[Sj[offset + k]] += rsum[k];
+        }
+    }
+}
+
+
+/*
+ *  Perform one iteration of additive Schwarz relaxation on the linear
+ *  system Ax = b, where A is stored in CSR format, with the LU
+ *  factorizations of the subdomain blocks computed by lu_factor_blocks,
+ *
+ *      x <- x + omega * sum_i R_i^T A_i^{-1} R_i (b - A x),
+ *
+ *  where R_i restricts to subdomain i.  The residual and the subdomain
+ *  solves are partitioned among threads, and the corrections are then
+ *  added in the order of the subdomains, so that the result does not
+ *  depend on the number of threads.
+ *
+ *  Parameters
+ *      Ap[], Aj[], Ax[]  - CSR matrix A
+ *      x[]               - approximate solution
+ *      b[]               - right hand side
+ *      Tx[], Tp[], piv[] - LU factorizations, see lu_factor_blocks
+ *      Sj[], Sp[]        - subdomains, see overlapping_schwarz_csr
+ *      temp[]            - temporary vector the same size as x
+ *      z[]               - temporary vector the same size as Sj
+ *      omega             - damping parameter
+ *      nsdomains         - number of subdomains
+ *      n_threads         - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void additive_lu_schwarz_csr(const I Ap[], const int Ap_size,
+                             const I Aj[], const int Aj_size,
+                             const T Ax[], const int Ax_size,
+                                   T  x[], const int  x_size,
+                             const T  b[], const int  b_size,
+                             const T Tx[], const int Tx_size,
+                             const I Tp[], const int Tp_size,
+                             const I piv[], const int piv_size,
+                             const I Sj[], const int Sj_size,
+                             const I Sp[], const int Sp_size,
+                                   T temp[], const int temp_size,
+                                   T  z[], const int  z_size,
+                             const T omega[], const int omega_size,
+                             const I nsdomains,
+                             const I n_threads)
+{
+    const T omega2 = omega[0];
+
+    parallel_rows(Ap, (I) (Ap_size - 1), n_threads, (I) 1,
+        [=](const I start, const I end){
+            for(I i = start; i < end; i++){
+                T sum = b[i];
+                for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                    sum -= Ax[jj]*x[Aj[jj]];
+                }
+                temp[i] = sum;
+            }
+        });
+
+    parallel_range(nsdomains, n_threads, (long) Tp[nsdomains],
+        [=](const I start, const I end){
+            for(I i = start; i < end; i++){
+                for(I k = Sp[i]; k < Sp[i+1]; k++){
+                    z[k] = temp[Sj[k]];
+                }
+                lu_solve(Tx + Tp[i], piv + Sp[i], z + Sp[i],
+                         Sp[i+1] - Sp[i]);
+            }
+        });
+
+    for(I k = 0; k < Sp[nsdomains]; k++){
+        x[Sj[k]] += omega2*z[k];
+    }
+}
+
+
+/*
+ *  Accumulate sum[w] = (A*h)[i, w] for the W columns w of an n x k
+ *  multivector h, stored in row-major (C) order with row stride
+ *  num_vectors, where row i of A is row ii of the block row made of the
+ *  blocks start:end of a BSR (or CSR, with blocksize 1) matrix.  The
+ *  accumulators are held in registers, and the terms are summed in the
+ *  same order as for a single vector.
+ *
+ *  Helper function for polynomial_smoother.
+ */
+template<int W, class I, class T>
+inline void panel_row(const I start, const I end, const I Aj[], const T Ax[],
+                      const I blocksize, const I ii, const T h[],
+                      const I num_vectors, T sum[])
+{
+    const I R = blocksize;
+    const I K = num_vectors;
+    T s[W];
+    for(int w = 0; w < W; w++){
+        s[w] = 0.0;
+    }
+    if(R == 1){
+        for(I jj = start; jj < end; jj++){
+            const T a = Ax[jj];
+            const T *hj = h + (long) Aj[jj]*K;
+            for(int w = 0; w < W; w++){
+                s[w] += a*hj[w];
+            }
+        }
+    }
+    else{
+        for(I jj = start; jj < end; jj++){
+            const T *block = Ax + (long) jj*R*R + ii*R;
+            const T *hj = h + (long) Aj[jj]*R*K;
+            for(I c2 = 0; c2 < R; c2++){
+                const T a = block[c2];
+                for(int w = 0; w < W; w++){
+                    s[w] += a*hj[c2*K + w];
+                }
+            }
+        }
+    }
+    for(int w = 0; w < W; w++){
+        sum[w] = s[w];
+    }
+}
+
+
+/*
+ *  Apply iterations of the polynomial smoother
+ *
+ *      x <- x + p(D^{-1} A) D^{-1} (b - A x)
+ *
+ *  to the linear system Ax = b, where A is stored in BSR format, or in CSR
+ *  format with blocksize 1, and D^{-1} is an optional diagonal scaling,
+ *  e.g., the inverse of the diagonal of A for the Jacobi preconditioned
+ *  Chebyshev smoother.  x and b may be n x k multivectors stored in
+ *  row-major (C) order, in which case all k columns are smoothed during
+ *  each pass over A.
+ *
+ *  The coefficients of p are given in descending order.  With the scaled
+ *  residual s, the powers v_j = (D^{-1} A)^j s are formed one pass over A
+ *  at a time, alternating between the two work vectors r and y, and each
+ *  a_j v_j is added to x in place as soon as the row of v_j is known.  The
+ *  rows of each pass are partitioned among threads, see parallel_rows, so
+ *  the result does not depend on the number of threads.
+ *
+ *  Parameters
+ *      Ap[]           - BSR (or CSR) row pointer
+ *      Aj[]           - BSR (or CSR) index array
+ *      Ax[]           - BSR (or CSR) data array, blocks assumed square
+ *      x[]            - approximate solution, x[i*num_vectors + c]
+ *      b[]            - right hand side, b[i*num_vectors + c]
+ *      Tx[]           - diagonal scaling D^{-1}, one entry per row of A,
+ *                       or empty for no scaling
+ *      coefficients[] - coefficients of p, in descending order
+ *      r[]            - work vector the same size as x
+ *      y[]            - work vector the same size as x
+ *      blocksize      - dimension of the square blocks of A, 1 for CSR
+ *      num_vectors    - number of columns k in x and b
+ *      iterations     - number of iterations
+ *      zero_guess     - if nonzero, x is assumed to be zero on entry, and
+ *                       the first residual is b
+ *      n_threads      - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void polynomial_smoother(const I Ap[], const int Ap_size,
+                         const I Aj[], const int Aj_size,
+                         const T Ax[], const int Ax_size,
+                               T  x[], const int  x_size,
+                         const T  b[], const int  b_size,
+                         const T Tx[], const int Tx_size,
+                         const T coefficients[], const int coefficients_size,
+                               T  r[], const int  r_size,
+                               T  y[], const int  y_size,
+                         const I blocksize,
+                         const I num_vectors,
+                         const I iterations,
+                         const I zero_guess,
+                         const I n_threads)
+{
+    const I R = blocksize;
+    const I RR = R*R;
+    const I K = num_vectors;
+    const I n_brows = (I) (Ap_size - 1);
+    const I degree = (I) coefficients_size;
+    const bool scaled = (Tx_size > 0);
+
+    /*
+     *  Given sum = (A*h)_i for the k columns of row i: if residual,
+     *  out_i <- D^{-1}(b_i - sum).  Otherwise, out_i <- D^{-1} sum and
+     *  x_i += c_h*h_i + c_out*out_i, where the h_i term is only added if
+     *  add_h, i.e., for the first power.
+     */
+    auto finish = [=](const I i, const T *sum, const T *h, T *out,
+                      const T c_h, const T c_out, const bool add_h,
+                      const bool residual){
+        const long ik = (long) i*K;
+        for(I v = 0; v < K; v++){
+            if(residual){
+                const T res = b[ik + v] - sum[v];
+                out[ik + v] = scaled ? Tx[i]*res : res;
+                continue;
+            }
+            const T Ah = scaled ? Tx[i]*sum[v] : sum[v];
+            out[ik + v] = Ah;
+            if(add_h){
+                x[ik + v] += c_h*h[ik + v];
+            }
+            x[ik + v] += c_out*Ah;
+        }
+    };
+
+    /*
+     *  One pass over A, out <- D^{-1}(b - A*h) if residual, or else
+     *  out <- D^{-1} A h with the updates of x described in finish.  The
+     *  k columns of each row of A*h are accumulated together.
+     */
+    auto step = [=](const T *h, T *out, const T c_h, const T c_out,
+                    const bool add_h, const bool residual){
+        parallel_rows(Ap, n_brows, n_threads, RR*K,
+            [=](const I start, const I end){
+                std::vector<T> sum(K);
+                for(I bi = start; bi < end; bi++){
+                    for(I ii = 0; ii < R; ii++){
+                        const I i = bi*R + ii;
+                        if(K == 1){
+                            panel_row<1>(Ap[bi], Ap[bi+1], Aj, Ax, R, ii, h,
+                                         K, &sum[0]);
+                        }
+                        for(I v = 0; K > 1 && v < K; ){
+                            if(K - v >= 4){
+                                panel_row<4>(Ap[bi], Ap[bi+1], Aj, Ax, R, ii,
+                                             h + v, K, &sum[v]);
+                                v += 4;
+                            }
+                            else if(K - v >= 2){
+                                panel_row<2>(Ap[bi], Ap[bi+1], Aj, Ax, R, ii,
+                                             h + v, K, &sum[v]);
+                                v += 2;
+                            }
+                            else{
+                                panel_row<1>(Ap[bi], Ap[bi+1], Aj, Ax, R, ii,
+                                             h + v, K, &sum[v]);
+                                v += 1;
+                            }
+                        }
+                        finish(i, &sum[0], h, out, c_h, c_out, add_h,
+                               residual);
+                    }
+                }
+            });
+    };
+
+    if(degree == 0){
+        return;
+    }
+
+    const T one = 1.0;
+    const I n = (I) x_size;
+    for(I iter = 0; iter < iterations; iter++){
+        // scaled residual s = v_0 in r
+        if(zero_guess && iter == 0){
+            for(I i = 0; i < n; i++){
+                r[i] = scaled ? Tx[i/K]*b[i] : b[i];
+            }
+        }
+        else{
+            step(x, r, one, one, false, true);
+        }
+
+        if(degree == 1){
+            const T c0 = coefficients[0];
+            for(I i = 0; i < n; i++){
+                x[i] += c0*r[i];
+            }
+            continue;
+        }
+
+        // v_j = D^{-1} A v_{j-1}, x += a_j v_j, and x += a_0 v_0 with v_1
+        T *h = r;
+        T *out = y;
+        for(I j = 1; j < degree; j++){
+            step(h, out, coefficients[degree - 1], coefficients[degree - 1 - j],
+                 j == 1, false);
+            std::swap(h, out);
+        }
+    }
+}
+
+
+/*
+ *  Apply iterations of CF (or FC) Jacobi relaxation to the linear system
+ *  Ax = b, where A is stored in BSR format, or in CSR format with blocksize
+ *  1.  Each iteration is C_iterations weighted Jacobi sweeps over the rows
+ *  in Cpts followed by F_iterations sweeps over the rows in Fpts, or the
+ *  F-sweeps first if F_first is nonzero.  A sweep over the points i is
+ *
+ *      x_i <- x_i + omega*D_ii^{-1}*(b_i - A_i x),
+ *
+ *  which equals (1-omega)*x_i + omega*(b_i - sum_{j!=i} A_ij x_j)/A_ii.
+ *  BSR rows are relaxed point-wise, one (block) row index per point of
+ *  Cpts and Fpts.
+ *
+ *  All sweeps run in a single call.  The new values of a sweep are
+ *  computed in temp, with the points partitioned among threads, and then
+ *  copied to x, so the result does not depend on the number of threads.
+ *  Rows with a zero diagonal, or a zero entry of Tx, are left unchanged.
+ *
+ *  Parameters
+ *      Ap[]           - BSR (or CSR) row pointer
+ *      Aj[]           - BSR (or CSR) index array
+ *      Ax[]           - BSR (or CSR) data array, blocks assumed square
+ *      x[]            - approximate solution
+ *      b[]            - right hand side
+ *      Tx[]           - inverse of the diagonal of A, the same size as x,
+ *                       or empty to find the diagonal in each sweep
+ *      Cpts[]         - (block) rows of the C-points
+ *      Fpts[]         - (block) rows of the F-points
+ *      temp[]         - temporary vector, of size at least blocksize times
+ *                       the number of C-points and of F-points
+ *      blocksize      - dimension of the square blocks of A, 1 for CSR
+ *      iterations     - number of CF (or FC) iterations
+ *      C_iterations   - number of sweeps over the C-points per iteration
+ *      F_iterations   - number of sweeps over the F-points per iteration
+ *      F_first        - if nonzero, relax the F-points first (FC Jacobi)
+ *      omega[]        - damping parameter, of length 1
+ *      n_threads      - maximum number of threads
+ *
+ *  Returns:
+ *      Nothing, x will be modified in place
+ *
+ */
+template<class I, class T, class F>
+void cf_jacobi(const I Ap[], const int Ap_size,
+               const I Aj[], const int Aj_size,
+               const T Ax[], const int Ax_size,
+                     T  x[], const int  x_size,
+               const T  b[], const int  b_size,
+               const T Tx[], const int Tx_size,
+               const I Cpts[], const int Cpts_size,
+               const I Fpts[], const int Fpts_size,
+                     T temp[], const int temp_size,
+               const I blocksize,
+               const I iterations,
+               const I C_iterations,
+               const I F_iterations,
+               const I F_first,
+               const T omega[], const int omega_size,
+               const I n_threads)
+{
+    const I R = blocksize;
+    const I RR = R*R;
+    const I n_brows = (I) (Ap_size - 1);
+    const bool scaled = (Tx_size > 0);
+    const T w = omega[0];
+    const T one = 1.0;
+
+    // multiply-adds per relaxed (block) row, for the thread partition
+    const long row_work = (n_brows > 0) ?
+        (long) RR*(Ap[n_brows] - Ap[0])/n_brows + 1 : 1;
+
+    // D_ii^{-1}, from Tx or from the diagonal entry of the (block) row
+    auto inverse_diagonal = [=](const I bi, const I ii) -> T {
+        const I i = bi*R + ii;
+        if(scaled){
+            return Tx[i];
+        }
+        for(I jj = Ap[bi]; jj < Ap[bi+1]; jj++){
+            if(Aj[jj] == bi){
+                const T diag = Ax[(long) jj*RR + ii*R + ii];
+                return (diag != (F) 0.0) ? one/diag : (T) 0.0;
+            }
+        }
+        return 0.0;
+    };
+
+    auto sweep = [=](const I pts[], const I npts){
+        // new values of the points in temp, from the old values in x
+        parallel_range(npts, n_threads, row_work*npts,
+            [=](const I start, const I end){
+                if(R == 1){
+                    for(I k = start; k < end; k++){
+                        const I i = pts[k];
+                        T sum = b[i];
+                        for(I jj = Ap[i]; jj < Ap[i+1]; jj++){
+                            sum -= Ax[jj]*x[Aj[jj]];
+                        }
+                        temp[k] = x[i] + w*inverse_diagonal(i, 0)*sum;
+                    }
+                    return;
+                }
+                for(I k = start; k < end; k++){
+                    const I bi = pts[k];
+                    for(I ii = 0; ii < R; ii++){
+                        const I i = bi*R + ii;
+                        T sum = b[i];
+                        for(I jj = Ap[bi]; jj < Ap[bi+1]; jj++){
+                            const T *block = Ax + (long) jj*RR + ii*R;
+                            const T *xj = x + (long) Aj[jj]*R;
+                            for(I c = 0; c < R; c++){
+                                sum -= block[c]*xj[c];
+                            }
+                        }
+                        temp[(long) k*R + ii] =
+                            x[i] + w*inverse_diagonal(bi, ii)*sum;
+                    }
+                }
+            });
+
+        if(R == 1){
+            for(I k = 0; k < npts; k++){
+                x[pts[k]] = temp[k];
+            }
+            return;
+        }
+        for(I k = 0; k < npts; k++){
+            for(I ii = 0; ii < R; ii++){
+                x[(long) pts[k]*R + ii] = temp[(long) k*R + ii];
+            }
+        }
+    };
+
+    for(I iter = 0; iter < iterations; iter++){
+        for(I pass = 0; pass < 2; pass++){
+            const bool cpass = (pass == 0) != (F_first != 0);
+            const I *pts = cpass ? Cpts : Fpts;
+            const I npts = (I) (cpass ? Cpts_size : Fpts_size);
+            const I sweeps = cpass ? C_iterations : F_iterations;
+            for(I k = 0; k < sweeps; k++){
+                sweep(pts, npts);
+            }
+        }
+    }
+}
+
+
 #endif
@@ -645,6 +645,144 @@ void cljp_naive_splitting(const I n,
 }
 
 
+/*
+ *  Compute a CLJP splitting with threads
+ *
+ *  The selection loop of cljp_naive_splitting, where each pass runs in
+ *  parallel over the rows and reads only the state left by the previous
+ *  pass.  The independent set is selected from the weights, and the
+ *  edges removed by the weight updates are marked by the rows that own
+ *  them, before each node counts its removed edges through the transpose.
+ *  The splitting therefore depends on the initial weights alone, and not
+ *  on the number of threads, and equals that of cljp_naive_splitting for
+ *  the same weights.
+ *
+ *  Parameters
+ *      n          - number of rows in A (number of vertices)
+ *      C_rowptr[]       - CSR row pointer (strength matrix)
+ *      C_colinds[]       - CSR index array
+ *      Tp[]       - CSR row pointer (transpose of the strength matrix)
+ *      Tj[]       - CSR index array
+ *      T_edges[]  - position in C_colinds of each entry of Tj
+ *      weights[]  - initial weight of each node, i.e., the number of
+ *                   nodes it influences plus a number in [0, 1)
+ *      splitting  - array to store the C/F splitting
+ *      n_threads  - maximum number of threads, see parallel_rows
+ *
+ *  Notes:
+ *      The strength matrix must not have diagonal entries, and the
+ *      splitting and weights are overwritten.
+ */
+template<class I, class T>
+void cljp_splitting_threaded(const I n,
+                             const I C_rowptr[], const int C_rowptr_size,
+                             const I C_colinds[], const int C_colinds_size,
+                             const I Tp[], const int Tp_size,
+                             const I Tj[], const int Tj_size,
+                             const I T_edges[], const int T_edges_size,
+                                   T weights[], const int weights_size,
+                                   I splitting[], const int splitting_size,
+                             const I n_threads)
+{
+    // 1 for edges in the graph, 2 for edges being removed, 0 for removed
+    std::vector<char> edgemark(C_rowptr[n], 1);
+    std::vector<char> D(n, 0);
+    std::fill(splitting, splitting + n, U_NODE);
+
+    while(std::find(splitting, splitting + n, U_NODE) != splitting + n){
+
+        // SELECT INDEPENDENT SET
+        // find i such that w_i > w_j for all i in union(S_i,S_i^T)
+        parallel_rows(C_rowptr, n, n_threads, (I) 2,
+            [&](const I row_start, const I row_end){
+                for(I i = row_start; i < row_end; i++){
+                    D[i] = 0;
+                    if(splitting[i] != U_NODE) continue;
+                    bool maximum = true;
+                    for(I jj = C_rowptr[i]; maximum && jj < C_rowptr[i+1]; jj++){
+                        const I j = C_colinds[jj];
+                        if(splitting[j] == U_NODE && weights[j] > weights[i])
+                            maximum = false;
+                    }
+                    for(I jj = Tp[i]; maximum && jj < Tp[i+1]; jj++){
+                        const I j = Tj[jj];
+                        if(splitting[j] == U_NODE && weights[j] > weights[i])
+                            maximum = false;
+                    }
+                    D[i] = maximum;
+                }
+            });
+
+        parallel_rows(C_rowptr, n, n_threads, (I) 1,
+            [&](const I row_start, const I row_end){
+                for(I i = row_start; i < row_end; i++){
+                    if(D[i]) splitting[i] = C_NODE;
+                }
+            });
+
+        // UPDATE WEIGHTS, marking the removed edges of each row
+        parallel_rows(C_rowptr, n, n_threads, (I) 2,
+            [&](const I row_start, const I row_end){
+                // mark[c] == j for the new C points c that j depends on
+                std::vector<I> mark(n, -1);
+
+                for(I j = row_start; j < row_end; j++){
+                    // P5: nbrs that influence C points are not good C points
+                    if(D[j]){
+                        for(I kk = C_rowptr[j]; kk < C_rowptr[j+1]; kk++){
+                            if(splitting[C_colinds[kk]] == U_NODE &&
+                               edgemark[kk] == 1)
+                                edgemark[kk] = 2;
+                        }
+                    }
+
+                    // P6: if k and j both depend on c, a C point, and j
+                    // depends on k, then k is less valuable as a C point
+                    bool depends = false;
+                    for(I jj = C_rowptr[j]; jj < C_rowptr[j+1]; jj++){
+                        const I c = C_colinds[jj];
+                        if(D[c]){
+                            mark[c] = j;
+                            depends = true;
+                        }
+                    }
+                    if(!depends) continue;
+
+                    for(I kk = C_rowptr[j]; kk < C_rowptr[j+1]; kk++){
+                        const I k = C_colinds[kk];
+                        if(splitting[k] != U_NODE || edgemark[kk] != 1)
+                            continue;
+                        // does c ---> k ?
+                        for(I ll = C_rowptr[k]; ll < C_rowptr[k+1]; ll++){
+                            if(mark[C_colinds[ll]] == j){
+                                edgemark[kk] = 2;
+                                break;
+                            }
+                        }
+                    }
+                }
+            });
+
+        // each node removes its marked edges from its weight
+        parallel_rows(Tp, n, n_threads, (I) 1,
+            [&](const I row_start, const I row_end){
+                for(I k = row_start; k < row_end; k++){
+                    if(splitting[k] != U_NODE) continue;
+                    for(I jj = Tp[k]; jj < Tp[k+1]; jj++){
+                        const I e = T_edges[jj];
+                        if(edgemark[e] == 2){
+                            edgemark[e] = 0;
+                            weights[k]--;
+                        }
+                    }
+                    if(weights[k] < 1)
+                        splitting[k] = F_NODE;
+                }
+            });
+    }
+}
+
+
 /*
  *   Produce the Ruge-Stuben prolongator using "Direct Interpolation"
  *
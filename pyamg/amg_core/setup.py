@@ -1,16 +1,28 @@
 #!/usr/bin/env python
 
 
+import sys
+
+
 def configuration(parent_package='', top_path=None):
     from numpy.distutils.misc_util import Configuration
 
     # lapack_opt = get_info('lapack_opt')
     config = Configuration('amg_core', parent_package, top_path)
 
+    # the threaded kernels in parallel.h use std::thread
+    if sys.platform == 'win32':
+        thread_args = []
+    else:
+        thread_args = ['-pthread']
+
     # extra_info = lapack_opt)
     config.add_extension('_amg_core',
                          define_macros=[('__STDC_FORMAT_MACROS', 1)],
-                         sources=['amg_core_wrap.cxx'])
+                         sources=['amg_core_wrap.cxx'],
+                         depends=['parallel.h'],
+                         extra_compile_args=thread_args,
+                         extra_link_args=thread_args)
 
     return config
 
@@ -0,0 +1,401 @@
+"""Setup and solve many independent systems in parallel"""
+from __future__ import absolute_import
+
+__docformat__ = "restructuredtext en"
+
+import os
+import shutil
+import tempfile
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu, LinearOperator
+
+from pyamg.multilevel import multilevel_solver
+from pyamg.graph import connected_components
+
+__all__ = ['batch_setup', 'batch_solve', 'component_solver']
+
+
+def _solver_function(solver):
+    """Return the function that builds a hierarchy for batch_setup"""
+    if callable(solver):
+        return solver
+    if solver == 'sa':
+        from pyamg.aggregation import smoothed_aggregation_solver
+        return smoothed_aggregation_solver
+    elif solver == 'rootnode':
+        from pyamg.aggregation import rootnode_solver
+        return rootnode_solver
+    elif solver == 'rs':
+        from pyamg.classical import ruge_stuben_solver
+        return ruge_stuben_solver
+    elif solver == 'air':
+        from pyamg.classical.air import AIR_solver
+        return AIR_solver
+    else:
+        raise ValueError('unknown solver (%s)' % solver)
+
+
+def _setup_worker(task):
+    """Build one hierarchy in a worker process and save it to path"""
+    solver, A, kwargs, path = task
+    ml = _solver_function(solver)(A, **kwargs)
+    ml.save(path)
+    return path
+
+
+def _shared_directory():
+    """Directory for the hierarchies exchanged by batch_setup
+
+    Memory-backed on Linux, so that the hierarchies are never written to
+    disk, otherwise the default temporary directory.
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+def batch_setup(As, solver='sa', workers=None, **kwargs):
+    """Build the hierarchies of many independent matrices in parallel
+
+    Parameters
+    ----------
+    As : list of sparse matrices
+        Matrices, one hierarchy is built for each
+    solver : {string, callable}
+        Method used to build each hierarchy, 'sa' for
+        smoothed_aggregation_solver, 'rootnode' for rootnode_solver, 'rs'
+        for ruge_stuben_solver and 'air' for AIR_solver, or a function
+        called as solver(A, **kwargs), which must be picklable.
+    workers : int
+        Number of worker processes, the default is the number of CPUs.
+        With a single worker, the hierarchies are built in this process.
+    kwargs : dict
+        Parameters passed to solver for every matrix
+
+    Returns
+    -------
+    mls : list of multilevel_solver
+        Hierarchy of each matrix in As
+
+    Notes
+    -----
+    Each hierarchy is built by a worker process and written with
+    multilevel_solver.save to a temporary file, in memory-backed storage
+    (/dev/shm) if available.  The hierarchies are then loaded with
+    multilevel_solver.load, with their arrays memory-mapped from these
+    files, so that the arrays are shared with the workers' output instead
+    of being pickled and copied between processes.  The files are removed
+    once mapped, and their memory is released with the hierarchies.
+
+    Only the matrices are sent to the workers, so kwargs must be picklable
+    and apply to every matrix.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyamg import batch_setup, batch_solve
+    >>> from pyamg.gallery import poisson
+    >>> As = [poisson((n, n), format='csr') for n in [20, 30, 40]]
+    >>> mls = batch_setup(As, solver='sa', max_coarse=10, workers=2)
+    >>> bs = [np.ones(A.shape[0]) for A in As]
+    >>> xs = batch_solve(mls, bs, tol=1e-8)
+
+    """
+    As = list(As)
+    fn = _solver_function(solver)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = min(workers, len(As))
+
+    if workers <= 1:
+        return [fn(A, **kwargs) for A in As]
+
+    directory = tempfile.mkdtemp(prefix='pyamg-', dir=_shared_directory())
+    try:
+        tasks = [(solver, A, kwargs,
+                  os.path.join(directory, 'ml%d.bin' % k))
+                 for k, A in enumerate(As)]
+        pool = multiprocessing.Pool(workers)
+        try:
+            paths = pool.map(_setup_worker, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        return [multilevel_solver.load(path, mmap=True) for path in paths]
+    finally:
+        # mapped files remain valid after they are unlinked
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def batch_solve(mls, bs, workers=None, **kwargs):
+    """Solve with many hierarchies in parallel
+
+    Parameters
+    ----------
+    mls : list of multilevel_solver
+        Hierarchies, e.g., from batch_setup.  A hierarchy may be listed
+        more than once, to solve with several right-hand sides.
+    bs : list of arrays
+        Right-hand side for each hierarchy in mls, a vector or an n x k
+        block of vectors
+    workers : int
+        Number of worker threads, the default is the number of CPUs
+    kwargs : dict
+        Parameters passed to multilevel_solver.solve for every system, such
+        as tol, maxiter or accel
+
+    Returns
+    -------
+    xs : list of arrays
+        Solution of each system
+
+    Notes
+    -----
+    The solves run in a pool of threads.  The amg_core kernels and the
+    sparse matrix products release the GIL, so the solves run in parallel,
+    in particular with frozen hierarchies (see multilevel_solver.freeze).
+    Concurrent solves with the same hierarchy are safe, see
+    multilevel_solver.solve.  With threaded kernels
+    (pyamg.util.utils.set_num_threads), the number of threads in use is
+    multiplied by workers.
+
+    Examples
+    --------
+    See batch_setup
+
+    """
+    mls = list(mls)
+    bs = list(bs)
+    if len(mls) != len(bs):
+        raise ValueError('expected one right-hand side per hierarchy')
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    def solve(k):
+        return mls[k].solve(bs[k], **kwargs)
+
+    return _thread_map(solve, len(mls), workers)
+
+
+def _thread_map(fn, n, workers):
+    """Return [fn(0), ..., fn(n-1)], computed by a pool of worker threads"""
+    workers = min(workers, n)
+    if workers <= 1:
+        return [fn(k) for k in range(n)]
+
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(fn, range(n), chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+class component_solver:
+    """Solve a matrix with decoupled blocks one connected component at a time
+
+    The connected components of the graph of A are found with
+    pyamg.graph.connected_components.  Each component with at least
+    min_size unknowns gets its own AMG hierarchy, and the small components
+    are solved together with one sparse LU factorization.  The hierarchies
+    never mix unrelated components, and the components are solved
+    concurrently.
+
+    Attributes
+    ----------
+    components : list of arrays
+        Unknowns of each component with a hierarchy
+    solvers : list of multilevel_solver
+        Hierarchy of each component in components
+    direct : array
+        Unknowns of the small components, solved directly
+
+    Methods
+    -------
+    solve()
+        Iteratively solve Ax = b component by component
+    aspreconditioner()
+        Return a preconditioner that cycles on each component
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from scipy.sparse import block_diag
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.batch import component_solver
+    >>> A = block_diag([poisson((30, 30)), poisson((40, 40)),
+    ...                 poisson((3, 3))], format='csr')
+    >>> ml = component_solver(A, solver='sa', max_coarse=10)
+    >>> print(len(ml.solvers), len(ml.direct))
+    2 9
+    >>> x = ml.solve(np.ones(A.shape[0]), tol=1e-8)
+
+    """
+
+    def __init__(self, A, solver='sa', min_size=100, workers=None,
+                 setup_workers=1, **kwargs):
+        """
+        Parameters
+        ----------
+        A : sparse matrix
+            n x n matrix, with a symmetric sparsity pattern.  BSR matrices
+            are split along their blocks, and keep their blocksize.
+        solver : {string, callable}
+            Method used to build the hierarchy of each component, see
+            batch_setup
+        min_size : int
+            Components with fewer unknowns are solved directly
+        workers : int
+            Number of threads solving the components, the default is the
+            number of CPUs
+        setup_workers : int
+            Number of processes building the hierarchies, see batch_setup
+        kwargs : dict
+            Parameters passed to solver for each component
+
+        """
+        if not sparse.isspmatrix(A):
+            raise TypeError('expected sparse matrix')
+        if A.shape[0] != A.shape[1]:
+            raise ValueError('expected square matrix')
+
+        if sparse.isspmatrix_bsr(A):
+            blocksize = A.blocksize
+        else:
+            A = A.tocsr()
+            blocksize = (1, 1)
+        R = blocksize[0]
+        G = sparse.csr_matrix((np.ones(A.indices.shape[0]), A.indices,
+                               A.indptr),
+                              shape=(A.shape[0] // R, A.shape[1] // R))
+        labels = connected_components(G)
+
+        # unknowns of each component, in increasing order
+        order = np.argsort(labels, kind='mergesort')
+        ptr = np.cumsum(np.bincount(labels))[:-1]
+        blocks = np.split(order, ptr)
+        groups = [(block[:, np.newaxis] * R + np.arange(R)).ravel()
+                  for block in blocks]
+
+        A = A.tocsr()
+        self.shape = A.shape
+        self.dtype = A.dtype
+        self.components = [idx for idx in groups if len(idx) >= min_size]
+        small = [idx for idx in groups if len(idx) < min_size]
+        self.direct = np.sort(np.concatenate(small)) if small else \
+            np.zeros(0, dtype=np.intc)
+
+        As = []
+        for idx in self.components:
+            Ac = A[idx, :][:, idx]
+            if R > 1:
+                Ac = Ac.tobsr(blocksize=blocksize)
+            As.append(Ac)
+        self.solvers = batch_setup(As, solver=solver, workers=setup_workers,
+                                   **kwargs)
+
+        self.LU = None
+        if len(self.direct):
+            self.LU = splu(A[self.direct, :][:, self.direct].tocsc())
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+
+    def __direct_solve(self, b):
+        x = self.LU.solve(np.array(b, dtype=np.result_type(self.dtype, b)))
+        return x.reshape(b.shape)
+
+    def solve(self, b, x0=None, tol=1e-5, maxiter=100, cycle='V', accel=None,
+              residuals=None):
+        """Solve Ax = b, with each component solved independently
+
+        Parameters
+        ----------
+        b : array
+            Right hand side, a vector or an n x k block
+        x0 : array
+            Initial guess, the default is zero
+        tol : float
+            Tolerance of the relative residual of each component, and so
+            approximately of A x = b
+        maxiter : int
+            Maximum number of iterations of each component
+        cycle, accel :
+            See multilevel_solver.solve
+        residuals : list
+            If given, the residual norms of A x = b after each iteration
+            are appended, where each component counts with its last
+            iterate once it has converged
+
+        Returns
+        -------
+        x : array
+            Approximate solution of A x = b
+
+        """
+        b = np.asarray(b)
+        if b.shape[0] != self.shape[0]:
+            raise ValueError('b has invalid dimensions')
+        if x0 is None:
+            x0 = np.zeros_like(b)
+        x0 = np.asarray(x0)
+        x = np.zeros(b.shape, dtype=np.result_type(self.dtype, b, x0))
+
+        histories = [[] for idx in self.components]
+
+        def solve(k):
+            idx = self.components[k]
+            x[idx] = self.solvers[k].solve(b[idx], x0=x0[idx], tol=tol,
+                                           maxiter=maxiter, cycle=cycle,
+                                           accel=accel,
+                                           residuals=histories[k])
+
+        _thread_map(solve, len(self.components), self.workers)
+        if self.LU is not None:
+            x[self.direct] = self.__direct_solve(b[self.direct])
+
+        if residuals is not None and histories:
+            length = max(len(history) for history in histories)
+            for i in range(length):
+                r = [history[min(i, len(history) - 1)]
+                     for history in histories]
+                residuals.append(np.sqrt(np.sum(np.abs(r)**2)))
+
+        return x
+
+    def aspreconditioner(self, cycle='V'):
+        """Create a preconditioner applying one cycle to each component
+
+        The small components are solved directly.
+
+        Parameters
+        ----------
+        cycle : {'V','W','F','AMLI'}
+            Type of multigrid cycle
+
+        Returns
+        -------
+        precond : LinearOperator
+
+        """
+        def matvec(b):
+            b = np.asarray(b)
+            x = np.zeros(b.shape, dtype=np.result_type(self.dtype, b))
+
+            def precondition(k):
+                idx = self.components[k]
+                x[idx] = self.solvers[k].precondition(b[idx], cycle=cycle)
+
+            _thread_map(precondition, len(self.components), self.workers)
+            if self.LU is not None:
+                x[self.direct] = self.__direct_solve(b[self.direct])
+            return x
+
+        return LinearOperator(self.shape, matvec, matmat=matvec,
+                              dtype=self.dtype)
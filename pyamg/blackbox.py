@@ -8,6 +8,7 @@ import scipy as sp
 from scipy.sparse import isspmatrix_csr, isspmatrix_bsr, csr_matrix
 from pyamg import smoothed_aggregation_solver
 from pyamg.util.linalg import ishermitian, norm
+from pyamg.batch import component_solver
 
 __all__ = ['solve', 'solver', 'solver_configuration']
 
@@ -216,8 +217,13 @@ def solver(A, config):
         raise TypeError('Failed generating smoothed_aggregation_solver')
 
 
+def _component_hierarchy(A):
+    """Hierarchy of one connected component for solve(..., decouple=True)"""
+    return solver(A, solver_configuration(A, verb=False))
+
+
 def solve(A, b, x0=None, tol=1e-5, maxiter=400, return_solver=False,
-          existing_solver=None, verb=True):
+          existing_solver=None, verb=True, decouple=False):
     """
     Solve the arbitrary system Ax=b with the best out-of-the box choice for a
     solver.  The matrix A can be non-Hermitian, indefinite, Hermitian
@@ -244,13 +250,21 @@ def solve(A, b, x0=None, tol=1e-5, maxiter=400, return_solver=False,
         to invert A, thus saving time on setup cost.
     verb : {bool}
         If True, print verbose output during runtime
+    decouple : {bool} : default False
+        If True, the connected components of the graph of A are solved
+        independently, each with its own hierarchy, and the small
+        components with a direct solver (see pyamg.batch.component_solver).
+        For matrices with many decoupled blocks, such as several unrelated
+        meshes, this avoids building aggregates and coarse levels across
+        unrelated blocks.  The tolerance then applies to each component.
 
     Returns
     -------
     x : {array}
         Solution to Ax = b
     ml : multilevel_solver
-        Optional return of the multilevel structure used for the solve
+        Optional return of the multilevel structure used for the solve, a
+        component_solver if decouple is True
 
     Notes
     -----
@@ -276,6 +290,10 @@ def solve(A, b, x0=None, tol=1e-5, maxiter=400, return_solver=False,
     # Convert A to acceptable CSR/BSR format
     A = make_csr(A)
 
+    if decouple or isinstance(existing_solver, component_solver):
+        return _decoupled_solve(A, b, x0, tol, maxiter, return_solver,
+                                existing_solver, verb)
+
     # Generate solver if necessary
     if existing_solver is None:
 
@@ -327,3 +345,43 @@ def solve(A, b, x0=None, tol=1e-5, maxiter=400, return_solver=False,
         return (x.reshape(b.shape), existing_solver)
     else:
         return x.reshape(b.shape)
+
+
+def _decoupled_solve(A, b, x0, tol, maxiter, return_solver, existing_solver,
+                     verb):
+    """Solve Ax=b one connected component at a time, see solve"""
+    if existing_solver is None:
+        existing_solver = component_solver(A, solver=_component_hierarchy)
+        if verb:
+            print("  Detected %d components with a hierarchy, and %d "
+                  "unknowns in small components" %
+                  (len(existing_solver.components),
+                   len(existing_solver.direct)))
+    elif existing_solver.shape[0] != A.shape[0]:
+        raise TypeError('Argument existing_solver must have the same size '
+                        'as A')
+
+    # Krylov acceleration depends on symmetry of the components
+    if all(ml.levels[0].A.symmetry == 'hermitian'
+           for ml in existing_solver.solvers):
+        accel = 'cg'
+    else:
+        accel = 'gmres'
+
+    if x0 is None:
+        x0 = np.array(sp.rand(A.shape[0],), dtype=A.dtype)
+
+    x = existing_solver.solve(np.ravel(b), x0=np.ravel(x0), accel=accel,
+                              tol=tol, maxiter=maxiter)
+    if verb:
+        r0 = norm(np.ravel(b) - np.ravel(A * x0))
+        rk = norm(np.ravel(b) - np.ravel(A * x))
+        if r0 != 0.0:
+            print("  Residual reduction ||r_k||/||r_0|| = %1.2e" % (rk / r0))
+        else:
+            print("  Residuals ||r_k||, ||r_0|| = %1.2e, %1.2e" % (rk, r0))
+
+    if return_solver:
+        return (x.reshape(b.shape), existing_solver)
+    else:
+        return x.reshape(b.shape)
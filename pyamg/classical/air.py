@@ -9,7 +9,7 @@ from scipy.sparse import csr_matrix, bsr_matrix, isspmatrix_csr, isspmatrix_bsr,
 import numpy as np
 from copy import deepcopy
 
-from pyamg.multilevel import multilevel_solver
+from pyamg.multilevel import multilevel_solver, galerkin_product
 from pyamg.relaxation.smoothing import change_smoothers
 from pyamg.strength import classical_strength_of_connection, \
     symmetric_strength_of_connection, evolution_strength_of_connection, \
@@ -97,6 +97,10 @@ def AIR_solver(A,
         For a detailed, more accurate setup complexity, pass in 
         'setup_complexity' = True. This will slow down performance, but
         increase accuracy of complexity count. 
+    mixed_precision : {None, 'coarse', 'all'}
+        Store the coarse levels ('coarse') or all levels ('all') in single
+        precision, see multilevel_solver.set_precision.  solve() wraps the
+        single precision cycle in a double precision iterative refinement.
 
     Notes
     -----
@@ -396,18 +400,18 @@ def extend_hierarchy(levels, strength, CF, interp, restrict, filter_operator,
     levels[-1].R = R                  # restriction operator
     levels[-1].splitting = splitting  # C/F splitting
 
+    # Optional operators used in place of P and R for RAP, also by
+    # multilevel_solver.update
+    if P_temp is not P:
+        levels[-1].coarse_grid_P = P_temp
+    if R_temp is not R:
+        levels[-1].coarse_grid_R = R_temp
+
     # Form coarse grid operator, get complexity
-    #levels[-1].complexity['RAP'] = mat_mat_complexity(R_temp,A) / float(A.nnz)
-    #RA = R_temp * A
-    #levels[-1].complexity['RAP'] += mat_mat_complexity(RA,P_temp) / float(A.nnz)
-    #A = RA * P_temp
-    
-    # RL: RAP = R*(A*P)
-    levels[-1].complexity['RAP'] = mat_mat_complexity(A, P_temp) / float(A.nnz)
-    AP = A * P_temp
-    levels[-1].complexity['RAP'] += mat_mat_complexity(R_temp, AP) / float(A.nnz)
-    A = R_temp * AP
-    
+    temp_cost = [0.0]
+    nnz = float(A.nnz)
+    A = galerkin_product(levels[-1], cost=temp_cost)    # Ac = RAP
+    levels[-1].complexity['RAP'] = temp_cost[0] / nnz
 
     # Make sure coarse-grid operator is in correct sparse format
     if (isspmatrix_csr(P) and (not isspmatrix_csr(A))):
@@ -6,7 +6,7 @@ __docformat__ = "restructuredtext en"
 from warnings import warn
 from scipy.sparse import csr_matrix, isspmatrix_csr, isspmatrix_bsr, \
     SparseEfficiencyWarning
-from pyamg.multilevel import multilevel_solver
+from pyamg.multilevel import multilevel_solver, galerkin_product
 from pyamg.relaxation.smoothing import change_smoothers
 from pyamg.strength import classical_strength_of_connection, \
     symmetric_strength_of_connection, evolution_strength_of_connection,\
@@ -85,6 +85,10 @@ def ruge_stuben_solver(A,
         For a detailed, more accurate setup complexity, pass in 
         'setup_complexity' = True. This will slow down performance, but
         increase accuracy of complexity count. 
+    mixed_precision : {None, 'coarse', 'all'}
+        Store the coarse levels ('coarse') or all levels ('all') in single
+        precision, see multilevel_solver.set_precision.  solve() wraps the
+        single precision cycle in a double precision iterative refinement.
 
     Examples
     --------
@@ -288,11 +292,20 @@ def extend_hierarchy(levels, strength, CF, interpolation, restriction, keep):
     levels[-1].R = R                  # restriction operator
     levels[-1].splitting = splitting  # C/F splitting
 
+    # Interpolation and its inputs other than A, with which
+    # multilevel_solver.update recomputes P and R for a new A
+    fn, kwargs = unpack_arg(interpolation, cost=False)
+    if fn in ['direct', 'standard', 'distance_two'] and \
+            restriction == 'galerkin':
+        kwargs = dict((k, v) for k, v in kwargs.items() if k != 'cost')
+        kwargs.update(C=C, splitting=splitting)
+        levels[-1].interpolation = (fn, kwargs)
+
     # Form coarse grid operator, get complexity
-    levels[-1].complexity['RAP'] = mat_mat_complexity(R,A) / float(A.nnz)
-    RA = R * A
-    levels[-1].complexity['RAP'] += mat_mat_complexity(RA,P) / float(A.nnz)
-    A = RA * P      # Galerkin operator, Ac = RAP
+    temp_cost = [0.0]
+    nnz = float(A.nnz)
+    A = galerkin_product(levels[-1], cost=temp_cost)    # Ac = RAP
+    levels[-1].complexity['RAP'] = temp_cost[0] / nnz
 
     # Make sure coarse-grid operator is in correct sparse format
     if (isspmatrix_csr(P) and (not isspmatrix_csr(A))):
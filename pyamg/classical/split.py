@@ -59,6 +59,10 @@ In general, methods that use a graph coloring perform better on structured
 meshes [1].  Unstructured meshes do not appear to benefit substantially
 from coloring.
 
+PMIS, PMISc, CLJP and CLJPc run on the number of threads set by
+pyamg.util.utils.set_num_threads, and their random weights can be seeded.
+For a given seed, the splitting does not depend on the number of threads.
+
     ========  ========  ========  ==========
      method   parallel  in color     cost
     ========  ========  ========  ==========
@@ -101,7 +105,7 @@ from scipy.sparse import csr_matrix, isspmatrix_csr
 
 from pyamg.graph import vertex_coloring
 from pyamg import amg_core
-from pyamg.util.utils import remove_diagonal
+from pyamg.util.utils import remove_diagonal, get_num_threads
 from pyamg.strength import classical_strength_of_connection
 
 __all__ = ['RS', 'PMIS', 'PMISc', 'CLJP', 'CLJPc', 'MIS', 'weighted_matching']
@@ -165,7 +169,7 @@ def RS(S, second_pass=False, cost=[0]):
     return splitting
 
 
-def PMIS(S, cost=[0]):
+def PMIS(S, cost=[0], seed=None):
     """C/F splitting using the Parallel Modified Independent Set method
 
     Parameters
@@ -173,6 +177,10 @@ def PMIS(S, cost=[0]):
     S : csr_matrix
         Strength of connection matrix indicating the strength between nodes i
         and j (S_ij)
+    seed : int
+        Seed of the random weights, drawn from the global numpy random
+        state if None.  The splitting is the same for a given seed,
+        whatever the number of threads.
 
     Returns
     -------
@@ -198,11 +206,11 @@ def PMIS(S, cost=[0]):
 
     """
     S = remove_diagonal(S)
-    weights, G, S, T = preprocess(S)
+    weights, G, S, T = preprocess(S, seed=seed)
     return MIS(G, weights)
 
 
-def PMISc(S, method='JP', cost=[0]):
+def PMISc(S, method='JP', cost=[0], seed=None):
     """C/F splitting using Parallel Modified Independent Set (in color)
 
     PMIS-c, or PMIS in color, improves PMIS by perturbing the initial
@@ -218,6 +226,8 @@ def PMISc(S, method='JP', cost=[0]):
             * 'MIS' - Maximal Independent Set
             * 'JP'  - Jones-Plassmann (parallel)
             * 'LDF' - Largest-Degree-First (parallel)
+    seed : int
+        Seed of the random weights, and of the coloring, see PMIS
 
     Returns
     -------
@@ -243,11 +253,11 @@ def PMISc(S, method='JP', cost=[0]):
 
     """
     S = remove_diagonal(S)
-    weights, G, S, T = preprocess(S, coloring_method=method)
+    weights, G, S, T = preprocess(S, coloring_method=method, seed=seed)
     return MIS(G, weights)
 
 
-def CLJP(S, color=False, cost=[0]):
+def CLJP(S, color=False, cost=[0], seed=None):
     """Compute a C/F splitting using the parallel CLJP algorithm
 
     Parameters
@@ -257,6 +267,9 @@ def CLJP(S, color=False, cost=[0]):
         and j (S_ij)
     color : bool
         use the CLJP coloring approach
+    seed : int
+        Seed of the random weights, a fixed seed if None.  The splitting
+        is the same for a given seed, whatever the number of threads.
 
     Returns
     -------
@@ -284,19 +297,30 @@ def CLJP(S, color=False, cost=[0]):
     if not isspmatrix_csr(S):
         raise TypeError('expected csr_matrix')
     S = remove_diagonal(S)
+    n = S.shape[0]
 
-    colorid = 0
-    if color:
-        colorid = 1
+    # transpose S for efficient column access, with the position in S of
+    # each entry
+    T = csr_matrix((np.arange(S.nnz, dtype='intc'), S.indices, S.indptr),
+                   shape=S.shape).T.tocsr()
+    edges = np.asarray(T.data, dtype='intc')
 
-    T = S.T.tocsr()  # transpose S for efficient column access
-    splitting = np.empty(S.shape[0], dtype='intc')
+    # number of nodes influenced by each node, perturbed by a coloring or
+    # random weights
+    weights = np.diff(T.indptr).astype(float)
+    if color:
+        coloring = np.empty(n, dtype='intc')
+        amg_core.vertex_coloring_mis(n, S.indptr, S.indices, coloring)
+        weights += coloring / float(coloring.max() + 1)
+    else:
+        if seed is None:
+            seed = 2448422
+        weights += np.random.RandomState(seed).rand(n)
 
-    amg_core.cljp_naive_splitting(S.shape[0],
-                                  S.indptr, S.indices,
-                                  T.indptr, T.indices,
-                                  splitting,
-                                  colorid)
+    splitting = np.empty(n, dtype='intc')
+    amg_core.cljp_splitting_threaded(n, S.indptr, S.indices,
+                                     T.indptr, T.indices, edges,
+                                     weights, splitting, get_num_threads())
 
     return splitting
 
@@ -368,7 +392,12 @@ def MIS(G, weights, maxiter=None, cost=[0]):
 
     See Also
     --------
-    fn = amg_core.maximal_independent_set_parallel
+    amg_core.maximal_independent_set_threaded
+
+    Notes
+    -----
+    The set is computed by threads, see pyamg.util.utils.set_num_threads,
+    and depends only on the weights, not on the number of threads.
 
     """
 
@@ -379,21 +408,24 @@ def MIS(G, weights, maxiter=None, cost=[0]):
     mis = np.empty(G.shape[0], dtype='intc')
     mis[:] = -1
 
-    fn = amg_core.maximal_independent_set_parallel
+    fn = amg_core.maximal_independent_set_threaded
+    n_threads = get_num_threads()
 
     if maxiter is None:
-        fn(G.shape[0], G.indptr, G.indices, -1, 1, 0, mis, weights, -1)
+        fn(G.shape[0], G.indptr, G.indices, -1, 1, 0, mis, weights, -1,
+           n_threads)
     else:
         if maxiter < 0:
             raise ValueError('maxiter must be >= 0')
 
-        fn(G.shape[0], G.indptr, G.indices, -1, 1, 0, mis, weights, maxiter)
+        fn(G.shape[0], G.indptr, G.indices, -1, 1, 0, mis, weights, maxiter,
+           n_threads)
 
     return mis
 
 
 # internal function
-def preprocess(S, coloring_method=None):
+def preprocess(S, coloring_method=None, seed=None):
     """Common preprocess for splitting functions
 
     Parameters
@@ -405,6 +437,8 @@ def preprocess(S, coloring_method=None):
             * 'MIS' - Maximal Independent Set
             * 'JP'  - Jones-Plassmann (parallel)
             * 'LDF' - Largest-Degree-First (parallel)
+    seed : int
+        Seed of the random weights, the global numpy random state if None
 
     Returns
     -------
@@ -446,12 +480,17 @@ def preprocess(S, coloring_method=None):
     weights = np.ravel(T.sum(axis=1))  # initial weights
     # weights -= T.diagonal()          # discount self loops
 
+    if seed is None:
+        rand = sp.rand
+    else:
+        rand = np.random.RandomState(seed).rand
+
     if coloring_method is None:
-        weights = weights + sp.rand(len(weights))
+        weights = weights + rand(len(weights))
     else:
-        coloring = vertex_coloring(G, coloring_method)
+        coloring = vertex_coloring(G, coloring_method, seed=seed)
         num_colors = coloring.max() + 1
-        weights = weights + (sp.rand(len(weights)) + coloring)/num_colors
+        weights = weights + (rand(len(weights)) + coloring)/num_colors
 
     return (weights, G, S, T)
 
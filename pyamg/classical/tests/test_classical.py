@@ -102,6 +102,52 @@ class TestRugeStubenFunctions(TestCase):
             # check that all F-nodes are strongly connected to a C-node
             assert((splitting + S*splitting).min() > 0)
 
+    def test_threaded_splitting(self):
+        from pyamg import amg_core
+        from pyamg.util.utils import set_num_threads, remove_diagonal
+
+        cases = self.cases[-3:] + [poisson((200, 200), format='csr')]
+        try:
+            for A in cases:
+                S = classical_strength_of_connection(A, 0.25)
+
+                # CLJP-c has no random weights, and matches the serial
+                # implementation
+                Sd = remove_diagonal(S.copy())
+                T = Sd.T.tocsr()
+                gold = np.empty(S.shape[0], dtype='intc')
+                amg_core.cljp_naive_splitting(S.shape[0], Sd.indptr,
+                                              Sd.indices, T.indptr,
+                                              T.indices, gold, 1)
+
+                results = []
+                for n_threads in [1, 2, 4]:
+                    set_num_threads(n_threads)
+                    results.append([split.PMIS(S, seed=1),
+                                    split.PMISc(S, seed=1),
+                                    split.CLJP(S, seed=1),
+                                    split.CLJPc(S)])
+                assert_equal(results[0][3], gold)
+                for result in results[1:]:
+                    for splitting, expected in zip(result, results[0]):
+                        assert_equal(splitting, expected)
+
+                # the seed determines the splitting
+                assert_equal(split.PMIS(S, seed=1), results[0][0])
+                assert(not np.array_equal(split.PMIS(S, seed=2),
+                                          results[0][0]))
+
+                # PMIS: every F-node is connected to a C-node and the
+                # C-nodes are independent
+                G = remove_diagonal(S.copy())
+                G.data[:] = 1
+                G = G + G.T
+                for splitting in results[0][:2]:
+                    assert((splitting + G * splitting).min() > 0)
+                    assert_equal((G * splitting)[splitting == 1].max(), 0)
+        finally:
+            set_num_threads(None)
+
     def test_direct_interpolation(self):
         for A in self.cases:
 
@@ -0,0 +1,275 @@
+"""Domain decomposition preconditioners with an AMG solver per subdomain"""
+from __future__ import absolute_import
+
+__docformat__ = "restructuredtext en"
+
+import threading
+import traceback
+import multiprocessing
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator
+
+from pyamg.graph import lloyd_cluster, pseudo_peripheral_node
+from pyamg.batch import _solver_function
+
+__all__ = ['schwarz_preconditioner']
+
+
+def _partition(A, n_subdomains, method):
+    """Split the unknowns of A into n_subdomains parts
+
+    Returns an array with the part of each unknown.  With method='lloyd',
+    the parts are Lloyd clusters of the graph of A, and with method='rcm',
+    contiguous slices of the reverse Cuthill-McKee ordering of A.
+    """
+    n = A.shape[0]
+    G = sparse.csr_matrix((np.ones(A.nnz), A.indices, A.indptr),
+                          shape=A.shape)
+    G = (G + G.T).tocsr()
+
+    if method == 'lloyd':
+        parts = lloyd_cluster(G, n_subdomains)[1]
+        # unknowns not reached from any seed
+        parts[parts < 0] = 0
+    elif method == 'rcm':
+        level = pseudo_peripheral_node(G)[2]
+        order = np.argsort(level, kind='mergesort')
+        parts = np.empty(n, dtype=np.intc)
+        parts[order] = (np.arange(n) * n_subdomains) // n
+    else:
+        raise ValueError('unknown partition method (%s)' % method)
+
+    return parts
+
+
+def _worker(conn, A, subdomains, owned, method, solver, cycle, kwargs,
+            shared_x, shared_y, index, dtype):
+    """Build and apply the hierarchies of a group of subdomains
+
+    Waits on conn for applications of the preconditioner to the vector in
+    shared_x, and adds the results of its subdomains to row index of
+    shared_y.  A message None stops the worker.  The worker answers each
+    message with None, or with the traceback of an error.
+    """
+    try:
+        n = A.shape[0]
+        x = np.frombuffer(shared_x, dtype=dtype)
+        y = np.frombuffer(shared_y, dtype=dtype).reshape(-1, n)[index]
+
+        fn = _solver_function(solver)
+        local = []
+        for idx, own in zip(subdomains, owned):
+            Ai = A[idx, :][:, idx].tocsr()
+            ml = fn(Ai, **kwargs)
+            # position of the owned unknowns in the subdomain
+            local.append((idx, np.searchsorted(idx, own), own, ml))
+    except Exception:
+        conn.send(traceback.format_exc())
+        return
+    conn.send(None)
+
+    while conn.recv() is not None:
+        try:
+            y[:] = 0
+            for idx, pos, own, ml in local:
+                yi = ml.precondition(x[idx], cycle=cycle)
+                if method == 'ras':
+                    y[own] += yi[pos]
+                else:
+                    y[idx] += yi
+            conn.send(None)
+        except Exception:
+            conn.send(traceback.format_exc())
+
+
+class schwarz_preconditioner(LinearOperator):
+    """Additive Schwarz preconditioner with AMG subdomain solvers
+
+    The unknowns are partitioned into subdomains, which are extended by a
+    number of layers of neighbors in the graph of A.  The matrix of each
+    overlapping subdomain, with Dirichlet conditions at its boundary, is
+    owned by a worker process, which builds an AMG hierarchy for it and
+    applies one cycle per application of the preconditioner.  The vectors
+    are exchanged with the workers through shared memory.
+
+    Attributes
+    ----------
+    subdomains : list of arrays
+        Sorted unknowns of each overlapping subdomain
+    owned : list of arrays
+        Sorted unknowns of the partition, owned by each subdomain
+    workers : int
+        Number of worker processes
+
+    Methods
+    -------
+    close()
+        Stop the worker processes
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.krylov import fgmres
+    >>> from pyamg.decomposition import schwarz_preconditioner
+    >>> A = poisson((50, 50), format='csr')
+    >>> b = np.ones(A.shape[0])
+    >>> M = schwarz_preconditioner(A, n_subdomains=4, workers=2)
+    >>> x, info = fgmres(A, b, tol=1e-8, maxiter=100, M=M)
+    >>> M.close()
+
+    """
+
+    def __init__(self, A, n_subdomains=None, partition='lloyd', overlap=1,
+                 method='ras', solver='sa', cycle='V', workers=None,
+                 **kwargs):
+        """
+        Parameters
+        ----------
+        A : sparse matrix
+            n x n matrix
+        n_subdomains : int
+            Number of subdomains, the default is the number of workers
+        partition : {string, array}
+            Nonoverlapping subdomains, either an array with the subdomain
+            number of each unknown, or the method used to compute them:
+            'lloyd' for Lloyd clustering of the graph of A (see
+            pyamg.graph.lloyd_cluster), or 'rcm' for contiguous slices of
+            its reverse Cuthill-McKee ordering (see
+            pyamg.graph.symmetric_rcm).
+        overlap : int
+            Number of layers of neighbors added to each subdomain
+        method : {'ras', 'as'}
+            'ras' for restricted additive Schwarz, where each unknown is
+            taken from the subdomain that owns it, or 'as' for additive
+            Schwarz, where the results of the overlapping subdomains are
+            summed.  Additive Schwarz is symmetric for symmetric A and
+            subdomain cycles, and may be used with cg; restricted additive
+            Schwarz usually converges faster, with gmres or fgmres.
+        solver : {string, callable}
+            Method used to build the subdomain hierarchies, see
+            pyamg.batch.batch_setup
+        cycle : {'V','W','F','AMLI'}
+            Subdomain cycle
+        workers : int
+            Number of worker processes, the default is the number of CPUs,
+            and at most the number of subdomains.  Subdomains are assigned
+            to the workers in turn.
+        kwargs : dict
+            Parameters passed to solver for each subdomain
+
+        """
+        if not sparse.isspmatrix(A):
+            raise TypeError('expected sparse matrix')
+        if A.shape[0] != A.shape[1]:
+            raise ValueError('expected square matrix')
+        if method not in ['ras', 'as']:
+            raise ValueError("method must be 'ras' or 'as'")
+
+        A = sparse.csr_matrix(A).asfptype()
+        n = A.shape[0]
+        dtype = A.dtype
+
+        if isinstance(partition, str):
+            if n_subdomains is None:
+                n_subdomains = workers or multiprocessing.cpu_count()
+            parts = _partition(A, min(n_subdomains, n), partition)
+        else:
+            parts = np.asarray(partition)
+            if parts.shape != (n,):
+                raise ValueError('partition must have one entry per unknown')
+        parts = np.unique(parts, return_inverse=True)[1]
+        n_subdomains = parts.max() + 1
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = max(1, min(workers, n_subdomains))
+
+        # extend each part by overlap layers of neighbors
+        G = sparse.csr_matrix((np.ones(A.nnz), A.indices, A.indptr),
+                              shape=A.shape)
+        G = (G + G.T).tocsr()
+        self.owned = []
+        self.subdomains = []
+        for k in range(n_subdomains):
+            mask = (parts == k)
+            self.owned.append(np.where(mask)[0])
+            for layer in range(overlap):
+                mask = mask | (G * mask.astype(float) > 0)
+            self.subdomains.append(np.where(mask)[0])
+        self.workers = workers
+
+        LinearOperator.__init__(self, dtype=dtype, shape=A.shape)
+
+        # input vector and one output vector per worker
+        itemsize = np.dtype(dtype).itemsize
+        self._x_buffer = multiprocessing.RawArray('b', n * itemsize)
+        self._y_buffer = multiprocessing.RawArray('b',
+                                                  workers * n * itemsize)
+        self._x = np.frombuffer(self._x_buffer, dtype=dtype)
+        self._y = np.frombuffer(self._y_buffer, dtype=dtype).reshape(-1, n)
+        self._lock = threading.Lock()
+
+        self._conns = []
+        self._processes = []
+        for w in range(workers):
+            conn, child_conn = multiprocessing.Pipe()
+            p = multiprocessing.Process(
+                target=_worker,
+                args=(child_conn, A, self.subdomains[w::workers],
+                      self.owned[w::workers], method, solver, cycle, kwargs,
+                      self._x_buffer, self._y_buffer, w, dtype))
+            p.daemon = True
+            p.start()
+            self._conns.append(conn)
+            self._processes.append(p)
+
+        try:
+            self.__wait()
+        except RuntimeError:
+            self.close()
+            raise
+
+    def __wait(self):
+        """Collect the answers of the workers"""
+        errors = [conn.recv() for conn in self._conns]
+        for error in errors:
+            if error is not None:
+                raise RuntimeError('subdomain worker failed:\n' + error)
+
+    def _matvec(self, x):
+        x = np.ravel(x)
+        if np.iscomplexobj(x) and not np.iscomplexobj(self._x):
+            return self._matvec(x.real) + 1j * self._matvec(x.imag)
+
+        with self._lock:
+            if not self._conns:
+                raise RuntimeError('the preconditioner is closed')
+            self._x[:] = x
+            for conn in self._conns:
+                conn.send(True)
+            self.__wait()
+            return self._y.sum(axis=0)
+
+    def close(self):
+        """Stop the worker processes"""
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.send(None)
+                except (IOError, OSError):
+                    pass
+            for p in self._processes:
+                p.join()
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
+            self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
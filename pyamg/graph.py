@@ -81,7 +81,7 @@ def maximal_independent_set(G, algo='serial', k=None):
     return mis
 
 
-def vertex_coloring(G, method='MIS'):
+def vertex_coloring(G, method='MIS', seed=None):
     """Compute a vertex coloring of a graph
 
     Parameters
@@ -94,6 +94,9 @@ def vertex_coloring(G, method='MIS'):
             * 'MIS' - Maximal Independent Set
             * 'JP'  - Jones-Plassmann (parallel)
             * 'LDF' - Largest-Degree-First (parallel)
+    seed : {int}
+        Seed of the random weights of 'JP' and 'LDF', the global numpy
+        random state if None
 
     Returns
     -------
@@ -109,16 +112,20 @@ def vertex_coloring(G, method='MIS'):
     N = G.shape[0]
 
     coloring = np.empty(N, dtype='intc')
+    if seed is None:
+        rand = sp.rand
+    else:
+        rand = np.random.RandomState(seed).rand
 
     if method == 'MIS':
         fn = amg_core.vertex_coloring_mis
         fn(N, G.indptr, G.indices, coloring)
     elif method == 'JP':
         fn = amg_core.vertex_coloring_jones_plassmann
-        fn(N, G.indptr, G.indices, coloring, sp.rand(N))
+        fn(N, G.indptr, G.indices, coloring, rand(N))
     elif method == 'LDF':
         fn = amg_core.vertex_coloring_LDF
-        fn(N, G.indptr, G.indices, coloring, sp.rand(N))
+        fn(N, G.indptr, G.indices, coloring, rand(N))
     else:
         raise ValueError('unknown method (%s)' % method)
 
@@ -1,6 +1,8 @@
 "Krylov Solvers"
 from __future__ import absolute_import
 
+import sys as _sys
+
 from .info import __doc__
 
 from ._gmres import *
@@ -13,6 +15,9 @@ from ._bicgstab import *
 from ._steepest_descent import *
 from ._minimal_residual import *
 
+if _sys.version_info >= (3, 5):
+    from ._aio import *
+
 __all__ = [s for s in dir() if not s.startswith('_')]
 from numpy.testing import Tester
 test = Tester().test
@@ -0,0 +1,273 @@
+"""Asyncio interface to the iterative solvers
+
+The solves run in an executor, so that the event loop is not blocked, and
+their residual histories are streamed back to the loop as they are
+computed.  Requires Python 3.5 or later.
+"""
+import asyncio
+import threading
+
+from ._gmres import gmres
+from ._fgmres import fgmres
+from ._cg import cg
+from ._cr import cr
+from ._cgnr import cgnr
+from ._cgne import cgne
+from ._bicgstab import bicgstab
+from ._steepest_descent import steepest_descent
+from ._minimal_residual import minimal_residual
+
+__docformat__ = "restructuredtext en"
+
+__all__ = ['async_solution', 'gmres_async', 'fgmres_async', 'cg_async',
+           'cr_async', 'cgnr_async', 'cgne_async', 'bicgstab_async',
+           'steepest_descent_async', 'minimal_residual_async']
+
+
+class _SolveCancelled(Exception):
+    """Raised in the executor to stop a cancelled solve"""
+    pass
+
+
+# marks the end of the residual stream
+_DONE = object()
+
+
+class _residual_stream(list):
+    """Residual history passed to the solver in place of a list
+
+    Each new residual norm is forwarded to the event loop, and every
+    update checks whether the solve has been cancelled.
+    """
+
+    def __init__(self, solution):
+        list.__init__(self)
+        self._solution = solution
+
+    def append(self, value):
+        self._solution._check()
+        list.append(self, value)
+        self._solution._push(value)
+
+    def __setitem__(self, key, value):
+        # solvers reset the history with residuals[:] = [...]
+        self._solution._check()
+        value = list(value) if isinstance(key, slice) else value
+        list.__setitem__(self, key, value)
+        if isinstance(key, slice):
+            for v in value:
+                self._solution._push(v)
+        else:
+            self._solution._push(value)
+
+
+class async_solution(object):
+    """Solve running in an executor, awaited from an event loop
+
+    Awaiting the object returns the result of the solve.  Iterating over it
+    with ``async for`` yields the residual norms as they are computed, and
+    ends with the solve.  The solve checks for cancellation after every
+    iteration, i.e., between multigrid cycles or Krylov iterations.
+
+    Attributes
+    ----------
+    residuals : list
+        Residual history computed so far
+    timeout : float
+        Number of seconds after which the solve is cancelled, None for no
+        limit
+
+    Methods
+    -------
+    result()
+        Coroutine returning the result of the solve
+    cancel()
+        Stop the solve after its current iteration
+    done()
+        True if the solve has finished
+
+    Notes
+    -----
+    Cancelling a task awaiting the solve, or exceeding the timeout, also
+    cancels the solve, and awaiting a cancelled solve raises
+    asyncio.CancelledError.  The solve must be created in the thread of its
+    event loop, and runs in the default executor of the loop unless an
+    executor is given.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> import numpy as np
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.krylov import cg_async
+    >>> A = poisson((50, 50), format='csr')
+    >>> b = np.ones(A.shape[0])
+    >>> loop = asyncio.get_event_loop()
+    >>> x, info = loop.run_until_complete(cg_async(A, b, tol=1e-8).result())
+
+    """
+
+    def __init__(self, solve, args, kwargs, timeout=None, executor=None,
+                 loop=None):
+        """
+        Parameters
+        ----------
+        solve : callable
+            Solver called as solve(*args, **kwargs), with callback and
+            residuals parameters
+        args, kwargs :
+            Arguments of the solver.  The callback and the residuals list
+            in kwargs are called and filled as by the solver.
+        timeout : float
+            Number of seconds after which the solve is cancelled
+        executor : concurrent.futures.Executor
+            Executor running the solve, the default executor of the loop
+            if None
+        loop : event loop
+            Loop that awaits the solve, the current event loop if None
+
+        """
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        self._loop = loop
+        self.timeout = timeout
+        self._deadline = None
+        if timeout is not None:
+            self._deadline = loop.time() + timeout
+
+        self._cancelled = threading.Event()
+        self._queue = asyncio.Queue()
+        self.residuals = _residual_stream(self)
+
+        kwargs = dict(kwargs)
+        user_residuals = kwargs.get('residuals')
+        user_callback = kwargs.get('callback')
+
+        def callback(x):
+            self._check()
+            if user_callback is not None:
+                user_callback(x)
+
+        kwargs['residuals'] = self.residuals
+        kwargs['callback'] = callback
+
+        def run():
+            try:
+                return solve(*args, **kwargs)
+            finally:
+                if user_residuals is not None:
+                    user_residuals[:] = list(self.residuals)
+
+        self._future = loop.run_in_executor(executor, run)
+        self._future.add_done_callback(self.__finished)
+
+    def __finished(self, future):
+        # retrieve the exception, so that an abandoned solve is not reported
+        if not future.cancelled():
+            future.exception()
+        self._queue.put_nowait(_DONE)
+
+    def _check(self):
+        """Stop the solve if it has been cancelled, called by the executor"""
+        if self._cancelled.is_set():
+            raise _SolveCancelled()
+
+    def _push(self, value):
+        """Forward a residual norm to the loop, called by the executor"""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, value)
+
+    def __remaining(self):
+        # a cancelled solve stops after its current iteration
+        if self._deadline is None or self._cancelled.is_set():
+            return None
+        return max(0.0, self._deadline - self._loop.time())
+
+    def cancel(self):
+        """Stop the solve after its current iteration"""
+        self._cancelled.set()
+
+    def cancelled(self):
+        """True if the solve has been cancelled"""
+        return self._cancelled.is_set()
+
+    def done(self):
+        """True if the solve has finished"""
+        return self._future.done()
+
+    async def result(self):
+        """Wait for the solve and return its result
+
+        Raises asyncio.TimeoutError once the timeout has passed, and
+        asyncio.CancelledError if the solve was cancelled, once the solve
+        has stopped.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._future),
+                                          self.__remaining())
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.cancel()
+            raise
+        except _SolveCancelled:
+            raise asyncio.CancelledError()
+
+    def __await__(self):
+        return self.result().__await__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            value = await asyncio.wait_for(self._queue.get(),
+                                           self.__remaining())
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.cancel()
+            raise
+        if value is _DONE:
+            # the end of the stream stays available to later iterations
+            self._queue.put_nowait(_DONE)
+            raise StopAsyncIteration
+        return value
+
+
+def _async_variant(solver):
+    """Return the asyncio variant of solver, returning an async_solution"""
+    def solve_async(A, b, x0=None, timeout=None, executor=None, **kwargs):
+        return async_solution(solver, (A, b, x0), kwargs, timeout=timeout,
+                              executor=executor)
+
+    solve_async.__name__ = solver.__name__ + '_async'
+    solve_async.__doc__ = \
+        """Run %s in an executor, see async_solution
+
+    Parameters
+    ----------
+    A, b, x0 :
+        System to solve, see %s
+    timeout : float
+        Number of seconds after which the solve is cancelled
+    executor : concurrent.futures.Executor
+        Executor running the solve, the default executor of the loop if
+        None
+    kwargs : dict
+        Parameters of %s, such as tol, maxiter, M, callback or residuals
+
+    Returns
+    -------
+    solution : async_solution
+        Awaitable returning (x, info) and asynchronous iterator over the
+        residual norms
+
+    """ % (solver.__name__, solver.__name__, solver.__name__)
+    return solve_async
+
+
+gmres_async = _async_variant(gmres)
+fgmres_async = _async_variant(fgmres)
+cg_async = _async_variant(cg)
+cr_async = _async_variant(cr)
+cgnr_async = _async_variant(cgnr)
+cgne_async = _async_variant(cgne)
+bicgstab_async = _async_variant(bicgstab)
+steepest_descent_async = _async_variant(steepest_descent)
+minimal_residual_async = _async_variant(minimal_residual)
@@ -29,8 +29,10 @@ def cg(A, b, x0=None, tol=1e-5, maxiter=None, xtype=None, M=None,
         maximum number of allowed iterations
     xtype : type
         dtype for the solution, default is automatic type detection
-    M : {array, matrix, sparse matrix, LinearOperator}
-        n x n, inverted preconditioner, i.e. solve M A x = M b.
+    M : {array, matrix, sparse matrix, LinearOperator, multilevel_solver}
+        n x n, inverted preconditioner, i.e. solve M A x = M b.  A pyamg
+        multilevel_solver is applied through multilevel_solver.precondition,
+        reusing a single output vector across iterations.
     callback : function
         User-supplied function is called after each iteration as
         callback(xk), where xk is the current solution vector
@@ -81,6 +83,12 @@ def cg(A, b, x0=None, tol=1e-5, maxiter=None, xtype=None, M=None,
        http://www-users.cs.umn.edu/~saad/books.html
 
     '''
+    # A pyamg hierarchy is applied with one cycle from a zero initial guess
+    if hasattr(M, 'precondition'):
+        ml, M = M, None
+    else:
+        ml = None
+
     A, M, x, b, postprocess = make_system(A, M, x0, b)
 
     # Ensure that warnings are always reissued from this function
@@ -104,7 +112,10 @@ def cg(A, b, x0=None, tol=1e-5, maxiter=None, xtype=None, M=None,
 
     # setup method
     r = b - A*x
-    z = M*r
+    if ml is None:
+        z = M*r
+    else:
+        z = ml.precondition(r)
     p = z.copy()
     rz = inner(r.conjugate(), z)
 
@@ -149,7 +160,10 @@ def cg(A, b, x0=None, tol=1e-5, maxiter=None, xtype=None, M=None,
         else:
             r = b - A*x
 
-        z = M*r                                   # 6
+        if ml is None:                            # 6
+            z = M*r
+        else:
+            ml.precondition(r, out=z)
         rz = inner(r.conjugate(), z)
 
         if rz < 0.0:                              # check curvature of M
@@ -37,8 +37,9 @@ def gmres(A, b, x0=None, tol=1e-5, restrt=None, maxiter=None, xtype=None,
           and restrt is the max number of inner iterations
     xtype : type
         dtype for the solution, default is automatic type detection
-    M : {array, matrix, sparse matrix, LinearOperator}
-        n x n, inverted preconditioner, i.e. solve M A x = M b.
+    M : {array, matrix, sparse matrix, LinearOperator, multilevel_solver}
+        n x n, inverted preconditioner, i.e. solve M A x = M b.  A pyamg
+        multilevel_solver is applied through multilevel_solver.precondition.
     callback : function
         User-supplied function is called after each iteration as
         callback( ||rk||_2 ), where rk is the current preconditioned residual
@@ -99,6 +100,10 @@ def gmres(A, b, x0=None, tol=1e-5, restrt=None, maxiter=None, xtype=None,
 
     '''
 
+    # A pyamg hierarchy is applied with one cycle from a zero initial guess
+    if hasattr(M, 'precondition'):
+        M = M.aspreconditioner()
+
     # pass along **kwargs
     if orthog == 'householder':
         (x, flag) = gmres_householder(A, b, x0=x0, tol=tol, restrt=restrt,
@@ -15,6 +15,9 @@ Functions
     - steepest descent, (simple iteration)
     - minimial residual (MR), (simple iteration)
 
+Each method has an asyncio variant, e.g., cg_async, which runs the solve in
+an executor and streams its residual history (Python 3.5 or later).
+
 
 References
 ----------
@@ -0,0 +1,106 @@
+import sys
+import time
+import unittest
+
+import numpy as np
+from scipy import rand
+from pyamg.gallery import poisson
+from pyamg import smoothed_aggregation_solver
+from pyamg.krylov import cg, gmres
+
+from numpy.testing import TestCase, assert_equal, assert_almost_equal, \
+    assert_raises
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from pyamg.krylov import cg_async, gmres_async, async_solution
+
+
+def collect(loop, solution):
+    """Residual norms streamed by solution"""
+    values = []
+    while True:
+        try:
+            values.append(loop.run_until_complete(solution.__anext__()))
+        except StopAsyncIteration:
+            return values
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'requires asyncio')
+class TestAsync(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.A = poisson((30, 30), format='csr')
+        np.random.seed(0)
+        self.b = rand(self.A.shape[0])
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_krylov(self):
+        A, b, loop = self.A, self.b, self.loop
+        for solver, solver_async in [(cg, cg_async), (gmres, gmres_async)]:
+            res_gold = []
+            x_gold, info_gold = solver(A, b, tol=1e-8, maxiter=100,
+                                       residuals=res_gold)
+
+            res = []
+            solution = solver_async(A, b, tol=1e-8, maxiter=100,
+                                    residuals=res)
+            assert(isinstance(solution, async_solution))
+            x, info = loop.run_until_complete(solution.result())
+            assert_almost_equal(x, x_gold)
+            assert_equal(info, info_gold)
+            assert_almost_equal(res, res_gold)
+            # the stream holds the history, also after the solve
+            assert_almost_equal(collect(loop, solution), res_gold)
+            assert(solution.done())
+
+    def test_multilevel(self):
+        A, b, loop = self.A, self.b, self.loop
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        for accel in [None, 'cg']:
+            res_gold = []
+            x_gold = ml.solve(b, tol=1e-8, accel=accel, residuals=res_gold)
+
+            solution = ml.solve_async(b, tol=1e-8, accel=accel)
+            assert_almost_equal(collect(loop, solution), res_gold)
+            x = loop.run_until_complete(solution.result())
+            assert_almost_equal(x, x_gold)
+            assert_almost_equal(solution.residuals, res_gold)
+
+    def test_cancel(self):
+        A, b, loop = self.A, self.b, self.loop
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        iterations = []
+
+        def slow(x):
+            iterations.append(1)
+            time.sleep(0.01)
+
+        # the loop runs while the solve is in the executor
+        ticks = []
+        for i in range(5):
+            loop.call_later(0.001 * i, ticks.append, i)
+        solution = ml.solve_async(b, tol=0.0, maxiter=1000, callback=slow,
+                                  timeout=0.1)
+        assert_raises(asyncio.TimeoutError, loop.run_until_complete,
+                      solution.result())
+        assert_equal(ticks, list(range(5)))
+        assert(solution.cancelled())
+        assert_raises(asyncio.CancelledError, loop.run_until_complete,
+                      solution.result())
+        assert(solution.done())
+        assert(len(iterations) < 1000)
+
+        # cancel after the first cycles
+        solution = cg_async(A, b, tol=0.0, maxiter=1000,
+                            M=ml.aspreconditioner(), callback=slow)
+        r = [loop.run_until_complete(solution.__anext__()) for i in range(3)]
+        solution.cancel()
+        assert_raises(asyncio.CancelledError, loop.run_until_complete,
+                      solution.result())
+        assert(len(solution.residuals) < 1000)
+        assert_almost_equal(solution.residuals[:3], r)
@@ -209,3 +209,20 @@ class TestKrylov(TestCase):
                 xNew = xNew.reshape(-1, 1)
                 assert_equal((norm(b - A*xNew)/norm(b - A*x0)) < 0.35, True,
                              err_msg='Inexact Krylov Method Failed Test')
+
+    def test_multilevel_preconditioner(self):
+        # A pyamg hierarchy may be passed directly as the preconditioner
+        A = pyamg.gallery.poisson((20, 20), format='csr')
+        b = random.rand(A.shape[0])
+        ml = pyamg.smoothed_aggregation_solver(A, max_coarse=10)
+        M = ml.aspreconditioner()
+
+        for method in [cg, gmres]:
+            res1, res2 = [], []
+            (x1, flag1) = method(A, b, tol=1e-8, maxiter=20, M=ml,
+                                 residuals=res1)
+            (x2, flag2) = method(A, b, tol=1e-8, maxiter=20, M=M,
+                                 residuals=res2)
+            assert_equal(flag1, 0)
+            assert_array_almost_equal(x1, x2)
+            assert_array_almost_equal(res1, res2)
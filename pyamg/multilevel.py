@@ -2,15 +2,30 @@
 
 __docformat__ = "restructuredtext en"
 
+import functools
+import io
+import pickle
+import re
+import threading
 from warnings import warn
-from pyamg.util.utils import unpack_arg
+from pyamg.util.utils import unpack_arg, mat_mat_complexity, get_num_threads
 
 import scipy as sp
 import numpy as np
+from scipy.sparse import isspmatrix_csr, isspmatrix_csc, isspmatrix_bsr, \
+    isspmatrix, csr_matrix, bsr_matrix
+from scipy.sparse.sputils import upcast
 from pyamg.vis.vis_coarse import vis_splitting
+from pyamg import amg_core
 import pyamg.relaxation.smoothing as sm
+from pyamg.relaxation.relaxation import relax_columns
 
-__all__ = ['multilevel_solver', 'coarse_grid_solver']
+__all__ = ['multilevel_solver', 'coarse_grid_solver', 'galerkin_product']
+
+try:
+    from scipy.sparse._sparsetools import csr_matvec, csc_matvec, bsr_matvec
+except ImportError:
+    from scipy.sparse.sparsetools import csr_matvec, csc_matvec, bsr_matvec
 
 
 class multilevel_solver:
@@ -33,6 +48,15 @@ class multilevel_solver:
         Dictionary storing cycle complexity with key as cycle type.
     SC : float
         Setup complexity for constructing solver.
+    workspace : bool
+        If True, each level owns persistent work vectors that are reused
+        in place by every cycle, instead of allocating temporaries.  The
+        work vectors are used by one solve at a time, concurrent solves
+        from other threads allocate temporaries.
+    frozen : {dict, None}
+        Flat operator, smoother and work arrays packed by freeze(), which
+        are used by the compiled amg_core cycle.  None if the hierarchy is
+        not frozen.
 
     Methods
     -------
@@ -40,12 +64,32 @@ class multilevel_solver:
         Create a preconditioner using this multigrid cycle
     cycle_complexity()
         A measure of the cost of a single multigrid cycle.
+    compile_cycle()
+        Flatten a multigrid cycle into a precomputed schedule.
+    plan_complexity()
+        Cycle complexity counted from the operations of a compiled cycle.
     grid_complexity()
         A measure of the rate of coarsening.
     operator_complexity()
         A measure of the size of the multigrid hierarchy.
     solve()
         Iteratively solves a linear system for the right hand side.
+    solve_async()
+        Run solve() in an executor, awaited from an asyncio event loop.
+    allocate_workspace()
+        Reserve the persistent per-level work vectors used by the cycle.
+    workspace_bytes()
+        Number of bytes reserved by the per-level work vectors.
+    freeze()
+        Pack the hierarchy for cycling inside amg_core.
+    set_precision()
+        Store the hierarchy in lower precision for iterative refinement.
+    update()
+        Recompute the hierarchy for a new matrix with a fixed structure.
+    save()
+        Write the hierarchy to a file.
+    load()
+        Read a hierarchy written by save(), optionally memory-mapped.
     visualize_coarse_grids()
         Dump a visualization of the coarse grids in the given directory.
     save_operators()
@@ -80,6 +124,19 @@ class multilevel_solver:
             Setup complexity on this level in WUs relative to fine grid. 
         verts : n x 2 array
             degree of freedom locations
+        work : {dict}
+            Persistent work vectors for this level, only present if the
+            hierarchy was built with workspace=True.  Keys are 'residual'
+            (all but the coarsest level), and 'x' and 'b' (all but the
+            finest level) holding the iterate and right-hand side that the
+            cycle passes to this level.
+        RAP_plan : tuple
+            Sparsity patterns and symbolic Galerkin product R*A*P of this
+            level, cached by galerkin_product.
+        A_refine : csr_matrix
+            Finest level only, if the whole hierarchy is stored in lower
+            precision (see set_precision).  The original matrix, used for
+            the residuals of the iterative refinement in solve().
 
         Notes
         -----
@@ -92,7 +149,16 @@ class multilevel_solver:
             self.complexity = {}
             self.SC = None
 
-    def __init__(self, levels, coarse_solver='pinv2', init_nnz=None):
+        def __getstate__(self):
+            # smoothers are closures and are rebuilt by multilevel_solver,
+            # work vectors are reallocated
+            state = self.__dict__.copy()
+            for key in ['presmoother', 'postsmoother', 'work']:
+                state.pop(key, None)
+            return state
+
+    def __init__(self, levels, coarse_solver='pinv2', init_nnz=None,
+                 workspace=False, mixed_precision=None):
         """
         Class constructor responsible for initializing the cycle and ensuring
         the list of levels is complete.
@@ -124,6 +190,16 @@ class multilevel_solver:
                 + pinv2    : pseudoinverse (SVD)
                 + lu       : LU factorization
                 + cholesky : Cholesky factorization
+        workspace : bool
+            If True, reserve persistent work vectors on every level when the
+            hierarchy is constructed (see allocate_workspace).  Cycles then
+            compute residuals, restrictions and coarse-grid corrections in
+            place, without allocating temporary vectors.
+        mixed_precision : {None, 'coarse', 'all'}
+            If not None, store the hierarchy in single precision (see
+            set_precision), either all levels but the finest ('coarse') or
+            all levels ('all').  solve() then wraps the single precision
+            cycle in a double precision iterative refinement.
 
         Notes
         -----
@@ -173,11 +249,21 @@ class multilevel_solver:
         self.coarse_solver = coarse_grid_solver(coarse_solver)
         self.CC = {}
         self.SC = None
+        self.workspace = False
+        self.frozen = None
+        self._plans = {}
+        # held by the solve that uses the shared work vectors
+        self._work_lock = threading.RLock()
 
         for level in levels[:-1]:
             if not hasattr(level, 'R'):
                 level.R = level.P.H
 
+        if mixed_precision is not None:
+            self.set_precision(mixed_precision)
+
+        if workspace:
+            self.allocate_workspace()
 
     def __repr__(self):
         """Prints basic statistics about the multigrid hierarchy.
@@ -225,6 +311,587 @@ class multilevel_solver:
             raise NameError("invalid presmoother method: ", fn2)
         self.levels[0].postsmoother = setup_postsmoother(self.levels[0], **kwargs2)
 
+    def allocate_workspace(self, dtype=None):
+        """Reserve persistent work vectors on each level of the hierarchy.
+
+        Each level, except the coarsest, receives a residual vector, and
+        each level, except the finest, receives the iterate 'x' and
+        right-hand side 'b' handed to it by the cycle.  Once allocated,
+        V, W, F and AMLI cycles reuse these vectors in place.
+
+        Parameters
+        ----------
+        dtype : dtype
+            Data type of the right-hand sides.  The work vectors on each
+            level have the data type of that level's operator, made complex
+            if dtype is complex.  solve() calls this method again if it
+            encounters a right-hand side that requires different data
+            types.
+
+        Returns
+        -------
+        Nothing, level.work is created on each level
+
+        Examples
+        --------
+        >>> from pyamg import smoothed_aggregation_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = smoothed_aggregation_solver(A)
+        >>> ml.allocate_workspace()
+        >>> ml.workspace_bytes() > 0
+        True
+        """
+        dtypes = self.__level_dtypes(dtype)
+
+        for i, level in enumerate(self.levels):
+            n = level.A.shape[0]
+            dtype = dtypes[i]
+            level.work = {}
+            if i < len(self.levels) - 1:
+                level.work['residual'] = np.zeros((n,), dtype=dtype)
+            if i > 0:
+                level.work['x'] = np.zeros((n,), dtype=dtype)
+                level.work['b'] = np.zeros((n,), dtype=dtype)
+
+        self.workspace = True
+
+    def __level_dtypes(self, dtype=None):
+        """Data types of the cycle vectors on each level
+
+        The vectors on each level have the data type of that level's
+        operator, upcast to complex if dtype is complex.
+        """
+        types = [level.A.dtype for level in self.levels]
+        if dtype is not None and np.dtype(dtype).kind == 'c':
+            types = [upcast(tp, np.complex64) for tp in types]
+        return types
+
+    def __prepare_workspace(self, dtype):
+        """Reallocate the work vectors if they do not match dtype"""
+        if self.workspace and len(self.levels) > 1:
+            dtypes = self.__level_dtypes(dtype)
+            if self.levels[0].work['residual'].dtype != dtypes[0] or \
+                    self.levels[-1].work['x'].dtype != dtypes[-1]:
+                self.allocate_workspace(dtype)
+
+    def workspace_bytes(self):
+        """Number of bytes reserved by the per-level work vectors.
+
+        Returns
+        -------
+        nbytes : int
+            Total size of the work vectors on all levels, or 0 if no
+            workspace has been allocated.
+        """
+        if not self.workspace:
+            return 0
+
+        return sum([sum([v.nbytes for v in level.work.values()])
+                    for level in self.levels])
+
+    def set_precision(self, precision='coarse', dtype=np.float32):
+        """Store the hierarchy in lower precision
+
+        The operators, transfer operators and smoothers are cast to dtype
+        (or to its complex counterpart for complex operators), which
+        reduces the memory footprint and bandwidth of every cycle.  The
+        cycle then runs in dtype, while solve() computes the residuals in
+        the precision of the original finest level matrix and corrects the
+        iterate by iterative refinement, so that the attainable accuracy
+        is that of the original matrix.
+
+        Parameters
+        ----------
+        precision : {'coarse', 'all'}
+            Store all levels but the finest ('coarse'), or all levels
+            ('all') in lower precision.  With 'all', the original finest
+            level matrix is kept as levels[0].A_refine.
+        dtype : dtype
+            Lower precision real data type.
+
+        Returns
+        -------
+        Nothing, the hierarchy is changed in place
+
+        Notes
+        -----
+        The smoothers of all levels are rebuilt with change_smoothers, and
+        the coarse grid solver is refactored on first use.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from pyamg import smoothed_aggregation_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = smoothed_aggregation_solver(A)
+        >>> ml.set_precision('all')
+        >>> ml.levels[1].A.dtype
+        dtype('float32')
+        >>> x = ml.solve(np.ones(A.shape[0]), tol=1e-10)
+        >>> x.dtype
+        dtype('float64')
+
+        """
+        if precision not in ['coarse', 'all']:
+            raise ValueError('precision must be \'coarse\' or \'all\'')
+        dtype = np.dtype(dtype)
+        if dtype.kind != 'f':
+            raise TypeError('dtype must be a real floating point type')
+
+        def lower(M):
+            tp = dtype
+            if M.dtype.kind == 'c':
+                tp = upcast(dtype, np.complex64)
+            if M.dtype == tp:
+                return M
+            return M.astype(tp)
+
+        levels = self.levels
+        if precision == 'all' and not hasattr(levels[0], 'A_refine'):
+            levels[0].A_refine = levels[0].A
+            levels[0].A = lower(levels[0].A)
+        for i, level in enumerate(levels):
+            if i > 0:
+                level.A = lower(level.A)
+            if i < len(levels) - 1:
+                level.P = lower(level.P)
+                level.R = lower(level.R)
+
+        self.__rebuild()
+
+    def update(self, A):
+        """Recompute the hierarchy for a new matrix with the same structure
+
+        The coarsening (strength of connection, C/F splitting or
+        aggregates) of the current hierarchy is kept.  Only the numerical
+        values that depend on A are recomputed, level by level: the
+        interpolation weights in P and R (see Notes), the coarse operators
+        R*A*P, reusing the symbolic products cached on each level (see
+        galerkin_product), as well as the smoothers, including diagonals,
+        spectral radii and Schwarz subdomain inverses, and the coarse grid
+        solver.  The spectral radius estimates start from the dominant
+        eigenvectors of the current hierarchy, see
+        relaxation.smoothing.spectral_bounds.
+
+        Parameters
+        ----------
+        A : sparse matrix
+            New finest level matrix, with the shape of the current one.
+            Matrices in the sparsity pattern of the current one reuse the
+            cached symbolic products.
+
+        Returns
+        -------
+        Nothing, the hierarchy is changed in place
+
+        Notes
+        -----
+        This is intended for sequences of matrices, e.g., in time stepping,
+        whose values change slowly enough for the coarsening and the
+        interpolation of the original hierarchy to remain effective.  A
+        frozen hierarchy is frozen again, and lower precision hierarchies
+        (see set_precision) keep their precision.
+
+        P and R are recomputed from the tentative prolongator for smoothed
+        aggregation with 'jacobi' or 'richardson' prolongation smoothing
+        of a symmetric or hermitian problem, and from the strength of
+        connection and the C/F splitting for classical AMG with 'direct',
+        'standard' or 'distance_two' interpolation and Galerkin
+        restriction.  These levels record their method and its inputs in
+        level.interpolation.  P and R of the other levels, e.g., from
+        energy minimization, AIR, or a nonsymmetric problem, are kept as
+        they are.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from pyamg import ruge_stuben_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = ruge_stuben_solver(A, max_coarse=10)
+        >>> ml.update(2.0 * A)
+        >>> x = ml.solve(np.ones(A.shape[0]), tol=1e-8)
+
+        """
+        levels = self.levels
+        A0 = self.__fine_operator()
+
+        if not isspmatrix(A):
+            raise TypeError('expected sparse matrix')
+        if A.shape != A0.shape:
+            raise ValueError('A must have the shape of the current matrix')
+
+        if isspmatrix_bsr(A0):
+            A = A.tobsr(blocksize=A0.blocksize)
+        else:
+            A = A.asformat(A0.format)
+        if hasattr(A0, 'symmetry'):
+            A.symmetry = A0.symmetry
+
+        if hasattr(levels[0], 'A_refine'):
+            levels[0].A_refine = A
+            A = A.astype(levels[0].A.dtype)
+        levels[0].A = A
+
+        for i, level in enumerate(levels[:-1]):
+            _interpolate(level)
+            Ac = galerkin_product(level)
+            old = levels[i + 1].A
+            if Ac.dtype != old.dtype:
+                Ac = Ac.astype(old.dtype)
+            if hasattr(old, 'symmetry'):
+                Ac.symmetry = old.symmetry
+            levels[i + 1].A = Ac
+
+        frozen = self.frozen is not None
+        self.CC = {}
+        self.__rebuild()
+        if frozen:
+            self.freeze()
+
+    def __rebuild(self):
+        """Rebuild the smoothers and solver data after the operators change"""
+        levels = self.levels
+        for level in levels:
+            # drop copies of the old operators in other formats, e.g.,
+            # level.Acsr, see relaxation.smoothing.matrix_asformat
+            for name in [name for name in vars(level)
+                         if _CONVERTED_A.match(name)]:
+                delattr(level, name)
+        if hasattr(levels[0], 'presmoother'):
+            sm.change_smoothers(self,
+                                [tuple(level.smoothers['presmoother'])
+                                 for level in levels],
+                                [tuple(level.smoothers['postsmoother'])
+                                 for level in levels])
+        self.coarse_solver.reset()
+        self.frozen = None
+        if self.workspace:
+            self.allocate_workspace()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_work_lock')
+        state['_smoothed'] = hasattr(self.levels[0], 'presmoother')
+        return state
+
+    def __setstate__(self, state):
+        smoothed = state.pop('_smoothed', False)
+        self.__dict__.update(state)
+        self._work_lock = threading.RLock()
+
+        # The smoother setup reuses the data cached on the operators, e.g.,
+        # spectral radii and Schwarz subdomain inverses
+        if smoothed:
+            frozen = self.frozen
+            sm.change_smoothers(self,
+                                [tuple(level.smoothers['presmoother'])
+                                 for level in self.levels],
+                                [tuple(level.smoothers['postsmoother'])
+                                 for level in self.levels])
+            self.frozen = frozen
+        if self.workspace:
+            self.allocate_workspace()
+
+    def save(self, path):
+        """Write the hierarchy to a file
+
+        Parameters
+        ----------
+        path : string
+            Name of the file, which is overwritten if it exists.
+
+        Returns
+        -------
+        Nothing, the hierarchy is written to path
+
+        Notes
+        -----
+        Everything stored on the levels is saved, i.e., the operators A, P
+        and R, the near null-spaces B and BH, the C/F splittings or
+        aggregates, the smoother specifications, and the data cached by the
+        smoothers on the operators, such as rho_D_inv and
+        schwarz_parameters.  The cached symbolic Galerkin products, the
+        packed arrays of a frozen hierarchy and the factorization of the
+        dense coarse grid solvers are saved as well.
+
+        The file consists of a pickled description of the hierarchy,
+        followed by the raw data of all numerical arrays, each aligned to
+        64 bytes.  Arrays shared between several objects are stored once.
+        A callable coarse grid solver or smoother parameter must be
+        picklable, e.g., a function defined at the top level of a module.
+
+        Examples
+        --------
+        >>> import os, tempfile
+        >>> import numpy as np
+        >>> from pyamg import smoothed_aggregation_solver
+        >>> from pyamg.multilevel import multilevel_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = smoothed_aggregation_solver(A)
+        >>> fd, path = tempfile.mkstemp()
+        >>> ml.save(path)
+        >>> ml = multilevel_solver.load(path)
+        >>> x = ml.solve(np.ones(A.shape[0]), tol=1e-8)
+        >>> os.close(fd); os.remove(path)
+
+        """
+        header = io.BytesIO()
+        pickler = _ArrayPickler(header)
+        pickler.dump(self)
+        header = header.getvalue()
+        offset = _aligned(len(_SAVE_MAGIC) + 24 + len(header))
+
+        with open(path, 'wb') as f:
+            f.write(_SAVE_MAGIC)
+            f.write(np.array([len(header), offset, pickler.nbytes],
+                             dtype='<u8').tobytes())
+            f.write(header)
+            for start, data in pickler.arrays:
+                f.write(b'\0' * (offset + start - f.tell()))
+                f.write(data.data)
+            f.write(b'\0' * (offset + pickler.nbytes - f.tell()))
+
+    @staticmethod
+    def load(path, mmap=True):
+        """Read a hierarchy written by multilevel_solver.save
+
+        Parameters
+        ----------
+        path : string
+            Name of the file.
+        mmap : bool
+            If True, the arrays of the hierarchy are memory-mapped from the
+            file instead of being read into memory.
+
+        Returns
+        -------
+        ml : multilevel_solver
+            The saved hierarchy, with its smoothers rebuilt from the saved
+            specifications and cached data.
+
+        Notes
+        -----
+        With mmap=True, loading only reads the description of the
+        hierarchy, and the arrays are paged in from the file as they are
+        used.  The mapping is copy-on-write: the pages are shared through
+        the page cache by all processes that load the same file, while
+        changes to the arrays, e.g., by update(), are private to the
+        process and never written back to the file.  The file must not be
+        modified while it is mapped.
+
+        The description is unpickled, so only files from trusted sources
+        should be loaded.
+
+        Examples
+        --------
+        See multilevel_solver.save
+
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(_SAVE_MAGIC)) != _SAVE_MAGIC:
+                raise ValueError('%s is not a saved multilevel_solver' % path)
+            nheader, offset, nbytes = \
+                [int(n) for n in np.frombuffer(f.read(24), dtype='<u8')]
+            header = f.read(nheader)
+
+            if mmap and nbytes > 0:
+                data = np.asarray(np.memmap(path, dtype=np.uint8, mode='c',
+                                            offset=offset, shape=(nbytes,)))
+            else:
+                data = np.empty(nbytes, dtype=np.uint8)
+                f.seek(offset)
+                if f.readinto(data) != nbytes:
+                    raise ValueError('%s is truncated' % path)
+
+        return _ArrayUnpickler(io.BytesIO(header), data).load()
+
+    def freeze(self):
+        """Pack the hierarchy into flat arrays for cycling inside amg_core
+
+        The operators A, P and R^T of all levels, the smoother parameters
+        and the work vectors of all levels are concatenated into contiguous
+        arrays.  Subsequent V-, W- and F-cycles on a single right-hand side
+        are then executed by amg_core.multilevel_cycle, with one call from
+        Python per cycle.
+
+        Returns
+        -------
+        frozen : bool
+            True if the hierarchy is supported, in which case self.frozen
+            holds the packed arrays.  Otherwise, self.frozen is None and
+            the Python cycle is used.
+
+        Notes
+        -----
+        Supported hierarchies consist of CSR or BSR (square blocks) A, CSR
+        or BSR P and R, with int32 indices, the smoothers 'gauss_seidel',
+        'jacobi', 'CF_jacobi', 'FC_jacobi' or None, and one of the coarse
+        solvers 'pinv', 'pinv2' or None.  AMLI-cycles and blocks of
+        right-hand sides always use the Python cycle.
+
+        The packed arrays are a copy of the hierarchy.  Changing the
+        smoothers with change_smoothers unfreezes the hierarchy, while
+        changes to the operators require another call to freeze().
+
+        The compiled cycle is serial, it does not use the threaded kernels
+        selected by pyamg.util.utils.set_num_threads.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from pyamg import ruge_stuben_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = ruge_stuben_solver(A, max_coarse=10)
+        >>> ml.freeze()
+        True
+        >>> x = ml.solve(np.ones(A.shape[0]), tol=1e-8)
+
+        """
+        self.frozen = None
+        levels = self.levels
+        if len(levels) == 1 or \
+                self.coarse_solver.method not in ['pinv', 'pinv2', None]:
+            return False
+
+        dtype = upcast(*self.__level_dtypes())
+        F = amg_core.CYCLE_FIELDS
+        descr = np.zeros((len(levels), F), dtype=np.intc)
+        omega = np.zeros((len(levels), 2), dtype=dtype)
+        arrays = dict([(key, []) for key in
+                       ['Ap', 'Aj', 'Ax', 'Pp', 'Pj', 'Px', 'Rp', 'Ri', 'Rx',
+                        'points']])
+        offsets = dict([(key, 0) for key in arrays])
+
+        def pack(field, keys, values):
+            # append arrays, storing their offsets in the descriptor
+            for k, key in enumerate(keys):
+                descr[i, field + k] = offsets[key]
+                arrays[key].append(values[k])
+                offsets[key] += len(values[k])
+
+        work_size = 0
+        for i, level in enumerate(levels):
+            A = level.A
+            if isspmatrix_csr(A):
+                blocksize = 1
+            elif isspmatrix_bsr(A) and A.blocksize[0] == A.blocksize[1]:
+                blocksize = A.blocksize[0]
+            else:
+                return False
+            if not _kernel_compatible(A):
+                return False
+
+            descr[i, amg_core.CYCLE_NROWS] = A.shape[0]
+            descr[i, amg_core.CYCLE_BLOCKSIZE] = blocksize
+            descr[i, amg_core.CYCLE_WORK] = work_size
+            work_size += 3 * A.shape[0] if i > 0 else A.shape[0]
+            pack(amg_core.CYCLE_A_PTR, ['Ap', 'Aj', 'Ax'],
+                 [A.indptr, A.indices, np.ravel(A.data)])
+
+            if i == len(levels) - 1:
+                break
+
+            P = level.P
+            RT = _restriction_transpose(level)
+            if not (isspmatrix_csr(P) or isspmatrix_bsr(P)) or \
+                    not _kernel_compatible(P) or not _kernel_compatible(RT):
+                return False
+            Pblock = P.blocksize if isspmatrix_bsr(P) else (1, 1)
+            descr[i, amg_core.CYCLE_P_ROWBLOCK] = Pblock[0]
+            descr[i, amg_core.CYCLE_P_COLBLOCK] = Pblock[1]
+            pack(amg_core.CYCLE_P_PTR, ['Pp', 'Pj', 'Px'],
+                 [P.indptr, P.indices, np.ravel(P.data)])
+            descr[i, amg_core.CYCLE_R_COLBLOCK] = \
+                RT.blocksize[1] if isspmatrix_bsr(RT) else 1
+            pack(amg_core.CYCLE_R_PTR, ['Rp', 'Ri', 'Rx'],
+                 [RT.indptr, RT.indices, np.ravel(RT.data)])
+
+            for j, (smoother, field) in \
+                    enumerate([('presmoother', amg_core.CYCLE_PRE),
+                               ('postsmoother', amg_core.CYCLE_POST)]):
+                frozen = _freeze_smoother(level, level.smoothers[smoother])
+                if frozen is None:
+                    return False
+                fields, omega[i, j], Cpts, Fpts = frozen
+                descr[i, field:field + 5] = fields
+                descr[i, field + 6] = len(Cpts)
+                descr[i, field + 8] = len(Fpts)
+                pack(field + 5, ['points'], [Cpts])
+                pack(field + 7, ['points'], [Fpts])
+
+        # Dense (pseudo-)inverse for the coarse grid solve
+        Ac = levels[-1].A
+        if self.coarse_solver.method is None or Ac.nnz == 0:
+            coarse = np.zeros(Ac.shape, dtype=dtype)
+        else:
+            self.coarse_solver(Ac, np.zeros(Ac.shape[0], dtype=dtype))
+            coarse = np.asarray(self.coarse_solver.P, dtype=dtype)
+
+        frozen = {'levels': np.ravel(descr), 'omega': np.ravel(omega),
+                  'coarse': np.ravel(coarse), 'dtype': dtype,
+                  'work': np.zeros(work_size, dtype=dtype), 'plans': {}}
+        for key, values in arrays.items():
+            tp = dtype if key.endswith('x') else np.intc
+            if len(values) == 0:
+                frozen[key] = np.zeros(0, dtype=tp)
+            else:
+                frozen[key] = np.concatenate(values).astype(tp, copy=False)
+        if offsets['Ax'] > np.iinfo(np.intc).max:
+            return False
+
+        self.frozen = frozen
+        return True
+
+    def __frozen_cycle(self, x, b, cycle, cyclesPerLevel, shared):
+        """Run one cycle with amg_core.multilevel_cycle, if possible
+
+        Returns False, without touching x, if the hierarchy is not frozen,
+        if x and b are not vectors of the frozen data type, or if the cycle
+        cannot be compiled for amg_core.  The packed work array is only
+        used if shared is True, otherwise a temporary one is allocated.
+        """
+        frozen = self.frozen
+        if frozen is None or x.ndim != 1 or x.dtype != frozen['dtype'] or \
+                b.dtype != frozen['dtype']:
+            return False
+
+        key = (cycle, cyclesPerLevel)
+        if key not in frozen['plans']:
+            codes = {'presmooth': amg_core.CYCLE_PRESMOOTH,
+                     'restrict': amg_core.CYCLE_RESTRICT,
+                     'coarse_solve': amg_core.CYCLE_COARSE_SOLVE,
+                     'interpolate': amg_core.CYCLE_INTERPOLATE,
+                     'postsmooth': amg_core.CYCLE_POSTSMOOTH}
+            plan = self.compile_cycle(cycle, cyclesPerLevel)
+            if any([op[0] not in codes for op in plan]):
+                frozen['plans'][key] = None
+            else:
+                frozen['plans'][key] = np.array(
+                    [[codes[op[0]], op[1]] for op in plan],
+                    dtype=np.intc).ravel()
+
+        plan = frozen['plans'][key]
+        if plan is None:
+            return False
+
+        if shared:
+            work = frozen['work']
+        else:
+            work = np.empty_like(frozen['work'])
+
+        amg_core.multilevel_cycle(plan, frozen['levels'], frozen['omega'],
+                                  frozen['Ap'], frozen['Aj'], frozen['Ax'],
+                                  frozen['Pp'], frozen['Pj'], frozen['Px'],
+                                  frozen['Rp'], frozen['Ri'], frozen['Rx'],
+                                  frozen['points'], frozen['coarse'], x, b,
+                                  work)
+        return True
+
     def setup_complexity(self, verbose=False):
         """Setup complexity of this multigrid hierarchy.
 
@@ -277,6 +944,67 @@ class multilevel_solver:
 
         return self.SC
 
+    def __level_costs(self):
+        """Work per level visit of a cycle, relative to a fine grid matvec
+
+        Returns a dictionary of lists over levels 0,...,end-1, holding the
+        cost of the 'presmoother' and 'postsmoother', the 'correction' cost
+        of computing and restricting the residual and interpolating the
+        coarse-grid correction, and the 'schwarz' work of applying the
+        inverted subdomain blocks.
+        """
+        nnz = float(self.levels[0].A.nnz)
+        costs = {'presmoother': [], 'postsmoother': [], 'correction': [],
+                 'schwarz': []}
+
+        for lvl in self.levels[:-1]:
+            rel_nnz_A = lvl.A.nnz/nnz
+
+            # Note: It is assumed that the default parameters in smoothing.py
+            # for each relaxation scheme corresponds to a single workunit
+            # operation.
+            pre = _smoother_factor(lvl, lvl.smoothers['presmoother'])*rel_nnz_A
+            post = _smoother_factor(lvl, lvl.smoothers['postsmoother'])*rel_nnz_A
+
+            # Compute work for any Schwarz relaxation
+            #   - The multiplier is the average row length, which is how many
+            #     times the residual (on average) must be computed for each
+            #     row.
+            #   - schwarz_work is the cost of multiplying with the
+            #     A[region_i, region_i]^{-1}
+            presmoother = lvl.smoothers['presmoother'][0]
+            postsmoother = lvl.smoothers['postsmoother'][0]
+            schwarz_work = 0.0
+            if (presmoother == 'aggregate_schwarz') or \
+               (postsmoother == 'aggregate_schwarz'):
+                pre, post, schwarz_work = \
+                    _aggregate_schwarz_costs(lvl, pre, post, nnz)
+            else:
+                if (presmoother == 'schwarz') or (postsmoother == 'schwarz'):
+                    S = lvl.A
+                if (presmoother == 'strength_based_schwarz') or \
+                   (postsmoother == 'strength_based_schwarz'):
+                    S = lvl.C
+                if (presmoother is not None and presmoother.find('schwarz') > 0) or \
+                   (postsmoother is not None and postsmoother.find('schwarz') > 0):
+                    rowlen = S.indptr[1:] - S.indptr[:-1]
+                    schwarz_work = np.sum(rowlen**2)
+                    # Note this scaling only applies to multiplicative
+                    # Schwarz, which is what is currently available.
+                    pre *= np.mean(rowlen)
+                    post *= np.mean(rowlen)
+
+            costs['presmoother'].append(pre)
+            costs['postsmoother'].append(post)
+            costs['schwarz'].append(schwarz_work)
+
+            # Computing residual, restricting residual and coarse grid
+            # correction
+            costs['correction'].append(rel_nnz_A + lvl.R.nnz/nnz +
+                                       lvl.P.nnz/nnz)
+
+        return costs
+
     def cycle_complexity(self, cycle='V', cyclesPerLevel=1, init_level=0, recompute=False):
         """Cycle complexity of this multigrid hierarchy.
 
@@ -316,113 +1044,13 @@ class multilevel_solver:
         if cycle in self.CC and not recompute and init_level==0:
             return self.CC[cycle]
 
-        # Get nonzeros per level and nonzeros per level relative to finest
-        nnz = [float(level.A.nnz) for level in self.levels]
-        rel_nnz_A = [level.A.nnz/nnz[0] for level in self.levels]
-        rel_nnz_P = [level.P.nnz/nnz[0] for level in self.levels[0:-1]]
-        rel_nnz_R = [level.R.nnz/nnz[0] for level in self.levels[0:-1]]
-
-        # Determine cost per nnz for smoothing on each level
-        # Note: It is assumed that the default parameters in smoothing.py for each
-        # relaxation scheme corresponds to a single workunit operation.
-        smoother_cost = []
-        for i in range(0,len(self.levels)-1):
-            lvl = self.levels[i]
-            presmoother = lvl.smoothers['presmoother']
-            postsmoother = lvl.smoothers['postsmoother']
-
-            # Presmoother
-            if presmoother[0] is not None:
-                pre_factor = 1
-                if presmoother[0].endswith(('nr', 'ne')):
-                    pre_factor *= 2
-                if 'sweep' in presmoother[1]:
-                    if presmoother[1]['sweep'] == 'symmetric':
-                        pre_factor *= 2
-                if 'iterations' in presmoother[1]:
-                    pre_factor *= presmoother[1]['iterations']
-                if 'maxiter' in presmoother[1]:
-                    pre_factor *= presmoother[1]['maxiter']
-                if 'degree' in presmoother[1]:
-                    pre_factor *= presmoother[1]['degree']                    
-                if presmoother[0].startswith(('CF','FC')):
-                    temp = 0
-                    if 'F_iterations' in presmoother[1]:
-                        temp += presmoother[1]['F_iterations'] * lvl.nf / float(lvl.A.shape[0])
-                    else:
-                        temp += lvl.nf / float(lvl.A.shape[0])
-                    if 'C_iterations' in presmoother[1]:
-                        temp += presmoother[1]['C_iterations'] * lvl.nc / float(lvl.A.shape[0])
-                    else:
-                        temp += lvl.nc / float(lvl.A.shape[0])
-                    pre_factor *= temp                  
-            else:
-                pre_factor = 0
-
-            # Postsmoother
-            if postsmoother[0] is not None:
-                post_factor = 1
-                if postsmoother[0].endswith(('nr', 'ne')):
-                    post_factor *= 2
-                if 'sweep' in postsmoother[1]:
-                    if postsmoother[1]['sweep'] == 'symmetric':
-                        post_factor *= 2
-                if 'iterations' in postsmoother[1]:
-                    post_factor *= postsmoother[1]['iterations']
-                if 'maxiter' in postsmoother[1]:
-                    post_factor *= postsmoother[1]['maxiter']
-                if 'degree' in postsmoother[1]:
-                    post_factor *= postsmoother[1]['degree']
-                if postsmoother[0].startswith(('CF','FC')):
-                    temp = 0
-                    if 'F_iterations' in postsmoother[1]:
-                        temp += postsmoother[1]['F_iterations'] * lvl.nf / float(lvl.A.shape[0])
-                    else:
-                        temp += lvl.nf / float(lvl.A.shape[0])
-                    if 'C_iterations' in postsmoother[1]:
-                        temp += postsmoother[1]['C_iterations'] * lvl.nc / float(lvl.A.shape[0])
-                    else:
-                        temp += lvl.nc / float(lvl.A.shape[0])
-                    post_factor *= temp 
-            else:
-                post_factor = 0
-
-            # Smoothing cost scaled by A_i.nnz / A_0.nnz
-            smoother_cost.append((pre_factor + post_factor)*rel_nnz_A[i])
-
-        # Compute work for any Schwarz relaxation
-        #   - The multiplier is the average row length, which is how many times
-        #     the residual (on average) must be computed for each row.
-        #   - schwarz_work is the cost of multiplying with the
-        #     A[region_i, region_i]^{-1}
-        schwarz_multiplier = np.zeros((len(self.levels)-1,))
-        schwarz_work = np.zeros((len(self.levels)-1,))
-        for i, lvl in enumerate(self.levels[:-1]):
-            presmoother = lvl.smoothers['presmoother'][0]
-            postsmoother = lvl.smoothers['postsmoother'][0]
-            if (presmoother == 'schwarz') or (postsmoother == 'schwarz'):
-                S = lvl.A
-            if (presmoother == 'strength_based_schwarz') or \
-               (postsmoother == 'strength_based_schwarz'):
-                S = lvl.C
-            if (presmoother is not None and presmoother.find('schwarz') > 0) or \
-               (postsmoother is not None and postsmoother.find('schwarz') > 0):
-                rowlen = S.indptr[1:] - S.indptr[:-1]
-                schwarz_work[i] = np.sum(rowlen**2)
-                schwarz_multiplier[i] = np.mean(rowlen)
-                # Note this scaling only applies to multiplicative
-                # Schwarz, which is what is currently available.
-                smoother_cost[i] *= schwarz_multiplier[i]
-
-        # Compute work for computing residual, restricting to coarse grid,
-        # and coarse grid correction
-        correction_cost = []
-        for i in range(len(rel_nnz_P)):
-            cost = 0
-            cost += rel_nnz_A[i]    # Computing residual
-            cost += rel_nnz_R[i]    # Restricting residual
-            cost += rel_nnz_P[i]    # Coarse grid correction
-            correction_cost.append(cost)
+        rel_nnz_A = [level.A.nnz/float(self.levels[0].A.nnz)
+                     for level in self.levels]
+        costs = self.__level_costs()
+        smoother_cost = [pre + post for pre, post in
+                         zip(costs['presmoother'], costs['postsmoother'])]
+        correction_cost = costs['correction']
+        schwarz_work = costs['schwarz']
 
         # Recursive functions to sum cost of given cycle type over all levels.
         # Note, ignores coarse grid direct solve.
@@ -473,6 +1101,125 @@ class multilevel_solver:
         return float(flops)
 
 
+    def compile_cycle(self, cycle='V', cyclesPerLevel=1):
+        """Flatten a multigrid cycle into a precomputed schedule
+
+        Parameters
+        ----------
+        cycle : {'V','W','F','AMLI'}
+            Type of multigrid cycle.
+        cyclesPerLevel: int
+            Number of coarse cycles per visit of a level.  For V-, W- and
+            AMLI-cycles, the coarse cycle is repeated cyclesPerLevel (resp.
+            2*cyclesPerLevel) times.  For F-cycles, the coarse F-cycle is
+            followed by cyclesPerLevel V-cycles.
+
+        Returns
+        -------
+        plan : list
+            Operations (op, lvl) applied in order, where op is one of
+            'presmooth', 'restrict', 'coarse_solve', 'interpolate' or
+            'postsmooth', and lvl is the level acted upon.  'restrict'
+            computes the restricted residual in the right-hand side of
+            level lvl+1 and zeros its solution, 'interpolate' adds the
+            coarse-grid correction from level lvl+1.  AMLI corrections are
+            given by ('amli', lvl, subplan), where subplan is the schedule
+            of each of the two coarse solves on level lvl+1.
+
+        Notes
+        -----
+        Plans are cached, so that each cycle type is compiled only once.
+        The schedule is executed by the solve phase in a single loop, instead
+        of recursing over the levels.
+
+        Examples
+        --------
+        >>> from pyamg import smoothed_aggregation_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = smoothed_aggregation_solver(A, max_coarse=500)
+        >>> ml.compile_cycle('V')
+        [('presmooth', 0), ('restrict', 0), ('coarse_solve', 1), ('interpolate', 0), ('postsmooth', 0)]
+
+        """
+        cycle = str(cycle).upper()
+        key = (cycle, cyclesPerLevel, len(self.levels))
+        if key not in self._plans:
+            if cycle not in ['V', 'W', 'F', 'AMLI']:
+                raise TypeError('Unrecognized cycle type (%s)' % cycle)
+            if int(cyclesPerLevel) < 1:
+                raise ValueError('cyclesPerLevel must be positive')
+            self._plans[key] = self.__compile(0, cycle, int(cyclesPerLevel))
+
+        return self._plans[key]
+
+    def __compile(self, lvl, cycle, cyclesPerLevel):
+        """Schedule of a cycle starting on level lvl, see compile_cycle"""
+        coarsest = len(self.levels) - 1
+        if lvl == coarsest:
+            return [('coarse_solve', lvl)]
+
+        plan = [('presmooth', lvl), ('restrict', lvl)]
+
+        if lvl + 1 == coarsest:
+            plan.append(('coarse_solve', lvl + 1))
+        elif cycle == 'V':
+            plan.extend(cyclesPerLevel *
+                        self.__compile(lvl + 1, 'V', cyclesPerLevel))
+        elif cycle == 'W':
+            plan.extend(2 * cyclesPerLevel *
+                        self.__compile(lvl + 1, 'W', cyclesPerLevel))
+        elif cycle == 'F':
+            plan.extend(self.__compile(lvl + 1, 'F', cyclesPerLevel))
+            plan.extend(cyclesPerLevel * self.__compile(lvl + 1, 'V', 1))
+        elif cycle == 'AMLI':
+            plan.append(('amli', lvl, cyclesPerLevel *
+                         self.__compile(lvl + 1, 'AMLI', cyclesPerLevel)))
+
+        plan.extend([('interpolate', lvl), ('postsmooth', lvl)])
+        return plan
+
+    def plan_complexity(self, cycle='V', cyclesPerLevel=1):
+        """Cycle complexity obtained by counting the operations of a plan
+
+        Each operation of compile_cycle(cycle, cyclesPerLevel) is charged
+        with its work on the level it acts upon, so that the result
+        cross-checks cycle_complexity.  As in cycle_complexity, the coarse
+        grid solve and the orthogonalization of AMLI-cycles are not counted.
+
+        Parameters
+        ----------
+        cycle : {'V','W','F','AMLI'}
+            Type of multigrid cycle.
+        cyclesPerLevel: int
+            Number of coarse cycles per visit of a level, see compile_cycle.
+
+        Returns
+        -------
+        cc : float
+            Complexity of a single multigrid iteration in work units.
+
+        """
+        if len(self.levels) == 1:
+            return 1.0
+
+        costs = self.__level_costs()
+        cost = {'presmooth': costs['presmoother'],
+                'postsmooth': costs['postsmoother'],
+                'restrict': [c + w for c, w in zip(costs['correction'],
+                                                   costs['schwarz'])]}
+
+        def count(plan):
+            work = 0.0
+            for op in plan:
+                if op[0] == 'amli':
+                    work += 2 * count(op[2])
+                elif op[0] in cost:
+                    work += cost[op[0]][op[1]]
+            return work
+
+        return float(count(self.compile_cycle(cycle, cyclesPerLevel)))
+
     def operator_complexity(self):
         """Operator complexity of this multigrid hierarchy
 
@@ -496,7 +1243,86 @@ class multilevel_solver:
 
 
     def psolve(self, b):
-        return self.solve(b, maxiter=1)
+        return self.precondition(b)
+
+    def precondition(self, b, out=None, cycle='V', cyclesPerLevel=1):
+        """Apply one multigrid cycle to b, starting from a zero initial guess
+
+        This is the lean entry point used when the hierarchy acts as a
+        preconditioner.  Exactly one cycle is performed, and no residual
+        norms, tolerance checks or input validation beyond dimensions and
+        data types are computed.
+
+        Parameters
+        ----------
+        b : array
+            Right hand side, a vector or an n x k block.
+        out : array
+            Optional output array of the same shape as b, and of the data
+            type of the result, which is overwritten in place.  By default,
+            a new array is allocated.
+        cycle : {'V','W','F','AMLI'}
+            Type of multigrid cycle to perform.
+        cyclesPerLevel: int
+            number of coarse cycles per level, see compile_cycle
+
+        Returns
+        -------
+        x : array
+            The result of the cycle, stored in out if given.
+
+        See Also
+        --------
+        aspreconditioner, solve
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from pyamg import smoothed_aggregation_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = smoothed_aggregation_solver(A)
+        >>> b = np.random.rand(A.shape[0])
+        >>> z = np.empty_like(b)
+        >>> z = ml.precondition(b, out=z)
+        """
+        tp = upcast(b.dtype, self.__fine_operator().dtype)
+        out_shape = b.shape
+
+        if out is not None:
+            if out.shape != b.shape:
+                raise ValueError('out has invalid dimensions')
+            if out.dtype != tp:
+                raise TypeError('out must have dtype %s' % tp)
+
+        b = np.ascontiguousarray(b, dtype=tp)
+        if b.ndim == 2 and b.shape[1] == 1:
+            b = np.ravel(b)
+
+        # The cycle runs in place on a contiguous vector, in the precision
+        # of the finest level of the cycle
+        dtype = self.__level_dtypes(tp)[0]
+        if out is not None and out.flags.c_contiguous and dtype == tp:
+            x = out.reshape(b.shape)
+            x[...] = 0
+        else:
+            x = np.zeros(b.shape, dtype=dtype)
+
+        shared = self._work_lock.acquire(False)
+        try:
+            if shared:
+                self.__prepare_workspace(tp)
+            self.__solve(0, x, b.astype(dtype, copy=False),
+                         str(cycle).upper(), cyclesPerLevel, shared)
+        finally:
+            if shared:
+                self._work_lock.release()
+
+        if out is None:
+            return x.astype(tp, copy=False).reshape(out_shape)
+        if not np.may_share_memory(x, out):
+            out[...] = x.reshape(out.shape)
+        return out
 
 
     def aspreconditioner(self, cycle='V'):
@@ -534,12 +1360,12 @@ class multilevel_solver:
         from scipy.sparse.linalg import LinearOperator
 
         shape = self.levels[0].A.shape
-        dtype = self.levels[0].A.dtype
+        dtype = self.__fine_operator().dtype
 
         def matvec(b):
-            return self.solve(b, maxiter=1, cycle=cycle, tol=1e-12)
+            return self.precondition(b, cycle=cycle)
 
-        return LinearOperator(shape, matvec, dtype=dtype)
+        return LinearOperator(shape, matvec, matmat=matvec, dtype=dtype)
 
 
     def solve(self, b, x0=None, tol=1e-5, maxiter=100, cycle='V', accel=None,
@@ -549,9 +1375,10 @@ class multilevel_solver:
         Parameters
         ----------
         b : array
-            Right hand side.
+            Right hand side, either a vector or an n x k block of k
+            right-hand sides.
         x0 : array
-            Initial guess.
+            Initial guess, of the same shape as b.
         tol : float
             Stopping criteria: relative residual r[k]/r[0] tolerance.
         maxiter : int
@@ -568,21 +1395,41 @@ class multilevel_solver:
             User-defined function called after each iteration.  It is
             called as callback(xk) where xk is the k-th iterate vector.
         residuals : list
-            List to contain residual norms at each iteration.
+            List to contain residual norms at each iteration.  For a block
+            of right-hand sides, each entry is an array holding the residual
+            norm of every column.
         cyclesPerLevel: int
-            number of V-cycles on each level for an F-cycle
+            number of coarse cycles per level, see compile_cycle
 
         Returns
         -------
         x : array
             Approximate solution to Ax=b
 
+        Notes
+        -----
+        An n x k block b is cycled as a dense panel, so that relaxation
+        methods in relaxation.smoothing.MULTIVECTOR_RELAXATION treat all k
+        columns in a single pass over each operator.  Convergence is tracked
+        per column, and columns meeting the tolerance are dropped from later
+        cycles.  With accel, the columns are solved one at a time.
+
+        Several threads may call solve, precondition or the preconditioner
+        returned by aspreconditioner on the same hierarchy at once.  The
+        amg_core kernels release the GIL, and the coarse grid solver is
+        factored once, by the first call.  The work vectors of the
+        hierarchy (see workspace and freeze) are used by one solve at a
+        time, while concurrent solves allocate their own.  Methods that
+        change the hierarchy, e.g., update, set_precision or
+        change_smoothers, must not run concurrently with solves.
+
         See Also
         --------
         aspreconditioner
 
         Examples
         --------
+        >>> import numpy as np
         >>> from numpy import ones
         >>> from pyamg import ruge_stuben_solver
         >>> from pyamg.gallery import poisson
@@ -591,6 +1438,10 @@ class multilevel_solver:
         >>> ml = ruge_stuben_solver(A, max_coarse=10)
         >>> residuals = []
         >>> x = ml.solve(b, tol=1e-12, residuals=residuals) # standalone solver
+        >>> B = np.random.rand(A.shape[0], 4)
+        >>> X = ml.solve(B, tol=1e-8)                       # block solve
+        >>> X.shape
+        (10000, 4)
 
         """
 
@@ -609,6 +1460,11 @@ class multilevel_solver:
                 raise ValueError('AMLI cycles require \
                     symmetry to be hermitian')
 
+        if b.ndim == 2 and b.shape[1] > 1:
+            return self.__block_solve(b, x, tol, maxiter, cycle, accel,
+                                      callback, residuals, return_residuals,
+                                      cyclesPerLevel)
+
         if accel is not None:
 
             # Check for symmetric smoothing scheme when using CG
@@ -637,7 +1493,7 @@ class multilevel_solver:
                 else:
                     accel = getattr(isolve, accel)
 
-            A = self.levels[0].A
+            A = self.__fine_operator()
             M = self.aspreconditioner(cycle=cycle)
 
             try:  # try PyAMG style interface which has a residuals parameter
@@ -682,119 +1538,381 @@ class multilevel_solver:
         # Clearly, this logic doesn't handle the case of real A and complex b
         from scipy.sparse.sputils import upcast
         from pyamg.util.utils import to_type
-        tp = upcast(b.dtype, x.dtype, self.levels[0].A.dtype)
+        A = self.__fine_operator()
+        tp = upcast(b.dtype, x.dtype, A.dtype)
         [b, x] = to_type(tp, [b, x])
         b = np.ravel(b)
         x = np.ravel(x)
 
-        A = self.levels[0].A
-
-        residuals.append(residual_norm(A, x, b))
-
-        self.first_pass = True
+        # A cycle in lower precision than x corrects x by iterative
+        # refinement, with residuals computed in the precision of x
+        refine = self.__level_dtypes(tp)[0] != tp
 
-        while len(residuals) <= maxiter and residuals[-1] > tol:
-            if len(self.levels) == 1:
-                # hierarchy has only 1 level
-                x = self.coarse_solver(A, b)
+        # The shared work vectors are used unless another thread is
+        # solving with them
+        shared = self._work_lock.acquire(False)
+        try:
+            if shared:
+                self.__prepare_workspace(tp)
+
+            if refine:
+                r = np.empty_like(b)
+            elif shared and self.workspace and len(self.levels) > 1:
+                # Residual norms reuse the finest level residual vector
+                r = self.levels[0].work['residual']
+            elif get_num_threads() > 1:
+                # for the threaded residual kernels
+                r = np.empty_like(b)
             else:
-                self.__solve(0, x, b, cycle, cyclesPerLevel)
+                r = None
+
+            if r is not None:
+                def residual_norm(A, x, b):
+                    _residual(A, x, b, r)
+                    return norm(r)
 
             residuals.append(residual_norm(A, x, b))
 
-            self.first_pass = False
+            self.first_pass = True
+
+            while len(residuals) <= maxiter and residuals[-1] > tol:
+                if refine:
+                    # r holds the residual of the current iterate
+                    self.__refine(x, r, cycle, cyclesPerLevel, shared)
+                elif len(self.levels) == 1:
+                    # hierarchy has only 1 level
+                    x = self.coarse_solver(A, b)
+                else:
+                    self.__solve(0, x, b, cycle, cyclesPerLevel, shared)
+
+                residuals.append(residual_norm(A, x, b))
 
+                self.first_pass = False
+
+                if callback is not None:
+                    callback(x)
+        finally:
+            if shared:
+                self._work_lock.release()
+
+        if return_residuals:
+            return x, residuals
+        else:
+            return x
+
+
+    def __block_solve(self, b, x, tol, maxiter, cycle, accel, callback,
+                      residuals, return_residuals, cyclesPerLevel):
+        """Solve for an n x k block of right-hand sides, see solve()"""
+        from pyamg.util.utils import to_type
+
+        if return_residuals:
+            warn('return_residuals is deprecated.  Use residuals instead')
+            residuals = []
+        if residuals is None:
+            residuals = []
+        else:
+            residuals[:] = []
+
+        A = self.__fine_operator()
+        tp = upcast(b.dtype, x.dtype, A.dtype)
+        refine = self.__level_dtypes(tp)[0] != tp
+        [b, x] = to_type(tp, [np.asarray(b), np.asarray(x)])
+        b = np.ascontiguousarray(b)
+        x = np.ascontiguousarray(x)
+        k = b.shape[1]
+
+        if accel is not None:
+            # Krylov acceleration treats one column at a time, each column's
+            # residual history is padded with its final value
+            history = []
+            for j in range(k):
+                res = []
+                x[:, j] = self.solve(b[:, j], x0=x[:, j], tol=tol,
+                                     maxiter=maxiter, cycle=cycle,
+                                     accel=accel, residuals=res,
+                                     cyclesPerLevel=cyclesPerLevel)
+                history.append(res)
+            nres = max([len(res) for res in history])
+            for i in range(nres):
+                residuals.append(np.array([res[min(i, len(res) - 1)]
+                                           for res in history]))
             if callback is not None:
                 callback(x)
+        else:
+            normb = np.sqrt(np.sum(np.abs(b)**2, axis=0))
+            tol = tol * np.where(normb != 0, normb, 1.0)
+
+            def column_norms(x, b):
+                r = b - A * x
+                return np.sqrt(np.sum(np.abs(r)**2, axis=0))
+
+            res = column_norms(x, b)
+            residuals.append(res.copy())
+            active = np.flatnonzero(res > tol)
+
+            shared = self._work_lock.acquire(False)
+            try:
+                if shared:
+                    self.__prepare_workspace(tp)
+
+                while len(residuals) <= maxiter and active.size > 0:
+                    # Converged columns are dropped, the remaining columns
+                    # are cycled as a contiguous panel
+                    xa = np.ascontiguousarray(x[:, active])
+                    ba = np.ascontiguousarray(b[:, active])
+                    if active.size == 1:
+                        xa, ba = np.ravel(xa), np.ravel(ba)
+
+                    if refine:
+                        self.__refine(xa, ba - A * xa, cycle, cyclesPerLevel,
+                                      shared)
+                    elif len(self.levels) == 1:
+                        # hierarchy has only 1 level
+                        xa = self.coarse_solver(A, ba)
+                    else:
+                        self.__solve(0, xa, ba, cycle, cyclesPerLevel, shared)
+
+                    x[:, active] = xa.reshape((-1, active.size))
+                    res[active] = column_norms(x[:, active], b[:, active])
+                    residuals.append(res.copy())
+
+                    if callback is not None:
+                        callback(x)
+
+                    active = active[res[active] > tol[active]]
+            finally:
+                if shared:
+                    self._work_lock.release()
 
         if return_residuals:
             return x, residuals
         else:
             return x
 
+    def solve_async(self, b, x0=None, tol=1e-5, maxiter=100, cycle='V',
+                    accel=None, callback=None, residuals=None,
+                    cyclesPerLevel=1, timeout=None, executor=None):
+        """Run solve in an executor, for use from an asyncio event loop
+
+        Parameters
+        ----------
+        b, x0, tol, maxiter, cycle, accel, callback, residuals,
+        cyclesPerLevel :
+            See solve
+        timeout : float
+            Number of seconds after which the solve is cancelled
+        executor : concurrent.futures.Executor
+            Executor running the solve, the default executor of the event
+            loop if None
+
+        Returns
+        -------
+        solution : pyamg.krylov.async_solution
+            Awaitable returning x, and asynchronous iterator over the
+            residual norms as they are computed
+
+        Notes
+        -----
+        The event loop is not blocked by the solve, which checks for
+        cancellation after every cycle (or Krylov iteration with accel).
+        Requires Python 3.5 or later.
+
+        Examples
+        --------
+        >>> import asyncio
+        >>> import numpy as np
+        >>> from pyamg import ruge_stuben_solver
+        >>> from pyamg.gallery import poisson
+        >>> A = poisson((100, 100), format='csr')
+        >>> ml = ruge_stuben_solver(A, max_coarse=10)
+        >>> b = np.ones(A.shape[0])
+        >>> loop = asyncio.get_event_loop()
+        >>> solution = ml.solve_async(b, tol=1e-8, timeout=60)
+        >>> x = loop.run_until_complete(solution.result())
 
-    def __solve(self, lvl, x, b, cycle, cyclesPerLevel):
+        """
+        from pyamg.krylov import async_solution
+
+        kwargs = {'x0': x0, 'tol': tol, 'maxiter': maxiter, 'cycle': cycle,
+                  'accel': accel, 'callback': callback,
+                  'residuals': residuals, 'cyclesPerLevel': cyclesPerLevel}
+        return async_solution(self.solve, (b,), kwargs, timeout=timeout,
+                              executor=executor)
+
+    def __fine_operator(self):
+        """Operator of the finest level, in the precision of the solution"""
+        return getattr(self.levels[0], 'A_refine', self.levels[0].A)
+
+    def __refine(self, x, r, cycle, cyclesPerLevel, shared):
+        """Iterative refinement step x += cycle(0, r) in cycle precision
+
+        The residual r, computed in the precision of x, is cast to the data
+        type of the finest level cycle vectors, and the correction computed
+        by one cycle from a zero initial guess is added to x.
+        """
+        dtype = self.__level_dtypes(r.dtype)[0]
+        e = np.zeros(r.shape, dtype=dtype)
+        self.__solve(0, e, r.astype(dtype), cycle, cyclesPerLevel, shared)
+        x += e
+
+    def __relax(self, lvl, smoother, A, x, b, zero_guess=False):
+        """Apply the pre- or postsmoother on level lvl to x
+
+        An n x k block is relaxed as a whole if the smoother accepts
+        multivectors, and column by column otherwise.  If zero_guess is
+        True, x is zero, which the smoothers of ZERO_GUESS_RELAXATION are
+        told, so that they skip the first residual.
+        """
+        level = self.levels[lvl]
+        relax = getattr(level, smoother)
+        method = level.smoothers[smoother][0]
+
+        if zero_guess and method in sm.ZERO_GUESS_RELAXATION:
+            relax = functools.partial(relax, zero_guess=True)
+
+        if x.ndim == 2 and method not in sm.MULTIVECTOR_RELAXATION:
+            relax_columns(relax, A, x, b)
+        else:
+            relax(A, x, b)
+
+    def __solve(self, lvl, x, b, cycle, cyclesPerLevel, shared):
         """
         Parameters
         ----------
         lvl : int
-            Solve problem on level `lvl`
+            Solve problem on level `lvl`, must be 0
         x : numpy array
-            Initial guess `x` and return correction
+            Initial guess `x` and return correction, either a vector or an
+            n x k block
         b : numpy array
-            Right-hand side for Ax=b
+            Right-hand side for Ax=b, of the same shape as x
         cycle : {'V','W','F','AMLI'}
-            Recursively called cycling function.  The
             Defines the cycling used:
             cycle = 'V',    V-cycle
             cycle = 'W',    W-cycle
             cycle = 'F',    F-cycle
-            cycle = 'FAMG', FAMG-cycle
             cycle = 'AMLI', AMLI-cycle
-        cyclesPerLevel: number of V-cycles on each level for an FAMG cycle
+        cyclesPerLevel: number of coarse cycles per level, see compile_cycle
+        shared : bool
+            Whether the calling thread holds the shared work vectors of the
+            hierarchy, i.e., the per-level work vectors and the packed work
+            array of a frozen hierarchy.  Otherwise, temporaries are used.
         """
+        if self.__frozen_cycle(x, b, cycle, cyclesPerLevel, shared):
+            return
+
+        plan = self.compile_cycle(cycle, cyclesPerLevel)
+
+        # Iterate and right-hand side on each level.  The per-level work
+        # vectors only hold a single right-hand side.
+        use_workspace = shared and self.workspace and x.ndim == 1
+        xs = [x] + [None] * (len(self.levels) - 1)
+        bs = [b] + [None] * (len(self.levels) - 1)
+        if use_workspace:
+            for i, level in enumerate(self.levels[1:]):
+                xs[i + 1] = level.work['x']
+                bs[i + 1] = level.work['b']
+        else:
+            dtypes = self.__level_dtypes(x.dtype)
+            for i, level in enumerate(self.levels[1:]):
+                xs[i + 1] = np.empty((level.A.shape[0],) + x.shape[1:],
+                                     dtype=dtypes[i + 1])
+                bs[i + 1] = np.empty_like(xs[i + 1])
 
-        A = self.levels[lvl].A
+        self.__execute(plan, xs, bs, use_workspace)
 
-        if (cycle != 'FAMG'):
-            self.levels[lvl].presmoother(A, x, b)
-        else:
-            for i in range(0):
-                self.levels[lvl].presmoother(A, x, b)
+    def __execute(self, plan, xs, bs, use_workspace):
+        """Apply the operations of a compiled cycle to the vectors xs, bs
+
+        If use_workspace is True, residuals are computed in the per-level
+        work vectors.
+        """
+        levels = self.levels
+        # levels whose iterate is zero, i.e., right after the restriction
+        zero = set()
+
+        for op in plan:
+            name, lvl = op[0], op[1]
+            level = levels[lvl]
+
+            if name == 'presmooth':
+                self.__relax(lvl, 'presmoother', level.A, xs[lvl], bs[lvl],
+                             zero_guess=(lvl in zero))
+
+            elif name == 'restrict':
+                # Restrict the residual, with a fused kernel for CSR/BSR
+                x, b, coarse_b = xs[lvl], bs[lvl], bs[lvl + 1]
+                residual = level.work['residual'] if use_workspace else None
+                if not _residual_restrict(level, x, b, coarse_b, residual):
+                    if use_workspace:
+                        _residual(level.A, x, b, residual)
+                        coarse_b[:] = 0
+                        _matvec(level.R, residual, coarse_b)
+                    else:
+                        coarse_b[...] = level.R * (b - level.A * x)
+                xs[lvl + 1][...] = 0
+                zero.add(lvl + 1)
+
+            elif name == 'coarse_solve':
+                xs[lvl][...] = self.coarse_solver(level.A, bs[lvl])
+
+            elif name == 'interpolate':
+                # coarse grid correction
+                x, coarse_x = xs[lvl], xs[lvl + 1]
+                if not _interpolate_add(level, coarse_x, x):
+                    if use_workspace:
+                        _matvec(level.P, coarse_x, x)
+                    else:
+                        x += level.P * coarse_x
 
-        residual = b - A * x
+            elif name == 'postsmooth':
+                self.__relax(lvl, 'postsmoother', level.A, xs[lvl], bs[lvl])
 
-        coarse_b = self.levels[lvl].R * residual
-        coarse_x = np.zeros_like(coarse_b)
+            elif name == 'amli':
+                self.__amli(op[2], lvl + 1, xs, bs, use_workspace)
+                zero.discard(lvl + 1)
 
-        if lvl == len(self.levels) - 2:
-            coarse_x[:] = self.coarse_solver(self.levels[-1].A, coarse_b)
-        else:
-            if cycle == 'V':
-                self.__solve(lvl + 1, coarse_x, coarse_b, 'V', cyclesPerLevel)
-            elif cycle == 'W':
-                self.__solve(lvl + 1, coarse_x, coarse_b, cycle, cyclesPerLevel)
-                self.__solve(lvl + 1, coarse_x, coarse_b, cycle, cyclesPerLevel)
-            elif cycle == 'F':
-                self.__solve(lvl + 1, coarse_x, coarse_b, cycle, cyclesPerLevel)
-                self.__solve(lvl + 1, coarse_x, coarse_b, 'V', cyclesPerLevel)
-            elif cycle == 'FAMG':
-                self.__solve(lvl + 1, coarse_x, coarse_b, cycle, cyclesPerLevel)
-            elif cycle == "AMLI":
-                # Run nAMLI AMLI cycles, which compute "optimal" corrections by
-                # orthogonalizing the coarse-grid corrections in the A-norm
-                nAMLI = 2
-                Ac = self.levels[lvl+1].A
-                p = np.zeros((nAMLI, coarse_b.shape[0]), dtype=coarse_b.dtype)
-                beta = np.zeros((nAMLI, nAMLI), dtype=coarse_b.dtype)
-                for k in range(nAMLI):
-                    # New search direction --> M^{-1}*residual
-                    p[k, :] = 1
-                    self.__solve(lvl + 1, p[k, :].reshape(coarse_b.shape),
-                                 coarse_b, cycle, cyclesPerLevel)
-
-                    # Orthogonalize new search direction to old directions
-                    for j in range(k):  # loops from j = 0...(k-1)
-                        beta[k, j] = np.inner(p[j, :].conj(), Ac * p[k, :]) /\
-                            np.inner(p[j, :].conj(), Ac * p[j, :])
-                        p[k, :] -= beta[k, j]*p[j, :]
-
-                    # Compute step size
-                    Ap = Ac*p[k, :]
-                    alpha = np.inner(p[k, :].conj(), np.ravel(coarse_b)) /\
-                        np.inner(p[k, :].conj(), Ap)
-
-                    # Update solution
-                    coarse_x += alpha*p[k, :].reshape(coarse_x.shape)
-
-                    # Update residual
-                    coarse_b -= alpha*Ap.reshape(coarse_b.shape)
-            else:
-                raise TypeError('Unrecognized cycle type (%s)' % cycle)
+            zero.discard(lvl)
+
+    def __amli(self, plan, lvl, xs, bs, use_workspace):
+        """AMLI correction on level lvl, each coarse solve given by plan"""
+        # Run nAMLI AMLI cycles, which compute "optimal" corrections by
+        # orthogonalizing the coarse-grid corrections in the A-norm
+        nAMLI = 2
+        Ac = self.levels[lvl].A
+        coarse_x, coarse_b = xs[lvl], bs[lvl]
+        p = np.zeros((nAMLI,) + coarse_b.shape, dtype=coarse_b.dtype)
+        beta = np.zeros((nAMLI, nAMLI) + coarse_b.shape[1:],
+                        dtype=coarse_b.dtype)
 
-        x += self.levels[lvl].P * coarse_x #+ self.levels[lvl].b_zero  # coarse grid correction
-        self.levels[lvl].postsmoother(A, x, b)
+        # inner products, taken column-wise for a block
+        def inner(u, v):
+            return np.sum(u.conj() * v, axis=0)
 
+        for k in range(nAMLI):
+            # New search direction --> M^{-1}*residual
+            p[k] = 1
+            xs[lvl] = p[k]
+            self.__execute(plan, xs, bs, use_workspace)
+
+            # Orthogonalize new search direction to old directions
+            for j in range(k):  # loops from j = 0...(k-1)
+                beta[k, j] = inner(p[j], Ac * p[k]) /\
+                    inner(p[j], Ac * p[j])
+                p[k] -= beta[k, j]*p[j]
+
+            # Compute step size
+            Ap = Ac*p[k]
+            alpha = inner(p[k], coarse_b) / inner(p[k], Ap)
+
+            # Update solution
+            coarse_x += alpha*p[k]
+
+            # Update residual
+            coarse_b -= alpha*Ap
+
+        xs[lvl] = coarse_x
 
     def visualize_coarse_grids(self, directory):
         # Dump a visualization of the coarse grids in the given directory.
@@ -808,6 +1926,562 @@ class multilevel_solver:
                 Pass in parameters verts = [nx2 array of dof locations] and keep = True when creating multilevel instance.')
 
 
+def _smoother_factor(level, smoother):
+    """Number of work units, relative to a matvec with level.A, of a smoother
+
+    Parameters
+    ----------
+    level : multilevel_solver.level
+        Level holding the smoother
+    smoother : list
+        Smoother description [name, kwargs], as stored in level.smoothers
+
+    Returns
+    -------
+    factor : float
+        Zero if no smoother is used
+
+    """
+    name, kwargs = smoother[0], smoother[1]
+    if name is None:
+        return 0
+
+    factor = 1
+    if name.endswith(('nr', 'ne')):
+        factor *= 2
+    if 'sweep' in kwargs:
+        if kwargs['sweep'] == 'symmetric':
+            factor *= 2
+    if 'iterations' in kwargs:
+        factor *= kwargs['iterations']
+    if 'maxiter' in kwargs:
+        factor *= kwargs['maxiter']
+    if 'degree' in kwargs:
+        factor *= kwargs['degree']
+    if name.startswith(('CF', 'FC')):
+        n = float(level.A.shape[0])
+        temp = kwargs.get('F_iterations', 1) * level.nf / n
+        temp += kwargs.get('C_iterations', 1) * level.nc / n
+        factor *= temp
+
+    return factor
+
+
+def _aggregate_schwarz_costs(level, pre, post, nnz):
+    """Work units of the aggregate_schwarz smoothers of a level
+
+    Parameters
+    ----------
+    level : multilevel_solver.level
+        Level holding the smoothers
+    pre, post : float
+        Cost of the presmoother and postsmoother, as matvecs with level.A
+    nnz : float
+        Number of nonzeros of the finest matrix
+
+    Returns
+    -------
+    pre, post : float
+        Costs scaled by the average number of subdomains holding each
+        unknown, i.e., how many times the residual of each row is computed
+        by a multiplicative sweep.  The additive sweep computes it once.
+    schwarz_work : float
+        Cost of the LU solves with the subdomain blocks, about m**2 for a
+        block of dimension m, relative to nnz
+
+    """
+    from pyamg.relaxation.relaxation import aggregate_subdomains
+
+    costs = []
+    schwarz_work = 0.0
+    for cost, smoother in [(pre, level.smoothers['presmoother']),
+                           (post, level.smoothers['postsmoother'])]:
+        name, kwargs = smoother[0], smoother[1]
+        if name == 'aggregate_schwarz':
+            subdomain_ptr = aggregate_subdomains(level.A, level.AggOp,
+                                                 kwargs.get('overlap', 0))[1]
+            blocksize = np.diff(subdomain_ptr)
+            schwarz_work += _smoother_factor(level, smoother) * \
+                np.sum(blocksize**2) / nnz
+            if kwargs.get('sweep', 'forward') != 'additive':
+                cost *= subdomain_ptr[-1] / float(level.A.shape[0])
+        costs.append(cost)
+
+    return costs[0], costs[1], schwarz_work
+
+
+def _matvec(A, x, y):
+    """Accumulate y += A*x in place
+
+    CSR, CSC and BSR matrices whose data type matches x and y are applied
+    directly with the sparsetools kernels, or the threaded amg_core kernels
+    if get_num_threads() > 1, so that no temporary vector is allocated.
+    Other inputs fall back to y += A*x.
+    """
+    n_threads = get_num_threads()
+    if n_threads > 1 and _kernel_compatible(A, x, y):
+        if isspmatrix_csr(A):
+            amg_core.csr_matvec_threaded(A.indptr, A.indices, A.data, x, y,
+                                         n_threads)
+            return
+        elif isspmatrix_bsr(A):
+            R, C = A.blocksize
+            amg_core.bsr_matvec_threaded(A.indptr, A.indices,
+                                         np.ravel(A.data), x, y, R, C,
+                                         n_threads)
+            return
+
+    if (A.dtype == x.dtype) and (A.dtype == y.dtype):
+        if isspmatrix_csr(A):
+            csr_matvec(A.shape[0], A.shape[1], A.indptr, A.indices, A.data,
+                       x, y)
+            return
+        elif isspmatrix_csc(A):
+            csc_matvec(A.shape[0], A.shape[1], A.indptr, A.indices, A.data,
+                       x, y)
+            return
+        elif isspmatrix_bsr(A):
+            R, C = A.blocksize
+            bsr_matvec(A.shape[0] // R, A.shape[1] // C, R, C, A.indptr,
+                       A.indices, np.ravel(A.data), x, y)
+            return
+
+    y += A * x
+
+
+def _residual(A, x, b, r):
+    """Compute the residual r = b - A*x in place"""
+    n_threads = get_num_threads()
+    if n_threads > 1 and _kernel_compatible(A, x, b, r):
+        if isspmatrix_csr(A):
+            amg_core.csr_residual_threaded(A.indptr, A.indices, A.data, x, b,
+                                           r, n_threads)
+            return
+        elif isspmatrix_bsr(A):
+            R, C = A.blocksize
+            amg_core.bsr_residual_threaded(A.indptr, A.indices,
+                                           np.ravel(A.data), x, b, r, R, C,
+                                           n_threads)
+            return
+
+    r[:] = 0
+    _matvec(A, x, r)
+    np.subtract(b, r, out=r)
+
+
+# Names of the copies of level.A made by relaxation.smoothing.matrix_asformat
+_CONVERTED_A = re.compile(r'^A(csr|csc|coo|lil|dok|dia|bsr\d+)$')
+
+
+def _freeze_smoother(level, smoother):
+    """Parameters of a smoother for amg_core.multilevel_relax
+
+    Returns (fields, omega, Cpts, Fpts), where fields holds the smoother
+    type, iterations, sweep, F_iterations and C_iterations, or None if the
+    smoother is not supported by the compiled cycle.  The parameters
+    mirror the setup_<smoother> functions in relaxation.smoothing.
+    """
+    name, kwargs = smoother[0], smoother[1]
+    fields = [0, 0, 0, 0, 0]
+    omega = 1.0
+    Cpts = Fpts = np.zeros(0, dtype=np.intc)
+    sweeps = ['forward', 'backward', 'symmetric']
+
+    if name == 'gauss_seidel':
+        sweep = kwargs.get('sweep', sm.DEFAULT_SWEEP)
+        if sweep not in sweeps:
+            return None
+        fields[:3] = [1, kwargs.get('iterations', sm.DEFAULT_NITER),
+                      sweeps.index(sweep)]
+    elif name in ['jacobi', 'CF_jacobi', 'FC_jacobi']:
+        omega = kwargs.get('omega', 1.0)
+        if kwargs.get('withrho', name == 'jacobi'):
+            omega = omega/sm.spectral_bounds(
+                level, 'diagonal', kwargs.get('rho_estimator', 'arnoldi'))
+        if name == 'jacobi':
+            fields[:2] = [2, kwargs.get('iterations', sm.DEFAULT_NITER)]
+        else:
+            # one CF/FC sweep per application, as in setup_CF_jacobi
+            fields = [3 if name == 'CF_jacobi' else 4, sm.DEFAULT_NITER, 0,
+                      kwargs.get('F_iterations', sm.DEFAULT_NITER),
+                      kwargs.get('C_iterations', sm.DEFAULT_NITER)]
+            Cpts, Fpts = sm._cf_jacobi_parameters(level)[:2]
+    elif name is not None:
+        return None
+
+    return fields, omega, Cpts, Fpts
+
+
+_SAVE_MAGIC = b'PYAMGML\x01'
+
+
+def _aligned(offset, alignment=64):
+    """Round offset up to a multiple of alignment"""
+    return -(-offset // alignment) * alignment
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Pickler that stores numerical arrays out of line
+
+    Arrays are replaced in the pickle by their offset, data type, shape and
+    layout in a separate data section, see multilevel_solver.save.  The
+    arrays, in C order, and their offsets are collected in self.arrays, and
+    self.nbytes is the size of the data section.
+    """
+    def __init__(self, file):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.arrays = []
+        self.nbytes = 0
+        self.__ids = {}
+        # keep the arrays alive, so that their ids are not reused
+        self.__saved = []
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray) or obj.dtype.hasobject or \
+                obj.dtype.fields is not None:
+            return None
+
+        key = id(obj)
+        if key not in self.__ids:
+            fortran = obj.flags.f_contiguous and not obj.flags.c_contiguous
+            data = np.asarray(obj.T if fortran else obj, order='C')
+            start = _aligned(self.nbytes)
+            self.__ids[key] = (start, data.dtype.str, obj.shape, fortran,
+                               isinstance(obj, np.matrix))
+            self.__saved.append(obj)
+            self.arrays.append((start, data))
+            self.nbytes = start + data.nbytes
+
+        return self.__ids[key]
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    """Unpickler for _ArrayPickler, with arrays viewing the data section"""
+    def __init__(self, file, data):
+        pickle.Unpickler.__init__(self, file)
+        self.data = data
+        self.__arrays = {}
+
+    def persistent_load(self, pid):
+        if pid not in self.__arrays:
+            start, dtype, shape, fortran, matrix = pid
+            dtype = np.dtype(dtype)
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            A = self.data[start:start + nbytes].view(dtype)
+            if fortran:
+                A = A.reshape(shape[::-1]).T
+            else:
+                A = A.reshape(shape)
+            if matrix:
+                A = np.asmatrix(A)
+            self.__arrays[pid] = A
+
+        return self.__arrays[pid]
+
+
+def _kernel_compatible(M, *vecs):
+    """Test whether M and the vectors can be passed to an amg_core kernel
+
+    The index arrays of M must be int32, and M must have the same data type
+    as the vectors, which must be one-dimensional.
+    """
+    if M.indices.dtype != np.intc or M.indptr.dtype != np.intc:
+        return False
+
+    for v in vecs:
+        if v.dtype != M.dtype or v.ndim != 1:
+            return False
+
+    return True
+
+
+def _restriction_transpose(level):
+    """Return R^T in the format used by the fused residual-restrict kernels
+
+    R^T is stored as CSR if A is CSR, and as BSR with blocks of size
+    A.blocksize[0] x R.blocksize[0] if A is BSR.  The result is cached on
+    the level and recomputed whenever level.R is replaced.
+    """
+    if getattr(level, '_RT', (None,))[0] is not level.R:
+        RT = level.R.T
+        if isspmatrix_bsr(level.A):
+            if isspmatrix_bsr(level.R):
+                coarse_blocksize = level.R.blocksize[0]
+            else:
+                coarse_blocksize = 1
+            RT = RT.tobsr(blocksize=(level.A.blocksize[0], coarse_blocksize))
+        else:
+            RT = RT.tocsr()
+        level._RT = (level.R, RT)
+
+    return level._RT[1]
+
+
+def _interpolate(level):
+    """Recompute P and R of a level for its current A
+
+    The level records in level.interpolation the name of its interpolation
+    and the inputs other than A, see multilevel_solver.update.  P and R keep
+    their data type.  Returns False, without touching the level, if it
+    records none.
+    """
+    from pyamg.aggregation.smooth import jacobi_prolongation_smoother, \
+        richardson_prolongation_smoother
+    from pyamg.classical.interpolate import direct_interpolation, \
+        standard_interpolation, distance_two_interpolation
+
+    if not hasattr(level, 'interpolation'):
+        return False
+    fn, kwargs = level.interpolation
+    A = getattr(level, 'A_refine', level.A)
+    symmetry = getattr(A, 'symmetry', 'hermitian')
+    # A of a lower precision level (see set_precision) is upcast to the
+    # inputs recorded at the setup
+    tp = upcast(A.dtype, *[v.dtype for v in kwargs.values() if isspmatrix(v)])
+    if A.dtype != tp:
+        A = A.astype(tp)
+
+    if fn in ['jacobi', 'richardson']:
+        # smoothed aggregation, with R = P^H for symmetric problems
+        if fn == 'jacobi':
+            P = jacobi_prolongation_smoother(A, cost=[0.0], **kwargs)
+        else:
+            P = richardson_prolongation_smoother(A, cost=[0.0], **kwargs)
+        if symmetry == 'hermitian':
+            R = P.H
+        else:
+            R = P.T
+    else:
+        # classical interpolation, with Galerkin restriction
+        interpolate = {'direct': direct_interpolation,
+                       'standard': standard_interpolation,
+                       'distance_two': distance_two_interpolation}[fn]
+        P = interpolate(A, cost=[0.0], **kwargs)
+        if isspmatrix_bsr(A):
+            R = P.T.tobsr()
+        else:
+            R = P.T.tocsr()
+
+    if P.dtype != level.P.dtype:
+        P = P.astype(level.P.dtype)
+    if R.dtype != level.R.dtype:
+        R = R.astype(level.R.dtype)
+    level.P, level.R = P, R
+    return True
+
+
+def galerkin_product(level, cost=[0.0]):
+    """Form the coarse operator R*A*P of a level
+
+    Parameters
+    ----------
+    level : multilevel_solver.level
+        Level with attributes A, P and R.  If the level has attributes
+        coarse_grid_P or coarse_grid_R, these replace P and R in the
+        product.
+    cost : {list containing one scalar}
+        cost[0] is incremented by the number of scalar multiply-adds of
+        the product
+
+    Returns
+    -------
+    Ac : {csr_matrix, bsr_matrix}
+        Coarse operator, in the format of P
+
+    Notes
+    -----
+    For CSR and BSR operators with int32 indices, Ac is computed by amg_core
+    row by row: each row of R*A is accumulated once, and then multiplied
+    with P.  The symbolic phase, which bounds the number of nonzeros of Ac
+    and counts the multiply-adds, is computed by the first product of a
+    level and cached in level.RAP_plan with the sparsity patterns of R, A
+    and P.  A repeated product with the same patterns, e.g., in
+    multilevel_solver.update, only repeats the numeric phase.  Ac is the
+    same as the scipy product (R*A)*P, including the order of the indices
+    within each row and, for scalar (CSR or 1x1 BSR) operators, the
+    removal of explicit zeros.
+
+    Other operators use the scipy product, with cost estimated by
+    mat_mat_complexity.
+
+    Examples
+    --------
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.multilevel import multilevel_solver, galerkin_product
+    >>> from pyamg.classical import direct_interpolation
+    >>> from pyamg.classical.split import RS
+    >>> from pyamg.strength import classical_strength_of_connection
+    >>> A = poisson((10, 10), format='csr')
+    >>> level = multilevel_solver.level()
+    >>> level.A = A
+    >>> C = classical_strength_of_connection(A)
+    >>> level.P = direct_interpolation(A, C, RS(C))
+    >>> level.R = level.P.T.tocsr()
+    >>> cost = [0.0]
+    >>> Ac = galerkin_product(level, cost=cost)
+    >>> Ac.shape
+    (50, 50)
+
+    """
+    A = level.A
+    P = getattr(level, 'coarse_grid_P', level.P)
+    R = getattr(level, 'coarse_grid_R', level.R)
+
+    if isspmatrix_csr(A) and isspmatrix_bsr(P) and isspmatrix_bsr(R) and \
+            P.blocksize[0] == 1:
+        # scalar problem with BSR transfer operators, e.g., from aggregation
+        A = bsr_matrix((A.data.reshape(-1, 1, 1), A.indices, A.indptr),
+                       shape=A.shape)
+
+    if isspmatrix_csr(A) and isspmatrix_csr(P) and isspmatrix_csr(R):
+        blocks = (1, 1, 1)
+    elif isspmatrix_bsr(A) and isspmatrix_bsr(P) and isspmatrix_bsr(R) and \
+            A.blocksize[0] == A.blocksize[1] == P.blocksize[0] == \
+            R.blocksize[1]:
+        blocks = (R.blocksize[0], A.blocksize[0], P.blocksize[1])
+    else:
+        blocks = None
+
+    if blocks is None or not (_kernel_compatible(A) and
+                              _kernel_compatible(P) and
+                              _kernel_compatible(R)):
+        cost[0] += mat_mat_complexity(R, A)
+        RA = R * A
+        cost[0] += mat_mat_complexity(RA, P)
+        Ac = RA * P
+        if isspmatrix_bsr(P) and not isspmatrix_bsr(Ac):
+            Ac = Ac.tobsr()
+        elif not isspmatrix_bsr(P) and not isspmatrix_csr(Ac):
+            Ac = Ac.tocsr()
+        return Ac
+
+    structure = [R.indptr, R.indices, A.indptr, A.indices, P.indptr,
+                 P.indices]
+    plan = getattr(level, 'RAP_plan', None)
+
+    # the kernels operate on a single data type
+    tp = upcast(R.dtype, A.dtype, P.dtype)
+    R, A, P = [M if M.dtype == tp else M.astype(tp) for M in [R, A, P]]
+    n_col = P.shape[1] // blocks[2]
+    # scipy orders the entries of scalar products differently
+    reverse = int(blocks == (1, 1, 1))
+
+    if plan is None or \
+            not all([u is v or (u.shape == v.shape and np.array_equal(u, v))
+                     for u, v in zip(plan[0], structure)]):
+        Cp = np.empty(R.indptr.shape[0], dtype=np.intc)
+        pairs = np.empty(R.indptr.shape[0] - 1, dtype=np.intc)
+        amg_core.rap_symbolic(R.indptr, R.indices, A.indptr, A.indices,
+                              P.indptr, P.indices, Cp, pairs, n_col)
+
+        # Each product of a block of R with a block of A costs rb*ab*ab
+        # multiply-adds, and each product of a block of R*A with a block
+        # of P costs rb*ab*pb, with the pattern of R*A assuming no
+        # numerical cancellation
+        A_rowlen = np.diff(A.indptr).astype(float)
+        R_collen = np.bincount(R.indices, minlength=A_rowlen.shape[0])
+        flops = blocks[0] * blocks[1] * blocks[1] * np.dot(R_collen, A_rowlen)
+        flops += blocks[0] * blocks[1] * blocks[2] * pairs.sum(dtype=float)
+
+        plan = (structure, Cp[-1], flops)
+        level.RAP_plan = plan
+
+    cost[0] += plan[2]
+    Cp = np.empty(R.indptr.shape[0], dtype=np.intc)
+    Cj = np.empty(plan[1], dtype=np.intc)
+    Cx = np.empty(plan[1] * blocks[0] * blocks[2], dtype=tp)
+    shape = (R.shape[0], P.shape[1])
+
+    if reverse:
+        # 1x1 blocks are stored as CSR
+        amg_core.csr_rap_numeric(R.indptr, R.indices, np.ravel(R.data),
+                                 A.indptr, A.indices, np.ravel(A.data),
+                                 P.indptr, P.indices, np.ravel(P.data),
+                                 Cp, Cj, Cx, n_col, reverse)
+    else:
+        amg_core.bsr_rap_numeric(R.indptr, R.indices, np.ravel(R.data),
+                                 A.indptr, A.indices, np.ravel(A.data),
+                                 P.indptr, P.indices, np.ravel(P.data),
+                                 Cp, Cj, Cx, n_col, *(blocks + (reverse,)))
+
+    Cj, Cx = Cj[:Cp[-1]], Cx[:Cp[-1] * blocks[0] * blocks[2]]
+    if isspmatrix_csr(A):
+        return csr_matrix((Cx, Cj, Cp), shape=shape)
+    else:
+        Cx = Cx.reshape(-1, blocks[0], blocks[2])
+        return bsr_matrix((Cx, Cj, Cp), shape=shape)
+
+
+def _residual_restrict(level, x, b, y, r=None):
+    """Compute y = R*(b - A*x) with amg_core kernels
+
+    Returns False, without touching y, if A is not CSR or BSR with square
+    blocks, or if the operators and vectors are not kernel compatible.
+
+    If get_num_threads() > 1 and R is CSR or BSR with sorted indices, the
+    residual and its restriction are computed by the threaded kernels, in
+    r if given.  Otherwise, a fused serial kernel scatters each entry of
+    the residual through R^T, without forming the residual vector.  Both
+    form the sums in the same order, so that y does not depend on the
+    number of threads.
+    """
+    A, R = level.A, level.R
+
+    if not (isspmatrix_csr(A) or
+            (isspmatrix_bsr(A) and A.blocksize[0] == A.blocksize[1])):
+        return False
+
+    if not _kernel_compatible(A, x, b, y) or A.dtype != R.dtype:
+        return False
+
+    if get_num_threads() > 1 and (isspmatrix_csr(R) or isspmatrix_bsr(R)) \
+            and _kernel_compatible(R) and R.has_sorted_indices:
+        if r is None:
+            r = np.empty_like(b)
+        _residual(A, x, b, r)
+        y[:] = 0
+        _matvec(R, r, y)
+        return True
+
+    RT = _restriction_transpose(level)
+    if not _kernel_compatible(RT):
+        return False
+
+    if isspmatrix_csr(A):
+        amg_core.csr_residual_restrict(A.indptr, A.indices, A.data, x, b,
+                                       RT.indptr, RT.indices, RT.data, y)
+    else:
+        amg_core.bsr_residual_restrict(A.indptr, A.indices, np.ravel(A.data),
+                                       x, b, RT.indptr, RT.indices,
+                                       np.ravel(RT.data), y,
+                                       A.blocksize[0], RT.blocksize[1])
+
+    return True
+
+
+def _interpolate_add(level, y, x):
+    """Add the coarse-grid correction x += P*y with an amg_core kernel
+
+    Returns False, without touching x, if P is not CSR or BSR, or if P and
+    the vectors are not kernel compatible.
+    """
+    P = level.P
+
+    if not (isspmatrix_csr(P) or isspmatrix_bsr(P)) or \
+            not _kernel_compatible(P, x, y):
+        return False
+
+    if get_num_threads() > 1:
+        _matvec(P, y, x)
+    elif isspmatrix_csr(P):
+        amg_core.csr_interpolate_add(P.indptr, P.indices, P.data, y, x)
+    else:
+        amg_core.bsr_interpolate_add(P.indptr, P.indices, np.ravel(P.data),
+                                     y, x, P.blocksize[0], P.blocksize[1])
+
+    return True
+
+
 def coarse_grid_solver(solver):
     """Return a coarse grid solver suitable for multilevel_solver
 
@@ -856,42 +2530,57 @@ def coarse_grid_solver(solver):
 
     solver, kwargs = unpack_arg(solver, cost=False)
 
+    # Solvers that do not accept an n x k block of right-hand sides are
+    # applied to each column in turn
+    multivector = True
+
+    # Direct solvers factor the coarse matrix on first use, see
+    # generic_solver.__call__
+    factor = None
+
     if solver in ['pinv', 'pinv2']:
+        def factor(self, A):
+            self.P = getattr(sp.linalg, solver)(A.todense(), **kwargs)
+
         def solve(self, A, b):
-            if not hasattr(self, 'P'):
-                self.P = getattr(sp.linalg, solver)(A.todense(), **kwargs)
             return np.dot(self.P, b)
 
     elif solver == 'lu':
+        def factor(self, A):
+            self.LU = sp.linalg.lu_factor(A.todense(), **kwargs)
+
         def solve(self, A, b):
-            if not hasattr(self, 'LU'):
-                self.LU = sp.linalg.lu_factor(A.todense(), **kwargs)
             return sp.linalg.lu_solve(self.LU, b)
 
     elif solver == 'cholesky':
+        def factor(self, A):
+            self.L = sp.linalg.cho_factor(A.todense(), **kwargs)
+
         def solve(self, A, b):
-            if not hasattr(self, 'L'):
-                self.L = sp.linalg.cho_factor(A.todense(), **kwargs)
             return sp.linalg.cho_solve(self.L, b)
 
     elif solver == 'splu':
+        def factor(self, A):
+            # for multiple candidates in B, A will often have a couple zero
+            # rows/columns that must be removed
+            Acsc = A.tocsc()
+            Acsc.eliminate_zeros()
+            diffptr = Acsc.indptr[:-1] - Acsc.indptr[1:]
+            nonzero_cols = (diffptr != 0).nonzero()[0]
+            Map = sp.sparse.eye(Acsc.shape[0], Acsc.shape[1], format='csc')
+            Map = Map[:, nonzero_cols]
+            Acsc = Map.T.tocsc() * Acsc * Map
+            self.LU_Map = Map
+            self.LU = sp.sparse.linalg.splu(Acsc, **kwargs)
+
         def solve(self, A, b):
-            if not hasattr(self, 'LU'):
-                # for multiple candidates in B, A will often have a couple zero
-                # rows/columns that must be removed
-                Acsc = A.tocsc()
-                Acsc.eliminate_zeros()
-                diffptr = Acsc.indptr[:-1] - Acsc.indptr[1:]
-                nonzero_cols = (diffptr != 0).nonzero()[0]
-                Map = sp.sparse.eye(Acsc.shape[0], Acsc.shape[1], format='csc')
-                Map = Map[:, nonzero_cols]
-                Acsc = Map.T.tocsc() * Acsc * Map
-                self.LU = sp.sparse.linalg.splu(Acsc, **kwargs)
-                self.LU_Map = Map
-
-            return self.LU_Map * self.LU.solve(np.ravel(self.LU_Map.T * b))
+            y = np.asarray(self.LU_Map.T * b)
+            if y.ndim == 2 and y.shape[1] == 1:
+                y = np.ravel(y)
+            return self.LU_Map * self.LU.solve(y)
 
     elif solver in ['bicg', 'bicgstab', 'cg', 'cgs', 'gmres', 'qmr', 'minres']:
+        multivector = False
         from pyamg import krylov
         if hasattr(krylov, solver):
             fn = getattr(krylov, solver)
@@ -916,6 +2605,7 @@ def coarse_grid_solver(solver):
 
         if 'iterations' not in kwargs:
             kwargs['iterations'] = 10
+        multivector = solver in sm.MULTIVECTOR_RELAXATION
 
         def solve(self, A, b):
             from pyamg.relaxation import smoothing
@@ -936,6 +2626,8 @@ def coarse_grid_solver(solver):
             return 0 * b  # should this return b instead?
 
     elif callable(solver):
+        multivector = False
+
         def solve(self, A, b):
             return solver(A, b, **kwargs)
 
@@ -944,13 +2636,27 @@ def coarse_grid_solver(solver):
 
 
     class generic_solver:
+        def __init__(self):
+            # the unpacked solver, e.g., 'splu' or a callable
+            self.method = solver
+            # serializes the factorization of concurrent first calls
+            self.lock = threading.Lock()
+
         def __call__(self, A, b):
             # make sure x is same dimensions and type as b
             b = np.asanyarray(b)
 
+            if factor is not None and A.nnz != 0 and not self.factored():
+                with self.lock:
+                    if not self.factored():
+                        factor(self, A)
+
             if A.nnz == 0:
                 # if A.nnz = 0, then we expect no correction
                 x = np.zeros(b.shape)
+            elif b.ndim == 2 and b.shape[1] > 1 and not multivector:
+                x = np.column_stack([np.ravel(solve(self, A, np.array(bj)))
+                                     for bj in np.asarray(b).T])
             else:
                 x = solve(self, A, b)
 
@@ -963,6 +2669,27 @@ def coarse_grid_solver(solver):
 
             return x.reshape(b.shape)
 
+        def factored(self):
+            # LU is set last by the 'splu' factorization
+            return hasattr(self, 'P') or hasattr(self, 'LU') or \
+                hasattr(self, 'L')
+
+        def reset(self):
+            # discard the factorization of a previous coarse grid matrix
+            with self.lock:
+                for attr in ['P', 'LU', 'LU_Map', 'L']:
+                    if hasattr(self, attr):
+                        delattr(self, attr)
+
+        def __reduce__(self):
+            # recreate the solver, keeping factorizations that can be pickled
+            state = self.__dict__.copy()
+            state.pop('lock')
+            if solver == 'splu':
+                state.pop('LU', None)
+                state.pop('LU_Map', None)
+            return (coarse_grid_solver, ((solver, kwargs),), state)
+
         def __repr__(self):
             return 'coarse_grid_solver(' + repr(solver) + ')'
 
@@ -5,21 +5,29 @@ __docformat__ = "restructuredtext en"
 from warnings import warn
 
 import numpy as np
-import scipy as sp
 from scipy import sparse
 
-from pyamg.util.utils import type_prep, get_diagonal, get_block_diag
+from pyamg.util.utils import type_prep, get_diagonal, get_block_diag, \
+    get_num_threads
+from pyamg.util.linalg import pinv_array
+from pyamg.graph import vertex_coloring
 from pyamg import amg_core
-from scipy.linalg import lapack as la
 
 __all__ = ['sor', 'gauss_seidel', 'jacobi', 'polynomial', 'schwarz',
+           'hybrid_gauss_seidel', 'l1_jacobi', 'l1_parameters',
            'schwarz_parameters', 'jacobi_ne', 'gauss_seidel_ne',
-           'gauss_seidel_nr', 'gauss_seidel_indexed', 'block_jacobi',
+           'gauss_seidel_nr', 'gauss_seidel_indexed',
+           'multicolor_gauss_seidel', 'multicolor_parameters', 'block_jacobi',
            'block_gauss_seidel', 'boundary_relaxation', 'CF_jacobi',
-           'FC_jacobi', 'CF_block_jacobi', 'FC_block_jacobi']
+           'FC_jacobi', 'CF_block_jacobi', 'FC_block_jacobi',
+           'aggregate_schwarz', 'aggregate_schwarz_parameters',
+           'aggregate_subdomains']
 
+# Maximum number of block entries inverted at once by schwarz_parameters
+_SUBBLOCK_CHUNK = 2**20
 
-def make_system(A, x, b, formats=None):
+
+def make_system(A, x, b, formats=None, multivector=False):
     """
     Return A,x,b suitable for relaxation or raise an exception
 
@@ -34,11 +42,14 @@ def make_system(A, x, b, formats=None):
     formats: {'csr', 'csc', 'bsr', 'lil', 'dok',...}
         desired sparse matrix format
         default is no change to A's format
+    multivector : {bool}
+        If True, x and b may also be n x k multivectors, with k > 1, which
+        are returned unraveled
 
     Returns
     -------
     (A,x,b), where A is in the desired sparse-matrix format
-    and x and b are "raveled", i.e. (n,) vectors.
+    and x and b are "raveled", i.e. (n,) vectors, or n x k multivectors.
 
     Notes
     -----
@@ -46,6 +57,11 @@ def make_system(A, x, b, formats=None):
     such as checking for compatible dimensions and checking
     for compatible type, i.e. float or complex.
 
+    Mixed precision is accepted for the right-hand side, which is cast to
+    the data type of A, e.g., a float64 b for a float32 A.  The casting
+    must not discard the imaginary part.  Since x is modified in place, it
+    must have the same data type as A.
+
     Examples
     --------
     >>> from pyamg.relaxation.relaxation import make_system
@@ -89,23 +105,62 @@ def make_system(A, x, b, formats=None):
     if M != N:
         raise ValueError('expected square matrix')
 
-    if x.shape not in [(M,), (M, 1)]:
-        raise ValueError('x has invalid dimensions')
-    if b.shape not in [(M,), (M, 1)]:
-        raise ValueError('b has invalid dimensions')
-
-    if A.dtype != x.dtype or A.dtype != b.dtype:
-        raise TypeError('arguments A, x, and b must have the same dtype')
+    if multivector and x.ndim == 2 and x.shape[1] > 1:
+        if x.shape[0] != M:
+            raise ValueError('x has invalid dimensions')
+        if b.shape != x.shape:
+            raise ValueError('b has invalid dimensions')
+    else:
+        multivector = False
+        if x.shape not in [(M,), (M, 1)]:
+            raise ValueError('x has invalid dimensions')
+        if b.shape not in [(M,), (M, 1)]:
+            raise ValueError('b has invalid dimensions')
+
+    if A.dtype != x.dtype:
+        raise TypeError('arguments A and x must have the same dtype')
+    if b.dtype != A.dtype:
+        if not np.can_cast(b.dtype, A.dtype, casting='same_kind'):
+            raise TypeError('argument b cannot be cast to the dtype of A')
+        b = b.astype(A.dtype)
 
     if not x.flags.carray:
         raise ValueError('x must be contiguous in memory')
 
+    if multivector:
+        return A, x, np.ascontiguousarray(b)
+
     x = np.ravel(x)
     b = np.ravel(b)
 
     return A, x, b
 
 
+def relax_columns(relax, A, x, b, **kwargs):
+    """Apply a relaxation method to each column of a multivector in turn
+
+    Parameters
+    ----------
+    relax : function
+        Relaxation method called as relax(A, xk, bk, **kwargs) for the
+        columns xk and bk
+    A : {sparse-matrix}
+        n x n system
+    x : {array}
+        n x k multivector, approximate solutions
+    b : {array}
+        n x k multivector, right-hand sides
+
+    Returns
+    -------
+    Nothing, x will be modified in place.
+    """
+    for k in range(x.shape[1]):
+        xk = np.array(x[:, k])
+        relax(A, xk, np.array(b[:, k]), **kwargs)
+        x[:, k] = xk
+
+
 def sor(A, x, b, omega, iterations=1, sweep='forward'):
     """Perform SOR iteration on the linear system Ax=b
 
@@ -114,9 +169,11 @@ def sor(A, x, b, omega, iterations=1, sweep='forward'):
     A : {csr_matrix, bsr_matrix}
         Sparse NxN matrix
     x : ndarray
-        Approximate solution (length N)
+        Approximate solution (length N), or N x k multivector of
+        approximate solutions
     b : ndarray
-        Right-hand side (length N)
+        Right-hand side (length N), or N x k multivector of right-hand
+        sides
     omega : scalar
         Damping parameter
     iterations : int
@@ -156,7 +213,7 @@ def sor(A, x, b, omega, iterations=1, sweep='forward'):
     >>> residuals=[]
     >>> x = sa.solve(b, x0=x0, tol=1e-8, residuals=residuals)
     """
-    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'], multivector=True)
 
     x_old = np.empty_like(x)
 
@@ -288,9 +345,11 @@ def gauss_seidel(A, x, b, iterations=1, sweep='forward'):
     A : {csr_matrix, bsr_matrix}
         Sparse NxN matrix
     x : ndarray
-        Approximate solution (length N)
+        Approximate solution (length N), or N x k multivector of
+        approximate solutions
     b : ndarray
-        Right-hand side (length N)
+        Right-hand side (length N), or N x k multivector of right-hand
+        sides
     iterations : int
         Number of iterations to perform
     sweep : {'forward','backward','symmetric'}
@@ -324,7 +383,7 @@ def gauss_seidel(A, x, b, iterations=1, sweep='forward'):
     >>> residuals=[]
     >>> x = sa.solve(b, x0=x0, tol=1e-8, residuals=residuals)
     """
-    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'], multivector=True)
 
     if sparse.isspmatrix_csr(A):
         blocksize = 1
@@ -347,7 +406,24 @@ def gauss_seidel(A, x, b, iterations=1, sweep='forward'):
         raise ValueError("valid sweep directions are 'forward',\
                           'backward', and 'symmetric'")
 
-    if sparse.isspmatrix_csr(A):
+    if x.ndim == 2:
+        # All columns of a multivector are relaxed in one pass over A
+        num_vectors = x.shape[1]
+        if sparse.isspmatrix_csr(A):
+            for iter in range(iterations):
+                amg_core.gauss_seidel_multivector(A.indptr, A.indices, A.data,
+                                                  np.ravel(x), np.ravel(b),
+                                                  row_start, row_stop,
+                                                  row_step, num_vectors)
+        else:
+            for iter in range(iterations):
+                amg_core.bsr_gauss_seidel_multivector(A.indptr, A.indices,
+                                                      np.ravel(A.data),
+                                                      np.ravel(x), np.ravel(b),
+                                                      row_start, row_stop,
+                                                      row_step, R,
+                                                      num_vectors)
+    elif sparse.isspmatrix_csr(A):
         for iter in range(iterations):
             amg_core.gauss_seidel(A.indptr, A.indices, A.data, x, b,
                                   row_start, row_stop, row_step)
@@ -356,6 +432,235 @@ def gauss_seidel(A, x, b, iterations=1, sweep='forward'):
             amg_core.bsr_gauss_seidel(A.indptr, A.indices, np.ravel(A.data),
                                       x, b, row_start, row_stop, row_step, R)
 
+def hybrid_gauss_seidel(A, x, b, iterations=1, sweep='forward', omega=1.0,
+                        blocks=None):
+    """Perform hybrid Gauss-Seidel iteration on the linear system Ax=b
+
+    The rows of A are split into contiguous blocks, which are relaxed
+    concurrently by get_num_threads() threads.  Gauss-Seidel is used inside
+    each block and Jacobi between the blocks, with the l1 diagonal of
+    l1_parameters, so that the iteration converges for symmetric positive
+    definite A.  The result depends on the blocks, but not on the number
+    of threads.
+
+    Parameters
+    ----------
+    A : {csr_matrix, bsr_matrix}
+        Sparse NxN matrix
+    x : ndarray
+        Approximate solution (length N)
+    b : ndarray
+        Right-hand side (length N)
+    iterations : int
+        Number of iterations to perform
+    sweep : {'forward','backward','symmetric'}
+        Direction of sweep inside each block
+    omega : scalar
+        Damping parameter
+    blocks : int
+        Number of blocks, the default is get_num_threads().  With a single
+        block, this is Gauss-Seidel.
+
+    Returns
+    -------
+    Nothing, x will be modified in place.
+
+    Examples
+    --------
+    >>> from pyamg.relaxation.relaxation import hybrid_gauss_seidel
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.util.linalg import norm
+    >>> import numpy as np
+    >>> A = poisson((10,10), format='csr')
+    >>> x0 = np.zeros((A.shape[0],1))
+    >>> b = np.ones((A.shape[0],1))
+    >>> hybrid_gauss_seidel(A, x0, b, iterations=10, blocks=4)
+    >>> print(norm(b-A*x0) < 5.0)
+    True
+    """
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+
+    if sparse.isspmatrix_bsr(A) and A.blocksize[0] != A.blocksize[1]:
+        raise ValueError('BSR blocks must be square')
+
+    if sweep == 'forward':
+        row_step = 1
+    elif sweep == 'backward':
+        row_step = -1
+    elif sweep == 'symmetric':
+        for iter in range(iterations):
+            hybrid_gauss_seidel(A, x, b, iterations=1, sweep='forward',
+                                omega=omega, blocks=blocks)
+            hybrid_gauss_seidel(A, x, b, iterations=1, sweep='backward',
+                                omega=omega, blocks=blocks)
+        return
+    else:
+        raise ValueError("valid sweep directions are 'forward',\
+                          'backward', and 'symmetric'")
+
+    if blocks is None:
+        blocks = get_num_threads()
+    block_ptr, Dinv = l1_parameters(A, blocks)
+
+    temp = np.empty_like(x)
+    [omega] = type_prep(A.dtype, [omega])
+    n_threads = get_num_threads()
+
+    if sparse.isspmatrix_csr(A):
+        for iter in range(iterations):
+            amg_core.hybrid_gauss_seidel(A.indptr, A.indices, A.data, x, b,
+                                         Dinv, temp, block_ptr, row_step,
+                                         omega, n_threads)
+    else:
+        for iter in range(iterations):
+            amg_core.bsr_hybrid_gauss_seidel(A.indptr, A.indices,
+                                             np.ravel(A.data), x, b, Dinv,
+                                             temp, block_ptr, row_step,
+                                             omega, A.blocksize[0],
+                                             n_threads)
+
+
+def l1_jacobi(A, x, b, iterations=1, omega=1.0):
+    """Perform l1-Jacobi iteration on the linear system Ax=b
+
+    Jacobi iteration with the diagonal of the l1 row norms of A, see
+    l1_parameters, which converges for symmetric positive definite A
+    without a spectral radius estimate.  The rows are relaxed concurrently
+    by get_num_threads() threads.
+
+    Parameters
+    ----------
+    A : {csr_matrix, bsr_matrix}
+        Sparse NxN matrix
+    x : ndarray
+        Approximate solution (length N)
+    b : ndarray
+        Right-hand side (length N)
+    iterations : int
+        Number of iterations to perform
+    omega : scalar
+        Damping parameter
+
+    Returns
+    -------
+    Nothing, x will be modified in place.
+
+    Examples
+    --------
+    >>> from pyamg.relaxation.relaxation import l1_jacobi
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.util.linalg import norm
+    >>> import numpy as np
+    >>> A = poisson((10,10), format='csr')
+    >>> x0 = np.zeros((A.shape[0],1))
+    >>> b = np.ones((A.shape[0],1))
+    >>> l1_jacobi(A, x0, b, iterations=10)
+    >>> print(norm(b-A*x0) < 8.0)
+    True
+    """
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+
+    if sparse.isspmatrix_bsr(A) and A.blocksize[0] != A.blocksize[1]:
+        raise ValueError('BSR blocks must be square')
+
+    block_ptr, Dinv = l1_parameters(A)
+
+    temp = np.empty_like(x)
+    [omega] = type_prep(A.dtype, [omega])
+    n_threads = get_num_threads()
+
+    if sparse.isspmatrix_csr(A):
+        for iter in range(iterations):
+            amg_core.l1_jacobi(A.indptr, A.indices, A.data, x, b, Dinv,
+                               temp, omega, n_threads)
+    else:
+        for iter in range(iterations):
+            amg_core.bsr_l1_jacobi(A.indptr, A.indices, np.ravel(A.data),
+                                   x, b, Dinv, temp, omega, A.blocksize[0],
+                                   n_threads)
+
+
+def l1_parameters(A, blocks=None):
+    """
+    Helper function for setting up the l1 smoothers hybrid_gauss_seidel and
+    l1_jacobi.  The results are stored on A for each number of blocks, so
+    that they are computed once for the pre and post smoothers.
+
+    Parameters
+    ----------
+    A : {csr_matrix, bsr_matrix}
+        Sparse NxN matrix, with square blocks
+    blocks : int
+        Number of contiguous blocks of (block) rows, balanced by their
+        number of nonzeros.  If None, each (block) row is its own block.
+
+    Returns
+    -------
+    block_ptr : ndarray
+        Block k holds the (block) rows block_ptr[k]:block_ptr[k+1]
+    Dinv : ndarray
+        Inverse of the l1 diagonal.  For a CSR matrix, row i is scaled by
+        1/d_i, with d_i = a_ii + sum_j |a_ij| over the columns j outside of
+        the block of row i.  For a BSR matrix, the l1 row sums are added to
+        the diagonal blocks, which are then inverted.
+
+    Examples
+    --------
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.relaxation.relaxation import l1_parameters
+    >>> A = poisson((4,), format='csr')
+    >>> block_ptr, Dinv = l1_parameters(A, blocks=2)
+    >>> print(block_ptr)
+    [0 2 4]
+    >>> print(Dinv)
+    [0.5        0.33333333 0.33333333 0.5       ]
+    """
+    if not hasattr(A, 'l1_parameters'):
+        A.l1_parameters = {}
+    if blocks in A.l1_parameters:
+        return A.l1_parameters[blocks]
+
+    if sparse.isspmatrix_bsr(A):
+        R = A.blocksize[0]
+        data = A.data
+    else:
+        R = 1
+        data = A.data.reshape(-1, 1, 1)
+    n = A.indptr.shape[0] - 1
+
+    if blocks is None:
+        block_ptr = np.arange(n + 1, dtype=np.intc)
+    else:
+        blocks = max(1, min(int(blocks), n))
+        targets = (A.indptr[-1] * np.arange(1, blocks)) // blocks
+        block_ptr = np.empty(blocks + 1, dtype=np.intc)
+        block_ptr[0], block_ptr[-1] = 0, n
+        block_ptr[1:-1] = np.searchsorted(A.indptr, targets)
+
+    # l1 norms of the rows over the columns outside of their block
+    block_of = np.repeat(np.arange(len(block_ptr) - 1), np.diff(block_ptr))
+    rows = np.repeat(np.arange(n), np.diff(A.indptr))
+    outside = block_of[rows] != block_of[A.indices]
+    row_norms = np.abs(data[outside]).sum(axis=2)
+    l1 = np.zeros((n, R))
+    for m in range(R):
+        l1[:, m] = np.bincount(rows[outside], weights=row_norms[:, m],
+                               minlength=n)
+
+    if R == 1:
+        D = get_diagonal(A) + l1[:, 0]
+        Dinv = np.zeros_like(D)
+        Dinv[D != 0] = 1.0 / D[D != 0]
+    else:
+        Dinv = np.array(get_block_diag(A, blocksize=R, inv_flag=False))
+        Dinv[:, np.arange(R), np.arange(R)] += l1
+        pinv_array(Dinv)
+    Dinv = np.ascontiguousarray(np.ravel(Dinv), dtype=A.dtype)
+
+    A.l1_parameters[blocks] = (block_ptr, Dinv)
+    return block_ptr, Dinv
+
+
 def f_relaxation(A, x, b, splitting, iterations=1, sweep='forward'):
     """Perform gauss-seidel f-relaxation iteration on the linear system Ax=b
 
@@ -417,9 +722,11 @@ def jacobi(A, x, b, iterations=1, omega=1.0):
     A : csr_matrix
         Sparse NxN matrix
     x : ndarray
-        Approximate solution (length N)
+        Approximate solution (length N), or N x k multivector of
+        approximate solutions
     b : ndarray
-        Right-hand side (length N)
+        Right-hand side (length N), or N x k multivector of right-hand
+        sides
     iterations : int
         Number of iterations to perform
     omega : scalar
@@ -453,7 +760,7 @@ def jacobi(A, x, b, iterations=1, omega=1.0):
     >>> residuals=[]
     >>> x = sa.solve(b, x0=x0, tol=1e-8, residuals=residuals)
     """
-    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'], multivector=True)
 
     sweep = slice(None)
     (row_start, row_stop, row_step) = sweep.indices(A.shape[0])
@@ -466,7 +773,14 @@ def jacobi(A, x, b, iterations=1, omega=1.0):
     # Create uniform type, convert possibly complex scalars to length 1 arrays
     [omega] = type_prep(A.dtype, [omega])
 
-    if sparse.isspmatrix_csr(A):
+    if x.ndim == 2 and sparse.isspmatrix_csr(A):
+        # All columns of a multivector are relaxed in one pass over A
+        for iter in range(iterations):
+            amg_core.jacobi_multivector(A.indptr, A.indices, A.data,
+                                        np.ravel(x), np.ravel(b),
+                                        np.ravel(temp), row_start, row_stop,
+                                        row_step, omega, x.shape[1])
+    elif sparse.isspmatrix_csr(A):
         for iter in range(iterations):
             amg_core.jacobi(A.indptr, A.indices, A.data, x, b, temp,
                             row_start, row_stop, row_step, omega)
@@ -476,10 +790,19 @@ def jacobi(A, x, b, iterations=1, omega=1.0):
             raise ValueError('BSR blocks must be square')
         row_start = int(row_start / R)
         row_stop = int(row_stop / R)
-        for iter in range(iterations):
-            amg_core.bsr_jacobi(A.indptr, A.indices, np.ravel(A.data),
-                                x, b, temp, row_start, row_stop,
-                                row_step, R, omega)
+        if x.ndim == 2:
+            for iter in range(iterations):
+                amg_core.bsr_jacobi_multivector(A.indptr, A.indices,
+                                                np.ravel(A.data),
+                                                np.ravel(x), np.ravel(b),
+                                                np.ravel(temp), row_start,
+                                                row_stop, row_step, R, omega,
+                                                x.shape[1])
+        else:
+            for iter in range(iterations):
+                amg_core.bsr_jacobi(A.indptr, A.indices, np.ravel(A.data),
+                                    x, b, temp, row_start, row_stop,
+                                    row_step, R, omega)
 
 
 def boundary_relaxation(A, x, b, iterations=1):
@@ -530,9 +853,11 @@ def block_jacobi(A, x, b, Dinv=None, blocksize=1, iterations=1, omega=1.0):
     A : csr_matrix or bsr_matrix
         Sparse NxN matrix
     x : ndarray
-        Approximate solution (length N)
+        Approximate solution (length N), or N x k multivector of
+        approximate solutions
     b : ndarray
-        Right-hand side (length N)
+        Right-hand side (length N), or N x k multivector of right-hand
+        sides
     Dinv : array
         Array holding block diagonal inverses of A
         size (N/blocksize, blocksize, blocksize)
@@ -573,7 +898,7 @@ def block_jacobi(A, x, b, Dinv=None, blocksize=1, iterations=1, omega=1.0):
     >>> x = sa.solve(b, x0=x0, tol=1e-8, residuals=residuals)
     """
 
-    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'], multivector=True)
     A = A.tobsr(blocksize=(blocksize, blocksize))
 
     if Dinv is None:
@@ -594,6 +919,17 @@ def block_jacobi(A, x, b, Dinv=None, blocksize=1, iterations=1, omega=1.0):
     # Create uniform type, convert possibly complex scalars to length 1 arrays
     [omega] = type_prep(A.dtype, [omega])
 
+    if x.ndim == 2:
+        # All columns of a multivector are relaxed in one pass over A
+        for iter in range(iterations):
+            amg_core.block_jacobi_multivector(A.indptr, A.indices,
+                                              np.ravel(A.data), np.ravel(x),
+                                              np.ravel(b), np.ravel(Dinv),
+                                              np.ravel(temp), row_start,
+                                              row_stop, row_step, omega,
+                                              blocksize, x.shape[1])
+        return
+
     for iter in range(iterations):
         amg_core.block_jacobi(A.indptr, A.indices, np.ravel(A.data),
                               x, b, np.ravel(Dinv), temp,
@@ -610,9 +946,11 @@ def block_gauss_seidel(A, x, b, iterations=1, sweep='forward', blocksize=1,
     A : {csr_matrix, bsr_matrix}
         Sparse NxN matrix
     x : ndarray
-        Approximate solution (length N)
+        Approximate solution (length N), or N x k multivector of
+        approximate solutions
     b : ndarray
-        Right-hand side (length N)
+        Right-hand side (length N), or N x k multivector of right-hand
+        sides
     iterations : int
         Number of iterations to perform
     sweep : {'forward','backward','symmetric'}
@@ -654,7 +992,7 @@ def block_gauss_seidel(A, x, b, iterations=1, sweep='forward', blocksize=1,
     >>> residuals=[]
     >>> x = sa.solve(b, x0=x0, tol=1e-8, residuals=residuals)
     """
-    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'], multivector=True)
     A = A.tobsr(blocksize=(blocksize, blocksize))
 
     if Dinv is None:
@@ -679,13 +1017,25 @@ def block_gauss_seidel(A, x, b, iterations=1, sweep='forward', blocksize=1,
         raise ValueError("valid sweep directions are 'forward',\
                           'backward', and 'symmetric'")
 
+    if x.ndim == 2:
+        # All columns of a multivector are relaxed in one pass over A
+        for iter in range(iterations):
+            amg_core.block_gauss_seidel_multivector(A.indptr, A.indices,
+                                                    np.ravel(A.data),
+                                                    np.ravel(x), np.ravel(b),
+                                                    np.ravel(Dinv), row_start,
+                                                    row_stop, row_step,
+                                                    blocksize, x.shape[1])
+        return
+
     for iter in range(iterations):
         amg_core.block_gauss_seidel(A.indptr, A.indices, np.ravel(A.data),
                                     x, b, np.ravel(Dinv),
                                     row_start, row_stop, row_step, blocksize)
 
 
-def polynomial(A, x, b, coefficients, iterations=1):
+def polynomial(A, x, b, coefficients, iterations=1, Dinv=None,
+               zero_guess=None, work=None):
     """Apply a polynomial smoother to the system Ax=b
 
 
@@ -694,13 +1044,26 @@ def polynomial(A, x, b, coefficients, iterations=1):
     A : sparse matrix
         Sparse NxN matrix
     x : ndarray
-        Approximate solution (length N)
+        Approximate solution (length N), or N x k multivector of
+        approximate solutions
     b : ndarray
-        Right-hand side (length N)
+        Right-hand side (length N), or N x k multivector of right-hand
+        sides
     coefficients : {array_like}
         Coefficients of the polynomial.  See Notes section for details.
     iterations : int
         Number of iterations to perform
+    Dinv : {array}
+        Diagonal scaling (length N), e.g., the inverse of the diagonal of A
+        for a Jacobi preconditioned polynomial.  None for no scaling.
+    zero_guess : {bool}
+        If True, x is assumed to be zero on entry, which saves the first
+        residual computation.  If None, x is checked for zeros.
+    work : {dict}
+        Holds the two work vectors of amg_core.polynomial_smoother between
+        calls, e.g., for a smoother called in every cycle.  They are
+        (re)allocated if x has a different shape or dtype.  If None, they
+        are allocated on each call.
 
     Returns
     -------
@@ -710,7 +1073,8 @@ def polynomial(A, x, b, coefficients, iterations=1):
     -----
     The smoother has the form  x[:] = x + p(A) (b - A*x) where p(A) is a
     polynomial in A whose scalar coefficients are specified (in descending
-    order) by argument 'coefficients'.
+    order) by argument 'coefficients'.  With Dinv, the smoother is
+    x[:] = x + p(Dinv*A) Dinv*(b - A*x).
 
     - Richardson iteration p(A) = c_0:
         polynomial_smoother(A, x, b, [c_0])
@@ -721,10 +1085,12 @@ def polynomial(A, x, b, coefficients, iterations=1):
     - Quadratic smoother p(A) = c_2*A^2 + c_1*A + c_0:
         polynomial_smoother(A, x, b, [c_2, c_1, c_0])
 
-    Here, Horner's Rule is applied to avoid computing A^k directly.
-
-    For efficience, the method detects the case x = 0 one matrix-vector
-    product is avoided (since (b - A*x) is b).
+    Here, Horner's Rule is applied to avoid computing A^k directly.  For
+    CSR and BSR matrices, the whole polynomial is instead applied in place
+    by amg_core.polynomial_smoother, with one threaded pass over A per
+    coefficient, see get_num_threads.  It adds each term c_j A^j r to x as
+    soon as A^j r is formed, so that only two work vectors are needed.  All
+    columns of an N x k multivector x are smoothed during each pass.
 
     Examples
     --------
@@ -745,20 +1111,51 @@ def polynomial(A, x, b, coefficients, iterations=1):
     >>> residuals=[]
     >>> x = sa.solve(b, x0=x0, tol=1e-8, residuals=residuals)
     """
-    A, x, b = make_system(A, x, b, formats=None)
+    A, x, b = make_system(A, x, b, formats=None, multivector=True)
 
-    for i in range(iterations):
-        from pyamg.util.linalg import norm
+    if zero_guess is None:
+        zero_guess = not x.any()
+
+    if sparse.isspmatrix_csr(A) or \
+       (sparse.isspmatrix_bsr(A) and A.blocksize[0] == A.blocksize[1]):
+        coefficients = np.ascontiguousarray(coefficients, dtype=A.dtype)
+        if Dinv is None:
+            Dinv = np.zeros(0, dtype=A.dtype)
+        else:
+            Dinv = np.ascontiguousarray(np.ravel(Dinv), dtype=A.dtype)
+        blocksize = A.blocksize[0] if sparse.isspmatrix_bsr(A) else 1
+        num_vectors = x.shape[1] if x.ndim == 2 else 1
+        if work is None:
+            work = {}
+        if work.get('key') != (x.shape, x.dtype):
+            work['key'] = (x.shape, x.dtype)
+            work['vectors'] = (np.empty_like(x), np.empty_like(x))
+        r, y = work['vectors']
+        amg_core.polynomial_smoother(A.indptr, A.indices, np.ravel(A.data),
+                                     np.ravel(x), np.ravel(b), Dinv,
+                                     coefficients, np.ravel(r), np.ravel(y),
+                                     blocksize, num_vectors, iterations,
+                                     int(zero_guess), get_num_threads())
+        return
+
+    if Dinv is not None and x.ndim == 2:
+        Dinv = np.reshape(Dinv, (-1, 1))
 
-        if norm(x) == 0:
+    for i in range(iterations):
+        if zero_guess and i == 0:
             residual = b
         else:
             residual = (b - A*x)
+        if Dinv is not None:
+            residual = Dinv*residual
 
         h = coefficients[0]*residual
 
         for c in coefficients[1:]:
-            h = c*residual + A*h
+            if Dinv is None:
+                h = c*residual + A*h
+            else:
+                h = c*residual + Dinv*(A*h)
 
         x += h
 
@@ -836,6 +1233,136 @@ def gauss_seidel_indexed(A, x, b,  indices, iterations=1, sweep='forward'):
                                       row_start, row_stop, row_step)
 
 
+def multicolor_gauss_seidel(A, x, b, indices=None, color_ptr=None,
+                            iterations=1, sweep='forward'):
+    """Perform multicolor Gauss-Seidel iteration on the linear system Ax=b
+
+    The unknowns are grouped into color classes, such that no two unknowns
+    of a class are coupled in A.  The classes are relaxed one after another,
+    and the unknowns of each class are relaxed concurrently by
+    get_num_threads() threads.  The result is independent of the number of
+    threads, and equals Gauss-Seidel with the unknowns ordered by color.
+
+    Parameters
+    ----------
+    A : csr_matrix
+        Sparse NxN matrix
+    x : ndarray
+        Approximate solution (length N)
+    b : ndarray
+        Right-hand side (length N)
+    indices : ndarray
+        Unknowns grouped by color, see multicolor_parameters
+    color_ptr : ndarray
+        Color c holds the unknowns indices[color_ptr[c]:color_ptr[c+1]]
+    iterations : int
+        Number of iterations to perform
+    sweep : {'forward','backward','symmetric'}
+        Order in which the colors are relaxed
+
+    Returns
+    -------
+    Nothing, x will be modified in place.
+
+    Notes
+    -----
+    If indices or color_ptr is None, the coloring of A computed by
+    multicolor_parameters is used.
+
+    Examples
+    --------
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.relaxation.relaxation import multicolor_gauss_seidel
+    >>> from pyamg.util.linalg import norm
+    >>> import numpy as np
+    >>> A = poisson((10,10), format='csr')
+    >>> x0 = np.zeros((A.shape[0],1))
+    >>> b = np.ones((A.shape[0],1))
+    >>> multicolor_gauss_seidel(A, x0, b, iterations=10)
+    >>> print(norm(b-A*x0) < 5.0)
+    True
+
+    """
+    A, x, b = make_system(A, x, b, formats=['csr'])
+
+    if indices is None or color_ptr is None:
+        indices, color_ptr = multicolor_parameters(A)
+
+    num_colors = len(color_ptr) - 1
+    if sweep == 'forward':
+        color_start, color_stop, color_step = 0, num_colors, 1
+    elif sweep == 'backward':
+        color_start, color_stop, color_step = num_colors-1, -1, -1
+    elif sweep == 'symmetric':
+        for iter in range(iterations):
+            multicolor_gauss_seidel(A, x, b, indices, color_ptr,
+                                    iterations=1, sweep='forward')
+            multicolor_gauss_seidel(A, x, b, indices, color_ptr,
+                                    iterations=1, sweep='backward')
+        return
+    else:
+        raise ValueError("valid sweep directions are 'forward',\
+                          'backward', and 'symmetric'")
+
+    n_threads = get_num_threads()
+    for iter in range(iterations):
+        amg_core.gauss_seidel_multicolor(A.indptr, A.indices, A.data, x, b,
+                                         indices, color_ptr, color_start,
+                                         color_stop, color_step, n_threads)
+
+
+def multicolor_parameters(A, method='MIS'):
+    """
+    Helper function for setting up multicolor Gauss-Seidel.  The coloring
+    is computed once and stored on A, so that it is shared by the pre and
+    post smoothers.
+
+    Parameters
+    ----------
+    A : {csr_matrix}
+        Matrix whose graph is colored.  A nonsymmetric sparsity pattern is
+        symmetrized first.
+    method : {string}
+        Coloring algorithm, see pyamg.graph.vertex_coloring
+
+    Returns
+    -------
+    indices : ndarray
+        Unknowns sorted by color
+    color_ptr : ndarray
+        Color c holds the unknowns indices[color_ptr[c]:color_ptr[c+1]]
+
+    Examples
+    --------
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.relaxation.relaxation import multicolor_parameters
+    >>> A = poisson((4,), format='csr')
+    >>> indices, color_ptr = multicolor_parameters(A)
+    >>> print(indices)
+    [0 2 1 3]
+    >>> print(color_ptr)
+    [0 2 4]
+    """
+    if hasattr(A, 'multicolor_parameters') and \
+            A.multicolor_parameters[0] == method:
+        return A.multicolor_parameters[1:]
+
+    # Color the graph of A + A.T, so that the unknowns of a color are not
+    # coupled in either direction
+    G = sparse.csr_matrix((np.ones(A.nnz), A.indices, A.indptr),
+                          shape=A.shape)
+    G = (G + G.T).tocsr()
+    colors = vertex_coloring(G, method=method)
+
+    indices = np.array(np.argsort(colors, kind='mergesort'), dtype=np.intc)
+    color_ptr = np.zeros(colors.max() + 2 if len(colors) else 1,
+                         dtype=np.intc)
+    np.cumsum(np.bincount(colors), out=color_ptr[1:])
+
+    A.multicolor_parameters = (method, indices, color_ptr)
+    return indices, color_ptr
+
+
 def jacobi_ne(A, x, b, iterations=1, omega=1.0):
     """Perform Jacobi iterations on the linear system A A.H x = A.H b
        (Also known as Cimmino relaxation)
@@ -1159,26 +1686,299 @@ def schwarz_parameters(A, subdomain=None, subdomain_ptr=None,
         _array_precision = {'f': 0, 'd': 1, 'g': 2, 'F': 0, 'D': 1, 'G': 2}
         cond = {0: feps*1e3, 1: eps*1e6, 2: geps*1e6}[_array_precision[t]]
 
-        # Invert each block column
-        my_pinv, = la.get_lapack_funcs(['gelss'],
-                                       (np.ones((1,), dtype=A.dtype)))
-        for i in range(subdomain_ptr.shape[0]-1):
-            m = blocksize[i]
-            rhs = sp.eye(m, m, dtype=A.dtype)
-            j0 = inv_subblock_ptr[i]
-            j1 = inv_subblock_ptr[i+1]
-            gelssoutput = my_pinv(inv_subblock[j0:j1].reshape(m, m),
-                                  rhs, cond=cond, overwrite_a=True,
-                                  overwrite_b=True)
-            inv_subblock[j0:j1] = np.ravel(gelssoutput[1])
+        # Invert the blocks
+        _pinv_subblocks(inv_subblock, inv_subblock_ptr, blocksize, cond)
 
     A.schwarz_parameters = (subdomain, subdomain_ptr, inv_subblock,
                             inv_subblock_ptr)
     return A.schwarz_parameters
 
 
+def _pinv_stack(stack, cond):
+    """Pseudo-inverses of a stack of square blocks, see _pinv_subblocks
+
+    The blocks are inverted by LU factorization, except for those that may
+    have a singular value below cond times the largest one, which are
+    inverted by numpy.linalg.pinv.  Since kappa_2 <= m * kappa_1 for m x m
+    blocks, the inverse equals the pseudo-inverse when m * kappa_1 is
+    below 1 / cond.
+    """
+    m = stack.shape[1]
+    try:
+        inverse = np.linalg.inv(stack)
+        regular = np.ones(stack.shape[0], dtype=bool)
+    except np.linalg.LinAlgError:
+        regular = np.linalg.slogdet(stack)[0] != 0
+        inverse = np.empty_like(stack)
+        inverse[regular] = np.linalg.inv(stack[regular])
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        kappa = np.abs(stack).sum(axis=1).max(axis=1) * \
+            np.abs(inverse).sum(axis=1).max(axis=1)
+        regular &= (m * kappa < 1.0 / cond)
+
+    if not regular.all():
+        inverse[~regular] = np.linalg.pinv(stack[~regular], rcond=cond)
+    return inverse
+
+
+def _pinv_subblocks(inv_subblock, inv_subblock_ptr, blocksize, cond):
+    """Replace each block of inv_subblock by its pseudo-inverse, in place
+
+    The blocks of equal size are stacked and inverted together, in chunks
+    of at most _SUBBLOCK_CHUNK entries, see _pinv_stack.  Singular values
+    below cond times the largest one are treated as zero, as by *gelss.
+    """
+    for m in np.unique(blocksize):
+        if m == 0:
+            continue
+        blocks = np.flatnonzero(blocksize == m)
+        step = max(1, _SUBBLOCK_CHUNK // (m*m))
+        for start in range(0, blocks.shape[0], step):
+            chunk = blocks[start:start+step]
+            entries = inv_subblock_ptr[chunk][:, np.newaxis] + \
+                np.arange(m*m, dtype=inv_subblock_ptr.dtype)
+            stack = inv_subblock[entries].reshape(-1, m, m)
+            inv_subblock[entries] = \
+                _pinv_stack(stack, cond).reshape(-1, m*m)
+
+
+def aggregate_schwarz(A, x, b, AggOp, iterations=1, overlap=0,
+                      sweep='forward', omega=1.0):
+    """Perform Schwarz relaxation on the linear system Ax=b, with the
+    aggregates of AggOp as subdomains
+
+    Parameters
+    ----------
+    A : {csr_matrix}
+        Sparse NxN matrix
+    x : ndarray
+        Approximate solution (length N)
+    b : ndarray
+        Right-hand side (length N)
+    AggOp : {csr_matrix}
+        Aggregation operator, see aggregation.standard_aggregation.  For a
+        matrix A with blocksize R, AggOp has N/R rows, and each aggregate
+        holds all the unknowns of its nodes.
+    iterations : int
+        Number of iterations to perform
+    overlap : int
+        Number of layers of neighbors in the graph of A added to each
+        aggregate
+    sweep : {'forward','backward','symmetric','additive'}
+        Direction of the multiplicative sweep over the subdomains, or
+        'additive' to correct all subdomains from the same residual
+    omega : scalar
+        Damping parameter of the additive variant, unused otherwise
+
+    Returns
+    -------
+    Nothing, x will be modified in place.
+
+    Notes
+    -----
+    The subdomain blocks are factored once with LU factorizations, see
+    aggregate_schwarz_parameters, and the subdomain solves of the additive
+    variant run in get_num_threads() threads.  Unknowns that belong to no
+    aggregate are subdomains on their own.  The additive variant converges
+    for symmetric positive definite A if omega is below 2 / rho, where rho
+    is the spectral radius of the additive Schwarz preconditioned A.
+
+    Examples
+    --------
+    >>> from pyamg.relaxation.relaxation import aggregate_schwarz
+    >>> from pyamg.aggregation import standard_aggregation
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.util.linalg import norm
+    >>> import numpy as np
+    >>> A = poisson((10,10), format='csr')
+    >>> AggOp = standard_aggregation(A)[0]
+    >>> x0 = np.zeros((A.shape[0],1))
+    >>> b = np.ones((A.shape[0],1))
+    >>> aggregate_schwarz(A, x0, b, AggOp, iterations=10, overlap=1)
+    >>> print(norm(b-A*x0) < 0.1)
+    True
+    """
+    A, x, b = make_system(A, x, b, formats=['csr'])
+    A.sort_indices()
+
+    subdomain, subdomain_ptr, lu, lu_ptr, piv = \
+        aggregate_schwarz_parameters(A, AggOp, overlap)
+    nsdomains = subdomain_ptr.shape[0] - 1
+
+    if sweep == 'additive':
+        temp = np.empty_like(x)
+        z = np.empty(subdomain.shape[0], dtype=x.dtype)
+        [omega] = type_prep(A.dtype, [omega])
+        n_threads = get_num_threads()
+        for iter in range(iterations):
+            amg_core.additive_lu_schwarz_csr(A.indptr, A.indices, A.data, x,
+                                             b, lu, lu_ptr, piv, subdomain,
+                                             subdomain_ptr, temp, z, omega,
+                                             nsdomains, n_threads)
+        return
+
+    if sweep == 'forward':
+        sweeps = [(0, nsdomains, 1)]
+    elif sweep == 'backward':
+        sweeps = [(nsdomains-1, -1, -1)]
+    elif sweep == 'symmetric':
+        sweeps = [(0, nsdomains, 1), (nsdomains-1, -1, -1)]
+    else:
+        raise ValueError("valid sweep directions are 'forward', 'backward',"
+                         " 'symmetric' and 'additive'")
+
+    for iter in range(iterations):
+        for row_start, row_stop, row_step in sweeps:
+            amg_core.lu_schwarz_csr(A.indptr, A.indices, A.data, x, b, lu,
+                                    lu_ptr, piv, subdomain, subdomain_ptr,
+                                    nsdomains, A.shape[0], row_start,
+                                    row_stop, row_step)
+
+
+def aggregate_subdomains(A, AggOp, overlap=0):
+    """Subdomains formed by the aggregates of AggOp
+
+    Parameters
+    ----------
+    A : {sparse matrix}
+        Sparse NxN matrix, whose graph defines the overlap
+    AggOp : {sparse matrix}
+        Aggregation operator, with N/R rows for blocksize R
+    overlap : int
+        Number of layers of neighbors added to each aggregate
+
+    Returns
+    -------
+    subdomain : array
+        Sorted unknowns of each subdomain, see schwarz
+    subdomain_ptr : array
+        Pointer in subdomain, subdomain i holds the unknowns
+        subdomain[subdomain_ptr[i]:subdomain_ptr[i+1]]
+
+    Notes
+    -----
+    Subdomain i is aggregate i, for the aggregates of AggOp, and the
+    unknowns outside of all aggregates follow as one subdomain each.
+
+    Examples
+    --------
+    >>> from scipy.sparse import csr_matrix
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.relaxation.relaxation import aggregate_subdomains
+    >>> A = poisson((5,), format='csr')
+    >>> AggOp = csr_matrix(([1, 1, 1, 1], [0, 0, 1, 1], [0, 1, 2, 3, 4, 4]))
+    >>> subdomain, subdomain_ptr = aggregate_subdomains(A, AggOp, overlap=1)
+    >>> print(subdomain)
+    [0 1 2 1 2 3 4 3 4]
+    >>> print(subdomain_ptr)
+    [0 3 7 9]
+    """
+    n = A.shape[0]
+    R = n // AggOp.shape[0]
+    if AggOp.shape[0] * R != n:
+        raise ValueError('AggOp and A have incompatible dimensions')
+    overlap = int(overlap)
+    if overlap < 0:
+        raise ValueError('overlap must be nonnegative')
+
+    # unknowns x subdomains pattern, with singletons for the unaggregated
+    T = sparse.csr_matrix(AggOp, dtype=np.int8)
+    T.data[:] = 1
+    T.eliminate_zeros()
+    if R > 1:
+        T = sparse.kron(T, np.ones((R, 1), dtype=np.int8), format='csr')
+    free = np.flatnonzero(np.diff(T.indptr) == 0)
+    if free.shape[0]:
+        S = sparse.csr_matrix((np.ones(free.shape[0], dtype=np.int8),
+                               (free, np.arange(free.shape[0]))),
+                              shape=(n, free.shape[0]))
+        T = sparse.hstack([T, S], format='csr')
+
+    if overlap > 0:
+        A = A.tocsr()
+        G = sparse.csr_matrix((np.ones(A.indices.shape[0], dtype=np.int8),
+                               A.indices, A.indptr), shape=A.shape)
+        for k in range(overlap):
+            T = T + G * T
+            T.data[:] = 1
+
+    T = T.tocsc()
+    T.sort_indices()
+    subdomain = np.asarray(T.indices, dtype=np.intc)
+    subdomain_ptr = np.asarray(T.indptr, dtype=np.intc)
+    return subdomain, subdomain_ptr
+
+
+def aggregate_schwarz_parameters(A, AggOp, overlap=0):
+    """
+    Helper function for setting up aggregate_schwarz.  The subdomains of the
+    aggregates of AggOp and the LU factorizations of their blocks of A are
+    stored on A for each overlap, so that they are computed once for the
+    pre and post smoothers.
+
+    Parameters
+    ----------
+    A : {csr_matrix}
+        Sparse NxN matrix, with sorted indices
+    AggOp : {sparse matrix}
+        Aggregation operator, see aggregate_subdomains
+    overlap : int
+        Number of layers of neighbors added to each aggregate
+
+    Returns
+    -------
+    subdomain, subdomain_ptr : array
+        Subdomains, see aggregate_subdomains
+    lu : array
+        LU factorization with partial pivoting of the block of A on each
+        subdomain, stored in row major as by scipy.linalg.lu_factor
+    lu_ptr : array
+        Pointer in lu, the factors of subdomain i are
+        lu[lu_ptr[i]:lu_ptr[i+1]]
+    piv : array
+        Pivot indices of the factorizations, the same length as subdomain
+
+    Notes
+    -----
+    The blocks are factored together by amg_core.lu_factor_blocks, in
+    get_num_threads() threads.  The solves with a singular block set the
+    unknowns of its zero pivots to zero.
+    """
+    AggOp = sparse.csr_matrix(AggOp)
+
+    # check that existing parameters correspond to the same aggregates
+    if not hasattr(A, 'aggregate_schwarz_parameters'):
+        A.aggregate_schwarz_parameters = {}
+    if overlap in A.aggregate_schwarz_parameters:
+        indptr, indices, parameters = A.aggregate_schwarz_parameters[overlap]
+        if np.array_equal(indptr, AggOp.indptr) and \
+           np.array_equal(indices, AggOp.indices):
+            return parameters
+
+    subdomain, subdomain_ptr = aggregate_subdomains(A, AggOp, overlap)
+    nsdomains = subdomain_ptr.shape[0] - 1
+    blocksize = np.diff(subdomain_ptr)
+    lu_ptr = np.zeros(subdomain_ptr.shape, dtype=np.intc)
+    lu_ptr[1:] = np.cumsum(blocksize*blocksize)
+    lu = np.zeros((lu_ptr[-1],), dtype=A.dtype)
+    piv = np.zeros(subdomain.shape, dtype=np.intc)
+
+    amg_core.extract_subblocks(A.indptr, A.indices, A.data, lu, lu_ptr,
+                               subdomain, subdomain_ptr, nsdomains,
+                               A.shape[0])
+    amg_core.lu_factor_blocks(lu, lu_ptr, piv, subdomain_ptr, nsdomains,
+                              get_num_threads())
+
+    parameters = (subdomain, subdomain_ptr, lu, lu_ptr, piv)
+    A.aggregate_schwarz_parameters[overlap] = (AggOp.indptr.copy(),
+                                               AggOp.indices.copy(),
+                                               parameters)
+    return parameters
+
+
 def CF_jacobi(A, x, b, Cpts, Fpts, iterations=1, F_iterations=1,
-              C_iterations=1, omega=1.0):
+              C_iterations=1, omega=1.0, Dinv=None):
     """Perform CF Jacobi iteration on the linear system Ax=b, that is
 
         x_c = (1-omega)x_c + omega*Dff^{-1}(b_c - Acf*xf - Acc*xc)
@@ -1188,7 +1988,7 @@ def CF_jacobi(A, x, b, Cpts, Fpts, iterations=1, F_iterations=1,
 
     Parameters
     ----------
-    A : csr_matrix
+    A : csr_matrix or bsr_matrix
         Sparse NxN matrix
     x : ndarray
         Approximate solution (length N)
@@ -1206,38 +2006,27 @@ def CF_jacobi(A, x, b, Cpts, Fpts, iterations=1, F_iterations=1,
         Number of sweeps of C-relaxation to perform
     omega : scalar
         Damping parameter
+    Dinv : ndarray
+        Inverse of the diagonal of A (length N), e.g., from
+        get_diagonal(A, inv=True).  If None, the diagonal is found in each
+        sweep.
 
     Returns
     -------
     Nothing, x will be modified in place.
-    """
-    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
-
-    # Create uniform type, convert possibly complex scalars to length 1 arrays
-    [omega] = type_prep(A.dtype, [omega])
-
-    if sparse.isspmatrix_csr(A):
-        for iter in range(iterations):
-            for Citer in range(C_iterations):
-                amg_core.jacobi_indexed(A.indptr, A.indices, A.data, x, b, Cpts, omega)
-            for Fiter in range(F_iterations):
-                amg_core.jacobi_indexed(A.indptr, A.indices, A.data, x, b, Fpts, omega)
-    else:
-        R, C = A.blocksize
-        if R != C:
-            raise ValueError('BSR blocks must be square')
 
-        for iter in range(iterations):
-            for Citer in range(C_iterations):
-                amg_core.bsr_jacobi_indexed(A.indptr, A.indices, np.ravel(A.data),
-                                            x, b, Cpts, R, omega)
-            for Fiter in range(F_iterations):
-                amg_core.bsr_jacobi_indexed(A.indptr, A.indices, np.ravel(A.data),
-                                            x, b, Fpts, R, omega)
+    Notes
+    -----
+    All sweeps run in one call to amg_core.cf_jacobi, in parallel threads,
+    see pyamg.util.utils.set_num_threads.  The points of a BSR matrix are
+    its block rows, which are relaxed point-wise.
+    """
+    _cf_jacobi(A, x, b, Cpts, Fpts, iterations, F_iterations, C_iterations,
+               omega, Dinv, F_first=False)
 
 
 def FC_jacobi(A, x, b, Cpts, Fpts, iterations=1, F_iterations=1,
-              C_iterations=1, omega=1.0):
+              C_iterations=1, omega=1.0, Dinv=None):
     """Perform FC Jacobi iteration on the linear system Ax=b, that is
 
         x_f = (1-omega)x_f + omega*Dff^{-1}(b_f - Aff*xf - Afc*xc)
@@ -1247,7 +2036,7 @@ def FC_jacobi(A, x, b, Cpts, Fpts, iterations=1, F_iterations=1,
 
     Parameters
     ----------
-    A : csr_matrix
+    A : csr_matrix or bsr_matrix
         Sparse NxN matrix
     x : ndarray
         Approximate solution (length N)
@@ -1265,34 +2054,50 @@ def FC_jacobi(A, x, b, Cpts, Fpts, iterations=1, F_iterations=1,
         Number of sweeps of C-relaxation to perform
     omega : scalar
         Damping parameter
+    Dinv : ndarray
+        Inverse of the diagonal of A (length N), e.g., from
+        get_diagonal(A, inv=True).  If None, the diagonal is found in each
+        sweep.
 
     Returns
     -------
     Nothing, x will be modified in place.
+
+    Notes
+    -----
+    All sweeps run in one call to amg_core.cf_jacobi, in parallel threads,
+    see pyamg.util.utils.set_num_threads.  The points of a BSR matrix are
+    its block rows, which are relaxed point-wise.
     """
-    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
+    _cf_jacobi(A, x, b, Cpts, Fpts, iterations, F_iterations, C_iterations,
+               omega, Dinv, F_first=True)
 
-    # Create uniform type, convert possibly complex scalars to length 1 arrays
-    [omega] = type_prep(A.dtype, [omega])
+
+def _cf_jacobi(A, x, b, Cpts, Fpts, iterations, F_iterations, C_iterations,
+               omega, Dinv, F_first):
+    """CF_jacobi, or FC_jacobi if F_first, with the fused amg_core kernel"""
+    A, x, b = make_system(A, x, b, formats=['csr', 'bsr'])
 
     if sparse.isspmatrix_csr(A):
-        for iter in range(iterations):
-            for Fiter in range(F_iterations):
-                amg_core.jacobi_indexed(A.indptr, A.indices, A.data, x, b, Fpts, omega)
-            for Citer in range(C_iterations):
-                amg_core.jacobi_indexed(A.indptr, A.indices, A.data, x, b, Cpts, omega)
+        R = 1
     else:
         R, C = A.blocksize
         if R != C:
             raise ValueError('BSR blocks must be square')
 
-        for iter in range(iterations):
-            for Fiter in range(F_iterations):
-                amg_core.bsr_jacobi_indexed(A.indptr, A.indices, np.ravel(A.data),
-                                            x, b, Fpts, R, omega)
-            for Citer in range(C_iterations):
-                amg_core.bsr_jacobi_indexed(A.indptr, A.indices, np.ravel(A.data),
-                                            x, b, Cpts, R, omega)
+    # Create uniform type, convert possibly complex scalars to length 1 arrays
+    [omega] = type_prep(A.dtype, [omega])
+    if Dinv is None:
+        Dinv = np.zeros(0, dtype=A.dtype)
+    else:
+        Dinv = np.ascontiguousarray(np.ravel(Dinv), dtype=A.dtype)
+    Cpts = np.ascontiguousarray(Cpts, dtype=A.indices.dtype)
+    Fpts = np.ascontiguousarray(Fpts, dtype=A.indices.dtype)
+    temp = np.empty(R * max(len(Cpts), len(Fpts)), dtype=x.dtype)
+
+    amg_core.cf_jacobi(A.indptr, A.indices, np.ravel(A.data), x, b, Dinv,
+                       Cpts, Fpts, temp, R, iterations, C_iterations,
+                       F_iterations, int(F_first), omega, get_num_threads())
 
 
 def CF_block_jacobi(A, x, b, Cpts, Fpts, Dinv=None, blocksize=1, iterations=1,
@@ -2,12 +2,15 @@
 """
 from __future__ import absolute_import
 
+import threading
 import scipy as sp
 import numpy as np
 from . import relaxation
 from .chebyshev import chebyshev_polynomial_coefficients
-from pyamg.util.utils import scale_rows, get_block_diag, get_diagonal, unpack_arg
-from pyamg.util.linalg import approximate_spectral_radius
+from pyamg.util.utils import get_block_diag, get_diagonal, \
+    unpack_arg, get_num_threads
+from pyamg.util.linalg import approximate_spectral_radius, \
+    estimate_spectral_radius
 from pyamg.krylov import gmres, cgne, cgnr, cg
 
 __docformat__ = "restructuredtext en"
@@ -22,9 +25,16 @@ DEFAULT_SWEEP = 'forward'
 DEFAULT_NITER = 1
 # List of by-definition symmetric relaxation schemes, e.g. Jacobi.
 SYMMETRIC_RELAXATION = ['jacobi', 'richardson', 'block_jacobi',
-                        'jacobi_ne', 'chebyshev', None ]
+                        'jacobi_ne', 'chebyshev', 'l1_jacobi', None ]
 # List of supported Krylov relaxation schemes
 KRYLOV_RELAXATION = ['cg', 'cgne', 'cgnr', 'gmres']
+# List of relaxation schemes that accept n x k multivectors x and b
+MULTIVECTOR_RELAXATION = ['gauss_seidel', 'jacobi', 'block_gauss_seidel',
+                          'block_jacobi', 'sor', 'richardson', 'chebyshev',
+                          None]
+# List of relaxation schemes whose smoothers accept zero_guess=True, passed
+# by the multigrid cycle when x is known to be zero
+ZERO_GUESS_RELAXATION = ['richardson', 'chebyshev']
 
 def change_smoothers(ml, presmoother, postsmoother):
     '''
@@ -74,7 +84,33 @@ def change_smoothers(ml, presmoother, postsmoother):
       methods is scaled by the spectral radius of the matrix on
       each level.  Therefore 'omega' should be in the interval (0,2).
     - Parameter 'withrho' (default: True) controls whether the omega is
-      rescaled by the spectral radius in jacobi, block_jacobi, and jacobi_ne
+      rescaled by the spectral radius in jacobi, block_jacobi, jacobi_ne,
+      and aggregate_schwarz with sweep='additive'
+    - Parameter 'rho_estimator' (default: 'arnoldi') of jacobi,
+      block_jacobi, richardson and chebyshev selects the spectral radius
+      estimate, see spectral_bounds: 'arnoldi', 'lanczos' (for Hermitian
+      matrices), or 'gershgorin', an upper bound that needs no iteration.
+      The estimates start from the dominant eigenvectors of the previous
+      setup of the level, e.g., before multilevel_solver.update, or else
+      from those of the finer level.
+    - Parameter 'diagonal_scaling' (default: False) of chebyshev applies
+      the polynomial to diag(A)^-1 A, i.e., Jacobi preconditioned
+      Chebyshev.  Parameter 'zero_guess' (default: None) of chebyshev tells
+      the smoother that the initial guess is (True) or is not (False)
+      zero, which skips checking it for zeros.  Only None is safe in a
+      multigrid cycle: the cycle itself passes zero_guess=True to the
+      richardson and chebyshev presmoothers of the coarse levels, whose
+      initial guess is zero right after the restriction.
+    - Parameter 'blocks' (default: None) of hybrid_gauss_seidel is the
+      number of blocks relaxed concurrently.  With None, it is
+      get_num_threads() at the time each smoother runs, so that
+      set_num_threads may be called after the setup, but the result then
+      depends on the number of threads.  Give blocks explicitly for a
+      smoother that does not.
+    - aggregate_schwarz uses the aggregates of a smoothed aggregation
+      hierarchy, lvl.AggOp, as subdomains, extended by 'overlap' layers of
+      neighbors.  Its subdomain blocks are LU factored, and the 'additive'
+      sweep solves the subdomains in parallel threads.
     - By initializing the smoothers after the hierarchy has been setup, allows
       for "algebraically" directed relaxation, such as strength_based_schwarz,
       which uses only the strong connections of a degree-of-freedom to define
@@ -83,7 +119,10 @@ def change_smoothers(ml, presmoother, postsmoother):
 
         gauss_seidel
         block_gauss_seidel
+        multicolor_gauss_seidel
+        hybrid_gauss_seidel
         jacobi
+        l1_jacobi
         block_jacobi
         richardson
         sor
@@ -97,6 +136,7 @@ def change_smoothers(ml, presmoother, postsmoother):
         cgnr
         schwarz
         strength_based_schwarz
+        aggregate_schwarz
         None
 
     Examples
@@ -132,6 +172,9 @@ def change_smoothers(ml, presmoother, postsmoother):
 
     ml.symmetric_smoothing = True
 
+    # packed smoother parameters of a frozen hierarchy are out of date
+    ml.frozen = None
+
     # interpret arguments into list
     if isinstance(presmoother, str) or isinstance(presmoother, tuple) or\
        (presmoother is None):
@@ -154,6 +197,8 @@ def change_smoothers(ml, presmoother, postsmoother):
     min_len = min(len(presmoother), len(postsmoother), len(ml.levels[:-1]))
     same = (len(presmoother) == len(postsmoother))
     for i in range(0, min_len):
+        _restrict_spectral_vectors(ml, i)
+
         # unpack presmoother[i]
         fn1, kwargs1 = unpack_arg(presmoother[i], cost=False)
         # get function handle
@@ -228,7 +273,8 @@ def change_smoothers(ml, presmoother, postsmoother):
                     sweep2 = DEFAULT_SWEEP
                 if  (sweep1 == 'forward' and sweep2 == 'backward') or \
                     (sweep1 == 'backward' and sweep2 == 'forward') or \
-                    (sweep1 == 'symmetric' and sweep2 == 'symmetric'):
+                    (sweep1 == 'symmetric' and sweep2 == 'symmetric') or \
+                    (sweep1 == 'additive' and sweep2 == 'additive'):
                     pass
                 else:
                     ml.symmetric_smoothing = False
@@ -236,6 +282,8 @@ def change_smoothers(ml, presmoother, postsmoother):
     if len(presmoother) < len(postsmoother):
         mid_len = min(len(postsmoother), len(ml.levels[:-1]))
         for i in range(min_len, mid_len):
+            _restrict_spectral_vectors(ml, i)
+
             # Set up presmoother
             ml.levels[i].presmoother = setup_presmoother(ml.levels[i], **kwargs1)
             
@@ -312,6 +360,8 @@ def change_smoothers(ml, presmoother, postsmoother):
     elif len(presmoother) > len(postsmoother):
         mid_len = min(len(presmoother), len(ml.levels[:-1]))
         for i in range(min_len, mid_len):
+            _restrict_spectral_vectors(ml, i)
+
             # unpack presmoother[i]
             fn1, kwargs1 = unpack_arg(presmoother[i], cost=False)
             # get function handle
@@ -390,6 +440,7 @@ def change_smoothers(ml, presmoother, postsmoother):
 
     # Fill in remaining levels
     for i in range(mid_len, len(ml.levels[:-1])):
+        _restrict_spectral_vectors(ml, i)
         ml.levels[i].presmoother = setup_presmoother(ml.levels[i], **kwargs1)
         ml.levels[i].postsmoother = setup_postsmoother(ml.levels[i], **kwargs2)
         ml.levels[i].smoothers['presmoother'] = [fn1, kwargs1]
@@ -421,8 +472,7 @@ def rho_D_inv_A(A):
 
     if not hasattr(A, 'rho_D_inv'):
         D_inv = get_diagonal(A, inv=True)
-        D_inv_A = scale_rows(A, D_inv, copy=True)
-        A.rho_D_inv = approximate_spectral_radius(D_inv_A)
+        A.rho_D_inv = estimate_spectral_radius(A, Dinv=D_inv)
 
     return A.rho_D_inv
 
@@ -454,27 +504,178 @@ def rho_block_D_inv_A(A, Dinv):
     """
 
     if not hasattr(A, 'rho_block_D_inv'):
-        from scipy.sparse.linalg import LinearOperator
-
         blocksize = Dinv.shape[1]
         if Dinv.shape[1] != Dinv.shape[2]:
             raise ValueError('Dinv has incorrect dimensions')
         elif Dinv.shape[0] != int(A.shape[0]/blocksize):
             raise ValueError('Dinv and A have incompatible dimensions')
 
-        Dinv = sp.sparse.bsr_matrix((Dinv,
-                                    sp.arange(Dinv.shape[0]),
-                                    sp.arange(Dinv.shape[0]+1)),
-                                    shape=A.shape)
+        # Dinv*A is not formed explicitly
+        A.rho_block_D_inv = estimate_spectral_radius(A, Dinv=Dinv)
+
+    return A.rho_block_D_inv
+
+
+def rho_aggregate_schwarz(A, AggOp, overlap=0):
+    """
+    Return the (approx.) spectral radius of M^-1 * A, for the additive
+    Schwarz preconditioner M^-1 on the aggregates of AggOp
+
+    Parameters
+    ----------
+    A : {csr_matrix}
+        Sparse NxN matrix, with sorted indices
+    AggOp : {sparse matrix}
+        Aggregation operator, see relaxation.aggregate_subdomains
+    overlap : int
+        Number of layers of neighbors added to each aggregate
+
+    Returns
+    -------
+    approximate spectral radius of M^-1 A
+
+    Examples
+    --------
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.aggregation import standard_aggregation
+    >>> from pyamg.relaxation.smoothing import rho_aggregate_schwarz
+    >>> A = poisson((10,10), format='csr')
+    >>> AggOp = standard_aggregation(A)[0]
+    >>> print(1.0 < rho_aggregate_schwarz(A, AggOp, overlap=1) < 4.0)
+    True
+    """
+    if not hasattr(A, 'rho_aggregate_schwarz'):
+        A.rho_aggregate_schwarz = {}
+
+    if overlap not in A.rho_aggregate_schwarz:
+        from scipy.sparse.linalg import LinearOperator
 
-        # Don't explicitly form Dinv*A
+        # one additive sweep from a zero guess applies M^-1
         def matvec(x):
-            return Dinv*(A*x)
-        D_inv_A = LinearOperator(A.shape, matvec, dtype=A.dtype)
+            y = np.zeros_like(x)
+            relaxation.aggregate_schwarz(A, y, A*x, AggOp, overlap=overlap,
+                                         sweep='additive', omega=1.0)
+            return y
+        M_inv_A = LinearOperator(A.shape, matvec, dtype=A.dtype)
 
-        A.rho_block_D_inv = approximate_spectral_radius(D_inv_A)
+        A.rho_aggregate_schwarz[overlap] = \
+            approximate_spectral_radius(M_inv_A)
 
-    return A.rho_block_D_inv
+    return A.rho_aggregate_schwarz[overlap]
+
+
+# Attributes of A caching the Arnoldi estimates, shared with rho_D_inv_A and
+# rho_block_D_inv_A
+_RHO_ATTRIBUTES = {None: 'rho', 'diagonal': 'rho_D_inv',
+                   'block': 'rho_block_D_inv'}
+
+
+def spectral_bounds(lvl, scaling=None, method='arnoldi', Dinv=None):
+    """
+    Return the (approx.) spectral radius of A, D^-1 * A or block D^-1 * A
+    on a level
+
+    Parameters
+    ----------
+    lvl : {multilevel_solver.level}
+        Level with the matrix A
+    scaling : {None, 'diagonal', 'block'}
+        None for A, 'diagonal' for diag(A)^-1 A and 'block' for Dinv A
+    method : {string}
+        'arnoldi', 'lanczos' or 'gershgorin', see
+        pyamg.util.linalg.estimate_spectral_radius
+    Dinv : {array}
+        Inverse of the diagonal blocks of A, size (N/blocksize, blocksize,
+        blocksize), required for scaling='block'
+
+    Returns
+    -------
+    approximate spectral radius of A, D^-1 A or Dinv A
+
+    Notes
+    -----
+    The estimate is cached on lvl.A, so that it is computed once for all
+    the smoothers of the level.  The Arnoldi estimates are the attributes
+    rho, rho_D_inv and rho_block_D_inv of A, as set by
+    approximate_spectral_radius, rho_D_inv_A and rho_block_D_inv_A.
+
+    The approximate dominant eigenvector of each scaling is kept in the
+    dictionary lvl.spectral_vectors, and starts the iteration of the next
+    estimate.  It survives a new matrix with the same hierarchy, see
+    multilevel_solver.update, and change_smoothers initializes the vectors
+    of a level without estimates from the restricted vectors of the finer
+    level.
+
+    Examples
+    --------
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.multilevel import multilevel_solver
+    >>> from pyamg.relaxation.smoothing import spectral_bounds
+    >>> lvl = multilevel_solver.level()
+    >>> lvl.A = poisson((10,10), format='csr')
+    >>> print(spectral_bounds(lvl, 'diagonal', method='gershgorin'))
+    2.0
+    """
+    if scaling not in _RHO_ATTRIBUTES:
+        raise ValueError('unknown scaling (%s)' % scaling)
+
+    A = lvl.A
+    if method == 'arnoldi':
+        rho = getattr(A, _RHO_ATTRIBUTES[scaling], None)
+    else:
+        rho = getattr(A, 'spectral_bounds', {}).get((scaling, method))
+    if rho is not None:
+        return rho
+
+    if scaling == 'diagonal':
+        Dinv = get_diagonal(A, inv=True)
+    elif scaling == 'block' and Dinv is None:
+        raise ValueError('Dinv is required for the block scaling')
+    elif scaling is None:
+        Dinv = None
+
+    if not hasattr(lvl, 'spectral_vectors'):
+        lvl.spectral_vectors = {}
+    guess = lvl.spectral_vectors.get(scaling)
+    if guess is not None and guess.shape[0] != A.shape[0]:
+        guess = None
+
+    rho, vector = estimate_spectral_radius(A, method=method, Dinv=Dinv,
+                                           initial_guess=guess,
+                                           return_vector=True)
+    if vector is not None and np.isfinite(vector).all():
+        lvl.spectral_vectors[scaling] = vector
+
+    if method == 'arnoldi':
+        setattr(A, _RHO_ATTRIBUTES[scaling], rho)
+    else:
+        if not hasattr(A, 'spectral_bounds'):
+            A.spectral_bounds = {}
+        A.spectral_bounds[(scaling, method)] = rho
+
+    return rho
+
+
+def _restrict_spectral_vectors(ml, i):
+    """Start the spectral radius estimates of level i from those of level i-1
+
+    The dominant eigenvectors of level i-1 are restricted with its R, for
+    the scalings without a vector on level i, e.g., from a previous setup.
+    """
+    if i == 0 or not hasattr(ml.levels[i-1], 'spectral_vectors') or \
+       not hasattr(ml.levels[i-1], 'R'):
+        return
+
+    fine, coarse = ml.levels[i-1], ml.levels[i]
+    if not hasattr(coarse, 'spectral_vectors'):
+        coarse.spectral_vectors = {}
+    for scaling, vector in fine.spectral_vectors.items():
+        if scaling in coarse.spectral_vectors:
+            continue
+        vector = np.ravel(fine.R * vector)
+        # a smooth restriction may remove the oscillatory vector
+        if np.isfinite(vector).all() and np.abs(vector).max() > 0:
+            coarse.spectral_vectors[scaling] = vector
 
 
 def matrix_asformat(lvl, name, format, blocksize=None):
@@ -550,9 +751,45 @@ def setup_gauss_seidel(lvl, iterations=DEFAULT_NITER, sweep=DEFAULT_SWEEP):
     return smoother
 
 
-def setup_jacobi(lvl, iterations=DEFAULT_NITER, omega=1.0, withrho=True):
+def setup_multicolor_gauss_seidel(lvl, iterations=DEFAULT_NITER,
+                                  sweep=DEFAULT_SWEEP, method='MIS'):
+    # the coloring is stored on lvl.Acsr and shared by pre and post smoothers
+    matrix_asformat(lvl, 'A', 'csr')
+    indices, color_ptr = relaxation.multicolor_parameters(lvl.Acsr,
+                                                          method=method)
+
+    def smoother(A, x, b):
+        relaxation.multicolor_gauss_seidel(lvl.Acsr, x, b, indices=indices,
+                                           color_ptr=color_ptr,
+                                           iterations=iterations, sweep=sweep)
+    return smoother
+
+
+def setup_hybrid_gauss_seidel(lvl, iterations=DEFAULT_NITER,
+                              sweep=DEFAULT_SWEEP, omega=1.0, blocks=None):
+    # with blocks=None, each call uses get_num_threads() blocks, and the l1
+    # parameters for each number of blocks are cached on A
+    relaxation.l1_parameters(lvl.A, blocks or get_num_threads())
+
+    def smoother(A, x, b):
+        relaxation.hybrid_gauss_seidel(A, x, b, iterations=iterations,
+                                       sweep=sweep, omega=omega,
+                                       blocks=blocks)
+    return smoother
+
+
+def setup_l1_jacobi(lvl, iterations=DEFAULT_NITER, omega=1.0):
+    relaxation.l1_parameters(lvl.A)
+
+    def smoother(A, x, b):
+        relaxation.l1_jacobi(A, x, b, iterations=iterations, omega=omega)
+    return smoother
+
+
+def setup_jacobi(lvl, iterations=DEFAULT_NITER, omega=1.0, withrho=True,
+                 rho_estimator='arnoldi'):
     if withrho:
-        omega = omega/rho_D_inv_A(lvl.A)
+        omega = omega/spectral_bounds(lvl, 'diagonal', rho_estimator)
 
     def smoother(A, x, b):
         relaxation.jacobi(A, x, b, iterations=iterations, omega=omega)
@@ -592,8 +829,29 @@ def setup_strength_based_schwarz(lvl, iterations=DEFAULT_NITER, sweep=DEFAULT_SW
                          subdomain_ptr=subdomain_ptr, sweep=sweep)
 
 
+def setup_aggregate_schwarz(lvl, iterations=DEFAULT_NITER, sweep=DEFAULT_SWEEP,
+                            overlap=0, omega=1.0, withrho=True):
+    # Use the aggregates of the level, extended by overlap layers of
+    # neighbors, as subdomains
+    if not hasattr(lvl, 'AggOp'):
+        raise ValueError('aggregate_schwarz requires the aggregation '
+                         'operator AggOp of the level')
+
+    Acsr = matrix_asformat(lvl, 'A', 'csr')
+    Acsr.sort_indices()
+    relaxation.aggregate_schwarz_parameters(Acsr, lvl.AggOp, overlap)
+    if sweep == 'additive' and withrho:
+        omega = omega/rho_aggregate_schwarz(Acsr, lvl.AggOp, overlap)
+
+    def smoother(A, x, b):
+        relaxation.aggregate_schwarz(Acsr, x, b, lvl.AggOp,
+                                     iterations=iterations, overlap=overlap,
+                                     sweep=sweep, omega=omega)
+    return smoother
+
+
 def setup_block_jacobi(lvl, iterations=DEFAULT_NITER, omega=1.0, Dinv=None,
-                       blocksize=None, withrho=True):
+                       blocksize=None, withrho=True, rho_estimator='arnoldi'):
     # Determine Blocksize
     if blocksize is None and Dinv is None:
         if sp.sparse.isspmatrix_csr(lvl.A):
@@ -606,13 +864,13 @@ def setup_block_jacobi(lvl, iterations=DEFAULT_NITER, omega=1.0, Dinv=None,
     if blocksize == 1:
         # Block Jacobi is equivalent to normal Jacobi
         return setup_jacobi(lvl, iterations=iterations, omega=omega,
-                            withrho=withrho)
+                            withrho=withrho, rho_estimator=rho_estimator)
     else:
         # Use Block Jacobi
         if Dinv is None:
             Dinv = get_block_diag(lvl.A, blocksize=blocksize, inv_flag=True)
         if withrho:
-            omega = omega/rho_block_D_inv_A(lvl.A, Dinv)
+            omega = omega/spectral_bounds(lvl, 'block', rho_estimator, Dinv)
 
         def smoother(A, x, b):
             relaxation.block_jacobi(A, x, b, iterations=iterations,
@@ -648,15 +906,38 @@ def setup_block_gauss_seidel(lvl, iterations=DEFAULT_NITER, sweep=DEFAULT_SWEEP,
         return smoother
 
 
-def setup_richardson(lvl, iterations=DEFAULT_NITER, omega=1.0):
-    omega = omega/approximate_spectral_radius(lvl.A)
+def _setup_polynomial(lvl, coefficients, iterations, Dinv=None,
+                      zero_guess=None):
+    """Smoother applying relaxation.polynomial
 
-    def smoother(A, x, b):
-        relaxation.polynomial(A, x, b, coefficients=[omega],
-                              iterations=iterations)
+    The two work vectors of the polynomial are allocated at the setup and
+    kept by the smoother.  A call made while another one is running, e.g.,
+    by a solve in another thread, allocates its own.  The smoother takes
+    an optional zero_guess, which overrides the one given here.
+    """
+    r = np.empty(lvl.A.shape[0], dtype=lvl.A.dtype)
+    work = {'key': (r.shape, r.dtype), 'vectors': (r, np.empty_like(r))}
+    work_lock = threading.Lock()
+
+    def smoother(A, x, b, zero_guess=zero_guess):
+        shared = work_lock.acquire(False)
+        try:
+            relaxation.polynomial(A, x, b, coefficients=coefficients,
+                                  iterations=iterations, Dinv=Dinv,
+                                  zero_guess=zero_guess,
+                                  work=work if shared else None)
+        finally:
+            if shared:
+                work_lock.release()
     return smoother
 
 
+def setup_richardson(lvl, iterations=DEFAULT_NITER, omega=1.0,
+                     rho_estimator='arnoldi'):
+    omega = omega/spectral_bounds(lvl, None, rho_estimator)
+    return _setup_polynomial(lvl, [omega], iterations)
+
+
 def setup_sor(lvl, omega=0.5, iterations=DEFAULT_NITER, sweep=DEFAULT_SWEEP):
     def smoother(A, x, b):
         relaxation.sor(A, x, b, omega=omega, iterations=iterations,
@@ -665,17 +946,23 @@ def setup_sor(lvl, omega=0.5, iterations=DEFAULT_NITER, sweep=DEFAULT_SWEEP):
 
 
 def setup_chebyshev(lvl, lower_bound=1.0/30.0, upper_bound=1.1, degree=3,
-                    iterations=DEFAULT_NITER):
-    rho = approximate_spectral_radius(lvl.A)
+                    iterations=DEFAULT_NITER, diagonal_scaling=False,
+                    zero_guess=None, rho_estimator='arnoldi'):
+    # With diagonal_scaling, the polynomial is in D^-1 A, i.e., Jacobi
+    # preconditioned Chebyshev
+    if diagonal_scaling:
+        rho = spectral_bounds(lvl, 'diagonal', rho_estimator)
+        Dinv = get_diagonal(lvl.A, inv=True)
+    else:
+        rho = spectral_bounds(lvl, None, rho_estimator)
+        Dinv = None
     a = rho * lower_bound
     b = rho * upper_bound
     # drop the constant coefficient
     coefficients = -chebyshev_polynomial_coefficients(a, b, degree)[:-1]
 
-    def smoother(A, x, b):
-        relaxation.polynomial(A, x, b, coefficients=coefficients,
-                              iterations=iterations)
-    return smoother
+    return _setup_polynomial(lvl, coefficients, iterations, Dinv=Dinv,
+                             zero_guess=zero_guess)
 
 
 def setup_jacobi_ne(lvl, iterations=DEFAULT_NITER, omega=1.0, withrho=True):
@@ -709,45 +996,57 @@ def setup_gauss_seidel_nr(lvl, iterations=DEFAULT_NITER, sweep=DEFAULT_SWEEP,
     return smoother
 
 
+
+def _cf_jacobi_parameters(lvl):
+    """C-points, F-points and inverse diagonal used by CF and FC Jacobi
+
+    The point index arrays are computed from lvl.splitting once per level,
+    and kept by later setups, e.g., after multilevel_solver.update.  The
+    inverse diagonal is cached on lvl.A, and shared by the pre- and
+    postsmoother.
+    """
+    if not hasattr(lvl, 'cf_points'):
+        # Get C-points and F-points from splitting
+        try:
+            Fpts = np.array(np.where(lvl.splitting == 0)[0], dtype='int32')
+            Cpts = np.array(np.where(lvl.splitting == 1)[0], dtype='int32')
+        except:
+            raise ValueError("CF-splitting array needs to be stored in hierarchy.")
+        lvl.cf_points = (Cpts, Fpts)
+    Cpts, Fpts = lvl.cf_points
+    lvl.nf = len(Fpts)
+    lvl.nc = len(Cpts)
+
+    if not hasattr(lvl.A, 'D_inv'):
+        lvl.A.D_inv = get_diagonal(lvl.A, inv=True)
+
+    return Cpts, Fpts, lvl.A.D_inv
+
 def setup_CF_jacobi(lvl, F_iterations=DEFAULT_NITER, C_iterations=DEFAULT_NITER,
                     iterations=DEFAULT_NITER, omega=1.0, withrho=False):
     if withrho:
-        omega = omega/rho_D_inv_A(lvl.A)
+        omega = omega/spectral_bounds(lvl, 'diagonal')
 
-    # Get C-points and F-points from splitting
-    try:
-        Fpts = np.array(np.where(lvl.splitting == 0)[0], dtype='int32')
-        Cpts = np.array(np.where(lvl.splitting == 1)[0], dtype='int32') 
-        lvl.nf = len(Fpts)
-        lvl.nc = len(Cpts)
-    except:
-        raise ValueError("CF-splitting array needs to be stored in hierarchy.")
+    Cpts, Fpts, Dinv = _cf_jacobi_parameters(lvl)
 
     def smoother(A, x, b):
         relaxation.CF_jacobi(A, x, b, Cpts=Cpts, Fpts=Fpts, F_iterations=F_iterations,
                              C_iterations=C_iterations, iterations=DEFAULT_NITER,
-                             omega=omega)
+                             omega=omega, Dinv=Dinv)
     return smoother
 
 
 def setup_FC_jacobi(lvl, F_iterations=DEFAULT_NITER, C_iterations=DEFAULT_NITER,
                     iterations=DEFAULT_NITER, omega=1.0, withrho=False):
     if withrho:
-        omega = omega/rho_D_inv_A(lvl.A)
+        omega = omega/spectral_bounds(lvl, 'diagonal')
 
-    # Get C-points and F-points from splitting
-    try:
-        Fpts = np.array(np.where(lvl.splitting == 0)[0], dtype='int32')
-        Cpts = np.array(np.where(lvl.splitting == 1)[0], dtype='int32') 
-        lvl.nf = len(Fpts)
-        lvl.nc = len(Cpts)
-    except:
-        raise ValueError("CF-splitting array needs to be stored in hierarchy.")
+    Cpts, Fpts, Dinv = _cf_jacobi_parameters(lvl)
 
     def smoother(A, x, b):
         relaxation.FC_jacobi(A, x, b, Cpts=Cpts, Fpts=Fpts, F_iterations=F_iterations,
                              C_iterations=C_iterations, iterations=DEFAULT_NITER,
-                             omega=omega)
+                             omega=omega, Dinv=Dinv)
     return smoother
 
 
@@ -790,7 +1089,7 @@ def setup_CF_block_jacobi(lvl, F_iterations=DEFAULT_NITER, C_iterations=DEFAULT_
         if Dinv is None:
             Dinv = get_block_diag(lvl.A, blocksize=blocksize, inv_flag=True)
         if withrho:
-            omega = omega/rho_block_D_inv_A(lvl.A, Dinv)
+            omega = omega/spectral_bounds(lvl, 'block', Dinv=Dinv)
 
         def smoother(A, x, b):
             relaxation.CF_block_jacobi(A, x, b, Cpts=Cpts, Fpts=Fpts, iterations=iterations,
@@ -838,7 +1137,7 @@ def setup_FC_block_jacobi(lvl, F_iterations=DEFAULT_NITER, C_iterations=DEFAULT_
         if Dinv is None:
             Dinv = get_block_diag(lvl.A, blocksize=blocksize, inv_flag=True)
         if withrho:
-            omega = omega/rho_block_D_inv_A(lvl.A, Dinv)
+            omega = omega/spectral_bounds(lvl, 'block', Dinv=Dinv)
 
         def smoother(A, x, b):
             relaxation.FC_block_jacobi(A, x, b, Cpts=Cpts, Fpts=Fpts, iterations=iterations,
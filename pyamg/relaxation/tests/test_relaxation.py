@@ -9,10 +9,15 @@ from pyamg.gallery import poisson, sprand, elasticity
 from pyamg.relaxation.relaxation import gauss_seidel, jacobi,\
     block_jacobi, block_gauss_seidel, jacobi_ne, schwarz, sor,\
     gauss_seidel_indexed, polynomial, gauss_seidel_ne,\
-    gauss_seidel_nr
-from pyamg.util.utils import get_block_diag
+    gauss_seidel_nr, multicolor_gauss_seidel, multicolor_parameters,\
+    hybrid_gauss_seidel, l1_jacobi, l1_parameters, schwarz_parameters,\
+    aggregate_schwarz, aggregate_subdomains
+from pyamg.relaxation import relaxation
+from pyamg.util.utils import get_block_diag, set_num_threads
+from pyamg.aggregation import standard_aggregation
 
-from numpy.testing import TestCase, assert_raises, assert_almost_equal
+from numpy.testing import TestCase, assert_raises, assert_almost_equal, \
+    assert_equal
 
 # Ignore efficiency warnings
 import warnings
@@ -31,6 +36,9 @@ class TestCommonRelaxation(TestCase):
         self.cases.append((schwarz,                   (),               {}))
         self.cases.append((sor,                       (0.5,),           {}))
         self.cases.append((gauss_seidel_indexed,      ([1, 0],),         {}))
+        self.cases.append((multicolor_gauss_seidel,   (),               {}))
+        self.cases.append((hybrid_gauss_seidel,       (),               {}))
+        self.cases.append((l1_jacobi,                 (),               {}))
         self.cases.append((polynomial,                ([0.6, 0.1],),     {}))
 
     def test_single_precision(self):
@@ -59,7 +67,7 @@ class TestCommonRelaxation(TestCase):
             assert_raises(ValueError, method, A, x, b, *args, **kwargs)
 
     def test_mixed_precision(self):
-        """mixed precision arguments should raise errors"""
+        """mixed precision x should raise errors, b is cast to A.dtype"""
 
         for method, args, kwargs in self.cases:
             A32 = poisson((4,), format='csr').astype('float32')
@@ -70,12 +78,21 @@ class TestCommonRelaxation(TestCase):
             b64 = arange(A64.shape[0], dtype='float64')
             x64 = 0*b64
 
-            assert_raises(TypeError, method, A32, x32, b64, *args, **kwargs)
             assert_raises(TypeError, method, A32, x64, b32, *args, **kwargs)
             assert_raises(TypeError, method, A64, x32, b32, *args, **kwargs)
             assert_raises(TypeError, method, A32, x64, b64, *args, **kwargs)
-            assert_raises(TypeError, method, A64, x64, b32, *args, **kwargs)
             assert_raises(TypeError, method, A64, x32, b64, *args, **kwargs)
+            assert_raises(TypeError, method, A64, x64, 1.0j*b64, *args,
+                          **kwargs)
+
+            # b is cast to the precision of A
+            method(A32, x32, b64, *args, **kwargs)
+            assert_equal(x32.dtype, np.float32)
+            x = 0*b64
+            method(A64, x, b64.astype('float32'), *args, **kwargs)
+            y = 0*b64
+            method(A64, y, b64, *args, **kwargs)
+            assert_equal(x, y)
 
     def test_vector_sizes(self):
         """incorrect vector sizes should raise errors"""
@@ -91,6 +108,39 @@ class TestCommonRelaxation(TestCase):
             assert_raises(ValueError, method, A, x5, b4, *args, **kwargs)
             assert_raises(ValueError, method, A, x5, b5, *args, **kwargs)
 
+    def test_multivector(self):
+        """n x k multivectors relax each column independently"""
+        multivector = [gauss_seidel, jacobi, block_jacobi,
+                       block_gauss_seidel, sor, polynomial]
+
+        A = poisson((6, 6), format='csr')
+        cases = [A, bsr_matrix(A, blocksize=(2, 2)), A + 1.0j*A]
+        sweeps = [{}, {'sweep': 'backward'}, {'sweep': 'symmetric'}]
+
+        for A in cases:
+            B = rand(A.shape[0], 3).astype(A.dtype)
+            X0 = rand(A.shape[0], 3).astype(A.dtype)
+
+            for method, args, kwargs in self.cases:
+                if method not in multivector:
+                    X = X0.copy()
+                    assert_raises(ValueError, method, A, X, B, *args,
+                                  **kwargs)
+                    continue
+
+                options = [kwargs]
+                if method in [gauss_seidel, block_gauss_seidel, sor]:
+                    options = [dict(kwargs, **sweep) for sweep in sweeps]
+
+                for opts in options:
+                    X = X0.copy()
+                    method(A, X, B, *args, iterations=2, **opts)
+                    for k in range(X.shape[1]):
+                        x = X0[:, k].copy()
+                        method(A, x, B[:, k].copy(), *args, iterations=2,
+                               **opts)
+                        assert_almost_equal(X[:, k], x)
+
     def test_non_square_matrix(self):
 
         for method, args, kwargs in self.cases:
@@ -136,6 +186,84 @@ class TestRelaxation(TestCase):
         polynomial(A, x, b, [-0.14285714,  1., -2.])
         assert_almost_equal(x, 0.14285714*A*A*b + A*b - 2*b)
 
+        # diagonal scaling, BSR and CSC matrices, a zero initial guess and
+        # several iterations against a reference Horner evaluation
+        def gold(A, x, b, coefficients, iterations, Dinv):
+            x = x.copy()
+            for i in range(iterations):
+                r = Dinv * (b - A*x)
+                h = coefficients[0]*r
+                for c in coefficients[1:]:
+                    h = c*r + Dinv*(A*h)
+                x += h
+            return x
+
+        np.random.seed(0)
+        A = elasticity.linear_elasticity((6, 6), format='bsr')[0]
+        A = A * (1.0 / abs(A.data).max())
+        coefficients = [0.01, -0.1, 0.2, 0.3]
+        for M in [A, A.tocsr(), A.tocsc()]:
+            n = M.shape[0]
+            b = rand(n)
+            for Dinv in [None, 1.0 / M.diagonal()]:
+                for x0 in [zeros(n), rand(n)]:
+                    x = x0.copy()
+                    polynomial(M, x, b, coefficients, iterations=2,
+                               Dinv=Dinv)
+                    D = ones(n) if Dinv is None else Dinv
+                    assert_almost_equal(x, gold(M, x0, b, coefficients, 2,
+                                                D))
+
+        # the columns of a multivector are smoothed as single vectors
+        for M in [A, A.tocsr(), A.tocsc()]:
+            n = M.shape[0]
+            B = rand(n, 3)
+            for Dinv in [None, 1.0 / M.diagonal()]:
+                X0 = rand(n, 3)
+                X = X0.copy()
+                polynomial(M, X, B, coefficients, iterations=2, Dinv=Dinv)
+                for k in range(3):
+                    x = X0[:, k].copy()
+                    polynomial(M, x, B[:, k].copy(), coefficients,
+                               iterations=2, Dinv=Dinv)
+                    if M.format == 'csc':
+                        assert_almost_equal(X[:, k], x)
+                    else:
+                        assert_equal(X[:, k], x)
+
+        # zero_guess skips the first residual
+        M = A.tocsr()
+        x0 = rand(M.shape[0])
+        x = x0.copy()
+        polynomial(M, x, b, coefficients, zero_guess=True)
+        assert_almost_equal(x, gold(M, zeros(M.shape[0]), b, coefficients,
+                                    1, ones(M.shape[0])) + x0)
+
+        # the work vectors are kept between calls of the same shape
+        work = {}
+        x = zeros(M.shape[0])
+        polynomial(M, x, b, coefficients, work=work)
+        vectors = work['vectors']
+        polynomial(M, x, b, coefficients, work=work)
+        assert(work['vectors'] is vectors)
+        X = zeros((M.shape[0], 2))
+        polynomial(M, X, rand(M.shape[0], 2), coefficients, work=work)
+        assert_equal(work['vectors'][0].shape, X.shape)
+
+        # the result does not depend on the number of threads
+        M = poisson((200, 200), format='csr')
+        b = rand(M.shape[0])
+        xs = []
+        for n_threads in [1, 3]:
+            set_num_threads(n_threads)
+            try:
+                x = zeros(M.shape[0])
+                polynomial(M, x, b, coefficients, iterations=2)
+            finally:
+                set_num_threads(1)
+            xs.append(x)
+        assert_equal(xs[0], xs[1])
+
     def test_jacobi(self):
         N = 1
         A = spdiags([2*ones(N), -ones(N), -ones(N)], [0, -1, 1], N, N,
@@ -401,6 +529,126 @@ class TestRelaxation(TestCase):
         gauss_seidel_indexed(A, x, b, [0, 0])
         assert_almost_equal(x, array([1.0/2.0, 1.0, 1.0, 1.0]))
 
+    def test_multicolor_gauss_seidel(self):
+        cases = []
+        cases.append(poisson((250, 250), format='csr'))
+        cases.append(elasticity.linear_elasticity((20, 20))[0].tocsr())
+        # nonsymmetric sparsity pattern
+        A = poisson((100, 100), format='csr')
+        cases.append((A + eye(A.shape[0], k=7, format='csr')).tocsr())
+        cases.append((A + 1.0j*A).tocsr())
+
+        for A in cases:
+            indices, color_ptr = multicolor_parameters(A)
+            assert_equal(np.sort(indices), arange(A.shape[0]))
+
+            # no two unknowns of a color are coupled
+            for c in range(len(color_ptr) - 1):
+                rows = indices[color_ptr[c]:color_ptr[c+1]]
+                block = A[rows, :][:, rows]
+                assert_equal(block.nnz, (block.diagonal() != 0).sum())
+
+            b = rand(A.shape[0]).astype(A.dtype)
+            for sweep in ['forward', 'backward', 'symmetric']:
+                x0 = rand(A.shape[0]).astype(A.dtype)
+                x_gold = x0.copy()
+                gauss_seidel_indexed(A, x_gold, b, indices, iterations=2,
+                                     sweep=sweep)
+
+                try:
+                    for n_threads in [1, 3]:
+                        set_num_threads(n_threads)
+                        x = x0.copy()
+                        multicolor_gauss_seidel(A, x, b, iterations=2,
+                                                sweep=sweep)
+                        assert_equal(x, x_gold)
+                finally:
+                    set_num_threads(1)
+
+        # the coloring is cached on A
+        A = poisson((10, 10), format='csr')
+        params = multicolor_parameters(A, method='JP')
+        assert(multicolor_parameters(A, method='JP')[0] is params[0])
+        assert(multicolor_parameters(A)[0] is not params[0])
+
+        x = zeros(A.shape[0])
+        assert_raises(ValueError, multicolor_gauss_seidel, A, x, x,
+                      sweep='diagonal')
+
+    def test_hybrid_gauss_seidel(self):
+        # a single block is Gauss-Seidel
+        A = poisson((10, 10), format='csr')
+        b = rand(A.shape[0])
+        for sweep in ['forward', 'backward', 'symmetric']:
+            x0 = rand(A.shape[0])
+            x_gold = x0.copy()
+            gauss_seidel(A, x_gold, b, iterations=2, sweep=sweep)
+            x = x0.copy()
+            hybrid_gauss_seidel(A, x, b, iterations=2, sweep=sweep, blocks=1)
+            assert_almost_equal(x, x_gold)
+
+        # l1-Jacobi
+        Ad = A.toarray()
+        d = abs(Ad).sum(axis=1)
+        x0 = rand(A.shape[0])
+        x_gold = x0 + 0.8 * (b - Ad.dot(x0)) / d
+        x = x0.copy()
+        l1_jacobi(A, x, b, omega=0.8)
+        assert_almost_equal(x, x_gold)
+
+        # l1 diagonal
+        block_ptr, Dinv = l1_parameters(A, blocks=3)
+        assert_equal(block_ptr[[0, -1]], [0, A.shape[0]])
+        for k in range(3):
+            rows = arange(block_ptr[k], block_ptr[k+1])
+            outside = ones(A.shape[0], dtype=bool)
+            outside[rows] = False
+            d = Ad[rows, rows] + abs(Ad[rows][:, outside]).sum(axis=1)
+            assert_almost_equal(Dinv[rows], 1.0 / d)
+
+        # forward followed by backward sweeps are symmetric
+        M = zeros(A.shape)
+        for k in range(A.shape[0]):
+            x = zeros(A.shape[0])
+            hybrid_gauss_seidel(A, x, eye(A.shape[0]).toarray()[k],
+                                sweep='symmetric', blocks=3)
+            M[:, k] = x
+        assert_almost_equal(M, M.T)
+
+        # the results do not depend on the number of threads
+        cases = []
+        cases.append(poisson((250, 250), format='csr'))
+        cases.append(elasticity.linear_elasticity((80, 80))[0])
+        cases.append((A + 1.0j*A).tocsr())
+
+        for A in cases:
+            b = rand(A.shape[0]).astype(A.dtype)
+            x0 = rand(A.shape[0]).astype(A.dtype)
+            for method, kwargs in [(hybrid_gauss_seidel, {'blocks': 8}),
+                                   (hybrid_gauss_seidel,
+                                    {'blocks': 5, 'sweep': 'backward'}),
+                                   (l1_jacobi, {'omega': 0.9})]:
+                results = []
+                try:
+                    for n_threads in [1, 3]:
+                        set_num_threads(n_threads)
+                        x = x0.copy()
+                        method(A, x, b, iterations=2, **kwargs)
+                        results.append(x)
+                finally:
+                    set_num_threads(1)
+                assert_equal(results[0], results[1])
+
+            # l1-Jacobi reduces the energy norm of the error without damping
+            if A.dtype == np.float64:
+                x_exact = rand(A.shape[0])
+                b = A * x_exact
+                x = zeros(A.shape[0])
+                e0 = x_exact - x
+                l1_jacobi(A, x, b)
+                e = x_exact - x
+                assert(np.dot(e, A * e) < np.dot(e0, A * e0))
+
     def test_jacobi_ne(self):
         N = 1
         A = spdiags([2*ones(N), -ones(N), -ones(N)], [0, -1, 1], N, N,
@@ -675,6 +923,179 @@ class TestRelaxation(TestCase):
         self.assertTrue(resid1 < 0.2 and resid2 < 0.2)
         self.assertTrue(allclose(resid1, resid2))
 
+    def test_schwarz_parameters(self):
+        np.random.seed(0)
+        # rows of varying length, with a singular subdomain block
+        A = sprand(60, 60, 0.08, format='csr') + eye(60, format='csr')
+        A = A.tolil()
+        A[5, :] = 0
+        A[5, 7] = 1.0
+        A[7, :] = 0
+        A[7, 5] = 1.0
+        A = A.tocsr()
+
+        for dtype in [np.float64, np.complex128]:
+            B = A.astype(dtype)
+            if dtype == np.complex128:
+                B = B + 1.0j * B
+            gold = None
+            for chunk in [2**20, 10]:
+                saved = relaxation._SUBBLOCK_CHUNK
+                relaxation._SUBBLOCK_CHUNK = chunk
+                try:
+                    C = B.copy()
+                    inv, inv_ptr = schwarz_parameters(C)[2:]
+                finally:
+                    relaxation._SUBBLOCK_CHUNK = saved
+
+                for i in range(A.shape[0]):
+                    idx = C.indices[C.indptr[i]:C.indptr[i+1]]
+                    m = len(idx)
+                    block = B[idx, :][:, idx].toarray()
+                    assert_almost_equal(
+                        inv[inv_ptr[i]:inv_ptr[i+1]].reshape(m, m),
+                        scipy.linalg.pinv(block))
+                if gold is None:
+                    gold = inv
+                assert_equal(inv, gold)
+
+    def test_aggregate_schwarz(self):
+        np.random.seed(0)
+        cases = []
+        A = poisson((12, 12), format='csr')
+        cases.append((A, standard_aggregation(A)[0]))
+        # unaggregated unknowns
+        A = sprand(40, 40, 0.1, format='csr') + 4*eye(40, format='csr')
+        A = (A + A.T).tocsr()
+        AggOp = csr_matrix((ones(36), (arange(36), arange(36) // 5)),
+                           shape=(40, 8))
+        cases.append((A, AggOp))
+
+        def gold(A, x, b, subdomains, sweep, omega):
+            A = A.toarray()
+            x = x.copy()
+            if sweep == 'additive':
+                r = b - A.dot(x)
+                for s in subdomains:
+                    x[s] += omega * solve(A[np.ix_(s, s)], r[s])
+                return x
+            if sweep == 'backward':
+                subdomains = subdomains[::-1]
+            elif sweep == 'symmetric':
+                subdomains = subdomains + subdomains[::-1]
+            for s in subdomains:
+                r = b - A.dot(x)
+                x[s] += solve(A[np.ix_(s, s)], r[s])
+            return x
+
+        for A, AggOp in cases:
+            for overlap in [0, 1]:
+                subdomain, subdomain_ptr = \
+                    aggregate_subdomains(A, AggOp, overlap)
+                subdomains = [subdomain[subdomain_ptr[i]:subdomain_ptr[i+1]]
+                              for i in range(subdomain_ptr.shape[0] - 1)]
+                # every unknown is relaxed
+                assert_equal(np.unique(subdomain), arange(A.shape[0]))
+                for s in subdomains:
+                    assert_equal(s, np.sort(s))
+
+                b = rand(A.shape[0])
+                x0 = rand(A.shape[0])
+                for sweep in ['forward', 'backward', 'symmetric',
+                              'additive']:
+                    x = x0.copy()
+                    aggregate_schwarz(A, x, b, AggOp, overlap=overlap,
+                                      sweep=sweep, omega=0.5)
+                    assert_almost_equal(x, gold(A, x0, b, subdomains, sweep,
+                                                0.5))
+
+        # a singular subdomain block skips its zero pivots
+        A = A.tolil()
+        A[3, :] = 0
+        A = A.tocsr()
+        x = np.zeros(A.shape[0])
+        aggregate_schwarz(A, x, b, AggOp, iterations=3)
+        assert(np.isfinite(x).all())
+
+        # the additive sweep does not depend on the number of threads
+        A = poisson((150, 150), format='csr')
+        AggOp = standard_aggregation(A)[0]
+        b = rand(A.shape[0])
+        xs = []
+        for n_threads in [1, 3]:
+            set_num_threads(n_threads)
+            try:
+                x = np.zeros(A.shape[0])
+                aggregate_schwarz(A, x, b, AggOp, iterations=2, overlap=1,
+                                  sweep='additive', omega=0.5)
+            finally:
+                set_num_threads(1)
+            xs.append(x)
+        assert_equal(xs[0], xs[1])
+
+        # BSR aggregates hold whole nodes
+        A = elasticity.linear_elasticity((4, 4), format='bsr')[0]
+        AggOp = standard_aggregation(A.tocsr()[::2, ::2])[0]
+        subdomain, subdomain_ptr = aggregate_subdomains(A, AggOp)
+        assert_equal(subdomain_ptr[-1], A.shape[0])
+        assert_equal(subdomain[:2], [0, 1])
+        assert_raises(ValueError, aggregate_schwarz, A.tocsr(), rand(32),
+                      rand(32), AggOp, sweep='sideways')
+
+    def test_cf_jacobi(self):
+        np.random.seed(0)
+
+        def gold(A, x, b, Cpts, Fpts, iterations, F_iterations,
+                 C_iterations, omega, F_first):
+            R = A.blocksize[0] if A.format == 'bsr' else 1
+            D = A.diagonal()
+            x = x.copy()
+            sweeps = [(Cpts, C_iterations), (Fpts, F_iterations)]
+            if F_first:
+                sweeps = sweeps[::-1]
+            for i in range(iterations):
+                for pts, k in sweeps:
+                    rows = (pts[:, np.newaxis]*R + arange(R)).ravel()
+                    for j in range(k):
+                        r = b - A*x
+                        x[rows] += omega*r[rows]/D[rows]
+            return x
+
+        cases = [poisson((10, 10), format='csr'),
+                 elasticity.linear_elasticity((5, 5), format='bsr')[0]]
+        for A in cases:
+            nb = A.shape[0] // (A.blocksize[0] if A.format == 'bsr' else 1)
+            splitting = rand(nb) < 0.3
+            Cpts = np.where(splitting)[0].astype(np.intc)
+            Fpts = np.where(~splitting)[0].astype(np.intc)
+            b = rand(A.shape[0])
+            x0 = rand(A.shape[0])
+            for fn, F_first in [(relaxation.CF_jacobi, False),
+                                (relaxation.FC_jacobi, True)]:
+                for Dinv in [None, 1.0 / A.diagonal()]:
+                    x = x0.copy()
+                    fn(A, x, b, Cpts, Fpts, iterations=2, F_iterations=2,
+                       C_iterations=1, omega=0.7, Dinv=Dinv)
+                    assert_almost_equal(x, gold(A, x0, b, Cpts, Fpts, 2, 2,
+                                                1, 0.7, F_first))
+
+        # the result does not depend on the number of threads
+        A = poisson((200, 200), format='csr')
+        splitting = rand(A.shape[0]) < 0.3
+        Cpts = np.where(splitting)[0].astype(np.intc)
+        Fpts = np.where(~splitting)[0].astype(np.intc)
+        b = rand(A.shape[0])
+        xs = []
+        for n_threads in [1, 3]:
+            set_num_threads(n_threads)
+            try:
+                x = zeros(A.shape[0])
+                relaxation.FC_jacobi(A, x, b, Cpts, Fpts, F_iterations=2)
+            finally:
+                set_num_threads(1)
+            xs.append(x)
+        assert_equal(xs[0], xs[1])
+
     def test_schwarz_gold(self):
         scipy.random.seed(0)
 
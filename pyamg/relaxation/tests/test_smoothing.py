@@ -1,20 +1,30 @@
 from pyamg.gallery import poisson
 from pyamg import smoothed_aggregation_solver
 from pyamg.util.utils import profile_solver
-from pyamg.relaxation.smoothing import change_smoothers
+from pyamg.relaxation.smoothing import change_smoothers, spectral_bounds
+import numpy as np
 
 from numpy.testing import TestCase
 
 methods = [('gauss_seidel', {'sweep' : 'symmetric'}),
+           ('multicolor_gauss_seidel', {'sweep' : 'symmetric'}),
+           ('hybrid_gauss_seidel', {'sweep' : 'symmetric', 'blocks' : 4}),
+           'l1_jacobi',
            'jacobi',
+           ('jacobi', {'rho_estimator' : 'lanczos'}),
            'richardson',
+           ('richardson', {'rho_estimator' : 'gershgorin'}),
            ('sor', {'sweep' : 'symmetric'}),
            'chebyshev',
+           ('chebyshev', {'diagonal_scaling' : True}),
+           ('chebyshev', {'rho_estimator' : 'lanczos'}),
            ('gauss_seidel_ne', {'sweep' : 'symmetric'}),
            'jacobi_ne',
            ('gauss_seidel_nr', {'sweep' : 'symmetric'}),
            ('schwarz', {'sweep' : 'symmetric'}),
-           ('strength_based_schwarz', {'sweep' : 'symmetric'})]
+           ('strength_based_schwarz', {'sweep' : 'symmetric'}),
+           ('aggregate_schwarz', {'sweep' : 'symmetric'}),
+           ('aggregate_schwarz', {'sweep' : 'additive', 'overlap' : 1})]
 
 methods2 = [('gauss_seidel', 'richardson'),
             ('gauss_seidel', 'jacobi'),
@@ -36,12 +46,18 @@ methods3 = [ [[('gauss_seidel', {'sweep' : 'forward'}), None],
               [('gauss_seidel_nr', {'sweep' : 'forward'}), 'jacobi']], 
              [[('jacobi', {'iterations' : 2}), ('jacobi', {'iterations' : 1})], 
               [('jacobi', {'iterations' : 2}), ('jacobi', {'iterations' : 1})]],
+             [[('multicolor_gauss_seidel', {'sweep' : 'forward'}), None], 
+              [('multicolor_gauss_seidel', {'sweep' : 'backward'}), None]], 
+             [[('hybrid_gauss_seidel', {'sweep' : 'forward'}), 'l1_jacobi'], 
+              [('hybrid_gauss_seidel', {'sweep' : 'backward'}), 'l1_jacobi']], 
              [[('gauss_seidel_ne', {'sweep' : 'forward'}), None], 
               [('gauss_seidel_ne', {'sweep' : 'backward'}), None]], 
              [[('block_gauss_seidel', {'sweep' : 'backward'}), 'richardson'], 
               [('block_gauss_seidel', {'sweep' : 'forward'}), 'richardson']], 
              [[('jacobi_ne', {'iterations' : 2}), ('block_jacobi', {'iterations' : 1})], 
-              [('jacobi_ne', {'iterations' : 2}), ('block_jacobi', {'iterations' : 1})]] ]
+              [('jacobi_ne', {'iterations' : 2}), ('block_jacobi', {'iterations' : 1})]],
+             [[('aggregate_schwarz', {'sweep' : 'forward', 'overlap' : 1}), None],
+              [('aggregate_schwarz', {'sweep' : 'backward', 'overlap' : 1}), None]] ]
 
 # Non-symmetric smoothing schemes
 methods4 = [ [[('gauss_seidel', {'sweep' : 'forward'}), None], 
@@ -87,4 +103,97 @@ class TestSmoothing(TestCase):
         for method in methods4:
             ml = smoothed_aggregation_solver(A, max_coarse=10)
             change_smoothers(ml, presmoother=method[0], postsmoother=method[1])
-            assert(not ml.symmetric_smoothing)
\ No newline at end of file
+            assert(not ml.symmetric_smoothing)
+    def test_spectral_bounds(self):
+        A = poisson((50, 50), format='csr')
+        np.random.seed(0)
+        ml = smoothed_aggregation_solver(A, max_coarse=10,
+                                         presmoother='jacobi',
+                                         postsmoother='jacobi')
+        levels = ml.levels[:-1]
+        for lvl in levels:
+            D = lvl.A.diagonal()
+            rho = np.abs(np.linalg.eigvals(lvl.A.toarray() /
+                                           D[:, np.newaxis])).max()
+            assert(abs(lvl.A.rho_D_inv - rho) < 0.01 * rho)
+
+            # the estimates are cached on A
+            assert(spectral_bounds(lvl, 'diagonal') == lvl.A.rho_D_inv)
+            assert(spectral_bounds(lvl, 'diagonal', 'lanczos') <= rho + 1e-8)
+            assert(spectral_bounds(lvl, 'diagonal', 'gershgorin') >= rho)
+            assert(sorted(lvl.A.spectral_bounds.keys()) ==
+                   [('diagonal', 'gershgorin'), ('diagonal', 'lanczos')])
+            assert(lvl.spectral_vectors['diagonal'].shape == D.shape)
+
+        # the estimates of a new matrix start from the previous vectors
+        ml.update(2.0 * A)
+        for lvl in levels:
+            assert(not hasattr(lvl.A, 'spectral_bounds'))
+            vector = lvl.spectral_vectors['diagonal']
+            assert(abs(lvl.A.rho_D_inv - spectral_bounds(
+                lvl, 'diagonal', 'lanczos')) < 0.01 * lvl.A.rho_D_inv)
+            Av = lvl.A * vector / lvl.A.diagonal()
+            assert(np.linalg.norm(Av - lvl.A.rho_D_inv * vector) <
+                   0.1 * np.linalg.norm(Av))
+
+        # coarse levels without estimates start from the restricted vectors
+        A = poisson((50, 50), format='csr')
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        spectral_bounds(ml.levels[0], 'diagonal')
+        change_smoothers(ml, 'gauss_seidel', 'gauss_seidel')
+        vector = ml.levels[1].spectral_vectors['diagonal']
+        assert(np.allclose(vector, ml.levels[0].R *
+                           ml.levels[0].spectral_vectors['diagonal']))
+        self.assertRaises(ValueError, spectral_bounds, ml.levels[0], 'block')
+
+    def test_hybrid_gauss_seidel_threads(self):
+        from pyamg.util.utils import set_num_threads, get_num_threads
+
+        # the number of blocks follows set_num_threads after the setup
+        A = poisson((50, 50), format='csr')
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        change_smoothers(ml, 'hybrid_gauss_seidel', 'hybrid_gauss_seidel')
+        b = np.random.rand(A.shape[0])
+
+        n_threads = get_num_threads()
+        try:
+            set_num_threads(3)
+            ml.solve(b, maxiter=2)
+        finally:
+            set_num_threads(n_threads)
+        assert(3 in ml.levels[0].A.l1_parameters)
+
+        # explicit blocks do not depend on the number of threads
+        change_smoothers(ml, ('hybrid_gauss_seidel', {'blocks': 2}),
+                         ('hybrid_gauss_seidel', {'blocks': 2}))
+        x = []
+        for k in [1, 3]:
+            try:
+                set_num_threads(k)
+                x.append(ml.solve(b, maxiter=2))
+            finally:
+                set_num_threads(n_threads)
+        assert(np.array_equal(x[0], x[1]))
+
+    def test_polynomial_zero_guess(self):
+        # the cycle passes zero_guess=True to the coarse-level presmoothers,
+        # and only when x is zero
+        A = poisson((50, 50), format='csr')
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        change_smoothers(ml, 'chebyshev', 'chebyshev')
+        calls = []
+        for i, lvl in enumerate(ml.levels[:-1]):
+            def presmoother(A, x, b, zero_guess=None, i=i,
+                            smoother=lvl.presmoother):
+                if zero_guess:
+                    assert(not x.any())
+                calls.append((i, zero_guess))
+                smoother(A, x, b, zero_guess=zero_guess)
+            lvl.presmoother = presmoother
+
+        b = np.random.rand(A.shape[0])
+        res = []
+        ml.solve(b, tol=1e-8, residuals=res)
+        assert(res[-1] < 1e-8 * res[0])
+        assert((0, None) in calls and (1, True) in calls)
+        assert(not [c for c in calls if c[0] == 0 and c[1]])
@@ -0,0 +1,326 @@
+"""Solve server batching concurrent right-hand sides into block cycles"""
+from __future__ import absolute_import
+
+__docformat__ = "restructuredtext en"
+
+import time
+import threading
+from collections import deque
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+import numpy as np
+
+__all__ = ['solve_server', 'solve_request']
+
+
+class solve_request(object):
+    """Pending solve submitted to a solve_server
+
+    Attributes
+    ----------
+    b : array
+        Right-hand side
+    residuals : list
+        Residual norm history of this right-hand side, once solved
+    group_size : int
+        Number of right-hand sides solved in the same block
+    latency : float
+        Seconds from the submission to the solution
+
+    Methods
+    -------
+    result()
+        Wait for the solution and return it
+    done()
+        True if the request has been solved
+
+    """
+
+    def __init__(self, b, x0):
+        self.b = b
+        self.x0 = x0
+        self.residuals = []
+        self.group_size = 0
+        self.latency = None
+        self._submitted = time.time()
+        self._event = threading.Event()
+        self._x = None
+        self._error = None
+
+    def _finish(self, x=None, error=None):
+        self._x = x
+        self._error = error
+        self.latency = time.time() - self._submitted
+        self._event.set()
+
+    def done(self):
+        """True if the request has been solved"""
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """Wait for the solution and return it
+
+        Parameters
+        ----------
+        timeout : float
+            Maximum number of seconds to wait, None to wait until solved
+
+        Returns
+        -------
+        x : array
+            Solution of the request
+
+        Raises RuntimeError after timeout seconds, and the error of the solve
+        if it failed.
+        """
+        if not self._event.wait(timeout):
+            raise RuntimeError('request not solved within the timeout')
+        if self._error is not None:
+            raise self._error
+        return self._x
+
+
+class solve_server(object):
+    """Serve solves with one hierarchy, grouping concurrent requests
+
+    Right-hand sides submitted from any thread are queued.  A worker
+    thread takes the requests that arrive within a short window of the
+    first queued request and solves them together as the columns of one
+    n x k block, see multilevel_solver.solve, so that each cycle makes a
+    single pass over the operators of the hierarchy for the whole group.
+    Each request then receives its own column and residual history.
+
+    Attributes
+    ----------
+    ml : multilevel_solver
+        Hierarchy used for the solves
+    window : float
+        Seconds to wait for more requests after the first of a group
+    max_group : int
+        Maximum number of right-hand sides solved in one block
+
+    Methods
+    -------
+    submit()
+        Queue a right-hand side, returning a solve_request
+    solve()
+        Submit a right-hand side and wait for its solution
+    metrics()
+        Throughput, latency and grouping statistics
+    close()
+        Solve the queued requests and stop the server
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyamg import smoothed_aggregation_solver
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.server import solve_server
+    >>> A = poisson((50, 50), format='csr')
+    >>> ml = smoothed_aggregation_solver(A, max_coarse=10)
+    >>> with solve_server(ml, tol=1e-8) as server:
+    ...     requests = [server.submit(np.random.rand(A.shape[0]))
+    ...                 for i in range(8)]
+    ...     xs = [request.result() for request in requests]
+
+    """
+
+    def __init__(self, ml, window=0.002, max_group=32, tol=1e-5,
+                 maxiter=100, cycle='V', history=1000):
+        """
+        Parameters
+        ----------
+        ml : multilevel_solver
+            Hierarchy used for the solves
+        window : float
+            Seconds to wait for more requests after the first of a group
+        max_group : int
+            Maximum number of right-hand sides solved in one block
+        tol, maxiter, cycle :
+            Parameters of multilevel_solver.solve, the tolerance applies
+            to each request
+        history : int
+            Number of recent latencies kept for metrics
+
+        """
+        if max_group < 1:
+            raise ValueError('max_group must be positive')
+
+        self.ml = ml
+        self.window = window
+        self.max_group = max_group
+        self.tol = tol
+        self.maxiter = maxiter
+        self.cycle = cycle
+        self._n = ml.levels[0].A.shape[0]
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # statistics
+        self._started = time.time()
+        self._latencies = deque(maxlen=history)
+        self._requests = 0
+        self._groups = 0
+        self._solve_time = 0.0
+
+        self._thread = threading.Thread(target=self.__run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, b, x0=None):
+        """Queue a right-hand side for solving
+
+        Parameters
+        ----------
+        b : array
+            Right-hand side, of length n
+        x0 : array
+            Initial guess, the default is zero
+
+        Returns
+        -------
+        request : solve_request
+            Pending solve, see solve_request.result
+
+        """
+        b = np.ravel(b)
+        if b.shape[0] != self._n:
+            raise ValueError('b has invalid dimensions')
+        if x0 is not None:
+            x0 = np.ravel(x0)
+            if x0.shape != b.shape:
+                raise ValueError('x0 has invalid dimensions')
+
+        request = solve_request(b, x0)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('the server is closed')
+            self._queue.put(request)
+        return request
+
+    def solve(self, b, x0=None, timeout=None):
+        """Submit a right-hand side and wait for its solution"""
+        return self.submit(b, x0).result(timeout)
+
+    def __run(self):
+        """Worker thread, groups the queued requests and solves them"""
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            group = [request]
+            deadline = time.time() + self.window
+            stop = False
+            while len(group) < self.max_group:
+                remaining = deadline - time.time()
+                try:
+                    if remaining > 0:
+                        request = self._queue.get(True, remaining)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                group.append(request)
+
+            self.__solve(group)
+            if stop:
+                return
+
+    def __solve(self, group):
+        """Solve a group of requests as one block"""
+        k = len(group)
+        start = time.time()
+        try:
+            dtype = np.result_type(*[request.b for request in group])
+            B = np.empty((self._n, k), dtype=dtype)
+            X0 = np.zeros((self._n, k), dtype=dtype)
+            for j, request in enumerate(group):
+                B[:, j] = request.b
+                if request.x0 is not None:
+                    X0[:, j] = request.x0
+
+            residuals = []
+            if k == 1:
+                X = self.ml.solve(B[:, 0], x0=X0[:, 0], tol=self.tol,
+                                  maxiter=self.maxiter, cycle=self.cycle,
+                                  residuals=residuals)
+                X = X.reshape(-1, 1)
+                residuals = [np.array([r]) for r in residuals]
+            else:
+                X = self.ml.solve(B, x0=X0, tol=self.tol,
+                                  maxiter=self.maxiter, cycle=self.cycle,
+                                  residuals=residuals)
+        except Exception as e:
+            for request in group:
+                request._finish(error=e)
+        else:
+            for j, request in enumerate(group):
+                request.residuals = [float(abs(r[j])) for r in residuals]
+                request.group_size = k
+                request._finish(x=X[:, j].copy())
+
+        with self._lock:
+            self._solve_time += time.time() - start
+            self._groups += 1
+            self._requests += k
+            self._latencies.extend(request.latency for request in group)
+
+    def metrics(self):
+        """Throughput, latency and grouping statistics of the server
+
+        Returns
+        -------
+        metrics : dict
+            'requests' and 'groups', the numbers of requests and of blocks
+            solved, 'mean_group_size', 'throughput' in requests per second
+            since the server started, 'utilization', the fraction of that
+            time spent solving, 'queued', the number of waiting requests,
+            and 'latency_mean', 'latency_p50', 'latency_p95' and
+            'latency_max', in seconds over the recent requests
+
+        """
+        with self._lock:
+            elapsed = max(time.time() - self._started, 1e-12)
+            latencies = np.array(self._latencies)
+            metrics = {'requests': self._requests,
+                       'groups': self._groups,
+                       'mean_group_size':
+                           self._requests / float(max(self._groups, 1)),
+                       'throughput': self._requests / elapsed,
+                       'utilization': self._solve_time / elapsed,
+                       'queued': self._queue.qsize()}
+
+        if len(latencies):
+            metrics['latency_mean'] = latencies.mean()
+            metrics['latency_p50'] = np.percentile(latencies, 50)
+            metrics['latency_p95'] = np.percentile(latencies, 95)
+            metrics['latency_max'] = latencies.max()
+        else:
+            for key in ['mean', 'p50', 'p95', 'max']:
+                metrics['latency_' + key] = 0.0
+        return metrics
+
+    def close(self):
+        """Solve the queued requests and stop the worker thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
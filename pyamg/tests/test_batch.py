@@ -0,0 +1,129 @@
+import numpy as np
+from scipy import rand
+from scipy.linalg import norm
+from scipy.sparse import block_diag
+from pyamg import smoothed_aggregation_solver, ruge_stuben_solver
+from pyamg.gallery import poisson, linear_elasticity
+from pyamg.krylov import cg
+from pyamg.batch import batch_setup, batch_solve, component_solver
+
+from numpy.testing import TestCase, assert_equal, assert_almost_equal, \
+    assert_raises
+
+
+class TestBatch(TestCase):
+    def setUp(self):
+        self.cases = []
+        for n in [10, 20, 30]:
+            self.cases.append(poisson((n, n), format='csr'))
+        self.cases.append(linear_elasticity((8, 8))[0])
+
+    def test_batch_setup(self):
+        As = self.cases
+        for solver, fn in [('sa', smoothed_aggregation_solver),
+                           ('rs', ruge_stuben_solver)]:
+            for workers in [1, 2]:
+                mls = batch_setup(As, solver=solver, workers=workers,
+                                  max_coarse=10)
+                assert_equal(len(mls), len(As))
+
+                for A, ml in zip(As, mls):
+                    gold = fn(A, max_coarse=10)
+                    assert_equal(len(ml.levels), len(gold.levels))
+                    for lvl, lvl_gold in zip(ml.levels, gold.levels):
+                        assert_equal(lvl.A.shape, lvl_gold.A.shape)
+
+                    # the arrays are mapped from the workers' output
+                    if workers > 1:
+                        base = ml.levels[0].P.data
+                        while not isinstance(base, (np.memmap, type(None))):
+                            base = base.base
+                        assert(isinstance(base, np.memmap))
+
+                    b = rand(A.shape[0])
+                    x = ml.solve(b, tol=1e-8, maxiter=100)
+                    assert(norm(b - A * x) < 1e-8 * norm(b))
+
+        # user-defined setup function
+        mls = batch_setup(As[:2], solver=smoothed_aggregation_solver,
+                          workers=2, max_coarse=10, presmoother='jacobi')
+        assert_equal(mls[0].levels[0].smoothers['presmoother'][0], 'jacobi')
+
+        assert_raises(ValueError, batch_setup, As, solver='unknown')
+
+    def test_batch_solve(self):
+        As = self.cases
+        mls = [smoothed_aggregation_solver(A, max_coarse=10) for A in As]
+        # several right-hand sides for the first hierarchy
+        mls.append(mls[0])
+        As = As + [As[0]]
+        bs = [rand(A.shape[0]) for A in As]
+        bs[-1] = rand(As[-1].shape[0], 3)
+
+        for workers in [1, 3]:
+            xs = batch_solve(mls, bs, workers=workers, tol=1e-8, accel='cg')
+            for ml, b, x in zip(mls, bs, xs):
+                assert_equal(x.shape, b.shape)
+                assert_almost_equal(x, ml.solve(b, tol=1e-8, accel='cg'))
+
+        assert_raises(ValueError, batch_solve, mls, bs[:-1])
+
+
+class TestComponentSolver(TestCase):
+    def setUp(self):
+        # decoupled blocks, permuted so that the components interleave
+        A = block_diag([poisson((20, 20)), poisson((15, 15)),
+                        poisson((3,)), poisson((2, 2))], format='csr')
+        np.random.seed(0)
+        perm = np.random.permutation(A.shape[0])
+        self.A = A[perm, :][:, perm].tocsr()
+
+    def test_components(self):
+        A = self.A
+        ml = component_solver(A, min_size=10, workers=2, max_coarse=10)
+        assert_equal(len(ml.solvers), 2)
+        assert_equal(sorted(len(idx) for idx in ml.components), [225, 400])
+        assert_equal(len(ml.direct), 7)
+        unknowns = np.sort(np.concatenate(ml.components + [ml.direct]))
+        assert_equal(unknowns, np.arange(A.shape[0]))
+        # each hierarchy sees only its component
+        for idx, mlc in zip(ml.components, ml.solvers):
+            assert_equal(mlc.levels[0].A.toarray(),
+                         A[idx, :][:, idx].toarray())
+
+        # BSR blocks are kept together
+        Ab = linear_elasticity((6, 6))[0]
+        Ab = block_diag([Ab, Ab], format='bsr').tobsr(blocksize=(2, 2))
+        ml = component_solver(Ab, min_size=10, max_coarse=10)
+        assert_equal(len(ml.solvers), 2)
+        assert_equal(ml.solvers[0].levels[0].A.blocksize, (2, 2))
+
+        assert_raises(TypeError, component_solver, A.toarray())
+
+    def test_solve(self):
+        A = self.A
+        ml = component_solver(A, solver='rs', min_size=10, workers=2,
+                              max_coarse=10)
+        b = rand(A.shape[0])
+        for accel in [None, 'cg']:
+            residuals = []
+            x = ml.solve(b, tol=1e-8, accel=accel, residuals=residuals)
+            assert(norm(b - A * x) < 1e-7 * norm(b))
+            assert(residuals[-1] < 1e-7 * norm(b))
+
+        # the components are solved independently
+        for idx, mlc in zip(ml.components, ml.solvers):
+            assert_almost_equal(x[idx], mlc.solve(b[idx], tol=1e-8,
+                                                  accel='cg'))
+
+        # several right-hand sides
+        B = rand(A.shape[0], 3)
+        X = ml.solve(B, tol=1e-8)
+        assert_equal(X.shape, B.shape)
+        assert(norm(B - A * X) < 1e-7 * norm(B))
+
+        # preconditioner
+        M = ml.aspreconditioner()
+        x, info = cg(A, b, tol=1e-8, maxiter=100, M=M)
+        assert(norm(b - A * x) < 1e-7 * norm(b))
+        assert_raises(ValueError, ml.solve, b[:-1])
@@ -1,8 +1,10 @@
 from numpy import zeros_like
+from scipy.sparse import block_diag
 from scipy import rand
 from scipy.linalg import norm
 from pyamg.gallery import poisson, load_example
 from pyamg.blackbox import solve
+from pyamg.batch import component_solver
 
 from numpy.testing import TestCase
 
@@ -52,3 +54,15 @@ class TestBlackbox(TestCase):
         (x, ml) = solve(A, b, return_solver=True, verb=False,
                         maxiter=A.shape[0])
         assert(ml.levels[0].BH is not None)
+
+        # (6) Solve decoupled components independently
+        A = block_diag([poisson((20, 20)), self.cases[2][0],
+                        poisson((2,))], format='csr')
+        b = rand(A.shape[0])
+        (x, ml) = solve(A, b, return_solver=True, verb=False, decouple=True,
+                        tol=1e-8, maxiter=A.shape[0])
+        assert(isinstance(ml, component_solver))
+        assert(len(ml.solvers) == 2)
+        assert(norm(b - A*x)/norm(b) < 1e-7)
+        x = solve(A, b, existing_solver=ml, verb=False, tol=1e-8)
+        assert(norm(b - A*x)/norm(b) < 1e-7)
@@ -0,0 +1,84 @@
+import numpy as np
+from scipy import rand
+from scipy.linalg import norm
+from pyamg import ruge_stuben_solver
+from pyamg.gallery import poisson
+from pyamg.krylov import cg, fgmres
+from pyamg.decomposition import schwarz_preconditioner
+
+from numpy.testing import TestCase, assert_equal, assert_almost_equal, \
+    assert_raises
+
+
+class TestSchwarzPreconditioner(TestCase):
+    def test_subdomains(self):
+        A = poisson((20, 20), format='csr')
+        for partition in ['lloyd', 'rcm', np.arange(400) // 100]:
+            with schwarz_preconditioner(A, n_subdomains=4,
+                                        partition=partition, overlap=2,
+                                        workers=2, max_coarse=10) as M:
+                assert_equal(len(M.owned), 4)
+                owned = np.sort(np.concatenate(M.owned))
+                assert_equal(owned, np.arange(A.shape[0]))
+                for idx, own in zip(M.subdomains, M.owned):
+                    assert(np.in1d(own, idx).all())
+                    # two layers of neighbors
+                    mask = np.zeros(A.shape[0], dtype=bool)
+                    mask[own] = True
+                    for layer in range(2):
+                        mask = mask | (abs(A) * mask > 0)
+                    assert_equal(idx, np.where(mask)[0])
+
+    def test_apply(self):
+        A = poisson((30, 30), format='csr')
+        x = rand(A.shape[0])
+
+        for method in ['ras', 'as']:
+            M = schwarz_preconditioner(A, n_subdomains=3, method=method,
+                                       solver='rs', workers=2, max_coarse=10)
+            y = M * x
+
+            # serial application of the subdomain cycles
+            y_gold = np.zeros(A.shape[0])
+            for idx, own in zip(M.subdomains, M.owned):
+                ml = ruge_stuben_solver(A[idx, :][:, idx].tocsr(),
+                                        max_coarse=10)
+                yi = ml.precondition(x[idx])
+                if method == 'ras':
+                    y_gold[own] += yi[np.searchsorted(idx, own)]
+                else:
+                    y_gold[idx] += yi
+            assert_almost_equal(y, y_gold)
+
+            # complex vectors with a real preconditioner
+            assert_almost_equal(M * (x + 2.0j * x), y + 2.0j * y)
+
+            M.close()
+            assert_raises(RuntimeError, M.matvec, x)
+
+    def test_krylov(self):
+        A = poisson((40, 40), format='csr')
+        b = rand(A.shape[0])
+
+        with schwarz_preconditioner(A, n_subdomains=4, workers=2) as M:
+            residuals = []
+            x, info = fgmres(A, b, tol=1e-8, maxiter=100, M=M,
+                             residuals=residuals)
+            assert(norm(b - A * x) < 1e-7 * norm(b))
+
+        with schwarz_preconditioner(A, n_subdomains=4, method='as',
+                                    workers=2) as M:
+            x, info = cg(A, b, tol=1e-8, maxiter=200, M=M)
+            assert(norm(b - A * x) < 1e-7 * norm(b))
+
+    def test_errors(self):
+        A = poisson((10, 10), format='csr')
+        assert_raises(ValueError, schwarz_preconditioner, A, method='x')
+        assert_raises(ValueError, schwarz_preconditioner, A,
+                      partition='unknown')
+        assert_raises(ValueError, schwarz_preconditioner, A,
+                      partition=np.zeros(5))
+        assert_raises(TypeError, schwarz_preconditioner, A.toarray())
+        # failures in the workers are raised
+        assert_raises(RuntimeError, schwarz_preconditioner, A,
+                      n_subdomains=2, workers=2, max_coarse='x')
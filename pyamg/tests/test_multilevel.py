@@ -7,7 +7,8 @@ from pyamg.gallery import poisson
 from pyamg.multilevel import multilevel_solver, coarse_grid_solver
 from pyamg.relaxation.smoothing import change_smoothers
 
-from numpy.testing import TestCase, assert_almost_equal, assert_equal
+from numpy.testing import TestCase, assert_almost_equal, assert_equal, \
+    assert_array_equal, assert_raises
 
 def precon_norm(v, ml):
     ''' helper function to calculate preconditioner norm of v '''
@@ -66,6 +67,42 @@ class TestMultilevel(TestCase):
             # fgmres satisfies convergence in the 2-norm
             assert(norm(b - A*x) < 1e-8*norm(b))
 
+    def test_precondition(self):
+        from numpy import empty, zeros
+        from pyamg import smoothed_aggregation_solver
+
+        A = poisson((30, 30), format='csr')
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        b = rand(A.shape[0])
+
+        for workspace in [False, True]:
+            if workspace:
+                ml.allocate_workspace()
+            for cycle in ['V', 'W', 'F', 'AMLI']:
+                x = ml.solve(b, maxiter=1, cycle=cycle)
+                assert_almost_equal(ml.precondition(b, cycle=cycle), x)
+
+                # the output buffer is overwritten and returned
+                out = rand(A.shape[0])
+                z = ml.precondition(b, out=out, cycle=cycle)
+                assert(z is out)
+                assert_almost_equal(out, x)
+
+        # column vectors and blocks
+        B = rand(A.shape[0], 3)
+        out = empty((A.shape[0], 1))
+        ml.precondition(B[:, [1]], out=out)
+        assert_almost_equal(out[:, 0], ml.solve(B[:, 1], maxiter=1))
+        Z = ml.precondition(B)
+        for k in range(3):
+            assert_almost_equal(Z[:, k], ml.solve(B[:, k], maxiter=1))
+
+        # invalid output buffers
+        self.assertRaises(ValueError, ml.precondition, b,
+                          out=zeros(A.shape[0] + 1))
+        self.assertRaises(TypeError, ml.precondition, b,
+                          out=zeros(A.shape[0], dtype=complex))
+
     def test_accel(self):
         from pyamg import smoothed_aggregation_solver
         from pyamg.krylov import cg, bicgstab
@@ -97,6 +134,585 @@ class TestMultilevel(TestCase):
             # print residuals
             assert_almost_equal(norm(b - A*x), residuals[-1])
 
+    def test_workspace(self):
+        from pyamg import smoothed_aggregation_solver
+        from pyamg.gallery import linear_elasticity
+
+        cases = []
+        cases.append(poisson((30, 30), format='csr'))
+        cases.append(linear_elasticity((10, 10))[0])
+
+        for A in cases:
+            b = rand(A.shape[0])
+            ml = smoothed_aggregation_solver(A, max_coarse=10)
+            assert_equal(ml.workspace_bytes(), 0)
+
+            # residual on all but the coarsest level, x and b on all but
+            # the finest level
+            sizes = [lvl.A.shape[0] for lvl in ml.levels]
+            nbytes = 8 * (3 * sum(sizes) - 2 * sizes[0] - sizes[-1])
+
+            ml_work = smoothed_aggregation_solver(A, max_coarse=10,
+                                                  workspace=True)
+            assert_equal(ml_work.workspace_bytes(), nbytes)
+
+            for cycle in ['V', 'W', 'F', 'AMLI']:
+                ml.workspace = False
+                res1, res2 = [], []
+                x1 = ml.solve(b, maxiter=5, cycle=cycle, residuals=res1)
+                ml.allocate_workspace()
+                x2 = ml.solve(b, maxiter=5, cycle=cycle, residuals=res2)
+                assert_equal(ml.workspace_bytes(), nbytes)
+                assert_almost_equal(x1, x2)
+                assert_almost_equal(res1, res2)
+
+            ml.allocate_workspace(dtype=complex)
+            assert_equal(ml.workspace_bytes(), 2*nbytes)
+
+    def test_mixed_precision(self):
+        import numpy as np
+        from pyamg import smoothed_aggregation_solver, ruge_stuben_solver
+        from pyamg.classical.air import AIR_solver
+
+        A = poisson((30, 30), format='csr')
+        b = rand(A.shape[0])
+
+        for solver in [smoothed_aggregation_solver, ruge_stuben_solver]:
+            for precision in ['coarse', 'all']:
+                ml = solver(A, max_coarse=10, mixed_precision=precision)
+                fine = 1 if precision == 'coarse' else 0
+                for lvl in ml.levels[fine:]:
+                    assert_equal(lvl.A.dtype, np.float32)
+                for lvl in ml.levels[:-1]:
+                    assert_equal(lvl.P.dtype, np.float32)
+                    assert_equal(lvl.R.dtype, np.float32)
+                if precision == 'all':
+                    assert_equal(ml.levels[0].A_refine.dtype, np.float64)
+                else:
+                    assert_equal(ml.levels[0].A.dtype, np.float64)
+
+                # iterative refinement attains double precision accuracy
+                x = ml.solve(b, tol=1e-10, maxiter=50)
+                assert_equal(x.dtype, np.float64)
+                assert(norm(b - A * x) < 1e-9 * norm(b))
+
+                X = ml.solve(np.column_stack([b, 2 * b]), tol=1e-10,
+                             maxiter=50)
+                assert(norm(b - A * X[:, 0]) < 1e-9 * norm(b))
+
+                ml.allocate_workspace()
+                x = ml.solve(b, tol=1e-10, maxiter=50)
+                assert(norm(b - A * x) < 1e-9 * norm(b))
+
+                M = ml.aspreconditioner()
+                assert_equal(M.dtype, np.float64)
+                assert_equal((M * b).dtype, np.float64)
+
+        ml = AIR_solver(A, max_coarse=10, mixed_precision='coarse')
+        for lvl in ml.levels[1:]:
+            assert_equal(lvl.A.dtype, np.float32)
+        res1, res2 = [], []
+        AIR_solver(A, max_coarse=10).solve(b, maxiter=5, residuals=res1)
+        ml.solve(b, maxiter=5, residuals=res2)
+        assert_almost_equal(res2, res1, decimal=4)
+
+        assert_raises(ValueError, ml.set_precision, 'fine')
+        assert_raises(TypeError, ml.set_precision, 'all', np.complex64)
+
+    def test_galerkin_product(self):
+        from pyamg.multilevel import galerkin_product
+        from pyamg import smoothed_aggregation_solver, ruge_stuben_solver
+        from pyamg.gallery import linear_elasticity
+
+        cases = []
+        A = poisson((10, 10), format='csr')
+        cases.append(ruge_stuben_solver(A, max_coarse=10).levels[0])
+        cases.append(smoothed_aggregation_solver(A, max_coarse=10).levels[0])
+        A = linear_elasticity((6, 6))[0]
+        cases.append(smoothed_aggregation_solver(A, max_coarse=10).levels[0])
+        A = poisson((10, 10), format='csr')
+        A = (A + 1.0j * A).tocsr()
+        cases.append(smoothed_aggregation_solver(A, max_coarse=10).levels[0])
+
+        for lvl in cases:
+            lvl.__dict__.pop('RAP_plan', None)
+            R, A, P = lvl.R, lvl.A, lvl.P
+            rb, ab, pb = [getattr(M, 'blocksize', (1, 1))[k]
+                          for M, k in [(R, 0), (P, 0), (P, 1)]]
+
+            # the amg_core kernels give the scipy product (R*A)*P, including
+            # the order of the indices and the explicit zeros on which the
+            # next level may depend
+            cost = [0.0]
+            Ac2 = galerkin_product(lvl, cost=cost)
+            assert_equal(type(Ac2), type(lvl.P))
+            RAP = (R * A) * P
+            assert_equal(Ac2.indptr, RAP.indptr)
+            assert_equal(Ac2.indices, RAP.indices)
+            assert_equal(Ac2.data, RAP.data)
+
+            # count the multiply-adds of the blocks R_ik A_kl and of the
+            # blocks (R*A)_il P_lj, assuming no numerical cancellation
+            flops = 0
+            for i in range(R.indptr.shape[0] - 1):
+                RA_cols = set()
+                for k in R.indices[R.indptr[i]:R.indptr[i+1]]:
+                    for l in A.indices[A.indptr[k]:A.indptr[k+1]]:
+                        flops += rb * ab * ab
+                        RA_cols.add(l)
+                for l in RA_cols:
+                    flops += rb * ab * pb * (P.indptr[l+1] - P.indptr[l])
+            assert_equal(cost[0], flops)
+
+            # the symbolic product is reused
+            plan = lvl.RAP_plan
+            Ac3 = galerkin_product(lvl, cost=cost)
+            assert(lvl.RAP_plan is plan)
+            assert_equal(cost[0], 2 * plan[2])
+            assert_equal(Ac3.data, Ac2.data)
+
+        # AIR forms its coarse operators with the coarse-grid R and P
+        from pyamg.classical.air import AIR_solver
+        A = poisson((10, 10), format='csr')
+        ml = AIR_solver(A, max_coarse=10)
+        for i, lvl in enumerate(ml.levels[:-1]):
+            plan = lvl.RAP_plan
+            Ac = galerkin_product(lvl)
+            assert(lvl.RAP_plan is plan)
+            assert_almost_equal(Ac.toarray(), ml.levels[i + 1].A.toarray())
+
+        # optional coarse-grid P, and operators without amg_core kernels
+        lvl = cases[0]
+        lvl.coarse_grid_P = 2.0 * lvl.P.tocsc()
+        cost = [0.0]
+        Ac = galerkin_product(lvl, cost=cost)
+        assert_almost_equal(Ac.toarray(),
+                            (2.0 * lvl.R * lvl.A * lvl.P).toarray())
+        assert(cost[0] > 0)
+
+    def test_update(self):
+        import numpy as np
+        from scipy.sparse import eye
+        from pyamg.classical import direct_interpolation
+        from pyamg import smoothed_aggregation_solver, ruge_stuben_solver
+        from pyamg.gallery import linear_elasticity
+
+        cases = []
+        cases.append(poisson((30, 30), format='csr'))
+        cases.append(linear_elasticity((10, 10))[0])
+
+        for A in cases:
+            b = rand(A.shape[0])
+            A2 = (A + 0.1 * eye(A.shape[0], format='csr')).asformat(A.format)
+
+            for solver in [smoothed_aggregation_solver, ruge_stuben_solver]:
+                ml = solver(A, max_coarse=10)
+                P = [lvl.P for lvl in ml.levels[:-1]]
+                ml.freeze()
+                frozen = ml.frozen is not None
+
+                ml.update(A2)
+                assert_equal(ml.frozen is not None, frozen)
+                for i, lvl in enumerate(ml.levels[:-1]):
+                    # P is interpolated anew, with the same coarsening
+                    fn, kwargs = lvl.interpolation
+                    assert(lvl.P is not P[i])
+                    assert_equal(lvl.P.shape, P[i].shape)
+                    if fn == 'direct':
+                        P2 = direct_interpolation(lvl.A, kwargs['C'],
+                                                  lvl.splitting)
+                        assert_equal(lvl.P.toarray(), P2.toarray())
+                    Ac = (lvl.R * lvl.A * lvl.P).toarray()
+                    assert_almost_equal(ml.levels[i + 1].A.toarray(), Ac)
+                    assert_equal(type(ml.levels[i + 1].A), type(lvl.P))
+
+                x = ml.solve(b, tol=1e-8, maxiter=50)
+                assert(norm(b - A2 * x) < 1e-8 * norm(b))
+
+                # updates with the same patterns reuse the symbolic
+                # products
+                plans = [lvl.RAP_plan for lvl in ml.levels[:-1]]
+                ml.update(2.0 * A2)
+                x2 = ml.solve(b, tol=1e-8, maxiter=50)
+                assert(norm(2.0 * x2 - x) < 1e-6 * norm(x))
+                for i, lvl in enumerate(ml.levels[:-1]):
+                    assert(lvl.RAP_plan is plans[i])
+                    Ac = (lvl.R * lvl.A * lvl.P).toarray()
+                    assert_almost_equal(ml.levels[i + 1].A.toarray(), Ac)
+
+        A = poisson((30, 30), format='csr')
+        ml = ruge_stuben_solver(A, max_coarse=10, mixed_precision='all')
+        ml.update(2.0 * A)
+        assert_equal(ml.levels[0].A_refine.dtype, np.float64)
+        for lvl in ml.levels:
+            assert_equal(lvl.A.dtype, np.float32)
+        for lvl in ml.levels[:-1]:
+            assert_equal(lvl.P.dtype, np.float32)
+
+        # P and R without a recorded interpolation are kept
+        ml = smoothed_aggregation_solver(A, max_coarse=10, smooth='energy')
+        P = [lvl.P for lvl in ml.levels[:-1]]
+        ml.update(2.0 * A)
+        for i, lvl in enumerate(ml.levels[:-1]):
+            assert(not hasattr(lvl, 'interpolation'))
+            assert(lvl.P is P[i])
+
+        # smoothers that convert A use the new operators
+        ml = ruge_stuben_solver(A, max_coarse=10,
+                                presmoother='gauss_seidel_nr',
+                                postsmoother='schwarz')
+        ml.update(2.0 * A)
+        for lvl in ml.levels[:-1]:
+            assert_equal(lvl.Acsc.toarray(), lvl.A.toarray())
+            assert_equal(lvl.Acsr.toarray(), lvl.A.toarray())
+
+        assert_raises(ValueError, ml.update, poisson((20, 20), format='csr'))
+        assert_raises(TypeError, ml.update, A.toarray())
+
+    def test_save_load(self):
+        import os
+        import tempfile
+        import numpy as np
+        from pyamg import smoothed_aggregation_solver, ruge_stuben_solver
+        from pyamg.gallery import linear_elasticity
+
+        A = poisson((20, 20), format='csr')
+        E = linear_elasticity((8, 8))[0]
+        cases = []
+        cases.append(smoothed_aggregation_solver(
+            A, strength='evolution', smooth='energy', max_coarse=10,
+            presmoother='jacobi', postsmoother='schwarz'))
+        cases.append(ruge_stuben_solver(A, max_coarse=10,
+                                        coarse_solver='splu'))
+        cases.append(ruge_stuben_solver(A, max_coarse=10, workspace=True,
+                                        mixed_precision='all'))
+        cases.append(smoothed_aggregation_solver(E, max_coarse=10))
+        cases[-1].freeze()
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            for ml in cases:
+                b = rand(ml.levels[0].A.shape[0])
+                x = ml.solve(b, tol=1e-8, maxiter=50)
+                ml.save(path)
+
+                for mmap in [True, False]:
+                    ml2 = multilevel_solver.load(path, mmap=mmap)
+                    assert_equal(len(ml2.levels), len(ml.levels))
+                    assert_equal(ml2.workspace, ml.workspace)
+                    assert_equal(ml2.frozen is not None,
+                                 ml.frozen is not None)
+                    for lvl, lvl2 in zip(ml.levels, ml2.levels):
+                        assert_equal(sorted(lvl2.__dict__.keys()),
+                                     sorted(lvl.__dict__.keys()))
+                        assert_equal(type(lvl2.A), type(lvl.A))
+                        assert_equal(lvl2.A.dtype, lvl.A.dtype)
+                        assert_equal(lvl2.A.toarray(), lvl.A.toarray())
+                        assert_equal(lvl2.smoothers, lvl.smoothers)
+                        assert(not lvl2.A.data.flags.owndata)
+                        if hasattr(lvl.A, 'rho_D_inv'):
+                            assert_equal(lvl2.A.rho_D_inv, lvl.A.rho_D_inv)
+                    for lvl, lvl2 in zip(ml.levels[:-1], ml2.levels[:-1]):
+                        assert_equal(lvl2.P.toarray(), lvl.P.toarray())
+                        assert_equal(lvl2.R.toarray(), lvl.R.toarray())
+                        # arrays shared by several objects are stored once
+                        if lvl.RAP_plan[0][4] is lvl.P.indptr:
+                            assert(lvl2.RAP_plan[0][4] is lvl2.P.indptr)
+                        if hasattr(lvl, 'Acsr'):
+                            assert(hasattr(lvl2.Acsr, 'schwarz_parameters'))
+
+                    x2 = ml2.solve(b, tol=1e-8, maxiter=50)
+                    assert_almost_equal(x2, x)
+                    assert_equal(x2.dtype, x.dtype)
+
+                    # the loaded arrays are private copies of the file
+                    ml2.update(2.0 * ml2.levels[0].A)
+        finally:
+            os.remove(path)
+
+        assert_raises(ValueError, multilevel_solver.load, __file__)
+
+    def test_concurrent_solve(self):
+        import threading
+        from pyamg import smoothed_aggregation_solver, ruge_stuben_solver
+        from pyamg.gallery import linear_elasticity
+
+        A = poisson((30, 30), format='csr')
+        E = linear_elasticity((10, 10))[0]
+        cases = []
+        cases.append(ruge_stuben_solver(A, max_coarse=10, workspace=True))
+        cases.append(ruge_stuben_solver(A, max_coarse=10,
+                                        coarse_solver='splu'))
+        cases.append(smoothed_aggregation_solver(E, max_coarse=10,
+                                                 workspace=True))
+        cases.append(ruge_stuben_solver(A, max_coarse=10,
+                                        mixed_precision='all'))
+        ml = ruge_stuben_solver(A, max_coarse=10, workspace=True)
+        ml.freeze()
+        cases.append(ml)
+
+        for ml in cases:
+            n = ml.levels[0].A.shape[0]
+            bs = [rand(n) for i in range(8)]
+            expected = [ml.solve(b, tol=1e-8, maxiter=20) for b in bs]
+            ml.coarse_solver.reset()
+
+            # all threads share the hierarchy, its work vectors and the
+            # lazily factored coarse grid solver
+            results = [None] * len(bs)
+            start = threading.Event()
+
+            def run(i):
+                start.wait()
+                results[i] = ml.solve(bs[i], tol=1e-8, maxiter=20)
+                ml.precondition(bs[i])
+
+            threads = [threading.Thread(target=run, args=(i,))
+                       for i in range(len(bs))]
+            for t in threads:
+                t.start()
+            start.set()
+            for t in threads:
+                t.join()
+
+            for x, y in zip(results, expected):
+                assert_almost_equal(x, y)
+
+    def test_block_solve(self):
+        from numpy import zeros, column_stack
+        from pyamg import smoothed_aggregation_solver
+        from pyamg.gallery import linear_elasticity
+
+        cases = []
+        cases.append((poisson((20, 20), format='csr'), {}))
+        cases.append((poisson((20, 20), format='csr'),
+                      {'presmoother': 'gauss_seidel_nr',
+                       'postsmoother': ('jacobi', {'iterations': 2}),
+                       'coarse_solver': 'cg'}))
+        cases.append((linear_elasticity((8, 8))[0],
+                      {'coarse_solver': 'splu'}))
+
+        for A, kwargs in cases:
+            ml = smoothed_aggregation_solver(A, max_coarse=10, **kwargs)
+            B = rand(A.shape[0], 4)
+            B[:, 2] = 0.0
+
+            for cycle in ['V', 'W', 'F', 'AMLI']:
+                residuals = []
+                X = ml.solve(B, tol=1e-6, maxiter=20, cycle=cycle,
+                             residuals=residuals)
+                assert_equal(X.shape, B.shape)
+                assert_equal(X[:, 2], zeros(A.shape[0]))
+                for k in [0, 1, 3]:
+                    res = []
+                    x = ml.solve(B[:, k], tol=1e-6, maxiter=20, cycle=cycle,
+                                 residuals=res)
+                    assert_almost_equal(X[:, k], x)
+                    # converged columns keep their final residual
+                    assert_almost_equal([r[k] for r in residuals][:len(res)],
+                                        res)
+                    assert_almost_equal(residuals[-1][k], res[-1])
+
+            X = ml.solve(B, tol=1e-8, maxiter=30, accel='cg')
+            for k in [0, 1, 3]:
+                assert(norm(B[:, k] - A*X[:, k]) < 1e-6*norm(B[:, k]))
+
+            M = ml.aspreconditioner()
+            assert_almost_equal(M.matmat(B),
+                                column_stack([M*B[:, k] for k in range(4)]))
+
+    def test_fused_kernels(self):
+        from scipy.sparse import bsr_matrix
+        from pyamg.multilevel import _residual_restrict, _interpolate_add
+        from pyamg.util.utils import set_num_threads, get_num_threads
+
+        A = poisson((12, 12), format='csr')
+        P = csr_matrix(rand(A.shape[0], 20))
+        P.data[P.data < 0.8] = 0.0
+        P.eliminate_zeros()
+
+        cases = []
+        cases.append((A, P, P.T))                 # CSR A, CSC R
+        cases.append((A, P, P.T.tocsr()))         # CSR A, CSR R
+        cases.append((bsr_matrix(A, blocksize=(2, 2)),
+                      bsr_matrix(P, blocksize=(2, 2)),
+                      bsr_matrix(P.T, blocksize=(2, 2))))
+        cases.append((bsr_matrix(A, blocksize=(3, 3)),
+                      bsr_matrix(P, blocksize=(3, 1)), P.T))
+        cases.append((A + 1.0j*A, P - 2.0j*P, (P - 2.0j*P).H))
+        # large enough to be split among several threads
+        A = poisson((150, 150), format='csr')
+        P = csr_matrix(rand(A.shape[0], 40))
+        P.data[P.data < 0.95] = 0.0
+        P.eliminate_zeros()
+        cases.append((A, P, P.T.tocsr()))
+        R = bsr_matrix(P.T, blocksize=(2, 2))
+        R.sort_indices()
+        cases.append((bsr_matrix(A, blocksize=(2, 2)),
+                      bsr_matrix(P, blocksize=(2, 2)), R))
+
+        n_threads = get_num_threads()
+        for A, P, R in cases:
+            lvl = multilevel_solver.level()
+            lvl.A, lvl.P, lvl.R = A, P, R
+            x = rand(A.shape[0]).astype(A.dtype)
+            b = rand(A.shape[0]).astype(A.dtype)
+            y = rand(R.shape[0]).astype(A.dtype)
+
+            coarse_b = 0*y
+            assert(_residual_restrict(lvl, x, b, coarse_b))
+            assert_almost_equal(coarse_b, R*(b - A*x))
+
+            x_new = x.copy()
+            assert(_interpolate_add(lvl, y, x_new))
+            assert_almost_equal(x_new, x + P*y)
+
+            # the fused serial kernels and the threaded kernels agree exactly
+            coarse_b1, coarse_b4 = 0*y, 0*y
+            x1, x4 = x.copy(), x.copy()
+            try:
+                set_num_threads(1)
+                _residual_restrict(lvl, x, b, coarse_b1)
+                _interpolate_add(lvl, y, x1)
+                set_num_threads(4)
+                _residual_restrict(lvl, x, b, coarse_b4)
+                _interpolate_add(lvl, y, x4)
+            finally:
+                set_num_threads(n_threads)
+            assert_array_equal(coarse_b1, coarse_b4)
+            assert_array_equal(x1, x4)
+
+        # unsupported formats fall back to the generic cycle
+        lvl = multilevel_solver.level()
+        lvl.A, lvl.P, lvl.R = A.tocsc(), P.tocsc(), R
+        assert(not _residual_restrict(lvl, x, b, coarse_b))
+        assert(not _interpolate_add(lvl, y, x_new))
+
+    def test_threaded_kernels(self):
+        import numpy as np
+        from scipy.sparse import bsr_matrix
+        from pyamg import amg_core, ruge_stuben_solver
+        from pyamg.gallery import linear_elasticity
+        from pyamg.util.utils import set_num_threads, get_num_threads
+
+        # large enough to be split among several threads
+        cases = []
+        A = poisson((150, 150), format='csr')
+        cases.append(A)
+        cases.append((A + 1.0j * A).tocsr())
+        cases.append(linear_elasticity((60, 60))[0])
+        cases.append(bsr_matrix(A, blocksize=(3, 3)))
+
+        for A in cases:
+            x = rand(A.shape[0]).astype(A.dtype)
+            b = rand(A.shape[0]).astype(A.dtype)
+            R, C = getattr(A, 'blocksize', (1, 1))
+
+            y, r = [], []
+            for n_threads in [1, 2, 5]:
+                yk = b.copy()
+                rk = np.empty_like(b)
+                if R == C == 1:
+                    amg_core.csr_matvec_threaded(A.indptr, A.indices, A.data,
+                                                 x, yk, n_threads)
+                    amg_core.csr_residual_threaded(A.indptr, A.indices,
+                                                   A.data, x, b, rk,
+                                                   n_threads)
+                else:
+                    amg_core.bsr_matvec_threaded(A.indptr, A.indices,
+                                                 np.ravel(A.data), x, yk,
+                                                 R, C, n_threads)
+                    amg_core.bsr_residual_threaded(A.indptr, A.indices,
+                                                   np.ravel(A.data), x, b,
+                                                   rk, R, C, n_threads)
+                y.append(yk)
+                r.append(rk)
+
+            assert_almost_equal(y[0], b + A * x)
+            assert_almost_equal(r[0], b - A * x)
+            # results do not depend on the number of threads
+            for k in range(1, len(y)):
+                assert_equal(y[k], y[0])
+                assert_equal(r[k], r[0])
+
+        # the cycle uses the threaded kernels, with identical results for
+        # any number of threads
+        A = poisson((150, 150), format='csr')
+        b = rand(A.shape[0])
+        ml = ruge_stuben_solver(A, max_coarse=10)
+        ml.levels[0].R = ml.levels[0].R.tocsr()
+        try:
+            results = []
+            for n_threads in [2, 4]:
+                set_num_threads(n_threads)
+                assert_equal(get_num_threads(), n_threads)
+                residuals = []
+                x = ml.solve(b, tol=1e-8, maxiter=30, residuals=residuals)
+                results.append((x, residuals))
+                assert(residuals[-1] < 1e-8 * residuals[0])
+            assert_equal(results[0][0], results[1][0])
+            assert_equal(results[0][1], results[1][1])
+
+            set_num_threads(None)
+            assert(get_num_threads() >= 1)
+            assert_raises(ValueError, set_num_threads, 0)
+            assert_raises(ValueError, set_num_threads, 1.5)
+        finally:
+            set_num_threads(1)
+
+    def test_freeze(self):
+        from pyamg import smoothed_aggregation_solver, ruge_stuben_solver
+        from pyamg.gallery import linear_elasticity
+
+        A = poisson((20, 20), format='csr')
+        cases = []
+        cases.append((smoothed_aggregation_solver(A, max_coarse=10),
+                      [('gauss_seidel', {'sweep': 'symmetric'}),
+                       ('jacobi', {'iterations': 2, 'omega': 0.8})]))
+        cases.append((smoothed_aggregation_solver(
+                      linear_elasticity((8, 8))[0], max_coarse=10),
+                      [('gauss_seidel', {'sweep': 'backward'}), 'jacobi']))
+        cases.append((ruge_stuben_solver(A, max_coarse=10),
+                      [('CF_jacobi', {'F_iterations': 2}),
+                       ('FC_jacobi', {'omega': 0.9, 'withrho': True})]))
+
+        for ml, smoothers in cases:
+            b = rand(ml.levels[0].A.shape[0])
+            for smoother in smoothers:
+                change_smoothers(ml, smoother, smoother)
+                assert(ml.frozen is None)
+                for cycle in ['V', 'W', 'F']:
+                    for cyclesPerLevel in [1, 2]:
+                        res1, res2 = [], []
+                        x1 = ml.solve(b, maxiter=5, cycle=cycle,
+                                      cyclesPerLevel=cyclesPerLevel,
+                                      residuals=res1)
+                        assert(ml.freeze())
+                        x2 = ml.solve(b, maxiter=5, cycle=cycle,
+                                      cyclesPerLevel=cyclesPerLevel,
+                                      residuals=res2)
+                        ml.frozen = None
+                        assert_almost_equal(x1, x2)
+                        assert_almost_equal(res1, res2)
+
+            # AMLI-cycles and blocks use the Python cycle
+            ml.freeze()
+            x = ml.solve(b, maxiter=5, cycle='AMLI')
+            X = ml.solve(rand(b.shape[0], 2), maxiter=5)
+            assert_equal(X.shape, (b.shape[0], 2))
+            ml.frozen = None
+            assert_almost_equal(x, ml.solve(b, maxiter=5, cycle='AMLI'))
+
+        # unsupported smoothers and coarse solvers
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        change_smoothers(ml, 'sor', 'gauss_seidel')
+        assert(not ml.freeze())
+        assert(ml.frozen is None)
+        ml = smoothed_aggregation_solver(A, max_coarse=10,
+                                         coarse_solver='splu')
+        assert(not ml.freeze())
+
     def test_cycle_complexity(self):
         # four levels
         levels = []
@@ -143,6 +759,56 @@ class TestMultilevel(TestCase):
         assert_equal(mg.cycle_complexity(cycle='AMLI'), 9.52)
         assert_equal(mg.cycle_complexity(cycle='F'), 9.04)
 
+        # operation counts of the compiled cycles agree
+        for n in range(1, 5):
+            mg = multilevel_solver(levels[:n])
+            if n > 1:
+                change_smoothers(mg, ('gauss_seidel', {'iterations': 2}),
+                                 ('jacobi', {'iterations': 3}))
+            for cycle in ['V', 'W', 'F', 'AMLI']:
+                for cyclesPerLevel in [1, 2, 3]:
+                    assert_almost_equal(
+                        mg.plan_complexity(cycle, cyclesPerLevel),
+                        mg.cycle_complexity(cycle, cyclesPerLevel,
+                                            recompute=True))
+
+    def test_compile_cycle(self):
+        from pyamg import smoothed_aggregation_solver
+
+        levels = []
+        for n in [10, 5, 3]:
+            levels.append(multilevel_solver.level())
+            levels[-1].A = csr_matrix(ones((n, n)))
+        levels[0].P = csr_matrix(ones((10, 5)))
+        levels[1].P = csr_matrix(ones((5, 3)))
+        mg = multilevel_solver(levels)
+
+        V1 = [('presmooth', 1), ('restrict', 1), ('coarse_solve', 2),
+              ('interpolate', 1), ('postsmooth', 1)]
+        pre = [('presmooth', 0), ('restrict', 0)]
+        post = [('interpolate', 0), ('postsmooth', 0)]
+        assert_equal(mg.compile_cycle('V'), pre + V1 + post)
+        assert_equal(mg.compile_cycle('v', 2), pre + 2*V1 + post)
+        assert_equal(mg.compile_cycle('W'), pre + 2*V1 + post)
+        assert_equal(mg.compile_cycle('F'), pre + 2*V1 + post)
+        assert_equal(mg.compile_cycle('AMLI'), pre + [('amli', 0, V1)] + post)
+        assert(mg.compile_cycle('W') is mg.compile_cycle('W'))
+        assert_equal(multilevel_solver(levels[2:]).compile_cycle('V'),
+                     [('coarse_solve', 0)])
+        self.assertRaises(TypeError, mg.compile_cycle, 'X')
+        self.assertRaises(ValueError, mg.compile_cycle, 'V', 0)
+
+        # repeated coarse cycles reduce the error further
+        A = poisson((50, 50), format='csr')
+        b = rand(A.shape[0])
+        ml = smoothed_aggregation_solver(A, max_coarse=10)
+        for cycle in ['V', 'W', 'F', 'AMLI']:
+            res1, res2 = [], []
+            ml.solve(b, maxiter=3, cycle=cycle, residuals=res1)
+            ml.solve(b, maxiter=3, cycle=cycle, residuals=res2,
+                     cyclesPerLevel=3)
+            assert(res2[-1] < res1[-1])
+
 
 class TestComplexMultilevel(TestCase):
     def test_coarse_grid_solver(self):
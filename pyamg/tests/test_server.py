@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+from scipy import rand
+from scipy.linalg import norm
+from pyamg import smoothed_aggregation_solver
+from pyamg.gallery import poisson
+from pyamg.server import solve_server
+
+from numpy.testing import TestCase, assert_equal, assert_almost_equal, \
+    assert_raises
+
+
+class TestSolveServer(TestCase):
+    def setUp(self):
+        self.A = poisson((30, 30), format='csr')
+        self.ml = smoothed_aggregation_solver(self.A, max_coarse=10)
+
+    def test_grouping(self):
+        A, ml = self.A, self.ml
+        np.random.seed(0)
+        bs = [rand(A.shape[0]) for i in range(10)]
+
+        with solve_server(ml, window=0.5, max_group=4, tol=1e-8) as server:
+            requests = [server.submit(b) for b in bs]
+            xs = [request.result() for request in requests]
+
+            for b, x, request in zip(bs, xs, requests):
+                res = []
+                x_gold = ml.solve(b, tol=1e-8, residuals=res)
+                assert_almost_equal(x, x_gold)
+                assert_almost_equal(request.residuals, res)
+                assert(norm(b - A * x) < 1e-8 * norm(b))
+
+            assert_equal([request.group_size for request in requests],
+                         [4] * 8 + [2] * 2)
+            metrics = server.metrics()
+            assert_equal(metrics['requests'], 10)
+            assert_equal(metrics['groups'], 3)
+            assert(metrics['throughput'] > 0)
+            assert(metrics['latency_max'] >= metrics['latency_p50'] > 0)
+
+    def test_threads(self):
+        A, ml = self.A, self.ml
+        server = solve_server(ml, window=0.01, tol=1e-8)
+        results = {}
+
+        def client(k):
+            b = A * np.full(A.shape[0], k + 1.0)
+            x0 = np.zeros(A.shape[0])
+            results[k] = server.solve(b, x0=x0, timeout=60)
+
+        threads = [threading.Thread(target=client, args=(k,))
+                   for k in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for k in range(6):
+            assert_almost_equal(results[k], k + 1.0, decimal=5)
+        assert_equal(server.metrics()['requests'], 6)
+
+        # queued requests are solved by close
+        request = server.submit(rand(A.shape[0]))
+        server.close()
+        assert(request.done())
+        assert_raises(RuntimeError, server.submit, rand(A.shape[0]))
+
+    def test_errors(self):
+        server = solve_server(self.ml)
+        assert_raises(ValueError, server.submit, rand(5))
+        assert_raises(ValueError, server.submit, rand(self.A.shape[0]),
+                      x0=rand(5))
+        # failures of the solve are raised by the request
+        request = server.submit(np.full(self.A.shape[0], 'x', dtype=object))
+        assert_raises(Exception, request.result, 60)
+        server.close()
+        assert_raises(ValueError, solve_server, self.ml, max_group=0)
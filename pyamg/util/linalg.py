@@ -9,7 +9,8 @@ import scipy.sparse as sparse
 from scipy.linalg.lapack import get_lapack_funcs
 from scipy.linalg.lapack import _compute_lwork
 
-__all__ = ['approximate_spectral_radius', 'infinity_norm', 'norm',
+__all__ = ['approximate_spectral_radius', 'estimate_spectral_radius',
+           'infinity_norm', 'norm',
            'residual_norm', 'condest', 'cond', 'ishermitian',
            'pinv_array']
 
@@ -416,6 +417,208 @@ def approximate_spectral_radius(A, tol=0.01, maxiter=15, restart=5,
         return A.rho
 
 
+def _block_diagonal_operator(blocks):
+    """Return a function applying the block diagonal matrix of blocks
+
+    blocks is a vector of length n (diagonal) or an (n/R, R, R) array of
+    R x R blocks.
+    """
+    if blocks.ndim == 1:
+        return lambda x: blocks * x
+    R = blocks.shape[1]
+    return lambda x: np.einsum('ijk,ik->ij', blocks,
+                               x.reshape(-1, R)).ravel()
+
+
+def _lanczos_spectral_radius(A, Dinv, maxiter, v0):
+    """Fixed number of Lanczos steps for the spectral radius of Dinv*A
+
+    Dinv*A is self-adjoint in the inner product <x, y>_D = y^H D x, with D
+    the inverse of Dinv, when A and D are Hermitian and D is positive
+    definite.  The iteration keeps the product of D with its Lanczos
+    vectors, so that D is only applied to the initial guess.
+    """
+    if Dinv is None:
+        apply_Dinv = apply_D = lambda x: x
+    elif Dinv.ndim == 1:
+        D = np.zeros_like(Dinv)
+        D[Dinv != 0] = 1.0 / Dinv[Dinv != 0]
+        apply_Dinv = _block_diagonal_operator(Dinv)
+        apply_D = _block_diagonal_operator(D)
+    else:
+        D = np.array(Dinv, copy=True)
+        pinv_array(D)
+        apply_Dinv = _block_diagonal_operator(Dinv)
+        apply_D = _block_diagonal_operator(D)
+
+    v = v0
+    Dv = apply_D(v)
+    scale = np.sqrt(np.abs(np.vdot(v, Dv)))
+    v, Dv = v / scale, Dv / scale
+    v_old = Dv_old = np.zeros_like(v)
+    V, alpha, beta = [], [], [0.0]
+
+    for k in range(maxiter):
+        V.append(v)
+        Av = np.ravel(A.dot(v))
+        a = np.real(np.vdot(v, Av))
+        alpha.append(a)
+
+        # w = Dinv*A*v - a*v - b*v_old, and its product with D
+        Dw = Av - a * Dv - beta[-1] * Dv_old
+        w = apply_Dinv(Av) - a * v - beta[-1] * v_old
+        b = np.sqrt(max(np.real(np.vdot(w, Dw)), 0.0))
+        if b <= np.finfo(float).eps * max(abs(a), 1.0):
+            # invariant subspace found
+            break
+        beta.append(b)
+        v_old, Dv_old = v, Dv
+        v, Dv = w / b, Dw / b
+
+    m = len(alpha)
+    T = np.diag(alpha) + np.diag(beta[1:m], 1) + np.diag(beta[1:m], -1)
+    from scipy.linalg import eigh
+    evals, evects = eigh(T)
+    max_index = np.abs(evals).argmax()
+    vector = np.dot(np.column_stack(V), evects[:, max_index])
+    return np.abs(evals[max_index]), vector
+
+
+def estimate_spectral_radius(A, method='arnoldi', Dinv=None, maxiter=None,
+                             initial_guess=None, return_vector=False):
+    """
+    Estimate the spectral radius of A or of a block diagonal scaling Dinv*A
+
+    Parameters
+    ----------
+    A : {dense or sparse matrix}
+        Square matrix, e.g. csr_matrix, bsr_matrix or ndarray
+    method : {string}
+        'arnoldi'    - restarted Arnoldi iteration, see
+                       approximate_spectral_radius
+        'lanczos'    - fixed number of Lanczos steps, for Hermitian A (and
+                       Hermitian positive definite inverse of Dinv)
+        'gershgorin' - maximum absolute row sum, an upper bound that
+                       requires no iteration
+    Dinv : {None, array}
+        None for A, a vector of length n for diag(Dinv)*A, or an array of
+        size (n/blocksize, blocksize, blocksize) for the block diagonal
+        scaling Dinv*A, e.g., from get_block_diag(A, inv_flag=True)
+    maxiter : {integer}
+        Number of Arnoldi iterations per restart (default 15), or of
+        Lanczos steps (default 10)
+    initial_guess : {array|None}
+        Starting vector of length n, e.g., the vector returned by an
+        earlier estimate for a similar matrix.  If None, then a random
+        initial guess is used.
+    return_vector : {boolean}
+        True - also return an approximate dominant eigenvector, or None for
+               the 'gershgorin' method
+
+    Returns
+    -------
+    An estimate of the spectral radius of Dinv*A, and if return_vector=True,
+    then also an approximate dominant eigenvector
+
+    Notes
+    -----
+    The Arnoldi and Lanczos estimates are Ritz values, which approach the
+    spectral radius from below, while the Gershgorin bound is an upper
+    bound, possibly a pessimistic one.  The Lanczos steps cost one product
+    with A and a few vector updates each, without the orthogonalization
+    against all previous vectors and the restarts of Arnoldi.  A good
+    initial guess, such as the dominant eigenvector of a previous matrix
+    in a sequence, reduces the number of restarts of Arnoldi and improves
+    the Lanczos estimate.
+
+    Unlike approximate_spectral_radius, the estimate is not cached on A.
+
+    Examples
+    --------
+    >>> from pyamg.gallery import poisson
+    >>> from pyamg.util.linalg import estimate_spectral_radius
+    >>> A = poisson((10, 10), format='csr')
+    >>> print(estimate_spectral_radius(A, method='gershgorin'))
+    8.0
+    >>> print(7.5 < estimate_spectral_radius(A, method='lanczos') <= 8.0)
+    True
+    """
+    if method not in ['arnoldi', 'lanczos', 'gershgorin']:
+        raise ValueError('unknown method (%s)' % method)
+    if A.shape[0] != A.shape[1]:
+        raise ValueError('expected square A')
+    n = A.shape[0]
+
+    if Dinv is not None:
+        Dinv = np.asarray(Dinv)
+        if Dinv.ndim == 1:
+            size = Dinv.shape[0]
+        elif Dinv.ndim == 3 and Dinv.shape[1] == Dinv.shape[2]:
+            size = Dinv.shape[0] * Dinv.shape[1]
+        else:
+            raise ValueError('Dinv has incorrect dimensions')
+        if size != n:
+            raise ValueError('Dinv and A have incompatible dimensions')
+
+    if method == 'gershgorin':
+        row_sums = np.asarray(abs(A).sum(axis=1)).ravel()
+        if Dinv is not None and Dinv.ndim == 1:
+            row_sums = np.abs(Dinv) * row_sums
+        elif Dinv is not None:
+            # |Dinv A| <= |Dinv| |A| entrywise
+            R = Dinv.shape[1]
+            row_sums = np.einsum('ijk,ik->ij', np.abs(Dinv),
+                                 row_sums.reshape(-1, R)).ravel()
+        rho = row_sums.max() if n > 0 else 0.0
+        vector = None
+
+    else:
+        if initial_guess is None:
+            v0 = sp.rand(n)
+            if np.iscomplexobj(A):
+                v0 = v0 + 1.0j * sp.rand(n)
+        else:
+            if initial_guess.shape[0] != n:
+                raise ValueError('initial_guess and A must have same shape')
+            v0 = np.ravel(initial_guess)
+        dtype = np.result_type(A.dtype, float)
+        if Dinv is not None:
+            dtype = np.result_type(dtype, Dinv.dtype)
+        v0 = np.array(v0, dtype=dtype)
+
+        if method == 'lanczos':
+            if maxiter is None:
+                maxiter = 10
+            if maxiter < 1:
+                raise ValueError('expected maxiter > 0')
+            rho, vector = _lanczos_spectral_radius(A, Dinv, maxiter, v0)
+        else:
+            if maxiter is None:
+                maxiter = 15
+            if Dinv is None:
+                M = A
+            elif Dinv.ndim == 1 and sparse.isspmatrix(A):
+                from pyamg.util.utils import scale_rows
+                M = scale_rows(A, Dinv, copy=True)
+            else:
+                from scipy.sparse.linalg import LinearOperator
+                apply_Dinv = _block_diagonal_operator(Dinv)
+
+                # Don't explicitly form Dinv*A
+                def matvec(x):
+                    return apply_Dinv(np.ravel(A.dot(x)))
+                M = LinearOperator(A.shape, matvec, dtype=v0.dtype)
+            rho, vector = approximate_spectral_radius(M, maxiter=maxiter,
+                                                      initial_guess=v0,
+                                                      return_vector=True)
+            vector = np.ravel(vector)
+
+    if return_vector:
+        return (rho, vector)
+    else:
+        return rho
+
+
 def condest(A, tol=0.1, maxiter=25, symmetric=False):
     """Estimates the condition number of A
 
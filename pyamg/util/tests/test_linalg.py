@@ -4,7 +4,7 @@ from scipy.sparse import csr_matrix
 from scipy.linalg import svd, eigvals
 
 from pyamg.util.linalg import approximate_spectral_radius,\
-    infinity_norm, norm, condest, cond,\
+    estimate_spectral_radius, infinity_norm, norm, condest, cond,\
     ishermitian, pinv_array
 
 from pyamg import gallery
@@ -121,6 +121,52 @@ class TestLinalg(TestCase):
             assert_equal(abs(ans2 - expected)/abs(expected) < 0.001, True)
             assert_equal(abs(ans2 - expected) < 0.1*abs(ans1 - expected), True)
 
+    def test_estimate_spectral_radius(self):
+        from numpy import diag
+        from scipy.sparse import block_diag
+        from pyamg.util.utils import get_diagonal, get_block_diag
+        random.seed(0)
+
+        cases = [gallery.poisson((12, 12), format='csr'),
+                 gallery.linear_elasticity((6, 6), format='bsr')[0]]
+        for A in cases:
+            R = A.blocksize[0] if A.format == 'bsr' else 1
+            Dinvs = [None, get_diagonal(A, inv=True),
+                     get_block_diag(A, blocksize=R, inv_flag=True)]
+            for Dinv in Dinvs:
+                if Dinv is None:
+                    M = A.toarray()
+                elif Dinv.ndim == 1:
+                    M = diag(Dinv).dot(A.toarray())
+                else:
+                    M = block_diag(list(Dinv)).dot(A).toarray()
+                expected = abs(eigvals(M)).max()
+
+                rho = estimate_spectral_radius(A, 'gershgorin', Dinv)
+                assert_equal(rho >= expected * (1 - 1e-12), True)
+                if Dinv is None or Dinv.ndim == 1:
+                    assert_almost_equal(rho, abs(M).sum(axis=1).max())
+
+                for method in ['arnoldi', 'lanczos']:
+                    rho, v = estimate_spectral_radius(A, method, Dinv,
+                                                      return_vector=True)
+                    assert_equal(rho <= expected * (1 + 1e-8), True)
+                    assert_equal(abs(rho - expected) < 0.05 * expected, True)
+
+                    # a good initial guess improves the estimate
+                    rho2 = estimate_spectral_radius(A, method, Dinv,
+                                                    initial_guess=v)
+                    assert_equal(abs(rho2 - expected) <=
+                                 abs(rho - expected) + 1e-8 * expected, True)
+                assert_equal(hasattr(A, 'rho'), Dinv is None)
+                if hasattr(A, 'rho'):
+                    del A.rho
+
+        A = gallery.poisson((5,), format='csr')
+        self.assertRaises(ValueError, estimate_spectral_radius, A, 'power')
+        self.assertRaises(ValueError, estimate_spectral_radius, A,
+                          Dinv=get_diagonal(A)[:4])
+
     def test_infinity_norm(self):
         A = matrix([[-4]])
         assert_equal(infinity_norm(csr_matrix(A)), 4)
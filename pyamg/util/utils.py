@@ -23,7 +23,8 @@ __all__ = ['unpack_arg', 'blocksize', 'diag_sparse', 'profile_solver',
            'levelize_strength_or_aggregation',
            'levelize_smooth_or_improve_candidates', 'filter_matrix_columns',
            'filter_matrix_rows', 'truncate_rows', 'mat_mat_complexity',
-           'extract_diagonal_blocks', 'scale_block_inverse']
+           'extract_diagonal_blocks', 'scale_block_inverse',
+           'set_num_threads', 'get_num_threads']
 
 try:
     from scipy.sparse._sparsetools import csr_scale_rows, bsr_scale_rows
@@ -56,6 +57,58 @@ def blocksize(A):
         return 1
 
 
+# Number of threads of the threaded amg_core kernels, see set_num_threads
+_num_threads = 1
+
+
+def set_num_threads(n=None):
+    """Set the number of threads used by the threaded amg_core kernels
+
+    Parameters
+    ----------
+    n : {int, None}
+        Maximum number of threads, or None for the number of CPUs.  With
+        n = 1, the default, all kernels run serially.
+
+    Returns
+    -------
+    Nothing, the setting applies to all subsequent calls
+
+    Notes
+    -----
+    The threaded kernels partition the rows of a matrix among the threads,
+    and each row is computed by one thread in the serial order, so that the
+    results do not depend on the number of threads.  Small matrices are
+    handled by fewer threads, or serially.
+
+    Examples
+    --------
+    >>> from pyamg.util.utils import set_num_threads, get_num_threads
+    >>> set_num_threads(4)
+    >>> get_num_threads()
+    4
+    >>> set_num_threads(1)
+
+    """
+    global _num_threads
+
+    if n is None:
+        import multiprocessing
+        n = multiprocessing.cpu_count()
+    if int(n) != n or n < 1:
+        raise ValueError('number of threads must be a positive integer')
+
+    _num_threads = int(n)
+
+
+def get_num_threads():
+    """Return the number of threads used by the threaded amg_core kernels
+
+    See set_num_threads
+    """
+    return _num_threads
+
+
 def profile_solver(ml, accel=None, **kwargs):
     """
     A quick solver to profile a particular multilevel object
@@ -1920,7 +1973,10 @@ def remove_diagonal(S):
     if S.shape[0] != S.shape[1]:
         raise ValueError('expected square matrix, shape=%s' % (S.shape,))
 
-    S.setdiag(0.0)
+    # zero the stored diagonal entries, setdiag would insert missing ones
+    rows = np.repeat(np.arange(S.shape[0], dtype=S.indices.dtype),
+                     np.diff(S.indptr))
+    S.data[rows == S.indices] = 0
     S.eliminate_zeros()
     return S
 